@@ -0,0 +1,106 @@
+r"""
+Benchmark the import time of each command line entry point, as reported by `python -X importtime` in a fresh
+interpreter, and check that none of them pull in the slow optional modules (VTK, pandas, tabulate) at start up. Each
+entry point is imported several times and the fastest run is reported (the others are mostly disk cache noise).
+Timings are written to a JSON file; if a threshold is given the script exits with a non-zero status when an entry
+point is slower than the threshold or imports a slow module, so that it can be used as a regression check.
+
+Example:
+
+    python benchmarks/benchmark_import_times.py --repeats 5 --max-ms 1000 --output import_times.json
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+from argparse import ArgumentParser
+
+ENTRY_POINTS = [
+    "m4db.scripts.m4db_setup_database.cmd_line_tool",
+    "m4db.scripts.m4db_user.cmd_line_tool",
+    "m4db.scripts.m4db_software.cmd_line_tool",
+    "m4db.scripts.m4db_project.cmd_line_tool",
+    "m4db.scripts.m4db_geometry.cmd_line_tool",
+    "m4db.scripts.m4db_model.cmd_line_tool",
+    "m4db.scripts.m4db_run_model.cmd_line_tool",
+    "m4db.scripts.m4db_assay.actions"
+]
+
+# Modules that should only ever be imported by the commands that use them.
+SLOW_MODULES = ["vtk", "pandas", "tabulate"]
+
+# A line of `-X importtime` output, i.e. 'import time: <self us> | <cumulative us> | <indented module name>'.
+regex_import_time = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def import_times(module):
+    r"""
+    Import a module in a fresh interpreter with `-X importtime`.
+    :param module: the name of the module to import.
+    :return: a pair with the cumulative import time of the module (in milliseconds) and the set of (top level) modules
+             that were imported along the way.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError("Could not import '{}':\n{}".format(module, result.stderr))
+
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        match = regex_import_time.match(line)
+        if match is None:
+            continue
+        name = match.group(4)
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(match.group(2))
+
+    return cumulative_us / 1000.0, imported
+
+
+def command_line_parser():
+    parser = ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="the number of times each entry point is imported")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="fail if an entry point takes longer than this to import (in milliseconds)")
+    parser.add_argument("--output", default="import_times.json", help="the output JSON file")
+    return parser
+
+
+def main():
+    args = command_line_parser().parse_args()
+
+    timings = {"repeats": args.repeats, "entry_points": {}}
+    failures = []
+    for module in ENTRY_POINTS:
+        runs = []
+        slow_modules = set()
+        for _ in range(args.repeats):
+            cumulative_ms, imported = import_times(module)
+            runs.append(cumulative_ms)
+            slow_modules |= imported.intersection(SLOW_MODULES)
+
+        timings["entry_points"][module] = {"min_ms": min(runs), "runs_ms": runs, "slow_modules": sorted(slow_modules)}
+
+        if slow_modules:
+            failures.append("{} imports {}".format(module, ", ".join(sorted(slow_modules))))
+        if args.max_ms is not None and min(runs) > args.max_ms:
+            failures.append("{} takes {:.1f} ms to import (max. {:.1f} ms)".format(module, min(runs), args.max_ms))
+
+    print(json.dumps(timings, indent=4))
+    with open(args.output, "w") as fout:
+        json.dump(timings, fout, indent=4)
+
+    if failures:
+        for failure in failures:
+            print(failure, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+r"""
+Benchmark the vectorised mesh statistics against the original per-element routines.
+
+A synthetic mesh is built by splitting each cube of an n x n x n grid in to six tetrahedra (by default n = 56, i.e.
+just over a million elements), the vectorised routines are timed on the whole mesh and, since the original routines
+are much slower, on a (smaller) sample of elements; timings are written to a JSON file.
+
+Example:
+
+    python benchmarks/benchmark_mesh_statistics.py --cubes 56 --output mesh_statistics.json
+"""
+import json
+import time
+
+from argparse import ArgumentParser
+
+import numpy as np
+
+from m4db.utilities.geometry import tetra_volume
+from m4db.utilities.geometry import edge_length
+from m4db.utilities.geometry import order_pair
+
+from m4db.utilities.mesh_statistics import edge_lengths
+from m4db.utilities.mesh_statistics import element_volumes
+from m4db.utilities.mesh_statistics import mesh_statistics
+from m4db.utilities.mesh_statistics import unique_edges
+
+# The six tetrahedra (as cube corner indices) of a Kuhn subdivision of a cube, corner index = x + 2y + 4z.
+KUHN_TETRAHEDRA = np.array([
+    [0, 1, 3, 7], [0, 1, 5, 7], [0, 2, 3, 7], [0, 2, 6, 7], [0, 4, 5, 7], [0, 4, 6, 7]
+])
+
+
+def cube_mesh(ncubes):
+    r"""
+    Build a tetrahedral mesh of a unit cube.
+    :param ncubes: the number of sub-cubes along each side.
+    :return: a pair containing the vertices and elements of the mesh.
+    """
+    axis = np.linspace(0.0, 1.0, ncubes + 1)
+    x, y, z = np.meshgrid(axis, axis, axis, indexing="ij")
+    vertices = np.column_stack((x.ravel(), y.ravel(), z.ravel()))
+
+    n = ncubes + 1
+    i, j, k = np.meshgrid(np.arange(ncubes), np.arange(ncubes), np.arange(ncubes), indexing="ij")
+    origins = (i * n * n + j * n + k).ravel()
+    offsets = np.array([
+        dx * n * n + dy * n + dz for dz in (0, 1) for dy in (0, 1) for dx in (0, 1)
+    ])
+    corners = origins[:, np.newaxis] + offsets[np.newaxis, :]
+
+    elements = corners[:, KUHN_TETRAHEDRA].reshape(-1, 4)
+
+    return vertices, elements
+
+
+def per_element_volume(vertices, elements):
+    return sum(tetra_volume(*vertices[element]) for element in elements)
+
+
+def per_element_edge_lengths(vertices, elements):
+    lengths = {}
+    for element in elements:
+        for i in range(4):
+            for j in range(i + 1, 4):
+                key = order_pair((element[i], element[j]))
+                if key not in lengths:
+                    lengths[key] = edge_length(vertices[key[0]], vertices[key[1]])
+    return list(lengths.values())
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def command_line_parser():
+    parser = ArgumentParser()
+    parser.add_argument("--cubes", type=int, default=56, help="the number of sub-cubes along each side of the mesh")
+    parser.add_argument("--sample", type=int, default=20000,
+                        help="the number of elements used to time the per-element routines")
+    parser.add_argument("--output", default="mesh_statistics.json", help="the output JSON file")
+    return parser
+
+
+def main():
+    args = command_line_parser().parse_args()
+
+    vertices, elements = cube_mesh(args.cubes)
+    sample = elements[:args.sample]
+
+    timings = {"nvertices": len(vertices), "nelements": len(elements), "sample": len(sample)}
+
+    volumes, timings["vectorised_volumes"] = timed(element_volumes, vertices, elements)
+    edges, timings["vectorised_unique_edges"] = timed(unique_edges, elements)
+    _, timings["vectorised_edge_lengths"] = timed(edge_lengths, vertices, edges)
+    statistics, timings["vectorised_mesh_statistics"] = timed(mesh_statistics, vertices, elements)
+
+    _, timings["per_element_volume_sample"] = timed(per_element_volume, vertices, sample)
+    _, timings["per_element_edge_lengths_sample"] = timed(per_element_edge_lengths, vertices, sample)
+    _, timings["vectorised_volume_sample"] = timed(element_volumes, vertices, sample)
+
+    timings["volume"] = float(volumes.sum())
+    timings["statistics"] = statistics
+
+    print(json.dumps(timings, indent=4))
+    with open(args.output, "w") as fout:
+        json.dump(timings, fout, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+r"""
+Benchmark the model/NEB retrieval queries with and without the secondary (and partial) indexes.
+
+A synthetic database with (by default) one million models, and a tenth as many NEBs, is written to an *empty*
+PostgreSQL database; each query is then run with EXPLAIN ANALYZE, first without and then with the indexes, and the
+planning/execution times are recorded in a JSON file.
+
+Example:
+
+    createdb m4db_index_benchmark
+    python benchmarks/benchmark_model_indexes.py postgresql+psycopg2:///m4db_index_benchmark --output indexes.json
+"""
+import json
+import time
+
+from argparse import ArgumentParser
+
+from sqlalchemy import DateTime
+from sqlalchemy import create_engine
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from m4db.orm.schema import Base
+from m4db.orm.schema import Model
+from m4db.orm.schema import NEB
+
+from m4db.install.data.anisotropy_forms import populate_anisotropy_forms
+from m4db.install.data.neb_calculation_type import populate_neb_calculation_types
+from m4db.install.data.running_statuses import populate_running_statuses
+from m4db.install.data.size_conventions import populate_size_conventions
+
+from m4db.install.indexes import create_secondary_indexes
+from m4db.install.indexes import drop_secondary_indexes
+from m4db.install.indexes import create_partial_indexes
+from m4db.install.indexes import drop_partial_indexes
+
+from m4db.db.model.retrieve import get_models_query
+
+
+def insert_series(session, table_name, nrows, values):
+    r"""
+    Insert `nrows` synthetic rows in to a table with a single INSERT ... SELECT over generate_series.
+    :param session: the database session.
+    :param table_name: the table to populate.
+    :param nrows: the number of rows, the series variable 'i' runs from 1 to `nrows`.
+    :param values: a dictionary of SQL expressions (in terms of 'i') keyed on column name, non-null columns that are
+                   not given are filled from their scalar defaults (or now() for timestamps and a random uuid for
+                   unique ids).
+    :return: None
+    """
+    table = Base.metadata.tables[table_name]
+
+    values = dict(values)
+    for column in table.columns:
+        if column.name in values or column.nullable or column.primary_key:
+            continue
+        if column.name == "unique_id":
+            values[column.name] = "md5(random()::text || i::text)::uuid::text"
+        elif isinstance(column.type, DateTime):
+            values[column.name] = "now()"
+        elif column.default is not None and column.default.is_scalar:
+            values[column.name] = repr(column.default.arg).lower() \
+                if isinstance(column.default.arg, bool) else repr(column.default.arg)
+        else:
+            raise ValueError(f"No value given for non-null column '{table_name}.{column.name}'")
+
+    columns = ", ".join(values.keys())
+    expressions = ", ".join(values.values())
+
+    session.execute(text(
+        f"insert into {table_name} ({columns}) select {expressions} from generate_series(1, {nrows}) as i"
+    ))
+
+
+def populate_synthetic_database(session, nmodels, ngeometries=1000, nmetadata=100):
+    r"""
+    Populate an empty database with synthetic models and NEBs.
+    :param session: the database session.
+    :param nmodels: the number of models.
+    :param ngeometries: the number of geometries that models are spread over.
+    :param nmetadata: the number of metadata (user/project/software) records that models are spread over.
+    :return: None
+    """
+    populate_anisotropy_forms(session)
+    populate_neb_calculation_types(session)
+    populate_running_statuses(session)
+    populate_size_conventions(session)
+
+    statuses = dict(session.execute(text("select name, id from running_status")).all())
+
+    insert_series(session, "db_user", 1, {"user_name": "'benchmark'", "first_name": "'Bench'",
+                                          "surname": "'Mark'", "email": "'benchmark@example.com'"})
+    insert_series(session, "project", 1, {"name": "'benchmark'", "description": "'benchmark project'"})
+    insert_series(session, "software", 1, {"name": "'merrill'", "version": "'1.8.6'"})
+    insert_series(session, "metadata", nmetadata, {"db_user_id": "1", "project_id": "1", "software_id": "1"})
+
+    insert_series(session, "geometry", ngeometries, {"id": "i", "type": "'ellipsoid'"})
+    insert_series(session, "ellipsoid", ngeometries, {"id": "i", "size": "i * 0.001", "element_size": "0.01",
+                                                      "prolateness": "1.0", "oblateness": "1.0",
+                                                      "size_convention_id": "1"})
+
+    insert_series(session, "initial_magnetization", 1, {"id": "i", "type": "'random_initial_magnetization'"})
+    insert_series(session, "random_initial_magnetization", 1, {"id": "i"})
+    insert_series(session, "model_run_data", 1, {})
+    insert_series(session, "model_report_data", 1, {})
+    insert_series(session, "neb_run_data", 1, {})
+    insert_series(session, "neb_report_data", 1, {})
+
+    # Most models are finished, the rest are spread over the other statuses.
+    running_status = f"""
+        case
+            when i % 100 < 90 then {statuses['finished']}
+            when i % 100 < 95 then {statuses['not-run']}
+            when i % 100 < 97 then {statuses['running']}
+            when i % 100 < 98 then {statuses['scheduled']}
+            when i % 100 < 99 then {statuses['re-run']}
+            else {statuses['crashed']}
+        end
+    """
+
+    insert_series(session, "model", nmodels, {
+        "id": "i",
+        "geometry_id": f"1 + i % {ngeometries}",
+        "initial_magnetization_id": "1",
+        "running_status_id": running_status,
+        "model_run_data_id": "1",
+        "model_report_data_id": "1",
+        "mdata_id": f"1 + i % {nmetadata}",
+        "e_tot": "random()"
+    })
+
+    insert_series(session, "material", nmodels, {
+        "model_id": "i",
+        "name": "case when i % 2 = 0 then 'magnetite' else 'iron' end",
+        "temperature": "20 * (i % 5)",
+        "anisotropy_form_id": "1"
+    })
+
+    nnebs = nmodels // 10
+    insert_series(session, "neb", nnebs, {
+        "id": "i",
+        "start_model_id": "10 * i - 9",
+        "end_model_id": "10 * i - 8",
+        "parent_neb_id": "case when i % 5 = 0 then i - 1 end",
+        "neb_calculation_type_id": "1",
+        "neb_run_data_id": "1",
+        "neb_report_data_id": "1",
+        "running_status_id": running_status,
+        "mdata_id": f"1 + i % {nmetadata}"
+    })
+
+    session.commit()
+
+
+def benchmark_queries(session, nmodels):
+    r"""
+    The queries to benchmark.
+    :param session: the database session.
+    :param nmodels: the number of models in the synthetic database.
+    :return: a dictionary of SQLAlchemy selectables keyed on a short description.
+    """
+    middle_id = nmodels // 2
+    return {
+        "models by status (first page)":
+            get_models_query(session, running_status="not-run").order_by(Model.id).limit(1000).statement,
+        "models by status (keyset page)":
+            get_models_query(session, running_status="not-run").
+            filter(Model.id > middle_id).order_by(Model.id).limit(1000).statement,
+        "models by status and user":
+            get_models_query(session, running_status="scheduled", db_user="benchmark").
+            order_by(Model.id).limit(1000).statement,
+        "models by geometry size":
+            get_models_query(session, size=0.5, size_convention="ESVD").statement,
+        "models by material and temperature":
+            get_models_query(session, running_status="finished", material="magnetite", temperature=40.0).
+            order_by(Model.id).limit(1000).statement,
+        "nebs by start model":
+            select(NEB.id).where(NEB.start_model_id == middle_id + 1),
+        "nebs by end model":
+            select(NEB.id).where(NEB.end_model_id == middle_id + 2),
+        "nebs by parent":
+            select(NEB.id).where(NEB.parent_neb_id == nmodels // 20),
+    }
+
+
+def scan_nodes(plan):
+    r"""
+    Summarise the scans in a query plan.
+    :param plan: a (JSON) plan node.
+    :return: a list of strings of the form '<node type> on <relation> [using <index>]'.
+    """
+    scans = []
+    if "Relation Name" in plan:
+        scan = f"{plan['Node Type']} on {plan['Relation Name']}"
+        if "Index Name" in plan:
+            scan += f" using {plan['Index Name']}"
+        scans.append(scan)
+    for child in plan.get("Plans", []):
+        scans.extend(scan_nodes(child))
+
+    return scans
+
+
+def explain_analyze(session, statement):
+    r"""
+    Run EXPLAIN ANALYZE on a statement.
+    :param session: the database session.
+    :param statement: an SQLAlchemy selectable.
+    :return: a dictionary with the planning time, execution time (both in ms) and the top level plan node type.
+    """
+    sql = str(statement.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}))
+    plan = session.execute(text(f"explain (analyze, buffers, format json) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return {
+        "planning_time": plan[0]["Planning Time"],
+        "execution_time": plan[0]["Execution Time"],
+        "scans": scan_nodes(plan[0]["Plan"])
+    }
+
+
+def command_line_parser():
+    parser = ArgumentParser()
+
+    parser.add_argument("db_uri", help="the SQLAlchemy URI of an empty PostgreSQL database")
+    parser.add_argument("--nmodels", type=int, default=1000000, help="the number of synthetic models")
+    parser.add_argument("--repeats", type=int, default=3, help="the number of times each query is run")
+    parser.add_argument("--output", default="model_index_benchmark.json", help="the JSON file for the results")
+    parser.add_argument("--reuse", action="store_true", help="reuse an already populated benchmark database")
+
+    return parser
+
+
+def main():
+    parser = command_line_parser()
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_uri)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("EXPLAIN ANALYZE benchmarks require a PostgreSQL database.")
+
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    if not args.reuse:
+        if session.execute(text("select count(*) from model")).scalar() != 0:
+            raise SystemExit("The benchmark database must be empty (or use --reuse).")
+        start = time.perf_counter()
+        populate_synthetic_database(session, args.nmodels)
+        print(f"Populated {args.nmodels} models in {time.perf_counter() - start:.1f}s")
+
+    results = {"nmodels": args.nmodels, "queries": {}}
+    for label, indexed in [("without_indexes", False), ("with_indexes", True)]:
+        if indexed:
+            create_secondary_indexes(session)
+            create_partial_indexes(session)
+        else:
+            drop_partial_indexes(session)
+            drop_secondary_indexes(session)
+        session.execute(text("analyze"))
+        session.commit()
+
+        for name, statement in benchmark_queries(session, args.nmodels).items():
+            # Keep the fastest run, the first run also warms the cache.
+            timings = [explain_analyze(session, statement) for _ in range(args.repeats)]
+            best = min(timings, key=lambda timing: timing["execution_time"])
+            results["queries"].setdefault(name, {})[label] = best
+            print(f"{label:16s} {name:40s} {best['execution_time']:10.3f}ms  {'; '.join(best['scans'])}")
+
+    with open(args.output, "w") as fout:
+        json.dump(results, fout, indent=2)
+
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+r"""
+Benchmark template rendering: the cost of the first render in a new environment (i.e. what a short-lived command line
+tool or runner pays) with no cache, with the bytecode cache and with precompiled templates, followed by batches of
+renders of the slurm (`model_slurm_script`) and MERRILL (`model_merrill_script`) scripts through the shared
+environment. Timings are written to a JSON file.
+
+Example:
+
+    python benchmarks/benchmark_templates.py --renders 10000 --output templates.json
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from argparse import ArgumentParser
+from types import SimpleNamespace
+
+from m4db.configuration import Configuration
+from m4db.configuration import Templates
+from m4db.configuration import write_config_to_file
+
+from m4db.template import model_merrill_script
+from m4db.template import model_slurm_script
+from m4db.template import precompile_templates
+from m4db.template import template_environment
+
+from m4db import GLOBAL
+
+TEMPLATE_NAMES = ["merrill_model.jinja2", "slurm_model.jinja2", "slurm_neb.jinja2"]
+
+
+def benchmark_config(directory):
+    r"""
+    Write a minimal configuration (required by the slurm scripts) and point the environment at it.
+    :param directory: the directory in which the configuration file is written.
+    :return: None
+    """
+    config = Configuration({
+        "password-salt": "salt",
+        "database": {"type": "SQLITE", "uri": "sqlite://", "file-root": directory, "working-root": directory},
+        "runner-web": {"host": "http://localhost", "port": 8080, "no-of-retries": 1, "backoff-factor": 1},
+        "scheduler": {"command": "sbatch"},
+        "modules": {"source": "/etc/profile.d/modules.sh", "path": "/opt/modules", "to-load": ["merrill", "m4db"]}
+    })
+    file_name = os.path.join(directory, "config.yaml")
+    write_config_to_file(file_name, config)
+    os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR] = file_name
+
+
+def benchmark_model(nmaterials):
+    r"""
+    Build an object with the attributes of a model that the MERRILL template uses.
+    :param nmaterials: the number of materials (submeshes) of the model.
+    :return: a model like object.
+    """
+    materials = [
+        SimpleNamespace(name="magnetite", temperature=20.0, submesh_id=index + 1, alpha=None, theta=None, phi=None,
+                        aex=None, ms=None, **{f"k{n}": (1.0e4 if n == 1 else None) for n in range(1, 11)})
+        for index in range(nmaterials)
+    ]
+    return SimpleNamespace(
+        max_energy_evaluations=10000,
+        initial_magnetization=SimpleNamespace(type="uniform_initial_magnetization", dir_x=1.0, dir_y=0.0, dir_z=0.0),
+        materials=materials,
+        applied_field=SimpleNamespace(strength=10.0, dir_x=0.0, dir_y=0.0, dir_z=1.0)
+    )
+
+
+def first_renders(templates):
+    r"""
+    Time the loading of every template in a new environment.
+    :param templates: the template settings used for the environment.
+    :return: the time taken in seconds.
+    """
+    start = time.perf_counter()
+    environment = template_environment(templates)
+    for template_name in TEMPLATE_NAMES:
+        environment.get_template(template_name)
+    return time.perf_counter() - start
+
+
+def timed_renders(function, nrenders, *args):
+    start = time.perf_counter()
+    for _ in range(nrenders):
+        function(*args)
+    return time.perf_counter() - start
+
+
+def command_line_parser():
+    parser = ArgumentParser()
+    parser.add_argument("--renders", type=int, default=10000, help="the number of renders per batch")
+    parser.add_argument("--batches", type=int, default=3, help="the number of batches of each script")
+    parser.add_argument("--materials", type=int, default=4, help="the number of materials of the MERRILL model")
+    parser.add_argument("--output", default="templates.json", help="the output JSON file")
+    return parser
+
+
+def main():
+    args = command_line_parser().parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        benchmark_config(directory)
+
+        cache_directory = os.path.join(directory, "cache")
+        precompiled_directory = os.path.join(directory, "precompiled")
+        precompile_templates(precompiled_directory)
+
+        timings = {"renders": args.renders, "materials": args.materials}
+        timings["first_load_no_cache"] = first_renders(Templates({"bytecode-cache": False}))
+        timings["first_load_cold_bytecode_cache"] = first_renders(
+            Templates({"bytecode-cache-directory": cache_directory}))
+        timings["first_load_warm_bytecode_cache"] = first_renders(
+            Templates({"bytecode-cache-directory": cache_directory}))
+        timings["first_load_precompiled"] = first_renders(
+            Templates({"bytecode-cache": False, "precompiled-directory": precompiled_directory}))
+
+        model = benchmark_model(args.materials)
+        timings["model_slurm_script"] = [
+            timed_renders(model_slurm_script, args.renders, "00000000-0000-0000-0000-000000000000")
+            for _ in range(args.batches)
+        ]
+        timings["model_merrill_script"] = [
+            timed_renders(model_merrill_script, args.renders, model) for _ in range(args.batches)
+        ]
+    finally:
+        shutil.rmtree(directory)
+
+    print(json.dumps(timings, indent=4))
+    with open(args.output, "w") as fout:
+        json.dump(timings, fout, indent=4)
+
+
+if __name__ == "__main__":
+    main()
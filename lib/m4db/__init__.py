@@ -55,6 +55,12 @@ class GLOBAL:
 
     M4DB_DATABASE_CONFIG_ENV_VAR = "M4DB_CONFIG_FILE"
 
+    # The validated configuration snapshot is stored next to the configuration file, with this suffix.
+    CONFIG_SNAPSHOT_SUFFIX = ".snapshot.json"
+
+    # The minimum time (in seconds) between checks for configuration changes by the web services.
+    CONFIG_RELOAD_INTERVAL = 30
+
     SALTED_PASSWORD_FORMAT = "{password}{salt}"
 
     REGEX_SOFTWARE_AND_VERSION = re.compile(r"([a-zA-Z0-9]+)@([0-9.-]+)")
@@ -63,6 +69,7 @@ class GLOBAL:
     GEOMETRY_EXODUS_FILE_NAME = "geometry.e"
     GEOMETRY_SCRIPT_FILE_NAME = "geometry.cubit"
     GEOMETRY_STDOUT_FILE_NAME = "geometry.stdout"
+    GEOMETRY_MESH_SIDECAR_FILE_NAME = "geometry.npz"
 
     # The global logger name.
     LOGGER_NAME = "m4db"
@@ -1,10 +1,14 @@
+import hashlib
+import json
 import os
+import tempfile
 
 import yaml
 
+from schematics.exceptions import BaseError
 from schematics.models import Model
 from schematics.types import StringType, IntType, ListType
-from schematics.types import BooleanType
+from schematics.types import BooleanType, FloatType
 from schematics.types.compound import ModelType
 
 from m4db.decorators import static
@@ -39,19 +43,61 @@ class Modules(Model):
     to_load = ListType(StringType, required=True, serialized_name="to-load")
 
 
+class SQLite(Model):
+    r"""
+    Class to hold the SQLite connection settings (used when the database type is SQLITE). The 'performance' profile
+    uses write-ahead logging, memory-mapped I/O and a larger page cache, the 'default' profile leaves SQLite's own
+    settings in place; the busy timeout is set for either profile.
+    """
+    profile = StringType(default="performance", choices=["default", "performance"])
+    journal_mode = StringType(default="wal", choices=["delete", "truncate", "persist", "memory", "wal"],
+                              serialized_name="journal-mode")
+    synchronous = StringType(default="normal", choices=["off", "normal", "full", "extra"])
+
+    # The maximum number of bytes of the database file that are memory-mapped.
+    mmap_size = IntType(default=268435456, min_value=0, serialized_name="mmap-size")
+
+    # The page cache size in KiB.
+    cache_size = IntType(default=65536, min_value=0, serialized_name="cache-size")
+
+    # The time (in milliseconds) to wait for a lock before raising 'database is locked'.
+    busy_timeout = IntType(default=30000, min_value=0, serialized_name="busy-timeout")
+
+    # The maximum number of queued writes that are committed in a single transaction.
+    write_batch_size = IntType(default=100, min_value=1, serialized_name="write-batch-size")
+
+
 class Database(Model):
     r"""
     Class to hold configuration information about databases for M4DB_DATABASE.
     """
-    type = StringType(required=True, regex=r"POSTGRES")
+    type = StringType(required=True, regex=r"^(POSTGRES|SQLITE)$")
     uri = StringType(required=True)
     file_root = StringType(required=True, serialized_name="file-root")
     working_root = StringType(required=True, serialized_name="working-root")
 
+    # Connection pool settings.
+    pool_size = IntType(default=5, min_value=1, serialized_name="pool-size")
+    max_overflow = IntType(default=10, min_value=0, serialized_name="max-overflow")
+    pool_timeout = IntType(default=30, min_value=0, serialized_name="pool-timeout")
+    pool_recycle = IntType(default=3600, serialized_name="pool-recycle")
+    pool_pre_ping = BooleanType(default=True, serialized_name="pool-pre-ping")
+
+    # The maximum time (in milliseconds) that any statement may run for, None for no limit.
+    statement_timeout = IntType(default=None, min_value=0, serialized_name="statement-timeout")
+
+    # The psycopg2 executemany mode ('values_only' or 'values_plus_batch') and the number of rows per statement.
+    executemany_mode = StringType(default="values_plus_batch", choices=["values_only", "values_plus_batch"],
+                                  serialized_name="executemany-mode")
+    executemany_page_size = IntType(default=1000, min_value=1, serialized_name="executemany-page-size")
+
+    sqlite = ModelType(SQLite, default=SQLite())
+
 
 class Logging(Model):
     r"""
-    Class to hold logging information.
+    Class to hold logging information. In queue mode records are handed to a background thread that does the
+    formatting and I/O, so that logging never blocks the caller (see `m4db.utilities.logger.setup_logger`).
     """
     file = StringType(default=None)
     level = StringType(choices=["critical",
@@ -62,6 +108,31 @@ class Logging(Model):
                                 "debug"],
                        default="error")
     log_to_stdout = BooleanType(default=False, serialized_name="log-to-stdout")
+    queue = BooleanType(default=False)
+
+    # Write one JSON object per record (including any 'extra' fields) rather than plain text.
+    structured = BooleanType(default=False)
+
+    # The fraction of debug records that are kept, records at other levels are always kept.
+    debug_sample_rate = FloatType(default=1.0, min_value=0.0, max_value=1.0, serialized_name="debug-sample-rate")
+
+    # Log file rotation: 'size' rotates after max-bytes, 'time' rotates at the interval given by 'when' (e.g.
+    # 'midnight'); backup-count rotated files are kept.
+    rotation = StringType(default="none", choices=["none", "size", "time"])
+    max_bytes = IntType(default=10485760, min_value=1, serialized_name="max-bytes")
+    when = StringType(default="midnight")
+    backup_count = IntType(default=5, min_value=0, serialized_name="backup-count")
+
+
+class Templates(Model):
+    r"""
+    Class to hold template settings. Compiled templates are cached in the bytecode cache directory (by default a
+    per-user directory in the system's temporary directory); if a precompiled directory (or zip file) is given then
+    templates precompiled with `m4db.template.precompile_templates` are loaded from there.
+    """
+    bytecode_cache = BooleanType(default=True, serialized_name="bytecode-cache")
+    bytecode_cache_directory = StringType(default=None, serialized_name="bytecode-cache-directory")
+    precompiled_directory = StringType(default=None, serialized_name="precompiled-directory")
 
 
 class Configuration(Model):
@@ -74,6 +145,11 @@ class Configuration(Model):
     runner_web = ModelType(RunnerWeb, required=True, serialized_name="runner-web")
     scheduler = ModelType(Scheduler, required=True)
     modules = ModelType(Modules, required=True)
+    templates = ModelType(Templates, default=Templates())
+
+
+# The version of the configuration snapshot file format.
+CONFIG_SNAPSHOT_FORMAT = 1
 
 
 def read_config_from_file(file_name: str) -> Configuration:
@@ -84,34 +160,219 @@ def read_config_from_file(file_name: str) -> Configuration:
 
     :return: a configuration object.
     """
-    # If the config cache is empty or the file_name associated with a config has changed, then cache a new config.
-    with open(file_name, "r") as fin:
-        config_dict = yaml.load(fin, Loader=yaml.FullLoader)
-        config = Configuration(config_dict)
-        config.validate()
+    with open(file_name, "rb") as fin:
+        return parse_config(fin.read())
+
+
+def parse_config(content: bytes) -> Configuration:
+    r"""
+    Parse and validate the contents of an M4DB database configuration file.
+
+    :param content: the (YAML) contents of a configuration file.
+
+    :return: a configuration object.
+    """
+    config_dict = yaml.load(content, Loader=yaml.FullLoader)
+    config = Configuration(config_dict)
+    config.validate()
 
     return config
 
 
-@static(config=None)
+def config_snapshot_file_name(file_name: str) -> str:
+    r"""
+    Retrieve the name of the configuration snapshot file that belongs to a configuration file.
+
+    :param file_name: the configuration file name.
+
+    :return: the snapshot file name.
+    """
+    return f"{file_name}{GLOBAL.CONFIG_SNAPSHOT_SUFFIX}"
+
+
+@static(fingerprint=None)
+def config_schema_fingerprint() -> str:
+    r"""
+    Retrieve a fingerprint of the configuration validation schema, snapshots written against a different schema (i.e.
+    by a different version of m4db) are ignored.
+
+    :return: the hex digest of the schema description.
+    """
+    self = config_schema_fingerprint
+    if self.fingerprint is None:
+        def describe(model_class):
+            description = []
+            for name, field in model_class._schema.fields.items():
+                regex = getattr(field, "regex", None)
+                description.append([
+                    name, type(field).__name__, field.serialized_name, field.required, field.choices,
+                    None if regex is None else regex.pattern,
+                    getattr(field, "min_value", None), getattr(field, "max_value", None),
+                    describe(field.model_class) if isinstance(field, ModelType) else None
+                ])
+            return description
+        self.fingerprint = hashlib.sha256(json.dumps(describe(Configuration)).encode("utf-8")).hexdigest()
+
+    return self.fingerprint
+
+
+def read_config_snapshot(snapshot_file: str) -> dict:
+    r"""
+    Read a configuration snapshot file.
+
+    :param snapshot_file: the snapshot file name.
+
+    :return: the snapshot (with the configuration under the 'config' key), or None if there is no (usable) snapshot.
+    """
+    try:
+        with open(snapshot_file, "r") as fin:
+            snapshot = json.load(fin)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or \
+            snapshot.get("format") != CONFIG_SNAPSHOT_FORMAT or \
+            snapshot.get("schema") != config_schema_fingerprint() or \
+            not isinstance(snapshot.get("config"), dict):
+        return None
+
+    # The snapshot was validated when it was written, so it only needs to be converted.
+    try:
+        snapshot["config"] = Configuration(snapshot["config"])
+    except BaseError:
+        return None
+
+    return snapshot
+
+
+def write_config_snapshot(snapshot_file: str, config: Configuration, stat: os.stat_result, content_hash: str):
+    r"""
+    Write a configuration snapshot file, the snapshot is written to a temporary file (readable only by the owner, since
+    the configuration holds the password salt) and then moved in to place, so that concurrent readers never see a
+    partially written snapshot. If the snapshot can't be written (e.g. the directory is read only) nothing is written.
+
+    :param snapshot_file: the snapshot file name.
+    :param config: the (validated) configuration.
+    :param stat: the status of the configuration file from which the configuration was read.
+    :param content_hash: the hash of the configuration file contents.
+
+    :return: None.
+    """
+    snapshot = {
+        "format": CONFIG_SNAPSHOT_FORMAT,
+        "schema": config_schema_fingerprint(),
+        "mtime-ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "content-hash": content_hash,
+        "config": config.to_primitive()
+    }
+
+    try:
+        fd, temporary_file = tempfile.mkstemp(
+            prefix=f"{os.path.basename(snapshot_file)}.", suffix=".tmp", dir=os.path.dirname(snapshot_file) or "."
+        )
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(fd, "w") as fout:
+            json.dump(snapshot, fout)
+        os.replace(temporary_file, snapshot_file)
+    except OSError:
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+
+
+def read_config_with_snapshot(file_name: str) -> Configuration:
+    r"""
+    Reads an M4DB database configuration from a file by way of its snapshot. The snapshot holds the configuration
+    after it has been parsed and validated, along with the modification time, size and content hash of the file. If
+    the modification time and size of the file are unchanged the snapshot is used as is, otherwise the file is hashed
+    and only parsed and validated (and the snapshot rewritten) if its contents have changed.
+
+    :param file_name: the file name containing configuration information.
+
+    :return: a configuration object.
+    """
+    stat = os.stat(file_name)
+    snapshot_file = config_snapshot_file_name(file_name)
+    snapshot = read_config_snapshot(snapshot_file)
+
+    if snapshot is not None and snapshot["mtime-ns"] == stat.st_mtime_ns and snapshot["size"] == stat.st_size:
+        return snapshot["config"]
+
+    with open(file_name, "rb") as fin:
+        content = fin.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    if snapshot is not None and snapshot["content-hash"] == content_hash:
+        config = snapshot["config"]
+    else:
+        config = parse_config(content)
+
+    # Record the new modification time (and contents if they changed), so that the file isn't hashed next time.
+    write_config_snapshot(snapshot_file, config, stat, content_hash)
+
+    return config
+
+
+@static(config=None, file_name=None, signature=None)
 def read_config_from_environ(force_reload: bool = False) -> Configuration:
     r"""
     Reads an M4DB database configuration by checking for an environment variable called 'M4DB_CONFIG".
 
-    :param force_reload: ignore cached config info and just force the configuration information to be reloaded.
+    The configuration is cached for the lifetime of the process and read by way of its snapshot (see
+    `read_config_with_snapshot`), so reloading is cheap: long-running services can call this function with
+    `force_reload` set to True to pick up changes to the configuration file without restarting.
+
+    :param force_reload: ignore cached config info and check the configuration file for changes.
 
     :return: A python dictionary representation of M4DB database related configuration information.
     """
     self = read_config_from_environ
-    if self.config is None or force_reload is True:
-        file_name = os.environ.get(GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR)
-        if file_name is None:
-            raise ValueError(f"{GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR} environment variable doesn't exist")
-        self.config = read_config_from_file(file_name)
+    file_name = os.environ.get(GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR)
+    if file_name is None:
+        raise ValueError(f"{GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR} environment variable doesn't exist")
+
+    if self.config is not None and file_name == self.file_name:
+        if force_reload is False:
+            return self.config
+        # If the file hasn't been touched since it was last read, there's nothing to reload.
+        stat = os.stat(file_name)
+        if (stat.st_mtime_ns, stat.st_size) == self.signature:
+            return self.config
+
+    stat = os.stat(file_name)
+    self.config = read_config_with_snapshot(file_name)
+    self.file_name = file_name
+    self.signature = (stat.st_mtime_ns, stat.st_size)
 
     return self.config
 
 
+def read_database_config(uri: str = None) -> Database:
+    r"""
+    Retrieve the database section of the configuration stored in the M4DB_CONFIG environment variable, optionally
+    for a different database uri (all other settings, e.g. pool and SQLite settings, are kept). If a uri is given
+    and there is no configuration then the default settings are used.
+
+    :param uri: the database uri, if None then the uri of the configuration is used.
+
+    :return: a database configuration object.
+    """
+    if uri is None:
+        return read_config_from_environ().database
+
+    if os.environ.get(GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR) is None:
+        return Database({"uri": uri})
+
+    # Work on a copy, the cached configuration is shared.
+    database = Database(read_config_from_environ().database.to_primitive())
+    database.uri = uri
+
+    return database
+
+
 def write_config_to_file(file_name: str, config: Configuration):
     r"""
     Writes M4DB database configuration.
@@ -138,4 +399,4 @@ def write_config_to_environ(config: Configuration):
     if file_name is None:
         raise ValueError(f"{GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR} environment variable doesn't exist")
 
-    return write_config_to_file(file_name, config.to_primitive())
+    return write_config_to_file(file_name, config)
@@ -0,0 +1,22 @@
+r"""
+A collection of routines to retrieve anisotropy forms from m4db.
+"""
+
+from m4db.db.reference_data_cache import anisotropy_form_cache
+
+
+def retrieve_anisotropy_form(session, name):
+    r"""
+    Retrieve an anisotropy form with the given name.
+    :param session: a database session.
+    :param name: the anisotropy form name.
+    :return: an AnisotropyForm object.
+    """
+    # Attempt to retrieve the AnisotropyForm
+    anisotropy_form = anisotropy_form_cache.get(session, name)
+    # If the anisotropy form cannot be found ...
+    if anisotropy_form is None:
+        # ... raise error
+        raise ValueError("Anisotropy form with name '{}' cannot be found.".format(name))
+
+    return anisotropy_form
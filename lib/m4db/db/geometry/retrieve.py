@@ -3,11 +3,16 @@ A collection of functions that retrieve geometries from the database.
 """
 from decimal import Decimal
 
+from sqlalchemy import tuple_
+
 from m4db.orm.schema import SizeConvention, Ellipsoid, TruncatedOctahedron
+from m4db.orm.schema import Geometry
 from m4db.orm.schema import SizeConventionEnum
 
 from m4db.orm.model_creation_schema import GeometrySchemaTypesEnum
 
+from m4db.utilities.batches import batches
+
 
 def get_geometry(session, **kwargs):
     if kwargs.get("schema_object") is not None:
@@ -127,3 +132,93 @@ def get_truncated_octahedron(session, size: Decimal, element_size: Decimal, size
         filter(TruncatedOctahedron.truncation_factor == truncation_factor). \
         filter(TruncatedOctahedron.aspect_ratio == aspect_ratio). \
         one_or_none()
+
+
+def geometry_schema_key(schema_object):
+    r"""
+    Retrieve a hashable key that identifies the geometry described by a schema object.
+
+    :param schema_object: the schema object.
+
+    :return: a tuple of the geometry type, size, element size, size convention and the two shape parameters.
+
+    """
+    if schema_object.type == GeometrySchemaTypesEnum.ellipsoid.value:
+        return (schema_object.type,
+                Decimal(schema_object.size),
+                Decimal(schema_object.element_size),
+                schema_object.size_convention,
+                Decimal(schema_object.oblateness),
+                Decimal(schema_object.prolateness))
+    elif schema_object.type == GeometrySchemaTypesEnum.truncated_octahedron.value:
+        return (schema_object.type,
+                Decimal(schema_object.size),
+                Decimal(schema_object.element_size),
+                schema_object.size_convention,
+                Decimal(schema_object.truncation_factor),
+                Decimal(schema_object.aspect_ratio))
+    else:
+        raise RuntimeError("Unknown GeometryEnum type")
+
+
+def get_geometries_by_schema_objects(session, schema_objects, batch_size=1000):
+    r"""
+    Retrieve the geometries for a collection of schema objects using one query per geometry type (and batch).
+
+    :param session: the database session.
+    :param schema_objects: an iterable of schema objects.
+    :param batch_size: the maximum number of geometries to look up per query.
+
+    :returns: a dictionary of existing geometries keyed on `geometry_schema_key`, geometries that could not be found
+              are absent.
+
+    """
+    keys = set(geometry_schema_key(schema_object) for schema_object in schema_objects)
+
+    ellipsoid_keys = [key for key in keys if key[0] == GeometrySchemaTypesEnum.ellipsoid.value]
+    truncated_octahedron_keys = [key for key in keys if key[0] == GeometrySchemaTypesEnum.truncated_octahedron.value]
+
+    geometries = {}
+
+    for batch in batches(ellipsoid_keys, batch_size):
+        ellipsoids = session.query(Ellipsoid, SizeConvention.symbol). \
+            join(SizeConvention, SizeConvention.id == Ellipsoid.size_convention_id). \
+            filter(tuple_(Ellipsoid.size,
+                          Ellipsoid.element_size,
+                          SizeConvention.symbol,
+                          Ellipsoid.oblateness,
+                          Ellipsoid.prolateness).in_([key[1:] for key in batch])). \
+            all()
+        for ellipsoid, symbol in ellipsoids:
+            key = (GeometrySchemaTypesEnum.ellipsoid.value,
+                   ellipsoid.size, ellipsoid.element_size, symbol, ellipsoid.oblateness, ellipsoid.prolateness)
+            geometries[key] = ellipsoid
+
+    for batch in batches(truncated_octahedron_keys, batch_size):
+        truncated_octahedra = session.query(TruncatedOctahedron, SizeConvention.symbol). \
+            join(SizeConvention, SizeConvention.id == TruncatedOctahedron.size_convention_id). \
+            filter(tuple_(TruncatedOctahedron.size,
+                          TruncatedOctahedron.element_size,
+                          SizeConvention.symbol,
+                          TruncatedOctahedron.truncation_factor,
+                          TruncatedOctahedron.aspect_ratio).in_([key[1:] for key in batch])). \
+            all()
+        for truncated_octahedron, symbol in truncated_octahedra:
+            key = (GeometrySchemaTypesEnum.truncated_octahedron.value,
+                   truncated_octahedron.size, truncated_octahedron.element_size, symbol,
+                   truncated_octahedron.truncation_factor, truncated_octahedron.aspect_ratio)
+            geometries[key] = truncated_octahedron
+
+    return geometries
+
+
+def get_geometries_by_content_hash(session, content_hash):
+    r"""
+    Retrieve the geometries whose patran file has the given content hash (i.e. geometries with identical meshes).
+
+    :param session: the database session.
+    :param content_hash: the content hash of a patran file.
+
+    :returns: a list of geometries, oldest first.
+    """
+    return session.query(Geometry).filter(Geometry.content_hash == content_hash).order_by(Geometry.id).all()
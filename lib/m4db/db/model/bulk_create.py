@@ -0,0 +1,262 @@
+r"""
+Routines to insert large numbers of new models in a small number of set based statements.
+
+Rather than building an ORM object graph for every model (and every repetition of a model) all the referenced rows
+(geometries, start models, anisotropy forms and the 'not-run' running status) are resolved up front, and the rows of
+each table are then written with batched, multi-row INSERT ... RETURNING statements.
+"""
+
+from sqlalchemy import insert
+
+from m4db.orm.schema import InitialMagnetization
+from m4db.orm.schema import Material
+from m4db.orm.schema import Metadata
+from m4db.orm.schema import Model
+from m4db.orm.schema import ModelInitialMagnetization
+from m4db.orm.schema import ModelReportData
+from m4db.orm.schema import ModelRunData
+from m4db.orm.schema import RandomInitialMagnetization
+from m4db.orm.schema import UniformAppliedField
+from m4db.orm.schema import UniformInitialMagnetization
+from m4db.orm.schema import new_unique_id
+
+from m4db.orm.model_creation_schema import InitialMagnetizationSchemaTypesEnum
+
+from m4db.db.anisotropy_form.retrieve import retrieve_anisotropy_form
+from m4db.db.geometry.retrieve import geometry_schema_key
+from m4db.db.geometry.retrieve import get_geometries_by_schema_objects
+from m4db.db.running_status.retrieve import retrieve_not_run_status
+
+from m4db.utilities.batches import batches
+
+
+# Maps initial magnetization schema types to the polymorphic ORM classes that store them.
+INITIAL_MAGNETIZATION_CLASSES = {
+    InitialMagnetizationSchemaTypesEnum.uniform.value: UniformInitialMagnetization,
+    InitialMagnetizationSchemaTypesEnum.model.value: ModelInitialMagnetization,
+    InitialMagnetizationSchemaTypesEnum.random.value: RandomInitialMagnetization
+}
+
+
+def get_model_ids_by_unique_ids(session, unique_ids, batch_size=1000):
+    r"""
+    Retrieve the internal ids of a collection of models.
+    :param session: the database session.
+    :param unique_ids: an iterable of model unique ids.
+    :param batch_size: the maximum number of unique ids to look up per query.
+    :return: a dictionary of model ids keyed on unique id, unique ids that could not be found are absent.
+    """
+    model_ids = {}
+    for batch in batches(set(unique_ids), batch_size):
+        for unique_id, model_id in session.query(Model.unique_id, Model.id).filter(Model.unique_id.in_(batch)):
+            model_ids[unique_id] = model_id
+
+    return model_ids
+
+
+def insert_returning(session, table_class, rows, *columns):
+    r"""
+    Insert a list of rows with a single (multi-row) INSERT statement and return the requested columns.
+    :param session: the database session.
+    :param table_class: the ORM class whose table the rows are written to.
+    :param rows: a list of dictionaries, one per row.
+    :param columns: the columns to return, if none are given the primary key ids are returned.
+    :return: a list of returned values (or tuples if more than one column is requested) in the same order as `rows`.
+    """
+    if len(rows) == 0:
+        return []
+
+    table = table_class.__table__
+    returning = [table.c[column] for column in columns] if columns else [table.c.id]
+
+    result = session.execute(
+        insert(table).returning(*returning, sort_by_parameter_order=True),
+        rows
+    )
+
+    if len(returning) == 1:
+        return result.scalars().all()
+    return [tuple(row) for row in result.all()]
+
+
+def insert_initial_magnetizations(session, model_specs, start_model_ids):
+    r"""
+    Insert the initial magnetizations for a batch of models.
+    :param session: the database session.
+    :param model_specs: a list of model schema objects, one per new model.
+    :param start_model_ids: a dictionary of model ids keyed on unique id (for 'model' initial magnetizations).
+    :return: a list of initial magnetization ids in the same order as `model_specs`.
+    """
+    # The parent (polymorphic) table.
+    initial_magnetization_ids = insert_returning(session, InitialMagnetization, [
+        {"type": INITIAL_MAGNETIZATION_CLASSES[spec.initial_magnetization.type].__mapper__.polymorphic_identity}
+        for spec in model_specs
+    ])
+
+    # The child tables.
+    uniform_rows = []
+    model_rows = []
+    random_rows = []
+    for initial_magnetization_id, spec in zip(initial_magnetization_ids, model_specs):
+        initial_magnetization = spec.initial_magnetization
+        if initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.uniform.value:
+            uniform_rows.append({
+                "id": initial_magnetization_id,
+                "dir_x": initial_magnetization.dir_x,
+                "dir_y": initial_magnetization.dir_y,
+                "dir_z": initial_magnetization.dir_z,
+                "magnitude": initial_magnetization.magnitude
+            })
+        elif initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.model.value:
+            model_rows.append({
+                "id": initial_magnetization_id,
+                "model_id": start_model_ids[initial_magnetization.unique_id]
+            })
+        elif initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.random.value:
+            random_rows.append({
+                "id": initial_magnetization_id
+            })
+        else:
+            raise ValueError(f"Unknown initial magnetization type: '{initial_magnetization.type}'.")
+
+    if uniform_rows:
+        session.execute(insert(UniformInitialMagnetization.__table__), uniform_rows)
+    if model_rows:
+        session.execute(insert(ModelInitialMagnetization.__table__), model_rows)
+    if random_rows:
+        session.execute(insert(RandomInitialMagnetization.__table__), random_rows)
+
+    return initial_magnetization_ids
+
+
+def insert_applied_fields(session, model_specs):
+    r"""
+    Insert the applied fields for a batch of models.
+    :param session: the database session.
+    :param model_specs: a list of model schema objects, one per new model.
+    :return: a list of applied field ids (or None for models without an applied field) in the same order as
+             `model_specs`.
+    """
+    specs_with_field = [index for index, spec in enumerate(model_specs) if spec.applied_field]
+
+    applied_field_ids = insert_returning(session, UniformAppliedField, [
+        {
+            "dir_x": model_specs[index].applied_field.dir_x,
+            "dir_y": model_specs[index].applied_field.dir_y,
+            "dir_z": model_specs[index].applied_field.dir_z,
+            "magnitude": model_specs[index].applied_field.magnitude
+        }
+        for index in specs_with_field
+    ])
+
+    result = [None] * len(model_specs)
+    for index, applied_field_id in zip(specs_with_field, applied_field_ids):
+        result[index] = applied_field_id
+
+    return result
+
+
+def bulk_create_models(session, models, db_user, project, software, batch_size=1000, progress=None):
+    r"""
+    Create new models in bulk. Note: the caller is responsible for validation and committing the session.
+    :param session: the database session.
+    :param models: a list of validated ModelSchema objects, each model is created `reps` times.
+    :param db_user: the DBUser that owns the new models.
+    :param project: the Project that the new models belong to.
+    :param software: the Software used to run the new models.
+    :param batch_size: the number of new models written per batch of INSERT statements.
+    :param progress: an optional function that is called with the number of models written after each batch.
+    :return: a list of the unique ids of the new models.
+    """
+    # Resolve all the referenced rows up front.
+    geometries = get_geometries_by_schema_objects(session, [model.geometry for model in models])
+
+    start_model_ids = get_model_ids_by_unique_ids(session, [
+        model.initial_magnetization.unique_id for model in models
+        if model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.model.value
+    ])
+
+    anisotropy_form_ids = {}
+    for model in models:
+        for material in model.materials:
+            if material.anisotropy_form not in anisotropy_form_ids:
+                anisotropy_form_ids[material.anisotropy_form] = \
+                    retrieve_anisotropy_form(session, material.anisotropy_form).id
+
+    not_run_status_id = retrieve_not_run_status(session).id
+
+    for model in models:
+        if geometry_schema_key(model.geometry) not in geometries:
+            raise ValueError("Could not find the geometry for a model.")
+        if model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.model.value and \
+                model.initial_magnetization.unique_id not in start_model_ids:
+            raise ValueError(f"Could not find model for initial model magnetization with unique id: "
+                             f"{model.initial_magnetization.unique_id}")
+
+    # Expand repetitions, each entry corresponds to exactly one new model.
+    model_specs = (model for model in models for _ in range(model.reps))
+
+    unique_ids = []
+    for batch in batches(model_specs, batch_size):
+        initial_magnetization_ids = insert_initial_magnetizations(session, batch, start_model_ids)
+        applied_field_ids = insert_applied_fields(session, batch)
+
+        model_run_data_ids = insert_returning(session, ModelRunData, [
+            {"has_script": False} for _ in batch
+        ])
+        model_report_data_ids = insert_returning(session, ModelReportData, [
+            {"has_xy_thumb_png": False} for _ in batch
+        ])
+        mdata_ids = insert_returning(session, Metadata, [
+            {"db_user_id": db_user.id, "project_id": project.id, "software_id": software.id} for _ in batch
+        ])
+
+        model_rows = []
+        for index, spec in enumerate(batch):
+            model_row = {
+                "max_energy_evaluations": spec.max_energy_evaluations,
+                "geometry_id": geometries[geometry_schema_key(spec.geometry)].id,
+                "initial_magnetization_id": initial_magnetization_ids[index],
+                "applied_field_id": applied_field_ids[index],
+                "running_status_id": not_run_status_id,
+                "model_run_data_id": model_run_data_ids[index],
+                "model_report_data_id": model_report_data_ids[index],
+                "mdata_id": mdata_ids[index],
+                # Every row of a batch must have the same keys, so generate missing unique ids here.
+                "unique_id": spec.unique_id if spec.unique_id is not None else new_unique_id()
+            }
+            model_rows.append(model_row)
+
+        model_ids_and_unique_ids = insert_returning(session, Model, model_rows, "id", "unique_id")
+
+        material_rows = []
+        for (model_id, _), spec in zip(model_ids_and_unique_ids, batch):
+            for material in spec.materials:
+                material_rows.append({
+                    "model_id": model_id,
+                    "name": material.name,
+                    "temperature": material.temperature,
+                    "k1": material.k1, "k2": material.k2, "k3": material.k3,
+                    "k4": material.k4, "k5": material.k5, "k6": material.k6,
+                    "k7": material.k7, "k8": material.k8, "k9": material.k9,
+                    "k10": material.k10,
+                    "aex": material.aex,
+                    "ms": material.ms,
+                    "dir_x": material.dir_x,
+                    "dir_y": material.dir_y,
+                    "dir_z": material.dir_z,
+                    "alpha": material.alpha,
+                    "theta": material.theta,
+                    "phi": material.phi,
+                    "anisotropy_form_id": anisotropy_form_ids[material.anisotropy_form],
+                    "submesh_id": material.submesh_id
+                })
+        if material_rows:
+            session.execute(insert(Material.__table__), material_rows)
+
+        unique_ids.extend(unique_id for _, unique_id in model_ids_and_unique_ids)
+
+        if progress is not None:
+            progress(len(unique_ids))
+
+    return unique_ids
@@ -1,69 +1,102 @@
 r"""
 A selection of routines to retrieve models from the database.
 """
-from sqlalchemy import tuple_
+import re
+
+from decimal import Decimal
+
+import numpy as np
+
+from sqlalchemy import and_
+from sqlalchemy import case
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import with_polymorphic
+
+from m4db import GLOBAL
 
 from m4db.orm.schema import DBUser
+from m4db.orm.schema import Ellipsoid
 from m4db.orm.schema import Geometry
+from m4db.orm.schema import InitialMagnetization
 from m4db.orm.schema import Material
 from m4db.orm.schema import Metadata
 from m4db.orm.schema import Model
-from m4db.orm.schema import RunningStatus
+from m4db.orm.schema import ModelInitialMagnetization
+from m4db.orm.schema import Project
+from m4db.orm.schema import RandomInitialMagnetization
 from m4db.orm.schema import SizeConvention
 from m4db.orm.schema import Software
+from m4db.orm.schema import TruncatedOctahedron
+from m4db.orm.schema import UniformInitialMagnetization
 
+from m4db.db.running_status.retrieve import retrieve_running_status
 
-def get_models(session, **kwargs):
+from m4db.utilities.batches import batches
+
+
+# Size unit conversion factors to micron (the unit in which geometry sizes are stored).
+MICRON_PER_SIZE_UNIT = {
+    "m": Decimal("1e6"),
+    "cm": Decimal("1e4"),
+    "mm": Decimal("1e3"),
+    "um": Decimal("1"),
+    "nm": Decimal("1e-3"),
+    "pm": Decimal("1e-6"),
+    "fm": Decimal("1e-9"),
+    "am": Decimal("1e-12")
+}
+
+# The quants calculated for a model on a successful run, in the order they appear in quant arrays/data frames.
+QUANT_NAMES = [
+    "mx_tot", "my_tot", "mz_tot",
+    "vx_tot", "vy_tot", "vz_tot",
+    "h_tot", "rh_tot", "adm_tot",
+    "e_typical", "e_anis", "e_ext", "e_demag",
+    "e_exch1", "e_exch2", "e_exch3", "e_exch4",
+    "e_tot",
+    "volume"
+]
+
+# The NumPy data type of a row of model quants (missing quants are NaN).
+QUANT_DTYPE = np.dtype(
+    [("id", np.int64), ("unique_id", "U36")] + [(quant_name, np.float64) for quant_name in QUANT_NAMES]
+)
+
+
+def is_set(kwargs, key):
     r"""
-    Retrieve a collection of models according to the arguments passed.
-    :param session: the database session.
-    :param kwargs: argument parameters designed to filter specific types of model.
-    :return: None
+    Check whether a filter argument has been given (command line parsers pass unset arguments as None).
+    :param kwargs: the filter arguments.
+    :param key: the argument name.
+    :return: True if the argument is present and not None, otherwise False.
     """
-    models_query = session.query(Model). \
-        join(RunningStatus, Model.running_status_id == RunningStatus.id). \
-        join(Geometry, Geometry.id == Model.geometry_id). \
-        join(SizeConvention, SizeConvention.id == Geometry.size_convention_id). \
-        join(Metadata, Metadata.id == Model.mdata_id). \
-        join(DBUser, DBUser.id == Metadata.db_user_id). \
-        join(Software, Software.id == Metadata.software_id)
-
-    # Deal with the running status
-    if "running_status" in kwargs.keys():
-        if kwargs["running_status"] not in ["any", "all"]:
-            models_query = models_query.filter(RunningStatus.name == kwargs["running_status"])
+    return kwargs.get(key) is not None
 
-    # Deal with the geometry
-    if "geometry" in kwargs.keys():
-        models_query = models_query.filter(Geometry.name == kwargs["geometry"])
-    if "size" in kwargs.keys():
-        models_query = models_query.filter(Geometry.size == kwargs["size"])
-    if "size_unit" in kwargs.keys():
-        models_query = models_query.filter(Unit.symbol == kwargs["size_unit"])
-    if "size_convention" in kwargs.keys():
-        models_query = models_query.filter(SizeConvention.symbol == kwargs["size_convention"])
 
-    # Deal with the metadata
-    if "db_user" in kwargs.keys():
-        models_query = models_query.filter(DBUser.user_name == kwargs["db_user"])
-    if "software" in kwargs.keys():
-        models_query = models_query.filter(Software.name == kwargs["software"])
-    if "software_version" in kwargs.keys():
-        models_query = models_query.filter(Software.version == kwargs["software_version"])
-
-    # Deal with the materials.
+def material_conditions(**kwargs):
+    r"""
+    Retrieve the material/temperature conditions that a model's materials must satisfy.
+    :param kwargs: argument parameters, of which 'material', 'materials', 'temperature' and 'temperatures' are used.
+    :return: a list of SQL conditions on the Material table, each of which must be met by at least one of a model's
+             materials (an empty list means there is no material filter).
+    """
     materials = None
     temperatures = None
 
-    if "material" in kwargs.keys():
+    if is_set(kwargs, "material"):
         materials = [kwargs["material"]]
-    elif "materials" in kwargs.keys():
+    elif is_set(kwargs, "materials"):
         materials = kwargs["materials"]
         if not isinstance(materials, list):
             raise ValueError("parameter 'materials' must be a list")
 
     # If we're given a singular temperature ...
-    if "temperature" in kwargs.keys():
+    if is_set(kwargs, "temperature"):
         # ... then, if we already have materials ...
         if materials is not None:
             # ... for each of those materials, use the temperature
@@ -72,7 +105,7 @@ def get_models(session, **kwargs):
             # ... otherwise, there are no materials, so just use the temperature
             temperatures = [kwargs["temperature"]]
     # ... on the other hand, if we have plural temperatures
-    elif "temperatures" in kwargs.keys():
+    elif is_set(kwargs, "temperatures"):
         # ... assign the temperatures
         temperatures = kwargs["temperatures"]
         # ... and check that it's a list
@@ -85,32 +118,284 @@ def get_models(session, **kwargs):
         if len(materials) != len(temperatures):
             raise ValueError("Length of 'temperatures' and 'materials' should be the same")
 
-    # Build the query
-
     if materials is not None and temperatures is None:
         # Case I there are material names, but no temperatures.
-        for material in materials:
-            subquery = session.query(Material.name). \
-                join(ModelMaterialAssociation, ModelMaterialAssociation.material_id == Material.id). \
-                filter(ModelMaterialAssociation.model_id == Model.id)
-            models_query = models_query.filter(tuple_(material).in_(subquery))
+        return [Material.name == material for material in materials]
     elif materials is None and temperatures is not None:
         # Case II there are no material names, but there are temperatures
-        for temperature in temperatures:
-            subquery = session.query(Material.temperature). \
-                join(ModelMaterialAssociation, ModelMaterialAssociation.material_id == Material.id). \
-                filter(ModelMaterialAssociation.model_id == Model.id)
-            models_query = models_query.filter(tuple_(temperature).in_(subquery))
+        return [Material.temperature == Decimal(str(temperature)) for temperature in temperatures]
     elif materials is not None and temperatures is not None:
         # Case III there are both materials and temperatures
-        for material, temperature in zip(materials, temperatures):
-            subquery = session.query(Material.name, Material.temperature). \
-                join(ModelMaterialAssociation, Material.id == ModelMaterialAssociation.material_id). \
-                filter(ModelMaterialAssociation.model_id == Model.id)
-            models_query = models_query.filter(tuple_(material, temperature).in_(subquery))
+        return [and_(Material.name == material, Material.temperature == Decimal(str(temperature)))
+                for material, temperature in zip(materials, temperatures)]
+
+    return []
+
+
+def geometry_ids_query(**kwargs):
+    r"""
+    Build a query for the ids of the geometries that match the geometry related arguments.
+    :param kwargs: argument parameters, of which 'size', 'size_unit' and 'size_convention' are used.
+    :return: a selectable of geometry ids or None if there are no geometry size filters.
+    """
+    if not is_set(kwargs, "size") and not is_set(kwargs, "size_convention"):
+        return None
+
+    size = None
+    if is_set(kwargs, "size"):
+        size = Decimal(str(kwargs["size"]))
+        if is_set(kwargs, "size_unit"):
+            if kwargs["size_unit"] not in MICRON_PER_SIZE_UNIT:
+                raise ValueError(f"Unknown size unit '{kwargs['size_unit']}'")
+            size = size * MICRON_PER_SIZE_UNIT[kwargs["size_unit"]]
+
+    # Only ellipsoids and truncated octahedra carry a size, so query each type and combine the ids.
+    selects = []
+    for geometry_class in [Ellipsoid, TruncatedOctahedron]:
+        geometry_select = select(geometry_class.id)
+        if size is not None:
+            geometry_select = geometry_select.where(geometry_class.size == size)
+        if is_set(kwargs, "size_convention"):
+            geometry_select = geometry_select. \
+                join(SizeConvention, SizeConvention.id == geometry_class.size_convention_id). \
+                where(SizeConvention.symbol == kwargs["size_convention"])
+        selects.append(geometry_select)
 
-    # Retrieve the models.
-    return models_query.all()
+    return union_all(*selects)
+
+
+def get_models_query(session, **kwargs):
+    r"""
+    Build a query for a collection of models according to the arguments passed. Only the tables required by the
+    filters that are actually given are joined.
+    :param session: the database session.
+    :param kwargs: argument parameters designed to filter specific types of model.
+    :return: a query object (of Model).
+    """
+    models_query = session.query(Model)
+
+    # Deal with the running status, the (cached) id is used directly so that no join is required and the
+    # (running_status_id, id) indexes apply.
+    if is_set(kwargs, "running_status") and kwargs["running_status"] not in ["any", "all"]:
+        running_status = retrieve_running_status(session, kwargs["running_status"])
+        models_query = models_query.filter(Model.running_status_id == running_status.id)
+
+    # Deal with the geometry
+    if is_set(kwargs, "geometry"):
+        # A geometry may be given either by its unique id or its type (e.g. 'ellipsoid').
+        models_query = models_query.join(Geometry, Geometry.id == Model.geometry_id)
+        if re.fullmatch(GLOBAL.UID_REGEX, kwargs["geometry"]):
+            models_query = models_query.filter(Geometry.unique_id == kwargs["geometry"])
+        else:
+            models_query = models_query.filter(Geometry.type == kwargs["geometry"].replace("-", "_"))
+
+    geometry_ids = geometry_ids_query(**kwargs)
+    if geometry_ids is not None:
+        models_query = models_query.filter(Model.geometry_id.in_(geometry_ids))
+
+    # Deal with the metadata
+    if is_set(kwargs, "db_user") or is_set(kwargs, "project") or \
+            is_set(kwargs, "software") or is_set(kwargs, "software_version"):
+        models_query = models_query.join(Metadata, Metadata.id == Model.mdata_id)
+    if is_set(kwargs, "db_user"):
+        models_query = models_query. \
+            join(DBUser, DBUser.id == Metadata.db_user_id). \
+            filter(DBUser.user_name == kwargs["db_user"])
+    if is_set(kwargs, "project"):
+        models_query = models_query. \
+            join(Project, Project.id == Metadata.project_id). \
+            filter(Project.name == kwargs["project"])
+    if is_set(kwargs, "software") or is_set(kwargs, "software_version"):
+        models_query = models_query.join(Software, Software.id == Metadata.software_id)
+    if is_set(kwargs, "software"):
+        models_query = models_query.filter(Software.name == kwargs["software"])
+    if is_set(kwargs, "software_version"):
+        models_query = models_query.filter(Software.version == kwargs["software_version"])
+
+    # Deal with the materials: every condition must be met by at least one of the model's materials, this is
+    # expressed as a single correlated EXISTS over the model's materials grouped by model.
+    conditions = material_conditions(**kwargs)
+    if conditions:
+        materials_exist = select(Material.model_id). \
+            where(Material.model_id == Model.id). \
+            where(or_(*conditions)). \
+            group_by(Material.model_id). \
+            having(and_(*[func.max(case((condition, 1), else_=0)) == 1 for condition in conditions])). \
+            exists()
+        models_query = models_query.filter(materials_exist)
+
+    return models_query
+
+
+def keyset_pages(query, key_column, page_size):
+    r"""
+    Split a query in to pages ordered by a unique key, each page is retrieved with a 'key > last key' filter rather
+    than an OFFSET, so every page costs the same to retrieve.
+    :param query: the query, each row must have an attribute with the same name as `key_column`.
+    :param key_column: the (unique) column to order and paginate on.
+    :param page_size: the maximum number of rows in each page.
+    :return: a generator of lists of rows.
+    """
+    query = query.order_by(key_column)
+
+    last_key = None
+    while True:
+        page_query = query if last_key is None else query.filter(key_column > last_key)
+        page = page_query.limit(page_size).all()
+
+        if len(page) > 0:
+            yield page
+
+        # A short page is the last page.
+        if len(page) < page_size:
+            return
+
+        last_key = getattr(page[-1], key_column.key)
+
+
+def iterate_models(session, page_size=1000, **kwargs):
+    r"""
+    Iterate over a collection of models according to the arguments passed. Models are retrieved in pages of at most
+    `page_size` models ordered by id (keyset pagination), so that only one page of models is held at a time.
+    :param session: the database session.
+    :param page_size: the maximum number of models retrieved per query.
+    :param kwargs: argument parameters designed to filter specific types of model.
+    :return: a generator of models.
+    """
+    for page in keyset_pages(get_models_query(session, **kwargs), Model.id, page_size):
+        yield from page
+
+
+def get_models(session, **kwargs):
+    r"""
+    Retrieve a collection of models according to the arguments passed.
+    :param session: the database session.
+    :param kwargs: argument parameters designed to filter specific types of model.
+    :return: a list of models, use `iterate_models` for large collections.
+    """
+    return get_models_query(session, **kwargs).order_by(Model.id).all()
+
+
+def merrill_script_loader_options():
+    r"""
+    Eager load options for everything that the MERRILL model script template requires (materials, the initial
+    magnetization, including the columns of its concrete type, and the applied field).
+    :return: a list of loader options.
+    """
+    initial_magnetization = with_polymorphic(
+        InitialMagnetization,
+        [ModelInitialMagnetization, RandomInitialMagnetization, UniformInitialMagnetization]
+    )
+
+    return [
+        selectinload(Model.materials),
+        selectinload(Model.initial_magnetization.of_type(initial_magnetization)),
+        selectinload(Model.applied_field)
+    ]
+
+
+def get_models_by_unique_ids(session, unique_ids, options=None, batch_size=1000):
+    r"""
+    Retrieve models by unique id, the models are retrieved in batches (one query per batch, plus one query per eager
+    loaded relationship per batch).
+    :param session: the database session.
+    :param unique_ids: the unique ids of the models.
+    :param options: loader options applied to each batch (e.g. `merrill_script_loader_options()`).
+    :param batch_size: the maximum number of unique ids per query.
+    :return: a dictionary of models keyed on unique id, unique ids without a model are left out.
+    """
+    options = [] if options is None else options
+
+    models = {}
+    for batch in batches(dict.fromkeys(unique_ids), batch_size):
+        query = session.query(Model).options(*options).filter(Model.unique_id.in_(batch))
+        for model in query:
+            models[model.unique_id] = model
+
+    return models
+
+
+def get_model_quants_query(session, **kwargs):
+    r"""
+    Build a query for the quants of a collection of models, only the key and quant columns are selected (no ORM
+    objects are created).
+    :param session: the database session.
+    :param kwargs: argument parameters designed to filter specific types of model.
+    :return: a query object whose rows have the attributes 'id', 'unique_id' and those in QUANT_NAMES.
+    """
+    # Use an alias so that the volume join does not clash with a geometry filter join.
+    volume_geometry = aliased(Geometry)
+
+    return get_models_query(session, **kwargs). \
+        join(volume_geometry, volume_geometry.id == Model.geometry_id). \
+        with_entities(Model.id,
+                      Model.unique_id,
+                      *[getattr(Model, quant_name) for quant_name in QUANT_NAMES if quant_name != "volume"],
+                      volume_geometry.computed_volume.label("volume"))
+
+
+def quant_rows_to_array(rows):
+    r"""
+    Convert rows from a model quants query to a NumPy structured array.
+    :param rows: a list of rows from `get_model_quants_query`.
+    :return: a NumPy structured array of type QUANT_DTYPE, missing quants are NaN.
+    """
+    array = np.empty(len(rows), dtype=QUANT_DTYPE)
+    if len(rows) == 0:
+        return array
+
+    columns = list(zip(*rows))
+    array["id"] = columns[0]
+    array["unique_id"] = columns[1]
+    for quant_name, column in zip(QUANT_NAMES, columns[2:]):
+        # None -> NaN
+        array[quant_name] = np.array(column, dtype=np.float64)
+
+    return array
+
+
+def iterate_model_quant_chunks(session, chunk_size=100000, **kwargs):
+    r"""
+    Iterate over the quants of a collection of models in chunks.
+    :param session: the database session.
+    :param chunk_size: the maximum number of models in each chunk.
+    :param kwargs: argument parameters designed to filter specific types of model.
+    :return: a generator of NumPy structured arrays (of type QUANT_DTYPE), ordered by model id.
+    """
+    for page in keyset_pages(get_model_quants_query(session, **kwargs), Model.id, chunk_size):
+        yield quant_rows_to_array(page)
+
+
+def get_model_quants_array(session, chunk_size=100000, **kwargs):
+    r"""
+    Retrieve the quants of a collection of models as a single NumPy structured array.
+    :param session: the database session.
+    :param chunk_size: the maximum number of models retrieved per query.
+    :param kwargs: argument parameters designed to filter specific types of model.
+    :return: a NumPy structured array of type QUANT_DTYPE.
+    """
+    chunks = list(iterate_model_quant_chunks(session, chunk_size, **kwargs))
+    if len(chunks) == 0:
+        return np.empty(0, dtype=QUANT_DTYPE)
+
+    return np.concatenate(chunks)
+
+
+def get_model_quants_data_frame(session, chunk_size=100000, **kwargs):
+    r"""
+    Retrieve the quants of a collection of models as a pandas data frame indexed on model unique id.
+    :param session: the database session.
+    :param chunk_size: the maximum number of models retrieved per query.
+    :param kwargs: argument parameters designed to filter specific types of model.
+    :return: a pandas data frame with one column per quant.
+    """
+    # pandas is only needed here, so avoid importing it whenever models are retrieved.
+    import pandas as pd
+
+    array = get_model_quants_array(session, chunk_size, **kwargs)
+
+    return pd.DataFrame({quant_name: array[quant_name] for quant_name in QUANT_NAMES},
+                        index=pd.Index(array["unique_id"], name="unique_id"))
 
 
 def get_model_quants(session, **kwargs):
@@ -118,32 +403,11 @@ def get_model_quants(session, **kwargs):
     Retrieve a collection of model quants according to the arguments passed.
     :param session: the database session.
     :param kwargs: argument parameters designed to filter specific types of model.
-    :return: None
+    :return: a list of dictionaries, one per model, keyed on quant name.
     """
-    models = get_models(session, **kwargs)
-
     quants = []
-    for model in models:
-        quants.append({
-            "mx_tot": model.mx_tot,
-            "my_tot": model.my_tot,
-            "mz_tot": model.mz_tot,
-            "vx_tot": model.vx_tot,
-            "vy_tot": model.vy_tot,
-            "vz_tot": model.vz_tot,
-            "h_tot": model.h_tot,
-            "rh_tot": model.rh_tot,
-            "adm_tot": model.adm_tot,
-            "e_typical": model.e_typical,
-            "e_anis": model.e_anis,
-            "e_ext": model.e_ext,
-            "e_demag": model.e_demag,
-            "e_exch1": model.e_exch1,
-            "e_exch2": model.e_exch2,
-            "e_exch3": model.e_exch3,
-            "e_exch4": model.e_exch4,
-            "e_tot": model.e_tot,
-            "volume": model.volume
-        })
+    for page in keyset_pages(get_model_quants_query(session, **kwargs), Model.id, 10000):
+        for row in page:
+            quants.append({quant_name: getattr(row, quant_name) for quant_name in QUANT_NAMES})
 
     return quants
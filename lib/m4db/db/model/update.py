@@ -0,0 +1,24 @@
+r"""
+Routines to update existing models.
+"""
+
+from m4db.orm.schema import Model
+
+from m4db.db.running_status.retrieve import retrieve_running_status
+
+
+def set_model_running_status(session, unique_id, running_status_name):
+    r"""
+    Set the running status of a model with a single UPDATE statement (the session is not committed).
+    :param session: the database session.
+    :param unique_id: the unique id of the model.
+    :param running_status_name: the name of the new running status.
+    :return: True if the model exists (and was updated), otherwise False.
+    """
+    running_status = retrieve_running_status(session, running_status_name)
+
+    updated = session.query(Model). \
+        filter(Model.unique_id == unique_id). \
+        update({Model.running_status_id: running_status.id}, synchronize_session=False)
+
+    return updated > 0
@@ -0,0 +1,71 @@
+r"""
+Routines to check a list of new models against the contents of the database before they are inserted.
+
+All the geometries and model unique ids referenced by the models are gathered first and are then checked with a
+fixed number of set based (IN) queries, so the number of queries issued does not depend on the number of models
+(other than through `batch_size`). Every problem found is reported, rather than just the first.
+"""
+
+from m4db.orm.model_creation_schema import InitialMagnetizationSchemaTypesEnum
+
+from m4db.db.reference_data_cache import anisotropy_form_cache
+from m4db.db.geometry.retrieve import geometry_schema_key
+from m4db.db.geometry.retrieve import get_geometries_by_schema_objects
+from m4db.db.model.bulk_create import get_model_ids_by_unique_ids
+
+
+def validate_new_models(session, models, batch_size=1000):
+    r"""
+    Check that a list of (schema validated) new models can be inserted in to the database.
+    :param session: the database session.
+    :param models: a list of validated ModelSchema objects.
+    :param batch_size: the maximum number of geometries/unique ids to look up per query.
+    :return: a list of error messages, this list is empty if all the models can be inserted.
+    """
+    errors = []
+
+    geometries = get_geometries_by_schema_objects(session, [model.geometry for model in models], batch_size)
+
+    start_unique_ids = [
+        model.initial_magnetization.unique_id for model in models
+        if model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.model.value
+    ]
+    new_unique_ids = [model.unique_id for model in models if model.unique_id is not None]
+
+    # Start models and unique id collisions are both resolved with the same lookup.
+    existing_model_ids = get_model_ids_by_unique_ids(session, start_unique_ids + new_unique_ids, batch_size)
+
+    seen_unique_ids = set()
+
+    for index, model in enumerate(models):
+
+        existing_geometry = geometries.get(geometry_schema_key(model.geometry))
+        if existing_geometry is None:
+            errors.append(f"Could not find geometry for model in position {index}.")
+        elif len(model.materials) != existing_geometry.nsubmeshes:
+            errors.append(f"The geometry for model in position {index} has {existing_geometry.nsubmeshes} "
+                          f"submeshes, however {len(model.materials)} material elements were given.")
+
+        if model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.model.value:
+            if model.initial_magnetization.unique_id not in existing_model_ids:
+                errors.append(f"Could not find model for initial model magnetization with unique id "
+                              f"{model.initial_magnetization.unique_id} (position {index}).")
+
+        if model.unique_id is not None:
+            if model.unique_id in existing_model_ids:
+                errors.append(f"The model in position {index} specifies the unique id {model.unique_id}, "
+                              f"however this id is already present.")
+            if model.unique_id in seen_unique_ids:
+                errors.append(f"The model in position {index} specifies the unique id {model.unique_id}, "
+                              f"however this id is used by an earlier model in the file.")
+            if model.reps > 1:
+                errors.append(f"The model in position {index} specifies a unique id, so it may not be repeated "
+                              f"({model.reps} reps given).")
+            seen_unique_ids.add(model.unique_id)
+
+        for material in model.materials:
+            if anisotropy_form_cache.get_id(session, material.anisotropy_form) is None:
+                errors.append(f"Unknown anisotropy form '{material.anisotropy_form}' for model in position "
+                              f"{index}.")
+
+    return errors
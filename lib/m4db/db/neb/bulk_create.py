@@ -0,0 +1,135 @@
+r"""
+Routines to create Fabian/Shcherbakov (root) NEB paths between all pairs of a selection of models in bulk.
+
+A path may only join two models with the same geometry and the same materials, so the selected models are grouped on
+their geometry and (submesh, name, temperature) material signature and paths are generated between all pairs within
+each group. Pairs that are already joined by a root path are skipped, and the new NEB rows (along with their run data,
+report data and metadata) are written with batched, multi-row INSERT ... RETURNING statements.
+"""
+
+from collections import defaultdict
+from itertools import combinations
+
+from m4db.orm.schema import Material
+from m4db.orm.schema import Metadata
+from m4db.orm.schema import Model
+from m4db.orm.schema import NEB
+from m4db.orm.schema import NEBCalculationType
+from m4db.orm.schema import NEBReportData
+from m4db.orm.schema import NEBRunData
+
+from m4db.db.model.bulk_create import insert_returning
+from m4db.db.model.retrieve import get_models_query
+from m4db.db.neb.check_endpoint_exists import endpoint_key
+from m4db.db.neb.check_endpoint_exists import parent_paths_with_model_ids_exist
+from m4db.db.running_status.retrieve import retrieve_not_run_status
+
+from m4db.utilities.batches import batches
+
+
+def get_model_groups(session, **kwargs):
+    r"""
+    Group a selection of models on their geometry and materials, i.e. such that an NEB path may be created between
+    any two models in the same group.
+    :param session: the database session.
+    :param kwargs: argument parameters (as for `get_models`) designed to filter specific types of model.
+    :return: a list of lists of model ids, each list is sorted.
+    """
+    model_ids = get_models_query(session, **kwargs).with_entities(Model.id).subquery()
+
+    geometry_ids = {}
+    signatures = defaultdict(list)
+
+    # Two queries in total, one for the models' geometries and one for all of their materials.
+    for model_id, geometry_id in session.query(Model.id, Model.geometry_id).filter(Model.id.in_(model_ids.select())):
+        geometry_ids[model_id] = geometry_id
+    for model_id, submesh_id, name, temperature in session.query(
+            Material.model_id, Material.submesh_id, Material.name, Material.temperature). \
+            filter(Material.model_id.in_(model_ids.select())):
+        signatures[model_id].append((submesh_id, name, temperature))
+
+    groups = defaultdict(list)
+    for model_id, geometry_id in geometry_ids.items():
+        groups[(geometry_id, tuple(sorted(signatures[model_id])))].append(model_id)
+
+    return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def candidate_pairs(model_groups):
+    r"""
+    Generate the (unique) end point pairs between all models in each group.
+    :param model_groups: a list of lists of model ids.
+    :return: a generator of end point keys (see `endpoint_key`).
+    """
+    for group in model_groups:
+        for model_id_one, model_id_two in combinations(group, 2):
+            yield endpoint_key(model_id_one, model_id_two)
+
+
+def bulk_create_fs_paths(session, db_user, project, software,
+                         no_of_points=100, max_energy_evaluations=10000, max_path_evaluations=5000,
+                         batch_size=1000, dry_run=False, progress=None, **kwargs):
+    r"""
+    Create root Fabian/Shcherbakov NEB paths between all pairs of models in a selection (the session is committed
+    after every batch).
+    :param session: the database session.
+    :param db_user: the DBUser that owns the new paths.
+    :param project: the Project that the new paths belong to.
+    :param software: the Software used to run the new paths.
+    :param no_of_points: the number of points along each path.
+    :param max_energy_evaluations: the maximum number of energy evaluations.
+    :param max_path_evaluations: the maximum number of path evaluations.
+    :param batch_size: the number of candidate pairs checked, and paths written, per batch.
+    :param dry_run: if True, count the paths that would be created but don't create them.
+    :param progress: an optional function that is called with the number of (new) paths after each batch.
+    :param kwargs: argument parameters (as for `get_models`) designed to filter specific types of model.
+    :return: a tuple of the list of new NEB unique ids (empty for a dry run), the number of new paths (or paths
+             that would be created for a dry run) and the number of paths that were skipped since they already exist.
+    """
+    model_groups = get_model_groups(session, **kwargs)
+
+    # Resolve shared reference rows once.
+    calculation_type_id = session.query(NEBCalculationType.id). \
+        filter(NEBCalculationType.name == "fs_heuristic"). \
+        scalar()
+    not_run_status_id = retrieve_not_run_status(session).id
+    mdata_row = {"db_user_id": db_user.id, "project_id": project.id, "software_id": software.id}
+
+    unique_ids = []
+    nnew = 0
+    nexisting = 0
+    for batch in batches(candidate_pairs(model_groups), batch_size):
+        existing = parent_paths_with_model_ids_exist(session, batch, batch_size)
+        new_pairs = [pair for pair in batch if pair not in existing]
+        nexisting += len(existing)
+        nnew += len(new_pairs)
+
+        if not dry_run and new_pairs:
+            neb_run_data_ids = insert_returning(session, NEBRunData, [{"has_script": False} for _ in new_pairs])
+            neb_report_data_ids = insert_returning(session, NEBReportData, [
+                {"has_x_thumb_png": False} for _ in new_pairs
+            ])
+            mdata_ids = insert_returning(session, Metadata, [dict(mdata_row) for _ in new_pairs])
+
+            unique_ids.extend(insert_returning(session, NEB, [
+                {
+                    "no_of_points": no_of_points,
+                    "max_energy_evaluations": max_energy_evaluations,
+                    "max_path_evaluations": max_path_evaluations,
+                    "start_model_id": start_model_id,
+                    "end_model_id": end_model_id,
+                    "neb_calculation_type_id": calculation_type_id,
+                    "neb_run_data_id": neb_run_data_ids[index],
+                    "neb_report_data_id": neb_report_data_ids[index],
+                    "running_status_id": not_run_status_id,
+                    "mdata_id": mdata_ids[index]
+                }
+                for index, (start_model_id, end_model_id) in enumerate(new_pairs)
+            ], "unique_id"))
+
+            session.commit()
+
+        if progress is not None:
+            progress(nnew)
+
+    return unique_ids, nnew, nexisting
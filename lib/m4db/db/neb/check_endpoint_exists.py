@@ -1,12 +1,30 @@
 r"""
 A set of utilities that check whether an neb path with the given start/end model unique_ids exists.
+
+Root (parent-less) paths are looked up on their direction independent end point key
+(min(start_model_id, end_model_id), max(start_model_id, end_model_id)), which is backed by a unique index.
 """
 
-from sqlalchemy.orm import aliased
+from sqlalchemy import case
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import tuple_
 
 from m4db.orm.schema import Model
 from m4db.orm.schema import NEB
 
+from m4db.utilities.batches import batches
+
+
+def endpoint_key(model_id_one, model_id_two):
+    r"""
+    Retrieve the direction independent end point key of a pair of models.
+    :param model_id_one: a model id.
+    :param model_id_two: a second model id.
+    :return: the tuple (min(model_id_one, model_id_two), max(model_id_one, model_id_two)).
+    """
+    return min(model_id_one, model_id_two), max(model_id_one, model_id_two)
+
 
 def parent_path_with_models_exists(session, model_unique_id_one, model_unique_id_two):
     r"""
@@ -17,32 +35,50 @@ def parent_path_with_models_exists(session, model_unique_id_one, model_unique_id
     :param model_unique_id_two: a second model unique ID.
     :return: the unique ID of the NEB if it already exists, otherwise return None
     """
+    model_id_one = select(Model.id).where(Model.unique_id == model_unique_id_one).scalar_subquery()
+    model_id_two = select(Model.id).where(Model.unique_id == model_unique_id_two).scalar_subquery()
+
+    # Either direction is matched by comparing against the ordered pair of model ids.
+    return session.query(NEB.unique_id). \
+        filter(NEB.parent_neb_id == None). \
+        filter(NEB.endpoint_low_model_id == case((model_id_one < model_id_two, model_id_one), else_=model_id_two)). \
+        filter(NEB.endpoint_high_model_id == case((model_id_one < model_id_two, model_id_two), else_=model_id_one)). \
+        scalar()
+
+
+def parent_paths_with_model_ids_exist(session, model_id_pairs, batch_size=1000):
+    r"""
+    Check which of a collection of model pairs are already joined by a parent NEB (in either direction).
+    :param session: the database session object.
+    :param model_id_pairs: an iterable of (model id, model id) pairs.
+    :param batch_size: the maximum number of pairs checked per query.
+    :return: a dictionary of NEB unique IDs keyed on `endpoint_key` for the pairs that already have a parent NEB,
+             pairs without a parent NEB are absent.
+    """
+    keys = set(endpoint_key(model_id_one, model_id_two) for model_id_one, model_id_two in model_id_pairs)
+
+    existing = {}
+    for batch in batches(keys, batch_size):
+        nebs = session.query(NEB.endpoint_low_model_id, NEB.endpoint_high_model_id, NEB.unique_id). \
+            filter(NEB.parent_neb_id == None). \
+            filter(tuple_(NEB.endpoint_low_model_id, NEB.endpoint_high_model_id).in_(batch))
+        for low_model_id, high_model_id, neb_unique_id in nebs:
+            existing[(low_model_id, high_model_id)] = neb_unique_id
+
+    return existing
+
+
+def duplicate_parent_paths(session):
+    r"""
+    Find pairs of models that are joined by more than one parent NEB (these must be resolved before the unique end
+    point index can be created on an existing database).
+    :param session: the database session object.
+    :return: a list of (low model id, high model id, number of parent NEBs) tuples.
+    """
+    duplicates = session.query(NEB.endpoint_low_model_id, NEB.endpoint_high_model_id, func.count(NEB.id)). \
+        filter(NEB.parent_neb_id == None). \
+        group_by(NEB.endpoint_low_model_id, NEB.endpoint_high_model_id). \
+        having(func.count(NEB.id) > 1). \
+        all()
 
-    StartModel = aliased(Model, name="StartModel")
-    EndModel = aliased(Model, name="EndModel")
-
-    # Check that `model_unique_id_one` and `model_unique_id_two` are not the start/end respectively.
-    result = session.query(NEB).\
-        join(StartModel, StartModel.id == NEB.start_model_id).\
-        join(EndModel, EndModel.id == NEB.end_model_id).\
-        filter(StartModel.unique_id == model_unique_id_one).\
-        filter(EndModel.unique_id == model_unique_id_two).\
-        filter(NEB.parent_neb == None).\
-        one_or_none()
-
-    if result:
-        return result.unique_id
-
-    # Check that `model_unique_id_two` and `model_unique_id_one` are not the start/end respectively.
-    result = session.query(NEB). \
-        join(StartModel, StartModel.id == NEB.start_model_id). \
-        join(EndModel, EndModel.id == NEB.end_model_id). \
-        filter(StartModel.unique_id == model_unique_id_two). \
-        filter(EndModel.unique_id == model_unique_id_one). \
-        filter(NEB.parent_neb == None). \
-        one_or_none()
-
-    if result:
-        return result.unique_id
-    else:
-        return None
+    return [tuple(duplicate) for duplicate in duplicates]
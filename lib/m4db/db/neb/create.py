@@ -3,7 +3,6 @@ A set of routines to create new NEB paths.
 """
 from m4db.configuration import read_config_from_environ
 
-from m4db.orm.schema import Software
 from m4db.orm.schema import Project
 from m4db.orm.schema import DBUser
 from m4db.orm.schema import Metadata
@@ -12,11 +11,12 @@ from m4db.orm.schema import UniformField
 from m4db.orm.schema import Unit
 from m4db.orm.schema import NEBRunData
 from m4db.orm.schema import NEBReportData
-from m4db.orm.schema import RunningStatus
 from m4db.orm.schema import NEB
 from m4db.orm.schema import NEBCalculationType
 
 from m4db.db.neb.check_endpoint_exists import parent_path_with_models_exists
+from m4db.db.running_status.retrieve import retrieve_not_run_status
+from m4db.db.software.retrieve import retrieve_software
 
 
 class PathExternalFieldKWArgs:
@@ -273,15 +273,17 @@ def create_fs_path(session, **kwargs):
 
     project = session.query(Project).filter(Project.name == args.project).one()
     db_user = session.query(DBUser).filter(DBUser.user_name == args.db_user).one()
-    software = session.query(Software). \
-        filter(Software.name == args.software). \
-        filter(Software.version == args.software_version). \
-        one()
+    software = retrieve_software(session, args.software, args.software_version)
+
+    # There may only be one parent path between two models (in either direction).
+    existing_unique_id = parent_path_with_models_exists(session, args.model_unique_id_one, args.model_unique_id_two)
+    if existing_unique_id is not None:
+        return existing_unique_id, False
 
     model_one = session.query(Model).filter(Model.unique_id == args.model_unique_id_one).one()
     model_two = session.query(Model).filter(Model.unique_id == args.model_unique_id_two).one()
 
-    running_status = session.query(RunningStatus).filter(RunningStatus.name == "not-run").one()
+    running_status = retrieve_not_run_status(session)
 
     calculation_type = session.query(NEBCalculationType).filter(NEBCalculationType.name == "fs_heuristic").one()
 
@@ -354,7 +356,7 @@ def create_neb_child_path(session, **kwargs):
     else:
         print("   there is no external field")
 
-    running_status = session.query(RunningStatus).filter(RunningStatus.name == "not-run").one()
+    running_status = retrieve_not_run_status(session)
 
     calculation_type = session.query(NEBCalculationType).filter(NEBCalculationType.name == "neb").one()
 
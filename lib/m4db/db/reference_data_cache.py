@@ -0,0 +1,185 @@
+r"""
+A process-wide cache for small, almost static, reference tables (running statuses, software, size conventions and
+anisotropy forms).
+
+Rows are held as detached copies and are attached to a caller's session with `session.merge(..., load=False)` so
+that a lookup never issues SQL once the cache is warm. A cache is (re)loaded from the database in a single query the
+first time it is used, when it has been invalidated, when its maximum age is exceeded or when a key is missed (this
+last rule means that rows added by other processes are eventually seen). A key that is still missing after a reload is
+remembered, so looking it up again does not reload the table until the cache is next invalidated or exceeds its
+maximum age.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from m4db.orm.schema import AnisotropyForm
+from m4db.orm.schema import RunningStatus
+from m4db.orm.schema import SizeConvention
+from m4db.orm.schema import Software
+
+
+class ReferenceDataCache:
+    r"""
+    Cache all the rows of a single reference table keyed on a natural key.
+    """
+
+    def __init__(self, entity, key, max_age=None):
+        r"""
+        Create a new (empty) reference data cache.
+        :param entity: the ORM class whose rows are cached.
+        :param key: a function that takes an instance of `entity` and returns its natural key.
+        :param max_age: if not None, the number of seconds after which the cache is reloaded.
+        """
+        self.entity = entity
+        self.key = key
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._rows = None
+        self._loaded_at = None
+        self._missing = set()
+
+    def _detached_copy(self, row):
+        r"""
+        Create a detached copy of a row, with all column attributes populated, that is independent of any session.
+        :param row: an instance of the cached entity.
+        :return: a detached instance of the cached entity.
+        """
+        copy = self.entity()
+        for column_attr in inspect(self.entity).column_attrs:
+            setattr(copy, column_attr.key, getattr(row, column_attr.key))
+        make_transient_to_detached(copy)
+
+        return copy
+
+    def _load(self, session):
+        r"""
+        (Re)load the entire reference table.
+        :param session: a database session.
+        :return: a dictionary of detached rows keyed on their natural key.
+        """
+        rows = {}
+        for row in session.query(self.entity).all():
+            rows[self.key(row)] = self._detached_copy(row)
+
+        self._rows = rows
+        self._loaded_at = time.monotonic()
+
+        return rows
+
+    def _stale(self):
+        r"""
+        Check whether the cache needs to be reloaded.
+        :return: True if the cache is empty or has exceeded its maximum age, otherwise False.
+        """
+        if self._rows is None:
+            return True
+        if self.max_age is not None and time.monotonic() - self._loaded_at > self.max_age:
+            return True
+        return False
+
+    def _current_rows(self, session):
+        r"""
+        Retrieve the cached rows, (re)loading the table first if the cache is stale.
+        :param session: a database session.
+        :return: a dictionary of detached rows keyed on their natural key.
+        """
+        if self._stale():
+            self._missing = set()
+            return self._load(session)
+        return self._rows
+
+    def get(self, session, key):
+        r"""
+        Retrieve a row from the cache.
+        :param session: a database session, the row returned is attached to this session.
+        :param key: the natural key of the row.
+        :return: the row attached to `session` or None if no such row exists.
+        """
+        with self._lock:
+            row = self._current_rows(session).get(key)
+            if row is None and key not in self._missing:
+                # The row may have been added since the cache was loaded, so try once more.
+                row = self._load(session).get(key)
+                if row is None:
+                    self._missing.add(key)
+
+        if row is None:
+            return None
+
+        return session.merge(row, load=False)
+
+    def get_id(self, session, key):
+        r"""
+        Retrieve the primary key of a row from the cache.
+        :param session: a database session.
+        :param key: the natural key of the row.
+        :return: the primary key of the row or None if no such row exists.
+        """
+        row = self.get(session, key)
+        if row is None:
+            return None
+        return row.id
+
+    def all(self, session):
+        r"""
+        Retrieve all the rows in the cache.
+        :param session: a database session, the rows returned are attached to this session.
+        :return: a list of rows attached to `session`.
+        """
+        with self._lock:
+            rows = list(self._current_rows(session).values())
+
+        return [session.merge(row, load=False) for row in rows]
+
+    def invalidate(self):
+        r"""
+        Evict all the rows in the cache, the next access will reload the table.
+        :return: None
+        """
+        with self._lock:
+            self._rows = None
+            self._loaded_at = None
+            self._missing = set()
+
+    def invalidate_after_commit(self, session):
+        r"""
+        Evict all the rows in the cache once the session's current transaction has been committed (rows loaded before
+        then would not include the session's changes).
+        :param session: the database session that is changing the table.
+        :return: None
+        """
+        event.listen(session, "after_commit", lambda committed_session: self.invalidate(), once=True)
+
+
+# Running statuses, keyed on name.
+running_status_cache = ReferenceDataCache(
+    RunningStatus, lambda running_status: running_status.name)
+
+# Software, keyed on (name, version); software executables may be edited by other processes so reload periodically.
+software_cache = ReferenceDataCache(
+    Software, lambda software: (software.name, software.version), max_age=60)
+
+# Size conventions, keyed on symbol.
+size_convention_cache = ReferenceDataCache(
+    SizeConvention, lambda size_convention: size_convention.symbol)
+
+# Anisotropy forms, keyed on name.
+anisotropy_form_cache = ReferenceDataCache(
+    AnisotropyForm, lambda anisotropy_form: anisotropy_form.name)
+
+
+def invalidate_reference_data_caches():
+    r"""
+    Evict the contents of every reference data cache.
+    :return: None
+    """
+    running_status_cache.invalidate()
+    software_cache.invalidate()
+    size_convention_cache.invalidate()
+    anisotropy_form_cache.invalidate()
@@ -2,7 +2,7 @@ r"""
 A collection of routines for retrieving running statuses.
 """
 
-from m4db.orm.schema import RunningStatus
+from m4db.db.reference_data_cache import running_status_cache
 
 from m4db import GLOBAL
 
@@ -15,7 +15,7 @@ def retrieve_running_status(session, running_status_name):
     :return: a RunningStatus object.
     """
     # Attempt to retrieve the running status.
-    running_status = session.query(RunningStatus).filter(RunningStatus.name == running_status_name).one_or_none()
+    running_status = running_status_cache.get(session, running_status_name)
     # If the running status cannot be found ...
     if running_status is None:
         # ... raise error
@@ -24,6 +24,15 @@ def retrieve_running_status(session, running_status_name):
     return running_status
 
 
+def retrieve_running_statuses(session):
+    r"""
+    Retrieve all the running statuses.
+    :param session: a database session.
+    :return: a list of RunningStatus objects.
+    """
+    return running_status_cache.all(session)
+
+
 def retrieve_not_run_status(session):
     r"""
     Retrieve the 'not-run' running status.
@@ -90,4 +99,4 @@ def retrieve_failed_running_status(session):
     :return: a RunningStatus object.
     """
     # Attempt to retrieve the 'failed' running status.
-    return retrieve_running_status(session, GLOBAL.running_status_failed)
\ No newline at end of file
+    return retrieve_running_status(session, GLOBAL.running_status_failed)
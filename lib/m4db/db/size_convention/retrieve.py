@@ -2,7 +2,7 @@ r"""
 A collection of routines to retrieve size conventions from m4db.
 """
 
-from m4db.orm.schema import SizeConvention
+from m4db.db.reference_data_cache import size_convention_cache
 
 
 def allowed_size_conventions():
@@ -44,7 +44,7 @@ def retrieve_size_convention(session, symbol):
     :return: a SizeConvention object.
     """
     # Attempt to retrieve the SizeConvention
-    size_convention = session.query(SizeConvention).filter(SizeConvention.symbol == symbol).one_or_none()
+    size_convention = size_convention_cache.get(session, symbol)
     # If the size convention cannot be found ...
     if size_convention is None:
         # ... raise error
@@ -4,6 +4,8 @@ A selection of routines for creating software objects.
 
 from m4db.orm.schema import Software
 
+from m4db.db.reference_data_cache import software_cache
+
 
 def create_software(session, name, version, executable, description, url, citation):
     r"""
@@ -35,4 +37,7 @@ def create_software(session, name, version, executable, description, url, citati
         citation=citation
     )
 
+    # The software table changes once the caller commits, so evict cached software then.
+    software_cache.invalidate_after_commit(session)
+
     return software
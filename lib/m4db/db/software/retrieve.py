@@ -2,7 +2,7 @@ r"""
 A collection of routines to retrieve software info from the database.
 """
 
-from m4db.orm.schema import Software
+from m4db.db.reference_data_cache import software_cache
 
 
 def retrieve_software(session, software_name, software_version: str, allow_none=False):
@@ -14,10 +14,7 @@ def retrieve_software(session, software_name, software_version: str, allow_none=
     :return: A Software object.
     """
     # Attempt to retrieve the software
-    software = session.query(Software). \
-        filter(Software.name == software_name). \
-        filter(Software.version == str(software_version)). \
-        one_or_none()
+    software = software_cache.get(session, (software_name, str(software_version)))
 
     # If the software cannot be found ...
     if software is None:
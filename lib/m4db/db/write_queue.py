@@ -0,0 +1,136 @@
+r"""
+A single-writer queue for databases that only allow one writer at a time (i.e. SQLite).
+
+Writes are submitted from any number of threads as functions that take a session, they are executed in order by a
+single thread that owns the only writing session. Queued writes are grouped into batches that are committed in a
+single transaction, each write runs inside its own savepoint so that a failing write does not affect the rest of its
+batch.
+"""
+
+import queue
+import threading
+
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    r"""
+    A queue of database writes executed by a single thread.
+    """
+
+    def __init__(self, Session, max_batch_size=100):
+        r"""
+        Create a write queue.
+        :param Session: a session factory, used to create the writing session.
+        :param max_batch_size: the maximum number of writes committed in a single transaction.
+        """
+        self.Session = Session
+        self.max_batch_size = max_batch_size
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        r"""
+        Start the writing thread (if it is not already running).
+        :return: the write queue.
+        """
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="m4db-write-queue", daemon=True)
+                self.thread.start()
+        return self
+
+    def stop(self):
+        r"""
+        Stop the writing thread once all the writes that are already queued have been executed.
+        :return: None
+        """
+        with self.lock:
+            if self.thread is not None:
+                self.queue.put(None)
+                self.thread.join()
+                self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def submit(self, function, *args, **kwargs):
+        r"""
+        Queue a write.
+        :param function: the function that performs the write, it is called with the writing session followed by
+                         `args` and `kwargs` and must not commit.
+        :param args: positional arguments for the function.
+        :param kwargs: keyword arguments for the function.
+        :return: a Future holding the return value of the function once the write has been committed.
+        """
+        if self.thread is None:
+            raise RuntimeError("The write queue has not been started.")
+
+        future = Future()
+        self.queue.put((future, function, args, kwargs))
+
+        return future
+
+    def next_batch(self):
+        r"""
+        Wait for the next write and take any other writes that are already queued (up to the maximum batch size).
+        :return: a list of queued writes, the last item is None if the queue has been stopped.
+        """
+        item = self.queue.get()
+        batch = [item]
+        while item is not None and len(batch) < self.max_batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+
+        return batch
+
+    def run(self):
+        r"""
+        Execute queued writes until the queue is stopped.
+        :return: None
+        """
+        session = self.Session()
+        try:
+            while True:
+                batch = self.next_batch()
+                self.execute(session, [item for item in batch if item is not None])
+                if batch[-1] is None:
+                    return
+        finally:
+            session.close()
+
+    def execute(self, session, writes):
+        r"""
+        Execute a batch of writes in a single transaction.
+        :param session: the writing session.
+        :param writes: a list of (future, function, args, kwargs) tuples.
+        :return: None
+        """
+        results = []
+        for future, function, args, kwargs in writes:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with session.begin_nested():
+                    result = function(session, *args, **kwargs)
+                results.append((future, result))
+            except Exception as exception:
+                future.set_exception(exception)
+
+        try:
+            session.commit()
+        except Exception as exception:
+            session.rollback()
+            for future, _ in results:
+                future.set_exception(exception)
+            return
+
+        for future, result in results:
+            future.set_result(result)
@@ -1,66 +1,170 @@
 r"""
 A set of utility functions that are useful when exporting data.
+
+Dependencies are resolved with recursive common table expressions, i.e. the chain of parent NEBs and the chain of
+models used as initial magnetizations are followed by the database rather than one query per object.
 """
 
+from sqlalchemy import select
+from sqlalchemy import union
+
+from m4db.orm.schema import Geometry
+from m4db.orm.schema import Model
+from m4db.orm.schema import ModelInitialMagnetization
 from m4db.orm.schema import NEB
 
 import sqlalchemy.orm
 
+from m4db.utilities.batches import batches
+
 
-def model_dependencies(unique_ids):
+def model_closure(seed_model_ids):
+    r"""
+    Build a recursive CTE of model ids that are required by a set of models, i.e. the models themselves along with
+    any models that they use as their initial magnetization (and so on).
+    Args:
+        seed_model_ids: a selectable with a single column of model ids.
+
+    Returns:
+        A CTE with a single column 'model_id'.
+
+    """
+    initial_magnetization = ModelInitialMagnetization.__table__
+    model = Model.__table__
+
+    closure = seed_model_ids.cte("model_closure", recursive=True)
+    closure = closure.union(
+        select(initial_magnetization.c.model_id).
+        join(model, model.c.initial_magnetization_id == initial_magnetization.c.id).
+        join(closure, closure.c.model_id == model.c.id)
+    )
+
+    return closure
+
+
+def model_and_geometry_unique_ids(session, closure):
+    r"""
+    Retrieve the model and geometry unique ids of the models in a closure.
+    Args:
+        session: the database session object.
+        closure: a selectable with a single column 'model_id'.
+
+    Returns:
+        A pair containing a set of geometry unique ids and a set of model unique ids.
+
+    """
+    geometry_unique_ids = set()
+    model_unique_ids = set()
+
+    rows = session.execute(
+        select(Model.unique_id, Geometry.unique_id).
+        join(Geometry, Geometry.id == Model.geometry_id).
+        where(Model.id.in_(select(closure.c.model_id)))
+    )
+    for model_unique_id, geometry_unique_id in rows:
+        model_unique_ids.add(model_unique_id)
+        geometry_unique_ids.add(geometry_unique_id)
+
+    return geometry_unique_ids, model_unique_ids
+
+
+def model_dependencies(unique_ids, session, batch_size=5000):
     r"""
     Returns a list of geometry and model unique ids with resolved dependencies.
     Args:
         unique_ids: an initial list of Model unique ids.
+        session: the database session object.
+        batch_size: the maximum number of unique ids resolved per query.
 
     Returns:
-        a pair containing a python set of geometry unique ids and a python set of model unique ids
+        A pair containing a list of geometry unique ids and a list of model unique ids.
+
     """
     geometry_unique_ids = set()
+    model_unique_ids = set()
+
+    for batch in batches(set(unique_ids), batch_size):
+        closure = model_closure(select(Model.id.label("model_id")).where(Model.unique_id.in_(batch)))
+        batch_geometry_unique_ids, batch_model_unique_ids = model_and_geometry_unique_ids(session, closure)
+
+        missing = set(batch) - batch_model_unique_ids
+        if missing:
+            print("Could not find model(s) {} in the database!!".format(", ".join(sorted(missing))))
+            raise sqlalchemy.orm.exc.NoResultFound()
+
+        geometry_unique_ids |= batch_geometry_unique_ids
+        model_unique_ids |= batch_model_unique_ids
+
+    return list(geometry_unique_ids), list(model_unique_ids)
 
 
-def neb_dependencies(unique_ids, session):
+def neb_dependencies(unique_ids, session, batch_size=5000):
     r"""
     Returns a list of geometry, model and NEB path unique ids with resolved dependencies.
     Args:
         unique_ids: an initial list of NEB path unique ids.
         session: the database session object.
+        batch_size: the maximum number of unique ids resolved per query.
 
     Returns:
-        A three-tuple containing a set of geometry unique ids, a set of model unique ids and a set of NEB unique ids.
+        A three-tuple containing a list of geometry unique ids, a list of model unique ids and a list of NEB unique
+        ids.
 
     """
     geometry_unique_ids = set()
     model_unique_ids = set()
     neb_unique_ids = set()
 
-    neb_unique_ids_stack = unique_ids[:]
-
-    while len(neb_unique_ids_stack) > 0:
-        uid = neb_unique_ids_stack.pop()
-
-        try:
-            neb = session.query(NEB).filter(NEB.unique_id == uid).one()
-        except sqlalchemy.orm.exc.NoResultFound as e:
-            print("Could not find NEB {} in the database!!".format(uid))
-            raise e
-
-        if neb.parent_neb is not None:
-            neb_unique_ids_stack.append(neb.parent_neb.unique_id)
-
-        neb_unique_ids.add(neb.unique_id)
-        model_unique_ids.add(neb.start_model.unique_id)
-        model_unique_ids.add(neb.end_model.unique_id)
-
-        if neb.start_model.geometry.unique_id == neb.end_model.geometry.unique_id:
-            geometry_unique_ids.add(neb.start_model.geometry.unique_id)
-            geometry_unique_ids.add(neb.end_model.geometry.unique_id)
-        else:
-            raise ValueError(
-                "Start model (uid: {}) and end model (uid: {}) of path (uid: {}) have different geometries!".format(
-                    neb.start_model.unique_id,
-                    neb.end_model.unique_id,
-                    neb.unique_id
-                ))
+    neb = NEB.__table__
+
+    for batch in batches(set(unique_ids), batch_size):
+        # The NEBs along with all their ancestors.
+        neb_closure = select(neb.c.id.label("neb_id")).where(neb.c.unique_id.in_(batch)). \
+            cte("neb_closure", recursive=True)
+        neb_closure = neb_closure.union(
+            select(neb.c.parent_neb_id).
+            join(neb_closure, neb_closure.c.neb_id == neb.c.id).
+            where(neb.c.parent_neb_id != None)
+        )
+
+        StartModel = sqlalchemy.orm.aliased(Model, name="start_model")
+        EndModel = sqlalchemy.orm.aliased(Model, name="end_model")
+
+        nebs = session.execute(
+            select(NEB.unique_id, StartModel.unique_id, StartModel.geometry_id, EndModel.unique_id,
+                   EndModel.geometry_id).
+            join(StartModel, StartModel.id == NEB.start_model_id).
+            join(EndModel, EndModel.id == NEB.end_model_id).
+            where(NEB.id.in_(select(neb_closure.c.neb_id)))
+        ).all()
+
+        found = set()
+        for neb_unique_id, start_unique_id, start_geometry_id, end_unique_id, end_geometry_id in nebs:
+            if start_geometry_id != end_geometry_id:
+                raise ValueError(
+                    "Start model (uid: {}) and end model (uid: {}) of path (uid: {}) have different geometries!".format(
+                        start_unique_id,
+                        end_unique_id,
+                        neb_unique_id
+                    ))
+            found.add(neb_unique_id)
+
+        missing = set(batch) - found
+        if missing:
+            print("Could not find NEB(s) {} in the database!!".format(", ".join(sorted(missing))))
+            raise sqlalchemy.orm.exc.NoResultFound()
+
+        neb_unique_ids |= found
+
+        # The end point models along with the models they depend upon.
+        end_point_model_ids = union(
+            select(neb.c.start_model_id.label("model_id")).where(neb.c.id.in_(select(neb_closure.c.neb_id))),
+            select(neb.c.end_model_id.label("model_id")).where(neb.c.id.in_(select(neb_closure.c.neb_id)))
+        )
+        batch_geometry_unique_ids, batch_model_unique_ids = model_and_geometry_unique_ids(
+            session, model_closure(select(end_point_model_ids.subquery().c.model_id))
+        )
+        geometry_unique_ids |= batch_geometry_unique_ids
+        model_unique_ids |= batch_model_unique_ids
 
     return list(geometry_unique_ids), list(model_unique_ids), list(neb_unique_ids)
@@ -0,0 +1,360 @@
+r"""
+A collection of utilities to export database objects as JSON in a streaming fashion.
+
+Objects are read in chunks (with `yield_per`) along with all the relationships that their `as_dict()` representation
+requires (with `selectinload`, i.e. one extra query per relationship per chunk rather than per object), and each
+object is written as soon as it has been converted. The output is either a single JSON array, which is written one
+element at a time, or JSON Lines (one object per line), so that exports run in constant memory.
+"""
+import json
+import os
+
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import with_polymorphic
+
+from m4db.orm.schema import AnisotropyForm
+from m4db.orm.schema import DBUser
+from m4db.orm.schema import Ellipsoid
+from m4db.orm.schema import Geometry
+from m4db.orm.schema import InitialMagnetization
+from m4db.orm.schema import Material
+from m4db.orm.schema import Metadata
+from m4db.orm.schema import Model
+from m4db.orm.schema import ModelInitialMagnetization
+from m4db.orm.schema import NEB
+from m4db.orm.schema import NEBCalculationType
+from m4db.orm.schema import Project
+from m4db.orm.schema import RandomInitialMagnetization
+from m4db.orm.schema import RunningStatus
+from m4db.orm.schema import SizeConvention
+from m4db.orm.schema import Software
+from m4db.orm.schema import TruncatedOctahedron
+from m4db.orm.schema import UniformInitialMagnetization
+
+from m4db.utilities.batches import batches
+from m4db.utilities.json_encoder import DecimalEncoder
+
+# The default number of objects read per chunk.
+DEFAULT_YIELD_PER = 1000
+
+
+def metadata_loader(relationship):
+    r"""
+    Eager load options for a metadata relationship (along with the user, project and software of the metadata).
+    Args:
+        relationship: a relationship attribute that refers to Metadata.
+
+    Returns:
+        A loader option.
+
+    """
+    return selectinload(relationship).options(
+        selectinload(Metadata.db_user),
+        selectinload(Metadata.project),
+        selectinload(Metadata.software)
+    )
+
+
+def geometry_loader(relationship=None):
+    r"""
+    Eager load options for geometries, including the columns of the concrete geometry types and their size
+    conventions.
+    Args:
+        relationship: a relationship attribute that refers to Geometry, or None if geometries are queried directly.
+
+    Returns:
+        A pair with the (polymorphic) entity and a list of loader options.
+
+    """
+    geometry = with_polymorphic(Geometry, [Ellipsoid, TruncatedOctahedron])
+    size_conventions = [
+        selectinload(geometry.Ellipsoid.size_convention),
+        selectinload(geometry.TruncatedOctahedron.size_convention)
+    ]
+
+    if relationship is None:
+        return geometry, size_conventions
+
+    return geometry, [selectinload(relationship.of_type(geometry)).options(*size_conventions)]
+
+
+def model_loader_options():
+    r"""
+    Eager load options for everything that `Model.as_dict()` requires.
+
+    Returns:
+        A list of loader options.
+
+    """
+    _, geometry_options = geometry_loader(Model.geometry)
+    initial_magnetization = with_polymorphic(
+        InitialMagnetization,
+        [ModelInitialMagnetization, RandomInitialMagnetization, UniformInitialMagnetization]
+    )
+
+    return geometry_options + [
+        selectinload(Model.materials).selectinload(Material.anisotropy_form),
+        selectinload(Model.initial_magnetization.of_type(initial_magnetization)).
+        selectinload(initial_magnetization.ModelInitialMagnetization.model),
+        selectinload(Model.applied_field),
+        selectinload(Model.running_status),
+        selectinload(Model.model_run_data),
+        selectinload(Model.model_report_data),
+        metadata_loader(Model.mdata),
+        selectinload(Model.legacy_model_info)
+    ]
+
+
+def neb_loader_options():
+    r"""
+    Eager load options for everything that `NEB.as_dict()` requires.
+
+    Returns:
+        A list of loader options.
+
+    """
+    return [
+        selectinload(NEB.start_model),
+        selectinload(NEB.end_model),
+        selectinload(NEB.parent_neb),
+        selectinload(NEB.neb_calculation_type),
+        selectinload(NEB.applied_field),
+        selectinload(NEB.neb_run_data),
+        selectinload(NEB.neb_report_data),
+        selectinload(NEB.running_status),
+        metadata_loader(NEB.mdata)
+    ]
+
+
+def write_json_array(fout, objects, format_json=False):
+    r"""
+    Write a JSON array to a file one element at a time.
+    Args:
+        fout: the output file (opened for writing text).
+        objects: an iterable of JSON serializable objects.
+        format_json: flag set to True if formatted JSON is required, otherwise false.
+
+    Returns:
+        The number of objects written.
+
+    """
+    indent = 4 if format_json else None
+    separator = ",\n" if format_json else ", "
+
+    count = 0
+    fout.write("[")
+    for obj in objects:
+        if count > 0:
+            fout.write(separator)
+        fout.write(json.dumps(obj, indent=indent, sort_keys=format_json, cls=DecimalEncoder))
+        count += 1
+    fout.write("]\n")
+
+    return count
+
+
+def write_json_lines(fout, objects):
+    r"""
+    Write JSON Lines (i.e. one JSON object per line) to a file.
+    Args:
+        fout: the output file (opened for writing text).
+        objects: an iterable of JSON serializable objects.
+
+    Returns:
+        The number of objects written.
+
+    """
+    count = 0
+    for obj in objects:
+        fout.write(json.dumps(obj, cls=DecimalEncoder))
+        fout.write("\n")
+        count += 1
+
+    return count
+
+
+def stream_as_dicts(query, yield_per=DEFAULT_YIELD_PER):
+    r"""
+    Iterate over the dictionary representations of the objects of a query, objects are read in chunks.
+    Args:
+        query: a query over a single (mapped) entity.
+        yield_per: the number of objects read per chunk.
+
+    Returns:
+        A generator of dictionaries.
+
+    """
+    for obj in query.yield_per(yield_per):
+        yield obj.as_dict()
+
+
+def write_export_file(file_name, objects, format_json=False, json_lines=False):
+    r"""
+    Write dictionaries to an export file.
+    Args:
+        file_name: the name of the output file.
+        objects: an iterable of dictionaries.
+        format_json: flag set to True if formatted JSON is required, otherwise false (ignored for JSON Lines).
+        json_lines: flag set to True if JSON Lines are required rather than a JSON array.
+
+    Returns:
+        The number of objects exported.
+
+    """
+    with open(file_name, "w") as fout:
+        if json_lines:
+            return write_json_lines(fout, objects)
+        return write_json_array(fout, objects, format_json)
+
+
+def export_query(file_name, query, format_json=False, json_lines=False, yield_per=DEFAULT_YIELD_PER):
+    r"""
+    Export the objects of a query to a file.
+    Args:
+        file_name: the name of the output file.
+        query: a query over a single (mapped) entity.
+        format_json: flag set to True if formatted JSON is required, otherwise false (ignored for JSON Lines).
+        json_lines: flag set to True if JSON Lines are required rather than a JSON array.
+        yield_per: the number of objects read per chunk.
+
+    Returns:
+        The number of objects exported.
+
+    """
+    return write_export_file(file_name, stream_as_dicts(query, yield_per), format_json, json_lines)
+
+
+def export_file_name(dir_path, name, json_lines=False):
+    r"""
+    Retrieve the name of an export file.
+    Args:
+        dir_path: the directory location to which objects are exported.
+        name: the base name of the file.
+        json_lines: flag set to True if JSON Lines are exported.
+
+    Returns:
+        The full path of the export file.
+
+    """
+    return os.path.join(dir_path, "{}.{}".format(name, "jsonl" if json_lines else "json"))
+
+
+def stream_by_unique_id(session, entity, options, unique_ids, yield_per=DEFAULT_YIELD_PER):
+    r"""
+    Iterate over the dictionary representations of objects, optionally filtered on a list of unique ids.
+    Args:
+        session: a session to the database.
+        entity: the entity (with a unique_id column) to export.
+        options: the loader options used for each chunk.
+        unique_ids: the unique ids of objects to export, if set to None all objects will be exported.
+        yield_per: the number of objects read per chunk (and the number of unique ids per query).
+
+    Returns:
+        A generator of dictionaries.
+
+    """
+    if unique_ids is None:
+        query = session.query(entity).options(*options).order_by(entity.id)
+        yield from stream_as_dicts(query, yield_per)
+    else:
+        for batch in batches(unique_ids, yield_per):
+            query = session.query(entity).options(*options).filter(entity.unique_id.in_(batch)).order_by(entity.id)
+            yield from stream_as_dicts(query, yield_per)
+
+
+def stream_export_geometry_by_unique_id(dir_path, session, unique_ids=None, format_json=False, json_lines=False,
+                                        yield_per=DEFAULT_YIELD_PER):
+    r"""
+    Export geometries from the database to a file called 'geometry.json' (or 'geometry.jsonl').
+    Args:
+        dir_path: the directory location to which geometry metadata is to be exported.
+        session: a session to the database.
+        unique_ids: the unique ids of geometries to export, if set to None all geometries will be exported.
+        format_json: flag set to True if formatted JSON is required, otherwise false.
+        json_lines: flag set to True if JSON Lines are required rather than a JSON array.
+        yield_per: the number of geometries read per chunk.
+
+    Returns:
+        The number of geometries exported.
+
+    """
+    geometry, options = geometry_loader()
+    return write_export_file(
+        export_file_name(dir_path, "geometry", json_lines),
+        stream_by_unique_id(session, geometry, options, unique_ids, yield_per),
+        format_json, json_lines
+    )
+
+
+def stream_export_model_by_unique_id(dir_path, session, unique_ids=None, format_json=False, json_lines=False,
+                                     yield_per=DEFAULT_YIELD_PER):
+    r"""
+    Export models from the database to a file called 'model.json' (or 'model.jsonl').
+    Args:
+        dir_path: the directory location to which model metadata is to be exported.
+        session: a session to the database.
+        unique_ids: the unique ids of models to export, if set to None all models will be exported.
+        format_json: flag set to True if formatted JSON is required, otherwise false.
+        json_lines: flag set to True if JSON Lines are required rather than a JSON array.
+        yield_per: the number of models read per chunk.
+
+    Returns:
+        The number of models exported.
+
+    """
+    return write_export_file(
+        export_file_name(dir_path, "model", json_lines),
+        stream_by_unique_id(session, Model, model_loader_options(), unique_ids, yield_per),
+        format_json, json_lines
+    )
+
+
+def stream_export_neb_by_unique_id(dir_path, session, unique_ids=None, format_json=False, json_lines=False,
+                                   yield_per=DEFAULT_YIELD_PER):
+    r"""
+    Export NEB paths from the database to a file called 'neb.json' (or 'neb.jsonl').
+    Args:
+        dir_path: the directory location to which NEB path metadata is to be exported.
+        session: a session to the database.
+        unique_ids: the unique ids of NEB paths to export, if set to None all paths will be exported.
+        format_json: flag set to True if formatted JSON is required, otherwise false.
+        json_lines: flag set to True if JSON Lines are required rather than a JSON array.
+        yield_per: the number of NEB paths read per chunk.
+
+    Returns:
+        The number of NEB paths exported.
+
+    """
+    return write_export_file(
+        export_file_name(dir_path, "neb", json_lines),
+        stream_by_unique_id(session, NEB, neb_loader_options(), unique_ids, yield_per),
+        format_json, json_lines
+    )
+
+
+def stream_export_reference_data(dir_path, session, format_json=False, json_lines=False,
+                                 yield_per=DEFAULT_YIELD_PER):
+    r"""
+    Export all users, projects, softwares, size conventions, anisotropy forms, running statuses and NEB calculation
+    types, each to its own file (named after the table).
+    Args:
+        dir_path: the directory location to which the objects are to be exported.
+        session: a session to the database.
+        format_json: flag set to True if formatted JSON is required, otherwise false.
+        json_lines: flag set to True if JSON Lines are required rather than a JSON array.
+        yield_per: the number of objects read per chunk.
+
+    Returns:
+        A dictionary of the number of objects exported keyed on table name.
+
+    """
+    counts = {}
+    for entity in [DBUser, Project, Software, SizeConvention, AnisotropyForm, RunningStatus, NEBCalculationType]:
+        name = entity.__tablename__
+        counts[name] = export_query(
+            export_file_name(dir_path, name, json_lines),
+            session.query(entity).order_by(entity.id),
+            format_json, json_lines, yield_per
+        )
+
+    return counts
@@ -0,0 +1,72 @@
+r"""
+Routines to read and write binary mesh sidecar files.
+
+A sidecar holds the arrays returned by `read_patran` (vertices, elements and submesh indices) in NumPy's (uncompressed)
+npz format, along with the content hash of the patran file that it was created from, so that a mesh can be loaded
+without parsing the ASCII patran file again.
+"""
+
+import os
+
+import numpy as np
+
+from m4db.file_io.patran import read_patran_fast
+
+
+def write_mesh_sidecar(sidecar_file, vertices, elements, submesh_ids, content_hash=None):
+    r"""
+    Write a mesh sidecar file, the file is written to a temporary file first and then moved in to place so that
+    readers never see a partially written sidecar.
+
+    :param sidecar_file: the sidecar file name.
+    :param vertices: the mesh vertices.
+    :param elements: the mesh elements (with the submesh index in the last column).
+    :param submesh_ids: the submesh indices of the mesh.
+    :param content_hash: the content hash of the patran file from which the mesh was read.
+
+    :return: None.
+    """
+    temporary_file = f"{sidecar_file}.tmp"
+    with open(temporary_file, "wb") as fout:
+        np.savez(
+            fout,
+            vertices=np.asarray(vertices, dtype=np.float64),
+            elements=np.asarray(elements, dtype=np.int64),
+            submesh_ids=np.asarray(submesh_ids, dtype=np.int64),
+            content_hash=np.array("" if content_hash is None else content_hash)
+        )
+    os.replace(temporary_file, sidecar_file)
+
+
+def read_mesh_sidecar(sidecar_file, content_hash=None):
+    r"""
+    Read a mesh sidecar file.
+
+    :param sidecar_file: the sidecar file name.
+    :param content_hash: if given, the content hash that the sidecar must have been written with.
+
+    :return: a 3-tuple containing the mesh vertices, elements, and submesh indices (as `read_patran`).
+    """
+    with np.load(sidecar_file, allow_pickle=False) as data:
+        if content_hash is not None and str(data["content_hash"]) != content_hash:
+            raise ValueError(f"The mesh sidecar '{sidecar_file}' is out of date.")
+        return data["vertices"], data["elements"], [int(submesh_id) for submesh_id in data["submesh_ids"]]
+
+
+def read_mesh(patran_file, sidecar_file, content_hash=None):
+    r"""
+    Read a mesh from its sidecar if there is one, otherwise from the patran file.
+
+    :param patran_file: the patran file name.
+    :param sidecar_file: the sidecar file name.
+    :param content_hash: if given, the sidecar is only used if it was written with this content hash.
+
+    :return: a 3-tuple containing the mesh vertices, elements, and submesh indices (as `read_patran`).
+    """
+    if os.path.isfile(sidecar_file):
+        try:
+            return read_mesh_sidecar(sidecar_file, content_hash)
+        except ValueError:
+            pass
+
+    return read_patran_fast(patran_file)
@@ -11,6 +11,17 @@ regex_header_data = re.compile("^26\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\
 regex_vertex_data = re.compile(r"^01\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)$")
 regex_element_data = re.compile(r"^02\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)$")
 
+# Whole file (multiline) versions of the packets above, used by the fast reader: a vertex packet is captured along with
+# its coordinate line and an element packet along with its submesh index and node index line.
+regex_header_counts = re.compile(r"^[ \t]*26[ \t]+[0-9]+[ \t]+[0-9]+[ \t]+[0-9]+[ \t]+([0-9]+)[ \t]+([0-9]+)",
+                                 re.MULTILINE)
+regex_vertex_packet = re.compile(r"^[ \t]*01[ \t]+([0-9]+)(?:[ \t]+[0-9]+){7}[ \t]*\r?\n([^\r\n]*)$", re.MULTILINE)
+regex_element_packet = re.compile(
+    r"^[ \t]*02[ \t]+([0-9]+)(?:[ \t]+[0-9]+){7}[ \t]*\r?\n"
+    r"[ \t]*[^ \t\r\n]+[ \t]+[^ \t\r\n]+[ \t]+([0-9]+)[^\r\n]*\r?\n([^\r\n]*)$",
+    re.MULTILINE
+)
+
 
 def read_patran(patran_file):
     r"""
@@ -113,3 +124,83 @@ def read_patran(patran_file):
         ))
 
     return vertices, elements, sorted(submesh_ids.keys())
+
+
+def contiguous_order(indices, name):
+    r"""
+    Retrieve the permutation that puts (zero based) packet indices in order, checking that they are contiguous.
+
+    :param indices: the indices of the packets, in file order.
+    :param name: the name of the packets (used in error messages).
+
+    :return: a permutation of the packets.
+    """
+    order = np.argsort(indices, kind="stable")
+    if len(indices) > 0:
+        ordered = indices[order]
+        if not np.array_equal(ordered, np.arange(ordered[0], ordered[0] + len(ordered))):
+            raise ValueError(f"{name} indices are not contiguous.")
+
+    return order
+
+
+def parse_patran(text):
+    r"""
+    Parse the contents of a patran file, each packet type is extracted with a single pass over the text and converted
+    to arrays in one go, which is much faster than `read_patran` for large meshes.
+
+    :param text: the contents of a patran file.
+
+    :return: a 3-tuple containing the patran file vertices, elements, and submesh indices (see `read_patran`).
+    """
+    match_header = regex_header_counts.search(text)
+    nverts = int(match_header.group(1)) if match_header else 0
+    nelems = int(match_header.group(2)) if match_header else 0
+
+    vertex_packets = regex_vertex_packet.findall(text)
+    vertex_indices = np.array([packet[0] for packet in vertex_packets], dtype=np.int64) - 1
+    vertices = np.array(" ".join(packet[1] for packet in vertex_packets).split(), dtype=float).reshape(-1, 3)
+    if len(vertices) != len(vertex_indices):
+        raise ValueError("Error reading Patran file, vertex packets must contain three coordinates.")
+    vertices = vertices[contiguous_order(vertex_indices, "Vertex")]
+
+    element_packets = regex_element_packet.findall(text)
+    element_indices = np.array([packet[0] for packet in element_packets], dtype=np.int64) - 1
+    element_submeshes = np.array([packet[1] for packet in element_packets], dtype=int)
+    nodes = " ".join(packet[2] for packet in element_packets).split()
+    if len(nodes) == 4 * len(element_packets):
+        nodes = np.array(nodes, dtype=int).reshape(-1, 4)
+    else:
+        # Node lines padded with extra (unused) entries, only the first four are tetrahedron vertices.
+        nodes = np.array([packet[2].split()[:4] for packet in element_packets], dtype=int).reshape(-1, 4)
+
+    elements = np.empty((len(element_packets), 5), dtype=int)
+    elements[:, 0:4] = nodes - 1
+    elements[:, 4] = element_submeshes
+    elements = elements[contiguous_order(element_indices, "Element")]
+
+    # Check that the number of vertices match
+    if len(vertices) != nverts:
+        raise ValueError("Error reading Patran file, no. of vertices found {} (expected {})".format(
+            len(vertices), nverts
+        ))
+
+    # Check that the number of elements match
+    if len(elements) != nelems:
+        raise ValueError("Error reading Patran file, no. of elements found {} (expected {})".format(
+            len(elements), nelems
+        ))
+
+    return vertices, elements, [int(submesh_id) for submesh_id in np.unique(element_submeshes)]
+
+
+def read_patran_fast(patran_file):
+    r"""
+    Read a patran file with `parse_patran`.
+
+    :param patran_file: the patran file name
+
+    :return: a 3-tuple containing the patran file vertices, elements, and submesh indices.
+    """
+    with open(patran_file, "r") as fin:
+        return parse_patran(fin.read())
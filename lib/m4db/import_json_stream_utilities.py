@@ -0,0 +1,611 @@
+r"""
+A collection of utilities to import models and NEB paths from (large) JSON files in a streaming fashion.
+
+Files are parsed incrementally, one array element (or one JSON Lines record) at a time, so that the whole file is
+never held in memory. Reference rows (running statuses, users, projects, software, anisotropy forms and NEB
+calculation types) are looked up once and memoised, rows that are referred to by unique id (geometries, start/end
+models and parent NEBs) are resolved a batch at a time, and new rows are written with batched, multi-row INSERT
+statements.
+"""
+import json
+import time
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from m4db.orm.schema import AnisotropyForm
+from m4db.orm.schema import DBUser
+from m4db.orm.schema import Geometry
+from m4db.orm.schema import InitialMagnetization
+from m4db.orm.schema import LegacyModelInfo
+from m4db.orm.schema import Material
+from m4db.orm.schema import Metadata
+from m4db.orm.schema import Model
+from m4db.orm.schema import ModelInitialMagnetization
+from m4db.orm.schema import ModelReportData
+from m4db.orm.schema import ModelRunData
+from m4db.orm.schema import NEB
+from m4db.orm.schema import NEBCalculationType
+from m4db.orm.schema import NEBReportData
+from m4db.orm.schema import NEBRunData
+from m4db.orm.schema import Project
+from m4db.orm.schema import RandomInitialMagnetization
+from m4db.orm.schema import RunningStatus
+from m4db.orm.schema import Software
+from m4db.orm.schema import UniformAppliedField
+from m4db.orm.schema import UniformInitialMagnetization
+
+from m4db.db.model.bulk_create import insert_returning
+
+from m4db.utilities.batches import batches
+
+from m4db import GLOBAL
+
+# The number of characters read from a JSON file at a time.
+READ_CHUNK_SIZE = 1 << 16
+
+# The columns that identify reference rows, keyed on the reference's ORM class.
+REFERENCE_KEYS = {
+    RunningStatus: ("name",),
+    DBUser: ("user_name",),
+    Project: ("name",),
+    Software: ("name", "version"),
+    AnisotropyForm: ("name",),
+    NEBCalculationType: ("name",)
+}
+
+# Maps exported initial magnetization types to the polymorphic ORM classes that store them.
+INITIAL_MAGNETIZATION_CLASSES = {
+    cls.__mapper__.polymorphic_identity: cls
+    for cls in [ModelInitialMagnetization, RandomInitialMagnetization, UniformInitialMagnetization]
+}
+
+# Columns that are only copied from an exported dictionary if the original dates are used.
+DATE_COLUMNS = ("last_modified", "created")
+
+# Exported model keys that differ from the name of the column that they are stored in, keyed on column name.
+MODEL_COLUMN_KEYS = {"rh_tot": "hr_tot"}
+
+
+def iterate_json_array(fin, read_chunk_size=READ_CHUNK_SIZE):
+    r"""
+    Iterate over the elements of a top level JSON array without reading the whole array in to memory.
+    Args:
+        fin: a file (opened for reading text) that holds a JSON array.
+        read_chunk_size: the number of characters read at a time.
+
+    Returns:
+        A generator of the (decoded) array elements.
+
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators.
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array.")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+                # A number at the very end of the buffer may have been truncated.
+                if end < len(buffer) or eof:
+                    yield element
+                    position = end
+                    continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+
+        if eof:
+            raise ValueError("Unexpected end of JSON array.")
+
+        chunk = fin.read(read_chunk_size)
+        eof = len(chunk) == 0
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iterate_json_lines(fin):
+    r"""
+    Iterate over the records of a JSON Lines file (one JSON value per line, blank lines are ignored).
+    Args:
+        fin: a file (opened for reading text) that holds JSON Lines.
+
+    Returns:
+        A generator of the (decoded) records.
+
+    """
+    for line in fin:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iterate_json_file(file_name):
+    r"""
+    Iterate over the objects in a JSON export file, files ending in '.jsonl' are read as JSON Lines otherwise a
+    JSON array is expected.
+    Args:
+        file_name: the file name.
+
+    Returns:
+        A generator of the (decoded) objects.
+
+    """
+    with open(file_name, "r") as fin:
+        if file_name.endswith(".jsonl"):
+            yield from iterate_json_lines(fin)
+        else:
+            yield from iterate_json_array(fin)
+
+
+class ReferenceCache:
+    r"""
+    Memoised look ups of the internal ids of reference rows (by their natural keys) and of rows with a unique id.
+    """
+
+    def __init__(self, session):
+        r"""
+        Create a new cache.
+        Args:
+            session: the database session.
+        """
+        self.session = session
+        self.reference_ids = {cls: {} for cls in REFERENCE_KEYS}
+        self.unique_id_ids = {}
+
+    def reference_id(self, cls, *key):
+        r"""
+        Retrieve the id of a reference row, the database is only queried the first time a key is seen.
+        Args:
+            cls: the ORM class of the reference (one of the keys of REFERENCE_KEYS).
+            *key: the values of the natural key columns of the reference.
+
+        Returns:
+            The id of the reference row.
+
+        Raises:
+            NoResultFound if the reference does not exist.
+
+        """
+        ids = self.reference_ids[cls]
+        if key not in ids:
+            query = self.session.query(cls.id)
+            for column, value in zip(REFERENCE_KEYS[cls], key):
+                query = query.filter(getattr(cls, column) == value)
+            ids[key] = query.one()[0]
+
+        return ids[key]
+
+    def resolve_unique_ids(self, cls, unique_ids, batch_size=1000):
+        r"""
+        Look up the ids of rows with the given unique ids, only unique ids that haven't been seen before are queried.
+        Args:
+            cls: the ORM class of the rows (with a unique_id column).
+            unique_ids: an iterable of unique ids.
+            batch_size: the maximum number of unique ids per query.
+
+        Returns:
+            None.
+
+        Raises:
+            ValueError if any unique id could not be found.
+
+        """
+        ids = self.unique_id_ids.setdefault(cls, {})
+        unknown = set(unique_id for unique_id in unique_ids if unique_id not in ids)
+
+        for batch in batches(unknown, batch_size):
+            for unique_id, row_id in self.session.query(cls.unique_id, cls.id).filter(cls.unique_id.in_(batch)):
+                ids[unique_id] = row_id
+
+        missing = unknown - set(ids)
+        if missing:
+            raise ValueError("Could not find {}(s) with unique id(s): {}".format(
+                cls.__tablename__, ", ".join(sorted(missing))
+            ))
+
+    def row_id(self, cls, unique_id):
+        r"""
+        Retrieve the id of a row that has been resolved with `resolve_unique_ids` (or added with `add_unique_ids`).
+        Args:
+            cls: the ORM class of the row.
+            unique_id: the unique id of the row.
+
+        Returns:
+            The id of the row.
+
+        """
+        return self.unique_id_ids[cls][unique_id]
+
+    def add_unique_ids(self, cls, unique_ids, row_ids):
+        r"""
+        Record the ids of newly inserted rows.
+        Args:
+            cls: the ORM class of the rows.
+            unique_ids: a list of unique ids.
+            row_ids: a list of the corresponding row ids.
+
+        Returns:
+            None.
+
+        """
+        self.unique_id_ids.setdefault(cls, {}).update(zip(unique_ids, row_ids))
+
+
+def parse_dates(obj_dict, original_dates):
+    r"""
+    Retrieve the (original) creation/modification dates of an exported object.
+    Args:
+        obj_dict: the exported object.
+        original_dates: flag indicating that the original dates of the import should be used.
+
+    Returns:
+        A dictionary with 'last_modified' and 'created' dates, or an empty dictionary if the original dates are not
+        used (in which case the database defaults apply).
+
+    """
+    if not original_dates:
+        return {}
+    return {
+        "last_modified": datetime.strptime(obj_dict["last_modified"], GLOBAL.DATE_TIME_FORMAT),
+        "created": datetime.strptime(obj_dict["created"], GLOBAL.DATE_TIME_FORMAT)
+    }
+
+
+def data_row(cls, obj_dict, original_dates, column_keys=None):
+    r"""
+    Build a row for a table from an exported object, every (non key, non foreign key) column is copied.
+    Args:
+        cls: the ORM class of the table.
+        obj_dict: the exported object.
+        original_dates: flag indicating that the original dates of the import should be used.
+        column_keys: an optional dictionary of exported keys keyed on column name (for keys that differ).
+
+    Returns:
+        A dictionary with a value for each data column.
+
+    """
+    column_keys = column_keys or {}
+    columns = {column_keys.get(column.name, column.name): column for column in cls.__table__.columns
+               if not column.primary_key and not column.foreign_keys and column.name not in DATE_COLUMNS}
+
+    row = {}
+    for key, column in columns.items():
+        if key in obj_dict:
+            row[column.name] = obj_dict[key]
+        elif column.default is not None and column.default.is_scalar:
+            row[column.name] = column.default.arg
+        else:
+            row[column.name] = None
+
+    if "last_modified" in cls.__table__.columns:
+        row.update(parse_dates(obj_dict, original_dates))
+
+    return row
+
+
+def insert_metadata(session, cache, obj_dicts, original_dates):
+    r"""
+    Insert the metadata of a batch of exported models/NEBs.
+    Args:
+        session: the database session.
+        cache: the ReferenceCache.
+        obj_dicts: a list of exported models/NEBs.
+        original_dates: flag indicating that the original dates of the import should be used.
+
+    Returns:
+        A list of metadata ids in the same order as `obj_dicts`.
+
+    """
+    rows = []
+    for obj_dict in obj_dicts:
+        mdata = obj_dict["mdata"]
+        row = {
+            "db_user_id": cache.reference_id(DBUser, mdata["db_user_user_name"]),
+            "project_id": cache.reference_id(Project, mdata["project_name"]),
+            "software_id": cache.reference_id(Software, mdata["software_name"], mdata["software_version"])
+            if mdata["software_name"] is not None else None
+        }
+        row.update(parse_dates(mdata, original_dates))
+        rows.append(row)
+
+    return insert_returning(session, Metadata, rows)
+
+
+def insert_applied_fields(session, obj_dicts, original_dates):
+    r"""
+    Insert the applied fields of a batch of exported models/NEBs.
+    Args:
+        session: the database session.
+        obj_dicts: a list of exported models/NEBs.
+        original_dates: flag indicating that the original dates of the import should be used.
+
+    Returns:
+        A list of applied field ids (or None for objects without an applied field) in the same order as `obj_dicts`.
+
+    """
+    indexes = [index for index, obj_dict in enumerate(obj_dicts) if obj_dict.get("applied_field") is not None]
+    applied_field_ids = [None] * len(obj_dicts)
+    for index, applied_field_id in zip(indexes, insert_returning(session, UniformAppliedField, [
+        data_row(UniformAppliedField, obj_dicts[index]["applied_field"], original_dates) for index in indexes
+    ])):
+        applied_field_ids[index] = applied_field_id
+
+    return applied_field_ids
+
+
+def insert_initial_magnetizations(session, cache, model_dicts, original_dates):
+    r"""
+    Insert the initial (start) magnetizations of a batch of exported models.
+    Args:
+        session: the database session.
+        cache: the ReferenceCache (with resolved start model unique ids).
+        model_dicts: a list of exported models.
+        original_dates: flag indicating that the original dates of the import should be used.
+
+    Returns:
+        A list of initial magnetization ids in the same order as `model_dicts`.
+
+    """
+    start_magnetizations = [model_dict["start_magnetization"] for model_dict in model_dicts]
+    for start_magnetization in start_magnetizations:
+        if start_magnetization["db_type"] not in INITIAL_MAGNETIZATION_CLASSES:
+            raise ValueError("Unsupported start magnetization db_type '{}'".format(start_magnetization["db_type"]))
+
+    initial_magnetization_ids = insert_returning(session, InitialMagnetization, [
+        dict(type=start_magnetization["db_type"], **parse_dates(start_magnetization, original_dates))
+        for start_magnetization in start_magnetizations
+    ])
+
+    rows = {cls: [] for cls in INITIAL_MAGNETIZATION_CLASSES.values()}
+    for initial_magnetization_id, start_magnetization in zip(initial_magnetization_ids, start_magnetizations):
+        cls = INITIAL_MAGNETIZATION_CLASSES[start_magnetization["db_type"]]
+        row = data_row(cls, start_magnetization, original_dates)
+        row["id"] = initial_magnetization_id
+        if cls is ModelInitialMagnetization:
+            row["model_id"] = cache.row_id(Model, start_magnetization["model_unique_id"])
+        rows[cls].append(row)
+
+    for cls, cls_rows in rows.items():
+        if cls_rows:
+            session.execute(insert(cls.__table__), cls_rows)
+
+    return initial_magnetization_ids
+
+
+def insert_model_batch(session, cache, model_dicts, original_dates):
+    r"""
+    Insert a batch of exported models (along with their materials, start magnetizations, run/report data and
+    metadata).
+    Args:
+        session: the database session.
+        cache: the ReferenceCache.
+        model_dicts: a list of exported models.
+        original_dates: flag indicating that the original dates of the import should be used.
+
+    Returns:
+        A list of the new model ids in the same order as `model_dicts`.
+
+    """
+    cache.resolve_unique_ids(Geometry, [model_dict["geometry"]["unique_id"] for model_dict in model_dicts])
+    cache.resolve_unique_ids(Model, [
+        model_dict["start_magnetization"]["model_unique_id"] for model_dict in model_dicts
+        if "model_unique_id" in model_dict["start_magnetization"]
+    ])
+
+    initial_magnetization_ids = insert_initial_magnetizations(session, cache, model_dicts, original_dates)
+    applied_field_ids = insert_applied_fields(session, model_dicts, original_dates)
+    model_run_data_ids = insert_returning(session, ModelRunData, [
+        data_row(ModelRunData, model_dict["model_run_data"], original_dates) for model_dict in model_dicts
+    ])
+    model_report_data_ids = insert_returning(session, ModelReportData, [
+        data_row(ModelReportData, model_dict["model_report_data"], original_dates) for model_dict in model_dicts
+    ])
+    mdata_ids = insert_metadata(session, cache, model_dicts, original_dates)
+
+    legacy_indexes = [index for index, model_dict in enumerate(model_dicts)
+                      if model_dict.get("legacy_model_info") is not None]
+    legacy_model_info_ids = dict(zip(legacy_indexes, insert_returning(session, LegacyModelInfo, [
+        data_row(LegacyModelInfo, model_dicts[index]["legacy_model_info"], original_dates)
+        for index in legacy_indexes
+    ])))
+
+    model_rows = []
+    for index, model_dict in enumerate(model_dicts):
+        row = data_row(Model, model_dict, original_dates, MODEL_COLUMN_KEYS)
+        row.update({
+            "geometry_id": cache.row_id(Geometry, model_dict["geometry"]["unique_id"]),
+            "initial_magnetization_id": initial_magnetization_ids[index],
+            "applied_field_id": applied_field_ids[index],
+            "running_status_id": cache.reference_id(RunningStatus, model_dict["running_status"]["name"]),
+            "model_run_data_id": model_run_data_ids[index],
+            "model_report_data_id": model_report_data_ids[index],
+            "mdata_id": mdata_ids[index],
+            "legacy_model_info_id": legacy_model_info_ids.get(index)
+        })
+        model_rows.append(row)
+    model_ids = insert_returning(session, Model, model_rows)
+    cache.add_unique_ids(Model, [model_dict["unique_id"] for model_dict in model_dicts], model_ids)
+
+    material_rows = []
+    for model_id, model_dict in zip(model_ids, model_dicts):
+        for material_dict in model_dict["materials"]:
+            row = data_row(Material, material_dict, original_dates)
+            row["temperature"] = Decimal(material_dict["temperature"])
+            row["model_id"] = model_id
+            row["anisotropy_form_id"] = cache.reference_id(AnisotropyForm, material_dict["anisotropy_form"]["name"])
+            material_rows.append(row)
+    if material_rows:
+        session.execute(insert(Material.__table__), material_rows)
+
+    return model_ids
+
+
+def insert_neb_batch(session, cache, neb_dicts, original_dates):
+    r"""
+    Insert a batch of exported NEB paths (along with their run/report data and metadata), parent paths must either
+    already be in the database or have been inserted in an earlier batch.
+    Args:
+        session: the database session.
+        cache: the ReferenceCache.
+        neb_dicts: a list of exported NEB paths.
+        original_dates: flag indicating that the original dates of the import should be used.
+
+    Returns:
+        A list of the new NEB ids in the same order as `neb_dicts`.
+
+    """
+    cache.resolve_unique_ids(Model, [neb_dict["start_model_unique_id"] for neb_dict in neb_dicts] +
+                             [neb_dict["end_model_unique_id"] for neb_dict in neb_dicts])
+    cache.resolve_unique_ids(NEB, [neb_dict["parent_neb_unique_id"] for neb_dict in neb_dicts
+                                   if neb_dict["parent_neb_unique_id"] is not None])
+
+    neb_run_data_ids = insert_returning(session, NEBRunData, [
+        data_row(NEBRunData, neb_dict["neb_run_data"], original_dates) for neb_dict in neb_dicts
+    ])
+    neb_report_data_ids = insert_returning(session, NEBReportData, [
+        data_row(NEBReportData, neb_dict["neb_report_data"], original_dates) for neb_dict in neb_dicts
+    ])
+    mdata_ids = insert_metadata(session, cache, neb_dicts, original_dates)
+    applied_field_ids = insert_applied_fields(session, neb_dicts, original_dates)
+
+    neb_rows = []
+    for index, neb_dict in enumerate(neb_dicts):
+        row = data_row(NEB, neb_dict, original_dates)
+        row.update({
+            "applied_field_id": applied_field_ids[index],
+            "start_model_id": cache.row_id(Model, neb_dict["start_model_unique_id"]),
+            "end_model_id": cache.row_id(Model, neb_dict["end_model_unique_id"]),
+            "parent_neb_id": cache.row_id(NEB, neb_dict["parent_neb_unique_id"])
+            if neb_dict["parent_neb_unique_id"] is not None else None,
+            "neb_calculation_type_id": cache.reference_id(NEBCalculationType, neb_dict["neb_calculation_type"]["name"]),
+            "neb_run_data_id": neb_run_data_ids[index],
+            "neb_report_data_id": neb_report_data_ids[index],
+            "running_status_id": cache.reference_id(RunningStatus, neb_dict["running_status"]["name"]),
+            "mdata_id": mdata_ids[index]
+        })
+        neb_rows.append(row)
+    neb_ids = insert_returning(session, NEB, neb_rows)
+    cache.add_unique_ids(NEB, [neb_dict["unique_id"] for neb_dict in neb_dicts], neb_ids)
+
+    return neb_ids
+
+
+def import_stream(session, obj_dicts, insert_batch, batch_size=1000, original_dates=True, progress=None,
+                  depends_on=None):
+    r"""
+    Import a stream of exported objects in batches (the session is committed after every batch).
+    Args:
+        session: the database session.
+        obj_dicts: an iterable of exported objects.
+        insert_batch: a function that inserts a batch of objects, called with the session, a ReferenceCache, the
+                      list of objects and the original dates flag.
+        batch_size: the maximum number of objects inserted per batch.
+        original_dates: flag indicating that the original dates of the import should be used.
+        progress: an optional function that is called with the number of objects imported so far and the number
+                  of objects imported per second after each batch.
+        depends_on: an optional function that returns the unique id of an object that an exported object depends
+                    upon (if any), a batch is written early if an object depends upon another object in the same
+                    batch.
+
+    Returns:
+        A dictionary with the number of objects imported ('count'), the time taken in seconds ('seconds') and the
+        throughput in objects per second ('rate').
+
+    """
+    cache = ReferenceCache(session)
+    start = time.perf_counter()
+    count = 0
+
+    def flush(batch):
+        insert_batch(session, cache, batch, original_dates)
+        session.commit()
+        if progress is not None:
+            elapsed = time.perf_counter() - start
+            progress(count + len(batch), (count + len(batch)) / elapsed if elapsed > 0 else 0.0)
+        return len(batch)
+
+    batch = []
+    batch_unique_ids = set()
+    for obj_dict in obj_dicts:
+        if depends_on is not None and depends_on(obj_dict) in batch_unique_ids:
+            count += flush(batch)
+            batch = []
+            batch_unique_ids = set()
+
+        batch.append(obj_dict)
+        batch_unique_ids.add(obj_dict["unique_id"])
+
+        if len(batch) == batch_size:
+            count += flush(batch)
+            batch = []
+            batch_unique_ids = set()
+
+    if batch:
+        count += flush(batch)
+
+    seconds = time.perf_counter() - start
+    return {"count": count, "seconds": seconds, "rate": count / seconds if seconds > 0 else 0.0}
+
+
+def stream_import_model(model_file, session, batch_size=1000, original_dates=True, progress=None):
+    r"""
+    Import Model objects stored as JSON (or JSON Lines) in a file, the geometries, users, projects and software
+    that models refer to must already exist.
+    Args:
+        model_file: the file name storing Model JSON data.
+        session: the database session to which models are to be added.
+        batch_size: the maximum number of models inserted per batch.
+        original_dates: flag indicating that the original dates of the import should be used.
+        progress: an optional function that is called with the number of models imported so far and the number of
+                  models imported per second after each batch.
+
+    Returns:
+        A dictionary with the number of models imported ('count'), the time taken in seconds ('seconds') and the
+        throughput in models per second ('rate').
+
+    """
+    def start_model_unique_id(model_dict):
+        return model_dict["start_magnetization"].get("model_unique_id")
+
+    return import_stream(session, iterate_json_file(model_file), insert_model_batch, batch_size, original_dates,
+                         progress, start_model_unique_id)
+
+
+def stream_import_neb(neb_file, session, batch_size=1000, original_dates=True, progress=None):
+    r"""
+    Import NEB path objects stored as JSON (or JSON Lines) in a file, parent paths must appear before their
+    children (as they do in an export) or already exist.
+    Args:
+        neb_file: the file name storing NEB JSON data.
+        session: the database session to which NEB paths are to be added.
+        batch_size: the maximum number of NEB paths inserted per batch.
+        original_dates: flag indicating that the original dates of the import should be used.
+        progress: an optional function that is called with the number of paths imported so far and the number of
+                  paths imported per second after each batch.
+
+    Returns:
+        A dictionary with the number of NEB paths imported ('count'), the time taken in seconds ('seconds') and
+        the throughput in paths per second ('rate').
+
+    """
+    def parent_neb_unique_id(neb_dict):
+        return neb_dict["parent_neb_unique_id"]
+
+    return import_stream(session, iterate_json_file(neb_file), insert_neb_batch, batch_size, original_dates,
+                         progress, parent_neb_unique_id)
@@ -0,0 +1,48 @@
+r"""
+Add the columns that were introduced after v2 to an existing database (a new database gets them along with the
+tables).
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy import text
+
+from m4db.install.indexes import create_geometry_content_hash_index
+
+
+def has_column(session, table_name, column_name):
+    r"""
+    Check whether a table has a column.
+    :param session: the database session.
+    :param table_name: the name of the table.
+    :param column_name: the name of the column.
+    :return: True if the table has the column, otherwise False.
+    """
+    columns = inspect(session.connection()).get_columns(table_name)
+    return column_name in [column["name"] for column in columns]
+
+
+def has_geometry_content_hash(session):
+    r"""
+    Check whether the geometry table has the content_hash column.
+    :param session: the database session.
+    :return: True if the column exists, otherwise False.
+    """
+    return has_column(session, "geometry", "content_hash")
+
+
+def add_geometry_content_hash(session):
+    r"""
+    Add the content_hash column to the geometry table, if it doesn't already exist, along with its index. The column
+    is empty for existing geometries, `m4db-geometry dedup` computes the missing hashes.
+    :param session: the database session.
+    :return: True if the column was added, False if it already existed.
+    """
+    added = False
+    if not has_geometry_content_hash(session):
+        session.execute(text("alter table geometry add column content_hash varchar"))
+        session.commit()
+        added = True
+
+    create_geometry_content_hash_index(session)
+
+    return added
@@ -4,6 +4,8 @@ Add supported anisotropy forms to the database.
 
 from m4db.orm.schema import AnisotropyForm
 
+from m4db.db.reference_data_cache import anisotropy_form_cache
+
 
 def populate_anisotropy_forms(session):
     r"""
@@ -18,3 +20,6 @@ def populate_anisotropy_forms(session):
     session.add(AnisotropyForm(name="cubic", description="Cubic anisotorpy form"))
     session.add(AnisotropyForm(name="uniaxial", description="Uniaxial anisotropy form"))
     session.commit()
+
+    # The table has changed, so evict cached rows.
+    anisotropy_form_cache.invalidate()
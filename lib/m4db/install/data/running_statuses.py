@@ -4,6 +4,8 @@ Add supported running statuses to the database.
 
 from m4db.orm.schema import RunningStatus
 
+from m4db.db.reference_data_cache import running_status_cache
+
 
 def populate_running_statuses(session):
     r"""
@@ -21,3 +23,6 @@ def populate_running_statuses(session):
     session.add(RunningStatus(name="crashed", description="a model that has crashed"))
     session.add(RunningStatus(name="scheduled", description="a job that has been scheduled for running"))
     session.commit()
+
+    # The table has changed, so evict cached rows.
+    running_status_cache.invalidate()
@@ -4,6 +4,8 @@ Add supported size conventions to the database.
 
 from m4db.orm.schema import SizeConvention
 
+from m4db.db.reference_data_cache import size_convention_cache
+
 
 def populate_size_conventions(session):
     r"""
@@ -17,3 +19,6 @@ def populate_size_conventions(session):
     session.add(SizeConvention(symbol="ESVD", description="Equivalent spherical volume diameter"))
     session.add(SizeConvention(symbol="ECVL", description="Equivalent cubic volume length"))
     session.commit()
+
+    # The table has changed, so evict cached rows.
+    size_convention_cache.invalidate()
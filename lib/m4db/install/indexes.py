@@ -0,0 +1,150 @@
+r"""
+Create (and drop) the secondary indexes that support the model/NEB filters used by retrieval and scheduling.
+
+The portable indexes are declared in `m4db.orm.schema` and are created along with the tables on a new database. Only
+the 'idx_model_*', 'idx_neb_*' and 'idx_material_*' indexes are secondary indexes in this sense, and only these are
+ever dropped. The 'uniq_*' indexes enforce constraints, so they are created but never dropped here, and
+'idx_geometry_01' is created along with the geometry.content_hash column that it indexes. On PostgreSQL, additional partial indexes cover only those models/NEBs whose running status is not yet final; since the
+running statuses live in their own table, these can only be created once the running statuses have been populated
+(their ids are baked in to the index predicate).
+"""
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.schema import DropIndex
+
+from m4db.orm.schema import Base
+
+from m4db.db.running_status.retrieve import retrieve_running_status
+
+# Running statuses of models/NEBs that still require some action (i.e. those that schedulers look for).
+PENDING_RUNNING_STATUSES = ["not-run", "re-run", "scheduled", "running"]
+
+# Partial indexes (PostgreSQL only), table name -> index name.
+PARTIAL_INDEXES = {
+    "model": "idx_model_pending_01",
+    "neb": "idx_neb_pending_01"
+}
+
+# Name prefixes of the secondary indexes declared in the schema.
+SECONDARY_INDEX_PREFIXES = ("idx_model_", "idx_neb_", "idx_material_")
+
+# Name prefix of the unique indexes declared in the schema.
+UNIQUE_INDEX_PREFIX = "uniq_"
+
+# Name of the index on geometry.content_hash.
+GEOMETRY_CONTENT_HASH_INDEX = "idx_geometry_01"
+
+
+def schema_indexes(prefixes):
+    r"""
+    Retrieve the indexes declared in the schema whose names start with one of the given prefixes.
+    :param prefixes: a name prefix or a tuple of name prefixes.
+    :return: a list of SQLAlchemy Index objects.
+    """
+    indexes = []
+    for table in Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name.startswith(prefixes):
+                indexes.append(index)
+
+    return indexes
+
+
+def secondary_indexes():
+    r"""
+    Retrieve the secondary indexes declared in the schema.
+    :return: a list of SQLAlchemy Index objects.
+    """
+    return schema_indexes(SECONDARY_INDEX_PREFIXES)
+
+
+def unique_indexes():
+    r"""
+    Retrieve the unique indexes declared in the schema.
+    :return: a list of SQLAlchemy Index objects.
+    """
+    return schema_indexes(UNIQUE_INDEX_PREFIX)
+
+
+def create_secondary_indexes(session):
+    r"""
+    Create the secondary indexes declared in the schema, if they don't already exist.
+    :param session: the database session.
+    :return: None
+    """
+    # IF [NOT] EXISTS is used rather than checkfirst, since not all dialects reflect expression indexes.
+    for index in secondary_indexes():
+        session.execute(CreateIndex(index, if_not_exists=True))
+    session.commit()
+
+
+def drop_secondary_indexes(session):
+    r"""
+    Drop the secondary indexes declared in the schema, if they exist.
+    :param session: the database session.
+    :return: None
+    """
+    for index in secondary_indexes():
+        session.execute(DropIndex(index, if_exists=True))
+    session.commit()
+
+
+def create_unique_indexes(session):
+    r"""
+    Create the unique indexes declared in the schema, if they don't already exist. There is deliberately no
+    counterpart to drop these.
+    :param session: the database session.
+    :return: None
+    """
+    for index in unique_indexes():
+        session.execute(CreateIndex(index, if_not_exists=True))
+    session.commit()
+
+
+def create_geometry_content_hash_index(session):
+    r"""
+    Create the index on geometry.content_hash, if it doesn't already exist (the column itself must exist).
+    :param session: the database session.
+    :return: None
+    """
+    for index in schema_indexes(GEOMETRY_CONTENT_HASH_INDEX):
+        session.execute(CreateIndex(index, if_not_exists=True))
+    session.commit()
+
+
+def create_partial_indexes(session):
+    r"""
+    Create partial indexes over the models/NEBs with a pending running status. This does nothing if the database
+    is not PostgreSQL.
+    :param session: the database session.
+    :return: None
+    """
+    if session.bind.dialect.name != "postgresql":
+        return
+
+    running_status_ids = ", ".join(
+        str(retrieve_running_status(session, name).id) for name in PENDING_RUNNING_STATUSES
+    )
+
+    for table_name, index_name in PARTIAL_INDEXES.items():
+        session.execute(text(
+            f"create index if not exists {index_name} on {table_name} (running_status_id, id) "
+            f"where running_status_id in ({running_status_ids})"
+        ))
+    session.commit()
+
+
+def drop_partial_indexes(session):
+    r"""
+    Drop the partial indexes over the models/NEBs with a pending running status. This does nothing if the database
+    is not PostgreSQL.
+    :param session: the database session.
+    :return: None
+    """
+    if session.bind.dialect.name != "postgresql":
+        return
+
+    for index_name in PARTIAL_INDEXES.values():
+        session.execute(text(f"drop index if exists {index_name}"))
+    session.commit()
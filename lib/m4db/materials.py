@@ -2,49 +2,93 @@
 
 from math import *
 
+from threading import Lock
+
+import numpy as np
+
+from m4db.decorators import static
+
+# Polynomial coefficients (in absolute temperature, highest power first) of the iron material parameters.
+IRON_MS_COEFFICIENTS = (
+    -1.42904e-18, 6.16143e-15, -1.1048e-11, 1.06587e-8, -5.98015e-6, 1.96713e-3, -0.363228, 33.3368, -1.21716e3,
+    1.75221e6
+)
+IRON_AEX_COEFFICIENTS = (-9.9515e-28, 3.6501e-24, -5.3728e-21, 4.0151e-18, -1.599e-15, 3.0657e-13, -1.8952e-12)
+IRON_K1_COEFFICIENTS = (-2.90947e-13, 8.83207e-10, -1.07579e-6, 0.000811152, -0.426485, 44.2946, 54967.1)
+
+# The Curie temperature of magnetite (in Celsius).
+MAGNETITE_CURIE_TEMPERATURE = 580.0
+
+# The material parameters returned by `material_parameter_array`, temperatures are in Celsius.
+MATERIAL_PARAMETER_DTYPE = np.dtype([
+    ("temperature", np.float64),
+    ("Aex", np.float64),
+    ("Ms", np.float64),
+    ("K1", np.float64),
+    ("Kd", np.float64),
+    ("lambda_ex", np.float64),
+    ("q_hardness", np.float64)
+])
+
+
+def horner(coefficients, x):
+    r"""
+    Evaluate a polynomial with Horner's scheme.
+
+    :param coefficients: the polynomial coefficients, highest power first.
+    :param x: a value or array of values at which the polynomial is evaluated.
+
+    :return: the value(s) of the polynomial.
+    """
+    result = np.zeros_like(x, dtype=np.float64) + coefficients[0]
+    for coefficient in coefficients[1:]:
+        result *= x
+        result += coefficient
+
+    return result
+
 
 def saturation_magnetization(t, material='iron'):
     if material == 'iron':
-        t = 273.0 + t
-        return 1.75221e6 - 1.21716e3 * t + 33.3368 * (t ** 2) - 0.363228 * (t ** 3) + 1.96713e-3 * (t ** 4) \
-               - 5.98015e-6 * (t ** 5) + 1.06587e-8 * (t ** 6) - 1.1048e-11 * (t ** 7) + 6.16143e-15 * (t ** 8) \
-               - 1.42904e-18 * (t ** 9)
+        return float(horner(IRON_MS_COEFFICIENTS, 273.0 + t))
     elif material == 'magnetite':
-        t_c = 580.0
-        return 737.384 * 51.876 * (t_c - t) ** 0.4
+        return 737.384 * 51.876 * (MAGNETITE_CURIE_TEMPERATURE - t) ** 0.4
     else:
         raise ValueError("Saturation magnetization calculation with unknown material '{}'".format(material))
 
 
 def exchange_constant(t, material='iron'):
     if material == 'iron':
-        t = 273.0 + t
-        return -1.8952e-12 + 3.0657e-13 * t - 1.599e-15 * (t ** 2) + 4.0151e-18 * (t ** 3) - 5.3728e-21 * (t ** 4) \
-               + 3.6501e-24 * (t ** 5) - 9.9515e-28 * (t ** 6)
+        return float(horner(IRON_AEX_COEFFICIENTS, 273.0 + t))
     elif material == 'magnetite':
-        t_c = 580.0
-        return (sqrt(21622.526 + 816.476 * (t_c - t)) - 147.046) / 408.238e11
+        return (sqrt(21622.526 + 816.476 * (MAGNETITE_CURIE_TEMPERATURE - t)) - 147.046) / 408.238e11
     else:
         raise ValueError("Exchange calculation with unknown material '{}'".format(material))
 
 
 def anisotropy_constant(t, material='iron'):
     if material == 'iron':
-        t = (273.0 + t)
-        k1 = 54967.1 + 44.2946 * t - 0.426485 * (t ** 2) + 0.000811152 * (t ** 3) - 1.07579e-6 * (t ** 4) + \
-             8.83207e-10 * (t ** 5) - 2.90947e-13 * (t ** 6)
-        k1 = k1 * (480.0 / 456.0)
-        return k1
+        return float(horner(IRON_K1_COEFFICIENTS, 273.0 + t)) * (480.0 / 456.0)
     elif material == 'magnetite':
-        t_c = 580.0
-        return -2.13074e-5 * (t_c - t) ** 3.2
+        return -2.13074e-5 * (MAGNETITE_CURIE_TEMPERATURE - t) ** 3.2
     else:
         raise ValueError("Magnetocrystalline anisotropy calculation with unknown material '{}'".format(material))
 
 
-def saturation_energy(t, material='iron'):
+def saturation_energy(t, material='iron', ms=None):
+    r"""
+    The saturation (demagnetizing) energy density Kd = mu0 Ms^2 / 2.
+
+    :param t: the temperature (in Celsius).
+    :param material: the material name.
+    :param ms: the saturation magnetization, if it has already been evaluated (it may also be an array), in which
+               case `t` and `material` are not used.
+
+    :return: the saturation energy density.
+    """
     mu = 1e-7
-    ms = saturation_magnetization(t, material=material)
+    if ms is None:
+        ms = saturation_magnetization(t, material=material)
 
     return 4 * 3.1415926535897932 * mu * ms * ms * 0.5
 
@@ -83,12 +127,21 @@ def material_parameters(t, material='iron'):
     else:
         raise ValueError("Attempting to calculate material parameters for unknown material '{}'".format(material))
 
+    # Each parameter is evaluated once (rather than again by `lambda_ex` and `q_hardness`).
     ms = saturation_magnetization(t, material=material)
     a = exchange_constant(t, material=material)
     k1 = anisotropy_constant(t, material=material)
-    kd = saturation_energy(t, material=material)
-    lex = lambda_ex(t, material=material)
-    qhd = q_hardness(t, material=material)
+    kd = saturation_energy(t, material=material, ms=ms)
+
+    try:
+        lex = sqrt(a / kd)
+    except (ValueError, ZeroDivisionError):
+        lex = None
+
+    try:
+        qhd = k1 / kd
+    except (ValueError, ZeroDivisionError):
+        qhd = None
 
     return {'anisform': anisform,
             'material': material,
@@ -106,3 +159,138 @@ def iron_parameters(t):
 
 def magnetite_parameters(t):
     return material_parameters(t, 'magnetite')
+
+
+def material_parameter_array(temperatures, material='iron'):
+    r"""
+    Evaluate the material parameters over an array of temperatures. Unlike the scalar functions, values that are not
+    defined (e.g. magnetite above its Curie temperature) are NaN rather than errors.
+
+    :param temperatures: the temperatures (in Celsius).
+    :param material: the material name, either 'iron' or 'magnetite'.
+
+    :return: a structured array (with dtype MATERIAL_PARAMETER_DTYPE) of the same shape as `temperatures`.
+    """
+    t = np.asarray(temperatures, dtype=np.float64)
+    parameters = np.empty(t.shape, dtype=MATERIAL_PARAMETER_DTYPE)
+    parameters["temperature"] = t
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if material == 'iron':
+            t_k = 273.0 + t
+            ms = horner(IRON_MS_COEFFICIENTS, t_k)
+            a = horner(IRON_AEX_COEFFICIENTS, t_k)
+            k1 = horner(IRON_K1_COEFFICIENTS, t_k) * (480.0 / 456.0)
+        elif material == 'magnetite':
+            dt = MAGNETITE_CURIE_TEMPERATURE - t
+            ms = 737.384 * 51.876 * np.power(dt, 0.4)
+            a = (np.sqrt(21622.526 + 816.476 * dt) - 147.046) / 408.238e11
+            k1 = -2.13074e-5 * np.power(dt, 3.2)
+        else:
+            raise ValueError("Attempting to calculate material parameters for unknown material '{}'".format(material))
+
+        kd = saturation_energy(t, material=material, ms=ms)
+
+        parameters["Ms"] = ms
+        parameters["Aex"] = a
+        parameters["K1"] = k1
+        parameters["Kd"] = kd
+        parameters["lambda_ex"] = np.sqrt(a / kd)
+        parameters["q_hardness"] = k1 / kd
+
+    return parameters
+
+
+class MaterialParameterTable:
+    r"""
+    A memoised table of the material parameters of one material: parameters are kept (sorted on temperature) for every
+    temperature that has been requested, so only temperatures that have not been seen before are evaluated.
+    """
+
+    def __init__(self, material):
+        r"""
+        Create a new (empty) table.
+
+        :param material: the material name.
+        """
+        if material not in ('iron', 'magnetite'):
+            raise ValueError("Attempting to calculate material parameters for unknown material '{}'".format(material))
+
+        self.material = material
+        self.table = np.empty(0, dtype=MATERIAL_PARAMETER_DTYPE)
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.table)
+
+    def parameters(self, temperatures):
+        r"""
+        Retrieve the material parameters at some temperatures.
+
+        :param temperatures: a temperature, or an array of temperatures (in Celsius).
+
+        :return: a structured array (with dtype MATERIAL_PARAMETER_DTYPE) of the same shape as `temperatures`.
+        """
+        t = np.asarray(temperatures, dtype=np.float64)
+
+        # Non-finite temperatures are evaluated but never added to the table (NaN would never match on lookup).
+        finite = np.isfinite(t)
+
+        with self.lock:
+            indices, found = self.lookup(t)
+            missing = ~found & finite
+            if np.any(missing):
+                table = np.concatenate((self.table, material_parameter_array(np.unique(t[missing]), self.material)))
+                self.table = table[np.argsort(table["temperature"], kind="stable")]
+                indices, _ = self.lookup(t)
+            table = self.table
+
+        parameters = np.empty(t.shape, dtype=MATERIAL_PARAMETER_DTYPE)
+        parameters[finite] = table[indices[finite]]
+        parameters[~finite] = material_parameter_array(t[~finite], self.material)
+
+        return parameters
+
+    def lookup(self, t):
+        r"""
+        Find temperatures in the table.
+
+        :param t: an array of temperatures.
+
+        :return: a pair containing the table indices of the temperatures and a mask of those that are in the table.
+        """
+        temperatures = self.table["temperature"]
+        if len(temperatures) == 0:
+            return np.zeros(t.shape, dtype=np.intp), np.zeros(t.shape, dtype=bool)
+
+        indices = np.minimum(np.searchsorted(temperatures, t), len(temperatures) - 1)
+
+        return indices, temperatures[indices] == t
+
+
+@static(tables={})
+def material_parameter_table(material='iron'):
+    r"""
+    Retrieve the (shared) memoised parameter table of a material.
+
+    :param material: the material name.
+
+    :return: a MaterialParameterTable.
+    """
+    tables = material_parameter_table.tables
+    if material not in tables:
+        tables[material] = MaterialParameterTable(material)
+
+    return tables[material]
+
+
+def material_parameter_sweep(temperatures, material='iron'):
+    r"""
+    Retrieve the material parameters at some temperatures from the memoised table of the material.
+
+    :param temperatures: a temperature, or an array of temperatures (in Celsius).
+    :param material: the material name.
+
+    :return: a structured array (with dtype MATERIAL_PARAMETER_DTYPE) of the same shape as `temperatures`.
+    """
+    return material_parameter_table(material).parameters(temperatures)
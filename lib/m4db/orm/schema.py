@@ -16,6 +16,7 @@ from sqlalchemy import Column, Integer, Float, String, DateTime, Boolean, Numeri
 from sqlalchemy import ForeignKey
 from sqlalchemy import UniqueConstraint, Index
 from sqlalchemy import event
+from sqlalchemy import case
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import column_property
 from sqlalchemy.orm import relationship
@@ -126,7 +127,6 @@ class DBUser(Base):
         return {
             "id": self.id,
             "user_name": self.user_name,
-            "password": self.password,
             "first_name": self.first_name,
             "initials": self.initials,
             "surname": self.surname,
@@ -282,6 +282,7 @@ class Geometry(Base):
     :param computed_element_length_standard_deviation: the calculated standard deviation in element edge lengths.
     :param computed_element_length_minimum: the calculated minimum edge length.
     :param computed_element_length_maximum: the calculated maximum edge length.
+    :param content_hash: the (sha256) content hash of the geometry's patran file.
     :param has_patran: flag indicates that a patran file is available for the geometry.
     :param has_exodus: flag indicates that an exodus file is available for the geometry.
     :param has_mesh_gen_script: flag indicates that a script to generate the mesh is available for the geometry.
@@ -305,6 +306,7 @@ class Geometry(Base):
     computed_element_length_standard_deviation = Column(Float, nullable=True, doc="the calculated standard deviation in element edge lengths.")
     computed_element_length_minimum = Column(Float, nullable=True, doc="the calculated minimum edge length.")
     computed_element_length_maximum = Column(Float, nullable=True, doc="the calculated maximum edge length.")
+    content_hash = Column(String, nullable=True, doc="the (sha256) content hash of the geometry's patran file.")
     has_patran = Column(Boolean, default=False, nullable=False, doc="flag indicates that a patran file is available for the geometry.")
     has_exodus = Column(Boolean, default=False, nullable=False, doc="flag indicates that an exodus file is available for the geometry.")
     has_mesh_gen_script = Column(Boolean, default=False, nullable=False, doc="flag indicates that a script to generate the mesh is available for the geometry.")
@@ -323,6 +325,7 @@ class Geometry(Base):
 
     __table_args__ = (
         UniqueConstraint('unique_id', name='uniq_geometry_01'),
+        Index('idx_geometry_01', 'content_hash'),
     )
 
     def _as_dict(self):
@@ -333,13 +336,14 @@ class Geometry(Base):
             'nelements': self.nelements,
             'nvertices': self.nvertices,
             'nsubmeshes': self.nsubmeshes,
-            'volume_total': self.volume_total,
+            'volume_total': self.computed_volume,
+            'content_hash': self.content_hash,
             'has_patran': self.has_patran,
             'has_exodus': self.has_exodus,
             'has_mesh_gen_script': self.has_mesh_gen_script,
             'has_mesh_gen_output': self.has_mesh_gen_output,
-            'las_modified': self.last_modified,
-            'created': self.created
+            'las_modified': self.last_modified.strftime(GLOBAL.DATE_TIME_FORMAT),
+            'created': self.created.strftime(GLOBAL.DATE_TIME_FORMAT)
         }
 
 
@@ -495,6 +499,10 @@ class Material(Base):
 
     model_id = Column(Integer, ForeignKey("model.id"))
 
+    __table_args__ = (
+        Index('idx_material_01', 'model_id', 'name', 'temperature'),
+    )
+
     def as_dict(self):
         r"""
         Get a python dictionary representation of this object.
@@ -504,16 +512,27 @@ class Material(Base):
 
         return {
             "id": self.id,
+            "submesh_id": self.submesh_id,
             "name": self.name,
             "temperature": str(self.temperature),
             "k1": self.k1,
+            "k2": self.k2,
+            "k3": self.k3,
+            "k4": self.k4,
+            "k5": self.k5,
+            "k6": self.k6,
+            "k7": self.k7,
+            "k8": self.k8,
+            "k9": self.k9,
+            "k10": self.k10,
             "aex": self.aex,
             "ms": self.ms,
-            "kd": self.kd,
-            "lambda_ex": self.lambda_ex,
-            "q_hardness": self.q_hardness,
-            "axis_theta": self.axis_theta,
-            "axis_phi": self.axis_phi,
+            "dir_x": self.dir_x,
+            "dir_y": self.dir_y,
+            "dir_z": self.dir_z,
+            "alpha": self.alpha,
+            "theta": self.theta,
+            "phi": self.phi,
             "last_modified": self.last_modified.strftime(GLOBAL.DATE_TIME_FORMAT),
             "created": self.created.strftime(GLOBAL.DATE_TIME_FORMAT),
             "anisotropy_form": self.anisotropy_form.as_dict()
@@ -540,6 +559,22 @@ class UniformAppliedField(Base):
     last_modified = Column(DateTime, default=now, onupdate=now, nullable=False)
     created = Column(DateTime, default=now, nullable=False)
 
+    def as_dict(self):
+        r"""
+        Get a python dictionary representation of this object.
+
+        :returns: a dictionary representing this object.
+        """
+        return {
+            "id": self.id,
+            "dir_x": self.dir_x,
+            "dir_y": self.dir_y,
+            "dir_z": self.dir_z,
+            "magnitude": self.magnitude,
+            "last_modified": self.last_modified.strftime(GLOBAL.DATE_TIME_FORMAT),
+            "created": self.created.strftime(GLOBAL.DATE_TIME_FORMAT)
+        }
+
 
 class InitialMagnetization(Base):
     """
@@ -635,8 +670,7 @@ class RandomInitialMagnetization(InitialMagnetization):
             "id": self.id,
             "db_type": self.type,
             "last_modified": self.last_modified.strftime(GLOBAL.DATE_TIME_FORMAT),
-            "created": self.created.strftime(GLOBAL.DATE_TIME_FORMAT),
-            "seed": self.seed
+            "created": self.created.strftime(GLOBAL.DATE_TIME_FORMAT)
         }
 
 
@@ -679,8 +713,6 @@ class UniformInitialMagnetization(InitialMagnetization):
             "db_type": self.type,
             "last_modified": self.last_modified.strftime(GLOBAL.DATE_TIME_FORMAT),
             "created": self.created.strftime(GLOBAL.DATE_TIME_FORMAT),
-            "theta": self.theta,
-            "phi": self.phi,
             "dir_x": self.dir_x,
             "dir_y": self.dir_y,
             "dir_z": self.dir_z,
@@ -1041,6 +1073,9 @@ class Model(Base):
 
     __table_args__ = (
         UniqueConstraint('unique_id', name='uniq_model_01'),
+        Index('idx_model_01', 'running_status_id', 'id'),
+        Index('idx_model_02', 'geometry_id'),
+        Index('idx_model_03', 'mdata_id'),
     )
 
     def as_dict(self):
@@ -1071,13 +1106,14 @@ class Model(Base):
             "e_exch3": self.e_exch3,
             "e_exch4": self.e_exch4,
             "e_tot": self.e_tot,
-            "volume": self.volume,
+            "volume": self.geometry.computed_volume,
             "max_energy_evaluations": self.max_energy_evaluations,
             "last_modified": self.last_modified.strftime(GLOBAL.DATE_TIME_FORMAT),
             "created": self.created.strftime(GLOBAL.DATE_TIME_FORMAT),
             "geometry": self.geometry.as_dict(),
             "materials": [mma.as_dict() for mma in self.materials],
-            "start_magnetization": self.start_magnetization.as_dict(),
+            "start_magnetization": self.initial_magnetization.as_dict(),
+            "applied_field": self.applied_field.as_dict() if self.applied_field is not None else None,
             "running_status": self.running_status.as_dict(),
             "model_run_data": self.model_run_data.as_dict(),
             "model_report_data": self.model_report_data.as_dict(),
@@ -1283,8 +1319,26 @@ class NEB(Base):
 
     models = relationship('NEBModelSplit', back_populates='neb')
 
+    # The end points of the path irrespective of direction, i.e. (min(start, end), max(start, end)).
+    endpoint_low_model_id = column_property(
+        case((start_model_id < end_model_id, start_model_id), else_=end_model_id))
+    endpoint_high_model_id = column_property(
+        case((start_model_id < end_model_id, end_model_id), else_=start_model_id))
+
     __table_args__ = (
         UniqueConstraint('unique_id', name='uniq_neb_01'),
+        # There may only be one root (parent-less) path between any two models, in either direction.
+        Index('uniq_neb_02',
+              case((start_model_id < end_model_id, start_model_id), else_=end_model_id),
+              case((start_model_id < end_model_id, end_model_id), else_=start_model_id),
+              unique=True,
+              postgresql_where=parent_neb_id.is_(None),
+              sqlite_where=parent_neb_id.is_(None)),
+        Index('idx_neb_01', 'running_status_id', 'id'),
+        Index('idx_neb_02', 'start_model_id'),
+        Index('idx_neb_03', 'end_model_id'),
+        Index('idx_neb_04', 'parent_neb_id'),
+        Index('idx_neb_05', 'mdata_id'),
     )
 
     def as_dict(self):
@@ -1309,6 +1363,7 @@ class NEB(Base):
             "end_model_unique_id": self.end_model.unique_id,
             "parent_neb_unique_id": self.parent_neb.unique_id if self.parent_neb is not None else None,
             "neb_calculation_type": self.neb_calculation_type.as_dict(),
+            "applied_field": self.applied_field.as_dict() if self.applied_field is not None else None,
             "neb_run_data": self.neb_run_data.as_dict(),
             "neb_report_data": self.neb_report_data.as_dict(),
             "running_status": self.running_status.as_dict(),
@@ -7,6 +7,9 @@ from m4db.utilities_logging import get_logger
 from m4db.rest.middleware import SQLAlchemySessionManager
 from m4db.rest.middleware import ConfigurationManager
 from m4db.rest.middleware import LoggerManager
+from m4db.rest.middleware import MetricsManager
+from m4db.rest.metrics import GetMetrics
+from m4db.rest.pool_metrics import GetPoolMetrics
 
 from m4db.rest.m4db_readonly_web.get_model_file import GetAllModelDataZip
 from m4db.rest.m4db_readonly_web.get_model_file import GetModelJSONZip
@@ -23,13 +26,18 @@ from m4db.rest.m4db_readonly_web.get_projects import GetProjects
 from m4db.rest.m4db_readonly_web.get_geometry import GetAllGeometryNames
 from m4db.rest.m4db_readonly_web.get_geometry import GetGeometrySizes
 
+from m4db.utilities.request_metrics import request_metrics
+
+from m4db import GLOBAL
+
 Session = get_session(scoped=True, echo=False)
 config = read_config_from_environ()
 logger = get_logger()
 app = falcon.App(
     middleware=[
+        MetricsManager(request_metrics()),
         SQLAlchemySessionManager(Session),
-        ConfigurationManager(config),
+        ConfigurationManager(config, GLOBAL.CONFIG_RELOAD_INTERVAL),
         LoggerManager(logger)
     ]
 )
@@ -87,3 +95,15 @@ get_geometry_sizes = GetGeometrySizes()
 app.add_route(
     "/geometry-sizes/{geometry_name}", get_geometry_sizes
 )
+
+# Service to report database connection pool metrics.
+get_pool_metrics = GetPoolMetrics()
+app.add_route(
+    "/pool-metrics", get_pool_metrics
+)
+
+# Service to report request, database and connection pool metrics (in the Prometheus text format).
+get_metrics = GetMetrics()
+app.add_route(
+    "/metrics", get_metrics
+)
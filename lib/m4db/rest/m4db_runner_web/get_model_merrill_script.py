@@ -10,8 +10,7 @@ from m4db.configuration import read_config_from_environ
 
 from m4db.orm.schema import Model
 
-from m4db import GLOBAL
-from m4db.template import template_loader
+from m4db.template import model_merrill_script
 
 
 class GetModelMerrillScript:
@@ -38,15 +37,4 @@ class GetModelMerrillScript:
 
         # Runner data.
 
-        merrill_template = template_loader().get_template("merrill_model.jinja2")
-
-        resp.text = json.dumps({"return": merrill_template.render(
-            model=model,
-            mesh_file=GLOBAL.GEOMETRY_PATRAN_FILE_NAME,
-            minimizer=GLOBAL.DEFAULT_ENERGY_MINIMIZER,
-            exchange_calculator=GLOBAL.DEFAULT_EXCHANGE_CALCULATOR,
-            initial_model_tecplot=GLOBAL.INITIAL_MODEL_TECPLOT_FILE_NAME,
-            energy_log_file=GLOBAL.ENERGY_LOG_FILE_NAME,
-            field_unit=GLOBAL.FIELD_UNIT,
-            model_output=GLOBAL.MAGNETIZATION_OUTPUT_FILE_NAME
-        )})
+        resp.text = json.dumps({"return": model_merrill_script(model)})
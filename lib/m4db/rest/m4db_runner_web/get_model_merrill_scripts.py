@@ -0,0 +1,81 @@
+r"""
+A service to generate the scripts to run many models at once (e.g. so that a worker can prefetch its next models).
+"""
+
+import falcon
+import json
+
+import schematics
+import schematics.exceptions
+
+from m4db import GLOBAL
+
+from m4db.db.model.retrieve import get_models_by_unique_ids
+from m4db.db.model.retrieve import merrill_script_loader_options
+
+from m4db.template import model_merrill_script
+
+from m4db.utilities.tar_stream import tar_stream
+
+# The maximum number of models per request.
+MAX_UNIQUE_IDS = 10000
+
+# The name of the archive member that lists unique ids without a model.
+MISSING_FILE_NAME = "missing.json"
+
+
+class GetModelMerrillScriptsJSONSchema(schematics.models.Model):
+    unique_ids = schematics.types.ListType(schematics.types.StringType(regex=GLOBAL.UID_REGEX),
+                                           min_size=1,
+                                           max_size=MAX_UNIQUE_IDS,
+                                           deserialize_from="unique-ids",
+                                           serialized_name="unique-ids",
+                                           required=True)
+    format = schematics.types.StringType(choices=["json", "tar"], default="json")
+
+
+class GetModelMerrillScripts:
+
+    def on_post(self, req, resp):
+        r"""
+        Get/generate the scripts to run a collection of models. All models (and everything that their scripts need)
+        are retrieved with a fixed number of queries and the scripts are rendered in one pass. The scripts are
+        returned either as a JSON map of unique id to script, or as a streamed tar archive with one
+        '<unique-id>/model_script.merrill' member per model.
+
+        :param req: request object.
+        :param resp: response object.
+
+        :return: None.
+        """
+        parameters = req.media
+        if isinstance(parameters, str):
+            parameters = json.loads(parameters)
+
+        try:
+            scripts_data = GetModelMerrillScriptsJSONSchema(parameters)
+            scripts_data.validate()
+        except (schematics.exceptions.ValidationError, schematics.exceptions.DataError) as e:
+            self.logger.error(e)
+            resp.status = falcon.HTTP_400
+            return
+
+        models = get_models_by_unique_ids(self.session, scripts_data.unique_ids, merrill_script_loader_options())
+
+        scripts = {unique_id: model_merrill_script(model) for unique_id, model in models.items()}
+        missing = [unique_id for unique_id in dict.fromkeys(scripts_data.unique_ids) if unique_id not in models]
+
+        self.logger.debug(f"Rendered {len(scripts)} merrill script(s), {len(missing)} model(s) missing.")
+
+        if scripts_data.format == "tar":
+            members = [
+                (f"{unique_id}/{GLOBAL.MODEL_MERRILL_SCRIPT_FILE_NAME}", script.encode())
+                for unique_id, script in scripts.items()
+            ]
+            if len(missing) > 0:
+                members.append((MISSING_FILE_NAME, json.dumps(missing).encode()))
+
+            resp.content_type = "application/x-tar"
+            resp.stream = tar_stream(members)
+        else:
+            resp.text = json.dumps({"return": scripts, "missing": missing})
@@ -13,7 +13,7 @@ from m4db import GLOBAL
 from m4db.orm.schema import Model, UniformInitialMagnetization, RandomInitialMagnetization, \
     ModelInitialMagnetization, RunningStatusEnum
 
-from m4db.template import template_loader
+from m4db.template import model_merrill_script
 from m4db.utilities.directories import geometry_directory, model_directory
 
 
@@ -37,16 +37,7 @@ class GetModelRunPrerequisites:
             return
 
         self.logger.debug(f"Model id {unique_id}, getting merrill script.")
-        merrill_template = template_loader().get_template("merrill_model.jinja2")
-        merrill_script = merrill_template.render(
-            model=model,
-            mesh_file=GLOBAL.GEOMETRY_PATRAN_FILE_NAME,
-            minimizer=GLOBAL.DEFAULT_ENERGY_MINIMIZER,
-            exchange_calculator=GLOBAL.DEFAULT_EXCHANGE_CALCULATOR,
-            initial_model_tecplot=GLOBAL.INITIAL_MODEL_TECPLOT_FILE_NAME,
-            energy_log_file=GLOBAL.ENERGY_LOG_FILE_NAME,
-            field_unit=GLOBAL.FIELD_UNIT,
-            model_output=GLOBAL.MAGNETIZATION_OUTPUT_FILE_NAME)
+        merrill_script = model_merrill_script(model)
         self.logger.debug(f"Model id {unique_id}, merrill script contents is complete.")
 
         self.logger.debug(f"Model id {unique_id} getting geometry path.")
@@ -162,9 +162,9 @@ class GetNEBMerrillScript:
         # Depending on whether this has a parent, generate a scripts
         if neb.parent_neb:
             runner_data = runner_data_with_parent(neb)
-            merrill_template = template_loader("merrill").get_template("merrill_neb_child_path.jinja2")
+            merrill_template = template_loader().get_template("merrill_neb_child_path.jinja2")
         else:
             runner_data = runner_data_without_parent(neb)
-            merrill_template = template_loader("merrill").get_template("merrill_neb_root_path.jinja2")
+            merrill_template = template_loader().get_template("merrill_neb_root_path.jinja2")
 
         resp.text = json.dumps({"return": merrill_template.render(neb=runner_data)})
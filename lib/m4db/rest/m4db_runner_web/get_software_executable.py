@@ -5,7 +5,7 @@ A service to retrieve a software's executable.
 import json
 import falcon
 
-from m4db.orm.schema import Software
+from m4db.db.software.retrieve import retrieve_software
 
 
 class GetSoftware:
@@ -17,9 +17,7 @@ class GetSoftware:
         :param resp: response object.
         :return: None
         """
-        software = self.session.query(Software). \
-            filter(Software.name == name). \
-            filter(Software.version == version).one_or_none()
+        software = retrieve_software(self.session, name, version, allow_none=True)
 
         if software is None:
             resp.status = falcon.HTTP_404
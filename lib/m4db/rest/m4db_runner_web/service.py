@@ -2,17 +2,23 @@ import falcon
 
 from m4db.configuration import read_config_from_environ
 
-from m4db.utilities.logger import setup_logger, get_logger
+from m4db.utilities.logger import setup_logger_from_config, get_logger
 
 from m4db.sessions import get_session
+from m4db.sessions import get_write_queue
 
-from m4db.rest.middleware import SQLAlchemySessionManager, LoggerManager
+from m4db.rest.middleware import SQLAlchemySessionManager, ConfigurationManager, LoggerManager, WriteQueueManager
+from m4db.rest.middleware import MetricsManager
 
 from m4db.rest.m4db_runner_web.is_alive import IsAlive
 
+from m4db.rest.metrics import GetMetrics
+from m4db.rest.pool_metrics import GetPoolMetrics
+
 from m4db.rest.m4db_runner_web.get_software_executable import GetSoftware
 
 from m4db.rest.m4db_runner_web.get_model_merrill_script import GetModelMerrillScript
+from m4db.rest.m4db_runner_web.get_model_merrill_scripts import GetModelMerrillScripts
 from m4db.rest.m4db_runner_web.get_model_run_prerequisites import GetModelRunPrerequisites
 from m4db.rest.m4db_runner_web.get_model_running_status import GetModelRunningStatus
 from m4db.rest.m4db_runner_web.get_model_software_executable import GetModelSoftwareExecutable
@@ -21,6 +27,10 @@ from m4db.rest.m4db_runner_web.get_model_initial_magnetization import GetModelIn
 from m4db.rest.m4db_runner_web.set_model_running_status import SetModelRunningStatus
 from m4db.rest.m4db_runner_web.set_model_quants import SetModelQuants
 
+from m4db.utilities.request_metrics import request_metrics
+
+from m4db import GLOBAL
+
 #
 # from m4db.rest.m4db_runner_web.set_neb_running_status import SetNEBRunningStatus
 # from m4db.rest.m4db_runner_web.is_neb_parent_blocking import IsNEBParentBlocking
@@ -31,14 +41,20 @@ from m4db.rest.m4db_runner_web.set_model_quants import SetModelQuants
 
 config = read_config_from_environ()
 
-setup_logger(config.logging.file, config.logging.level, config.logging.log_to_stdout)
+setup_logger_from_config(config.logging)
 logger = get_logger()
 
 Session = get_session(scoped=True, echo=False)
 
+# Status updates are funnelled through a single writer for databases that only allow one writer at a time (SQLite).
+write_queue = get_write_queue()
+
 app = falcon.App(
     middleware=[
+        MetricsManager(request_metrics()),
         SQLAlchemySessionManager(Session),
+        ConfigurationManager(config, GLOBAL.CONFIG_RELOAD_INTERVAL),
+        WriteQueueManager(write_queue),
         LoggerManager(logger)
     ]
 )
@@ -49,6 +65,12 @@ app.add_route(
     "/get-model-merrill-script/{unique_id}", get_model_merrill_script
 )
 
+# Model: get the merrill scripts of many models at once.
+get_model_merrill_scripts = GetModelMerrillScripts()
+app.add_route(
+    "/get-model-merrill-scripts", get_model_merrill_scripts
+)
+
 # Model: get model running status.
 get_model_running_status = GetModelRunningStatus()
 app.add_route(
@@ -92,6 +114,18 @@ app.add_route(
     '/is-alive', is_alive
 )
 
+# Service to report database connection pool metrics.
+get_pool_metrics = GetPoolMetrics()
+app.add_route(
+    "/pool-metrics", get_pool_metrics
+)
+
+# Service to report request, database and connection pool metrics (in the Prometheus text format).
+get_metrics = GetMetrics()
+app.add_route(
+    "/metrics", get_metrics
+)
+
 # Service to retrieve a software executable.
 get_software_executable = GetSoftware()
 app.add_route(
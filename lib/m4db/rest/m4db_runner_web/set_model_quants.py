@@ -3,6 +3,7 @@ A service to set a model's quants.
 """
 import falcon
 import json
+import logging
 
 from m4db import GLOBAL
 from m4db.orm.schema import Model
@@ -35,6 +36,13 @@ class SetModelQuantsJSONSchema(schematics.models.Model):
     e_tot = schematics.types.FloatType(deserialize_from="e-tot")
 
 
+# The quants that can be set, in the order in which they are set.
+QUANT_NAMES = [
+    "mx_tot", "my_tot", "mz_tot", "vx_tot", "vy_tot", "vz_tot", "h_tot", "rh_tot", "adm_tot",
+    "e_typical", "e_anis", "e_ext", "e_demag", "e_exch1", "e_exch2", "e_exch3", "e_exch4", "e_tot"
+]
+
+
 class SetModelQuants:
 
     def on_post(self, req, resp):
@@ -71,59 +79,15 @@ class SetModelQuants:
             return
         self.logger.debug(f"Model {model.unique_id}, has been retrieved.")
 
-        if quants.mx_tot is not None:
-            model.mx_tot = quants.mx_tot
-            self.logger.debug(f"Model {model.unique_id}, mx-tot changed to {quants.mx_tot}.")
-        if quants.my_tot is not None:
-            model.my_tot = quants.my_tot
-            self.logger.debug(f"Model {model.unique_id}, my-tot changed to {quants.my_tot}.")
-        if quants.mz_tot is not None:
-            model.mz_tot = quants.mz_tot
-            self.logger.debug(f"Model {model.unique_id}, mz-tot changed to {quants.mz_tot}.")
-        if quants.vx_tot is not None:
-            model.vx_tot = quants.vx_tot
-            self.logger.debug(f"Model {model.unique_id}, vx-tot changed to {quants.vx_tot}.")
-        if quants.vy_tot is not None:
-            model.vy_tot = quants.vy_tot
-            self.logger.debug(f"Model {model.unique_id}, vy-tot changed to {quants.vy_tot}.")
-        if quants.vz_tot is not None:
-            model.vz_tot = quants.vz_tot
-            self.logger.debug(f"Model {model.unique_id}, vz-tot changed to {quants.vz_tot}.")
-        if quants.h_tot is not None:
-            model.h_tot = quants.h_tot
-            self.logger.debug(f"Model {model.unique_id}, h-tot changed to {quants.h_tot}.")
-        if quants.rh_tot is not None:
-            model.rh_tot = quants.rh_tot
-            self.logger.debug(f"Model {model.unique_id}, rh-tot changed to {quants.rh_tot}.")
-        if quants.adm_tot is not None:
-            model.adm_tot = quants.adm_tot
-            self.logger.debug(f"Model {model.unique_id}, adm-tot changed to {quants.adm_tot}.")
-        if quants.e_typical is not None:
-            model.e_typical = quants.e_typical
-            self.logger.debug(f"Model {model.unique_id}, e-typical changed to {quants.e_typical}.")
-        if quants.e_anis is not None:
-            model.e_anis = quants.e_anis
-            self.logger.debug(f"Model {model.unique_id}, e-anis changed to {quants.e_anis}.")
-        if quants.e_ext is not None:
-            model.e_ext = quants.e_ext
-            self.logger.debug(f"Model {model.unique_id}, e-ext changed to {quants.e_ext}.")
-        if quants.e_demag is not None:
-            model.e_demag = quants.e_demag
-            self.logger.debug(f"Model {model.unique_id}, e-demag changed to {quants.e_demag}.")
-        if quants.e_exch1 is not None:
-            model.e_exch1 = quants.e_exch1
-            self.logger.debug(f"Model {model.unique_id}, e-exch1 changed to {quants.e_exch1}.")
-        if quants.e_exch2 is not None:
-            model.e_exch2 = quants.e_exch2
-            self.logger.debug(f"Model {model.unique_id}, e-exch2 changed to {quants.e_exch2}.")
-        if quants.e_exch3 is not None:
-            model.e_exch3 = quants.e_exch3
-            self.logger.debug(f"Model {model.unique_id}, e-exch3 changed to {quants.e_exch3}.")
-        if quants.e_exch4 is not None:
-            model.e_exch4 = quants.e_exch4
-            self.logger.debug(f"Model {model.unique_id}, e-exch4 changed to {quants.e_exch4}.")
-        if quants.e_tot is not None:
-            model.e_tot = quants.e_tot
-            self.logger.debug(f"Model {model.unique_id}, e-tot changed to {quants.e_tot}.")
+        # Set every quant that was supplied, the changes are logged as a single (structured) debug record.
+        changed = {}
+        for name in QUANT_NAMES:
+            value = getattr(quants, name)
+            if value is not None:
+                setattr(model, name, value)
+                changed[name] = value
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Model {model.unique_id}, quants changed.",
+                              extra={"unique_id": model.unique_id, "quants": changed})
 
         self.session.commit()
@@ -5,10 +5,9 @@ import falcon
 import json
 
 from m4db import GLOBAL
-from m4db.orm.schema import RunningStatus
 from m4db.orm.schema import RunningStatusEnum
 
-from m4db.orm.schema import Model
+from m4db.db.model.update import set_model_running_status
 
 import schematics
 import schematics.exceptions
@@ -55,23 +54,27 @@ class SetModelRunningStatus:
             resp.status = falcon.HTTP_500
             return
 
-        # Retrieve the running status ID.
-        new_running_status = self.session.query(RunningStatus).\
-            filter(RunningStatus.name == running_status_data.new_running_status).one()
-        self.logger.debug(f"Retrieved new running status.")
+        # Set the model's running status, via the single-writer queue if there is one.
+        if self.write_queue is not None:
+            updated = self.write_queue.submit(
+                set_model_running_status,
+                running_status_data.unique_id,
+                running_status_data.new_running_status
+            ).result()
+        else:
+            updated = set_model_running_status(
+                self.session,
+                running_status_data.unique_id,
+                running_status_data.new_running_status
+            )
+            self.session.commit()
 
-        # Retrieve the model and set the running status id.
-        model = self.session.query(Model).\
-            filter(Model.unique_id == running_status_data.unique_id).one_or_none()
-        if model is None:
+        if not updated:
             resp.status = falcon.HTTP_404
             resp.text = json.dumps({
                 "error": f"Missing model with unique id: '{running_status_data.unique_id}'."
             })
             return
-        self.logger.debug(f"Model {model.unique_id}, has been retrieved.")
-
-        model.running_status = new_running_status
-        self.session.commit()
-        self.logger.debug(f"Model {model.unique_id}, running status changed to {running_status_data.new_running_status}")
 
+        self.logger.debug(f"Model {running_status_data.unique_id}, running status changed to "
+                          f"{running_status_data.new_running_status}")
@@ -0,0 +1,28 @@
+r"""
+A service to report request, database and connection pool metrics in the Prometheus text exposition format.
+"""
+import falcon
+
+from m4db.sessions import pool_metrics
+
+from m4db.utilities.request_metrics import PROMETHEUS_CONTENT_TYPE
+from m4db.utilities.request_metrics import prometheus_text
+from m4db.utilities.request_metrics import request_metrics
+
+
+class GetMetrics:
+    r"""
+    Falcon service to retrieve the request metrics (recorded by `m4db.rest.middleware.MetricsManager`) along with the
+    connection pool metrics of the service's database engines.
+    """
+
+    def on_get(self, req, resp):
+        r"""
+        Retrieve the metrics.
+        :param req: Falcon request object.
+        :param resp: Falcon response object.
+        :return: None
+        """
+        resp.content_type = PROMETHEUS_CONTENT_TYPE
+        resp.text = prometheus_text(request_metrics(), pool_metrics())
+        resp.status = falcon.HTTP_200
@@ -1,6 +1,18 @@
 r"""
 A collection of routines for managing Falcon middleware.
 """
+import time
+
+import falcon
+
+from m4db.configuration import read_config_from_environ
+
+from m4db.utilities.request_metrics import CountingFile
+from m4db.utilities.request_metrics import CountingIterable
+from m4db.utilities.request_metrics import StatementTally
+from m4db.utilities.request_metrics import UNMATCHED_ROUTE
+from m4db.utilities.request_metrics import current_statement_tally
+
 
 class SQLAlchemySessionManager:
     """
@@ -21,15 +33,35 @@ class SQLAlchemySessionManager:
 
 class ConfigurationManager:
     r"""
-    Create a configuration object for every request.
+    Create a configuration object for every request. If a reload interval (in seconds) is given, the configuration
+    file is checked for changes at most once per interval (see `read_config_from_environ`), so that a running service
+    picks up changes without restarting; settings that are only used at start up (e.g. the database connection and
+    logging) still require a restart.
     """
-    def __init__(self, config):
+    def __init__(self, config, reload_interval=None):
         self.config = config
+        self.reload_interval = reload_interval
+        self.last_reload = time.monotonic()
 
     def process_resource(self, req, resp, resource, params):
+        if self.reload_interval is not None and time.monotonic() - self.last_reload >= self.reload_interval:
+            self.config = read_config_from_environ(force_reload=True)
+            self.last_reload = time.monotonic()
         resource.config = self.config
 
 
+class WriteQueueManager:
+    r"""
+    Provide the (single-writer) database write queue to every request, the queue is None if writes should go directly
+    through the request's session.
+    """
+    def __init__(self, write_queue):
+        self.write_queue = write_queue
+
+    def process_resource(self, req, resp, resource, params):
+        resource.write_queue = self.write_queue
+
+
 class LoggerManager:
     r"""
     Create a logging object for every request.
@@ -39,3 +71,42 @@ class LoggerManager:
 
     def process_resource(self, req, resp, resource, params):
         resource.logger = self.logger
+
+
+class MetricsManager:
+    r"""
+    Record the latency, status, response size and SQL statements of every request (see
+    `m4db.utilities.request_metrics`). Streamed response bodies are counted once they have been sent, files with a
+    known length are left as they are (so that the server may still use e.g. sendfile) and counted up front.
+    """
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def process_request(self, req, resp):
+        req.context.metrics_start = time.perf_counter()
+        req.context.metrics_tally = StatementTally()
+        req.context.metrics_token = current_statement_tally.set(req.context.metrics_tally)
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        if "metrics_start" not in req.context:
+            return
+        seconds = time.perf_counter() - req.context.metrics_start
+        current_statement_tally.reset(req.context.metrics_token)
+
+        method = req.method
+        route = req.uri_template or UNMATCHED_ROUTE
+        self.metrics.observe(method, route, falcon.http_status_to_code(resp.status), seconds,
+                             req.context.metrics_tally)
+
+        def add_response_bytes(nbytes):
+            self.metrics.add_response_bytes(method, route, nbytes)
+
+        if resp.stream is None:
+            body = resp.render_body()
+            add_response_bytes(0 if body is None else len(body))
+        elif resp.content_length is not None and hasattr(resp.stream, "fileno"):
+            add_response_bytes(resp.content_length)
+        elif hasattr(resp.stream, "read"):
+            resp.stream = CountingFile(resp.stream, add_response_bytes)
+        else:
+            resp.stream = CountingIterable(resp.stream, add_response_bytes)
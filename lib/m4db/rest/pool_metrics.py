@@ -0,0 +1,24 @@
+r"""
+A service to report database connection pool metrics.
+"""
+
+import json
+import falcon
+
+from m4db.sessions import pool_metrics
+
+
+class GetPoolMetrics:
+    r"""
+    Falcon service to retrieve the connection pool metrics of the service's database engines.
+    """
+
+    def on_get(self, req, resp):
+        r"""
+        Retrieve the connection pool metrics.
+        :param req: Falcon request object.
+        :param resp: Falcon response object.
+        :return: None
+        """
+        resp.text = json.dumps(pool_metrics())
+        resp.status = falcon.HTTP_200
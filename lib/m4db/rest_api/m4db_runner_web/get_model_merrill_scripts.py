@@ -0,0 +1,54 @@
+r"""
+An API call that will retrieve the MERRILL scripts of many models at once.
+"""
+
+import json
+import os
+import tarfile
+
+from m4db.configuration import read_config_from_environ
+
+from m4db.rest_api.sessions import get_session
+
+from m4db.rest.m4db_runner_web.get_model_merrill_scripts import GetModelMerrillScriptsJSONSchema
+from m4db.rest.m4db_runner_web.get_model_merrill_scripts import MISSING_FILE_NAME
+
+
+def get_model_merrill_scripts(unique_ids, output_dir=None):
+    r"""
+    Retrieve the MERRILL scripts that may be used to run a collection of models.
+    :param unique_ids: the unique IDs of the models.
+    :param output_dir: if given, the scripts are streamed as an archive and extracted to this directory (one
+                       '<unique-id>/model_script.merrill' file per model), otherwise they are returned.
+    :return: a pair containing a dictionary of scripts keyed on unique id (empty if the scripts were extracted to
+             `output_dir`) and a list of the unique ids that have no model.
+    """
+    config = read_config_from_environ()
+
+    scripts_request = GetModelMerrillScriptsJSONSchema()
+    scripts_request.unique_ids = list(unique_ids)
+    scripts_request.format = "json" if output_dir is None else "tar"
+
+    session = get_session()
+    response = session.post(
+        f"{config.runner_web.host}:{config.runner_web.port}/get-model-merrill-scripts",
+        json=json.dumps(scripts_request.to_primitive()),
+        stream=output_dir is not None
+    )
+    response.raise_for_status()
+
+    if output_dir is None:
+        output = json.loads(response.text)
+        return output["return"], output["missing"]
+
+    with tarfile.open(fileobj=response.raw, mode="r|") as tar:
+        tar.extractall(output_dir, filter="data")
+
+    missing = []
+    missing_file = os.path.join(output_dir, MISSING_FILE_NAME)
+    if os.path.isfile(missing_file):
+        with open(missing_file, "r") as fin:
+            missing = json.load(fin)
+        os.remove(missing_file)
+
+    return {}, missing
@@ -28,9 +28,6 @@ from m4db.rest_api.m4db_runner_web.set_model_quants import set_model_quants
 from m4db.file_io.merrill_stdio import is_merrill_model_finished
 from m4db.file_io.merrill_stdio import read_merrill_model_stdout
 
-from m4db.postprocessing.field_calculations import tec_to_unstructured_grid
-from m4db.postprocessing.field_calculations import net_quantities
-
 from m4db.utilities.archive import unarchive_model
 from m4db.utilities.directories import model_directory
 
@@ -146,8 +143,10 @@ def run_model(unique_id):
             stdout_contents = fin.readlines()
         quants1 = read_merrill_model_stdout(stdout_contents)
 
-        # Calculate additional quants.
+        # Calculate additional quants (VTK is only imported once there is output to process).
         logger.debug("Calculating quants")
+        from m4db.postprocessing.field_calculations import tec_to_unstructured_grid
+        from m4db.postprocessing.field_calculations import net_quantities
         ug, tec_raw = tec_to_unstructured_grid(GLOBAL.MAGNETIZATION_TECPLOT_FILE_NAME)
         quants2 = net_quantities(ug)
 
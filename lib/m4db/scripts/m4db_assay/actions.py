@@ -1,45 +1,51 @@
 r"""
 Perform actions for the 'm4db_assay' scripts.
 """
-import pandas as pd
-from tabulate import tabulate
-
+from sqlalchemy import func
 
 from m4db.sessions import get_session
 
-from m4db.orm.schema import RunningStatus
 from m4db.orm.schema import Model
 from m4db.orm.schema import NEB
 
+from m4db.db.running_status.retrieve import retrieve_running_statuses
+
 
 def model_general_action():
     r"""
     Display general m4db assay statistics for models.
     :return: None
     """
-    session = get_session(nullpool=True)
-
-    # Retrieve all running statuses.
-    statuses = session.query(RunningStatus).all()
-
-    # For each running status do a count.
-    tot_nmodels = 0
-
-    model_stats = {
-        "Running status": [],
-        "No. of models": []
-    }
-    for status in statuses:
-        nmodels = session.query(Model).filter(Model.running_status_id == status.id).count()
-        tot_nmodels += nmodels
-
-        model_stats["Running status"].append(status.name)
-        model_stats["No. of models"].append(nmodels)
-
-    df = pd.DataFrame.from_dict(model_stats)
-    print("Model data")
-    print(tabulate(df, headers='keys', tablefmt='psql'))
-    print("Total no. of models: {}".format(tot_nmodels))
+    with get_session() as session:
+        # Retrieve all running statuses.
+        statuses = retrieve_running_statuses(session)
+
+        # For each running status do a count.
+        tot_nmodels = 0
+
+        model_stats = {
+            "Running status": [],
+            "No. of models": []
+        }
+        # Count per running status in a single query.
+        counts = dict(
+            session.query(Model.running_status_id, func.count(Model.id))
+            .group_by(Model.running_status_id)
+            .all())
+
+        for status in statuses:
+            nmodels = counts.get(status.id, 0)
+            tot_nmodels += nmodels
+
+            model_stats["Running status"].append(status.name)
+            model_stats["No. of models"].append(nmodels)
+
+        import pandas as pd
+        from tabulate import tabulate
+        df = pd.DataFrame.from_dict(model_stats)
+        print("Model data")
+        print(tabulate(df, headers='keys', tablefmt='psql'))
+        print("Total no. of models: {}".format(tot_nmodels))
 
 
 def neb_general_action():
@@ -47,27 +53,34 @@ def neb_general_action():
     Display general m4db assay statistics for NEBs.
     :return: None
     """
-    session = get_session(nullpool=True)
-
-    # Retrieve all running statuses.
-    statuses = session.query(RunningStatus).all()
-
-    # For each running status do a count.
-    tot_nnebs = 0
-
-    neb_stats = {
-        "Running status": [],
-        "No. of NEBs": []
-    }
-    for status in statuses:
-        nnebs = session.query(NEB).filter(NEB.running_status_id == status.id).count()
-        tot_nnebs += nnebs
-
-        neb_stats["Running status"].append(status.name)
-        neb_stats["No. of NEBs"].append(nnebs)
-    df = pd.DataFrame.from_dict(neb_stats)
-    print("NEB data")
-    print(tabulate(df, headers="keys", tablefmt="psql"))
-    print(f"Total no. of NEBs: {tot_nnebs}")
+    with get_session() as session:
+        # Retrieve all running statuses.
+        statuses = retrieve_running_statuses(session)
+
+        # For each running status do a count.
+        tot_nnebs = 0
+
+        neb_stats = {
+            "Running status": [],
+            "No. of NEBs": []
+        }
+        # Count per running status in a single query.
+        counts = dict(
+            session.query(NEB.running_status_id, func.count(NEB.id))
+            .group_by(NEB.running_status_id)
+            .all())
+
+        for status in statuses:
+            nnebs = counts.get(status.id, 0)
+            tot_nnebs += nnebs
+
+            neb_stats["Running status"].append(status.name)
+            neb_stats["No. of NEBs"].append(nnebs)
+        import pandas as pd
+        from tabulate import tabulate
+        df = pd.DataFrame.from_dict(neb_stats)
+        print("NEB data")
+        print(tabulate(df, headers="keys", tablefmt="psql"))
+        print(f"Total no. of NEBs: {tot_nnebs}")
 
 
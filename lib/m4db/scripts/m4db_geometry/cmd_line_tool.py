@@ -13,15 +13,10 @@ import typer
 from typer import Option
 from typer import Argument
 
-import pandas as pd
-
-from tabulate import tabulate
-
 from sqlalchemy.exc import IntegrityError
 
 from m4db.orm.schema import Ellipsoid, Geometry
 from m4db.orm.schema import TruncatedOctahedron
-from m4db.orm.schema import SizeConvention
 from m4db.orm.schema import SizeConventionEnum
 
 from m4db.orm.schema import new_unique_id
@@ -29,9 +24,18 @@ from m4db.orm.schema import new_unique_id
 from m4db.sessions import get_session
 from m4db.utilities.directories import geometry_directory
 
-from m4db.file_io.patran import read_patran
-from m4db.utilities.geometry import geometry_volume
-from m4db.utilities.geometry import geometry_edge_stats
+from m4db.db.size_convention.retrieve import retrieve_size_convention
+from m4db.db.geometry.retrieve import get_geometries_by_content_hash
+
+from m4db.install.columns import has_geometry_content_hash
+
+from m4db.utilities.geometry_ingest import geometry_fields
+from m4db.utilities.geometry_ingest import ingest_patran
+from m4db.utilities.geometry_ingest import file_content_hash
+from m4db.utilities.geometry_ingest import link_geometry_files
+from m4db.utilities.geometry_ingest import shared_geometry_directory
+from m4db.utilities.geometry_ingest import store_geometry_mesh
+from m4db.utilities.file_links import link_or_copy
 
 from m4db.utilities.simple_formats import is_str_decimal
 
@@ -69,6 +73,17 @@ class GeometryOrAllEnum(Enum):
     truncated_octahedron = "truncated-octahedron"
 
 
+class DuplicateGeometryEnum(Enum):
+    r"""
+    What to do when a geometry is added whose patran file is identical to that of an existing geometry: 'link' adds
+    the geometry but shares the stored mesh files with the existing geometry, 'reuse' does not add the geometry (the
+    existing geometry should be used instead) and 'copy' adds the geometry with its own copy of the files.
+    """
+    link = "link"
+    reuse = "reuse"
+    copy = "copy"
+
+
 def all_ellipsoids(session):
     r"""
     Retrieve all ellipsoids and return a Pandas DataFrame object.
@@ -119,6 +134,7 @@ def all_ellipsoids(session):
             df_dict[HAS_MESH_GEN_SCRIPT].append(ellipsoid.has_mesh_gen_script)
             df_dict[HAS_MESH_GEN_OUTPUT].append(ellipsoid.has_mesh_gen_output)
 
+    import pandas as pd
     return pd.DataFrame(df_dict)
 
 
@@ -173,11 +189,12 @@ def all_truncated_octahedra(session):
             df_dict[HAS_MESH_GEN_SCRIPT].append(truncated_octahedron.has_mesh_gen_script)
             df_dict[HAS_MESH_GEN_OUTPUT].append(truncated_octahedron.has_mesh_gen_output)
 
+    import pandas as pd
     return pd.DataFrame(df_dict)
 
 
 def copy_geometry_files(unique_id: str, patran_file: str, exodus_file: str, script_file: str, stdout_file: str,
-                        create_destination: bool = False):
+                        create_destination: bool = False, shared_dir: str = None):
     r"""
     Utility function to create a destination directory in the data store and copy over each file.
 
@@ -188,6 +205,8 @@ def copy_geometry_files(unique_id: str, patran_file: str, exodus_file: str, scri
     :param stdout_file: the stdout file to copy or None.
     :param create_destination: flag to indicate that the destination should be created (an error is raised if the
                                destination is already contains the directory).
+    :param shared_dir: the directory of a geometry with an identical patran file, if given the patran file is linked
+                       from there rather than copied.
 
     :return: The directory in to which geometry files were placed.
     """
@@ -199,7 +218,10 @@ def copy_geometry_files(unique_id: str, patran_file: str, exodus_file: str, scri
     else:
         os.makedirs(dest_dir, exist_ok=True)
 
-    if os.path.isfile(patran_file):
+    if shared_dir is not None:
+        link_or_copy(os.path.join(shared_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME),
+                     os.path.join(dest_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME))
+    elif os.path.isfile(patran_file):
         shutil.copyfile(patran_file, os.path.join(dest_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME))
     else:
         raise IOError(f"Could not find '{patran_file}'.")
@@ -225,9 +247,10 @@ def copy_geometry_files(unique_id: str, patran_file: str, exodus_file: str, scri
     return dest_dir
 
 
-def save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout):
+def save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout, ingest=None,
+                      shared_dir=None):
     r"""
-    Save the new geometry to the database.
+    Save the new geometry to the database, along with a binary sidecar of its mesh.
 
     :param session: the database session.
     :param geometry: the geometry object to save.
@@ -235,13 +258,18 @@ def save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_scri
     :param exodus_file: the exodus file path.
     :param mesh_gen_script: the mesh generation script file path.
     :param mesh_gen_stdout: the mesh generation routine standard output file path.
+    :param ingest: the MeshIngest of the patran file, if given its sidecar is written in to the geometry directory.
+    :param shared_dir: the directory of a geometry with an identical patran file, whose files should be shared.
 
     :return: None.
     """
 
     try:
         session.add(geometry)
-        copy_geometry_files(geometry.unique_id, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout)
+        dest_dir = copy_geometry_files(geometry.unique_id, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout,
+                                       shared_dir=shared_dir)
+        if ingest is not None:
+            store_geometry_mesh(dest_dir, ingest, shared_dir)
 
     except IntegrityError as e:
         print("Could not add geometry - possible duplicate.")
@@ -261,6 +289,74 @@ def save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_scri
             session.commit()
 
 
+def duplicate_geometry_directory(session, ingest, on_duplicate):
+    r"""
+    Deal with a new geometry whose patran file is identical to that of existing geometries. If the existing geometry
+    should be reused, its unique id is reported and the program exits.
+
+    :param session: the database session.
+    :param ingest: the MeshIngest of the new geometry's patran file.
+    :param on_duplicate: what to do about duplicates (a DuplicateGeometryEnum).
+
+    :return: the directory of an existing geometry whose files should be shared, or None.
+    """
+    if on_duplicate == DuplicateGeometryEnum.copy:
+        return None
+
+    duplicates = get_geometries_by_content_hash(session, ingest.content_hash)
+    if len(duplicates) == 0:
+        return None
+
+    if on_duplicate == DuplicateGeometryEnum.reuse:
+        print(f"The mesh is identical to that of geometry '{duplicates[0].unique_id}', which should be used instead.")
+        sys.exit()
+
+    return shared_geometry_directory(duplicates)
+
+
+@app.command()
+def dedup(dry_run: bool = Option(False, help="only report the geometries that would share files.")):
+    r"""
+    Compute missing content hashes of the geometries in the system and share the stored patran files (and mesh
+    sidecars) of geometries with identical meshes.
+    """
+    session = get_session()
+
+    if not has_geometry_content_hash(session):
+        print("The geometry table has no 'content_hash' column, please run the "
+              "'m4db_add_geometry_content_hash.py' upgrade script first.")
+        sys.exit(1)
+
+    shared_dirs = {}
+    nlinked = 0
+    for geometry in session.query(Geometry).order_by(Geometry.id):
+        dest_dir = geometry_directory(geometry.unique_id)
+        patran_file = os.path.join(dest_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME)
+        if not os.path.isfile(patran_file):
+            continue
+
+        if geometry.content_hash is None:
+            geometry.content_hash = file_content_hash(patran_file)
+
+        shared_dir = shared_dirs.setdefault(geometry.content_hash, dest_dir)
+        if shared_dir == dest_dir:
+            continue
+
+        if dry_run:
+            print(f"{geometry.unique_id}: would share files with '{shared_dir}'")
+        else:
+            methods = link_geometry_files(shared_dir, dest_dir)
+            if len(methods) > 0:
+                nlinked += 1
+                print(f"{geometry.unique_id}: " + ", ".join(f"{name} ({method})" for name, method in methods.items()))
+
+    if dry_run:
+        session.rollback()
+    else:
+        session.commit()
+        print(f"Geometries sharing files: {nlinked}")
+
+
 @app.command()
 def list(type: GeometryOrAllEnum = Option(None, help="the type of geometry to list."),
          csv_file: str = Option(None, help="if specified, save the output to this csv file instead.")):
@@ -288,6 +384,8 @@ def list(type: GeometryOrAllEnum = Option(None, help="the type of geometry to li
         if not df_truncated_octahedra.empty:
             dfs.append(df_truncated_octahedra)
 
+    import pandas as pd
+    from tabulate import tabulate
     if len(dfs) > 1:
         df = pd.concat(dfs, axis=0, ignore_index=True)
     elif len(dfs) == 1:
@@ -313,7 +411,9 @@ def add_ellipsoid(
     exodus_file: str = Option(None, help="the geometry exodusII file."),
     mesh_gen_script: str = Option(None, help="the geometry mesh generation script."),
     mesh_gen_stdout: str = Option(None, help="the geometry standard output file.") ,
-    unique_id: str = Option(None, help="if supplied, try to use this as the unique_id of the new geometry.")):
+    unique_id: str = Option(None, help="if supplied, try to use this as the unique_id of the new geometry."),
+    on_duplicate: DuplicateGeometryEnum = Option(DuplicateGeometryEnum.link.value,
+                                                 help="what to do if an identical mesh is already stored.")):
     r"""
     Create a new ellipsoid geometry.
     """
@@ -330,7 +430,7 @@ def add_ellipsoid(
         print("Prolateness parameter has incorrect number format.")
         sys.exit(1)
 
-    session = get_session(nullpool=True)
+    session = get_session()
 
     if unique_id is not None:
         existing_geometry = session.query(Geometry).filter(Geometry.unique_id == unique_id).one_or_none()
@@ -342,28 +442,18 @@ def add_ellipsoid(
     else:
         the_unique_id = new_unique_id()
 
-    vertices, elements, submesh_ids = read_patran(patran_file)
-
-    volume = geometry_volume(vertices, elements)
-    avg_edge_length, std_dev_edge_length, max_edge_length, min_edge_length = geometry_edge_stats(vertices, elements)
+    ingest = ingest_patran(patran_file)
+    shared_dir = duplicate_geometry_directory(session, ingest, on_duplicate)
 
     has_exodus = True if exodus_file is not None and os.path.isfile(exodus_file) else False
     has_mesh_gen_script = True if mesh_gen_script is not None and os.path.isfile(mesh_gen_script) else False
     has_mesh_gen_stdout = True if mesh_gen_stdout is not None and os.path.isfile(mesh_gen_stdout) else False
 
-    db_size_convention = session.query(SizeConvention).filter(SizeConvention.symbol == size_convention.value).one()
+    db_size_convention = retrieve_size_convention(session, size_convention.value)
 
     geometry = Ellipsoid(
         unique_id=the_unique_id,
-        nelements=len(elements),
-        nvertices=len(vertices),
-        nsubmeshes=len(submesh_ids),
-        computed_volume=volume,
-        computed_element_length_average=avg_edge_length,
-        computed_element_length_standard_deviation=std_dev_edge_length,
-        computed_element_length_minimum=min_edge_length,
-        computed_element_length_maximum=max_edge_length,
-        has_patran=True,
+        **geometry_fields(ingest),
         has_exodus=has_exodus,
         has_mesh_gen_script=has_mesh_gen_script,
         has_mesh_gen_output=has_mesh_gen_stdout,
@@ -374,7 +464,8 @@ def add_ellipsoid(
         oblateness=Decimal(oblateness)
     )
 
-    save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout)
+    save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout, ingest,
+                      shared_dir)
 
 
 @app.command()
@@ -388,7 +479,9 @@ def add_truncated_octahedron(
         exodus_file: str = Option(None, help="the geometry exodusII file."),
         mesh_gen_script: str = Option(None, help="the geometry mesh generation script."),
         mesh_gen_stdout: str = Option(None, help="the geometry standard output file.") ,
-        unique_id: str = Option(None, help="if supplied, try to use this as the unique_id of the new geometry.")):
+        unique_id: str = Option(None, help="if supplied, try to use this as the unique_id of the new geometry."),
+        on_duplicate: DuplicateGeometryEnum = Option(DuplicateGeometryEnum.link.value,
+                                                     help="what to do if an identical mesh is already stored.")):
     r"""
     Create a new truncated octahedron geometry.
     """
@@ -405,7 +498,7 @@ def add_truncated_octahedron(
         print("Truncation factor parameter has incorrect number format.")
         sys.exit(1)
 
-    session = get_session(nullpool=True)
+    session = get_session()
 
     if unique_id is not None:
         existing_geometry = session.query(Geometry).filter(Geometry.unique_id == unique_id).one_or_none()
@@ -417,28 +510,18 @@ def add_truncated_octahedron(
     else:
         the_unique_id = new_unique_id()
 
-    vertices, elements, submesh_ids = read_patran(patran_file)
-
-    volume = geometry_volume(vertices, elements)
-    avg_edge_length, std_dev_edge_length, max_edge_length, min_edge_length = geometry_edge_stats(vertices, elements)
+    ingest = ingest_patran(patran_file)
+    shared_dir = duplicate_geometry_directory(session, ingest, on_duplicate)
 
     has_exodus = True if exodus_file is not None and os.path.isfile(exodus_file) else False
     has_mesh_gen_script = True if mesh_gen_script is not None and os.path.isfile(mesh_gen_script) else False
     has_mesh_gen_stdout = True if mesh_gen_stdout is not None and os.path.isfile(mesh_gen_stdout) else False
 
-    db_size_convention = session.query(SizeConvention).filter(SizeConvention.symbol == size_convention.value).one()
+    db_size_convention = retrieve_size_convention(session, size_convention.value)
 
     geometry = TruncatedOctahedron(
         unique_id=the_unique_id,
-        nelements=len(elements),
-        nvertices=len(vertices),
-        nsubmeshes=len(submesh_ids),
-        computed_volume=volume,
-        computed_element_length_average=avg_edge_length,
-        computed_element_length_standard_deviation=std_dev_edge_length,
-        computed_element_length_minimum=min_edge_length,
-        computed_element_length_maximum=max_edge_length,
-        has_patran=True,
+        **geometry_fields(ingest),
         has_exodus=has_exodus,
         has_mesh_gen_script=has_mesh_gen_script,
         has_mesh_gen_output=has_mesh_gen_stdout,
@@ -449,7 +532,8 @@ def add_truncated_octahedron(
         aspect_ratio=Decimal(aspect_ratio)
     )
 
-    save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout)
+    save_new_geometry(session, geometry, patran_file, exodus_file, mesh_gen_script, mesh_gen_stdout, ingest,
+                      shared_dir)
 
 
 def entry_point():
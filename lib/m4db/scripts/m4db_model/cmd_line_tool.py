@@ -21,20 +21,21 @@ from subprocess import Popen, PIPE
 from m4db import GLOBAL
 from m4db.configuration import read_config_from_environ
 from m4db.file_io.merrill_stdio import is_merrill_model_finished, read_merrill_model_stdout
-from m4db.postprocessing.field_calculations import tec_to_unstructured_grid, net_quantities
 from m4db.utilities.logger import setup_logger
+from m4db.utilities.logger import setup_logger_from_config
 from m4db.utilities.logger import get_logger
 
-from m4db.orm.schema import Project, Material, Model, UniformInitialMagnetization, ModelInitialMagnetization, \
-    RandomInitialMagnetization, UniformAppliedField, ModelRunData, ModelReportData, Metadata, Software, RunningStatus, \
-    AnisotropyForm, RunningStatusEnum
+from m4db.orm.schema import Project, Model, Metadata, RunningStatus, RunningStatusEnum
 from m4db.orm.schema import DBUser
 
-from m4db.orm.model_creation_schema import ModelListSchema, InitialMagnetizationSchemaTypesEnum
+from m4db.orm.model_creation_schema import ModelListSchema
 
 from m4db.sessions import get_session
 
-from m4db.db.geometry.retrieve import get_geometry
+from m4db.db.running_status.retrieve import retrieve_running_statuses
+from m4db.db.software.retrieve import retrieve_software
+from m4db.db.model.bulk_create import bulk_create_models
+from m4db.db.model.validate import validate_new_models
 
 from m4db.rest_api.m4db_runner_web.get_model_run_prerequisites import get_model_run_prerequisites
 from m4db.rest_api.m4db_runner_web.set_model_running_status import set_model_running_status
@@ -65,6 +66,7 @@ def add(model_json_file: str = Argument(..., help="a file containing new model J
         software_name: str = Argument(..., help="the name of the software that will be used to run this model."),
         software_version: str = Argument(..., help="the version of the software that will be used to run this model."),
         dry_run: bool = Option(True, help="if this flag is set, data will be written to m4db."),
+        batch_size: int = Option(1000, help="the number of models written to the database per batch."),
         log_file: str = Option(None, help="if supplied, logging data is saved to this file."),
         log_level: str = Option(None, help="if supplied, the level at which logging data is produced."),
         log_to_stdout: bool = Option(False, help="if set, write logging data to standard output.")):
@@ -102,133 +104,29 @@ def add(model_json_file: str = Argument(..., help="a file containing new model J
             sys.exit(1)
 
         # Get software.
-        existing_software = session.query(Software). \
-            filter(Software.name == software_name). \
-            filter(Software.version == software_version). \
-            one_or_none()
+        existing_software = retrieve_software(session, software_name, software_version, allow_none=True)
         if existing_software is None:
             print(f"The software: '{software_name}' at version '{software_version}' could not be found.")
             sys.exit()
 
-        # Perform additional checks.
-        for index, model in enumerate(models.models):
-
-            existing_geometry = get_geometry(session, schema_object=model.geometry)
-            if existing_geometry is None:
-                print(f"Could not find geometry for model in position {index}.")
-                sys.exit(1)
-
-            if model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.model.value:
-                existing_model = session.query(Model). \
-                    filter(Model.unique_id == model.initial_magnetization.unique_id). \
-                    one_or_none()
-                if existing_model is None:
-                    print(f"Could not find model for initial model magnetization with unique id: "
-                          f"{model.initial_magnetization.unique_id}")
-                    sys.exit(1)
-
-            if model.unique_id is not None:
-                existing_model = session.query(Model). \
-                    filter(Model.unique_id == model.unique_id). \
-                    one_or_none()
-                if existing_model is not None:
-                    print(f"Attempting to add a model with specified unique id in position {index}, however this "
-                          f"id ({model.unique_id}) is already present.")
-                    sys.exit(1)
-
-            if len(model.materials) != existing_geometry.nsubmeshes:
-                print(f"When attempting to add a model, the chosen geometry has {existing_geometry.nsubmeshes} "
-                      f"however only {len(model.materials)} material elements were given.")
-                sys.exit(1)
+        # Perform additional checks against the database, all errors are reported at once.
+        errors = validate_new_models(session, models.models, batch_size=batch_size)
+        if errors:
+            print(f"Model file validation has failed with {len(errors)} error(s):")
+            for error in errors:
+                print(f"  {error}")
+            sys.exit(1)
+        logger.debug("Successfully checked models against the database.")
 
         # If the user is intent on putting these models in the database, then perform the action.
         if dry_run is False:
-            for index, model in enumerate(models.models):
-
-                existing_geometry = get_geometry(session, schema_object=model.geometry)
-
-                not_run_status = session.query(RunningStatus).filter(RunningStatus.name == "not-run").one()
-
-                for rep in range(model.reps):
-
-                    # Create a new initial magnetization.
-                    if model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.uniform.value:
-                        new_initial_magnetization = UniformInitialMagnetization(
-                            dir_x=model.initial_magnetization.dir_x,
-                            dir_y=model.initial_magnetization.dir_y,
-                            dir_z=model.initial_magnetization.dir_z,
-                            magnitude=model.initia_magnetization.magnitude
-                        )
-                    elif model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.model.value:
-                        existing_model = session.query(Model). \
-                            filter(Model.unique_id == model.initial_magnetization.unique_id). \
-                            one()
-                        new_initial_magnetization = ModelInitialMagnetization(
-                            model=existing_model
-                        )
-                    elif model.initial_magnetization.type == InitialMagnetizationSchemaTypesEnum.random.value:
-                        new_initial_magnetization = RandomInitialMagnetization()
-                    else:
-                        print("Fatal error!")
-                        sys.exit(1)
-
-                    # Create new applied field.
-                    if model.applied_field:
-                        new_applied_field = UniformAppliedField(
-                            dir_x=model.applied_field.dir_x,
-                            dir_y=model.applied_field.dir_y,
-                            dir_z=model.applied_field.dir_z,
-                            magnitude=model.applied_field.magnitude
-                        )
-                    else:
-                        new_applied_field = None
-
-                    new_model_run_data = ModelRunData()
-                    new_model_report_data = ModelReportData()
-                    new_metadata = Metadata(
-                        db_user=existing_user,
-                        project=existing_project,
-                        software=existing_software
-                    )
-
-                    # Create new materials.
-                    new_materials = []
-                    for material in model.materials:
-                        existing_anisotropy_form = session.query(AnisotropyForm). \
-                            filter(AnisotropyForm.name == material.anisotropy_form). \
-                            one_or_none()
-
-                        new_materials.append(Material(name=material.name,
-                                                      temperature=material.temperature,
-                                                      k1=material.k1, k2=material.k2, k3=material.k3,
-                                                      k4=material.k4, k5=material.k5, k6=material.k6,
-                                                      k7=material.k7, k8=material.k8, k9=material.k9,
-                                                      k10=material.k10,
-                                                      aex=material.aex,
-                                                      ms=material.ms,
-                                                      dir_x=material.dir_x,
-                                                      dir_y=material.dir_y,
-                                                      dir_z=material.dir_z,
-                                                      alpha=material.alpha,
-                                                      theta=material.theta,
-                                                      phi=material.phi,
-                                                      anisotropy_form=existing_anisotropy_form,
-                                                      submesh_id=material.submesh_id))
-
-                    new_model = Model(
-                        unique_id=model.unique_id if model.unique_id is not None else None,
-                        max_energy_evaluations=model.max_energy_evaluations,
-                        geometry=existing_geometry,
-                        materials=new_materials,
-                        initial_magnetization=new_initial_magnetization,
-                        applied_field=new_applied_field,
-                        running_status=not_run_status,
-                        model_run_data=new_model_run_data,
-                        model_report_data=new_model_report_data,
-                        mdata=new_metadata
-                    )
-                    session.add(new_model)
+            unique_ids = bulk_create_models(
+                session, models.models, existing_user, existing_project, existing_software,
+                batch_size=batch_size,
+                progress=lambda count: logger.debug(f"Written {count} models.")
+            )
             session.commit()
+            logger.debug(f"Successfully added {len(unique_ids)} models.")
         else:
             print("Validation succeeded, if you want to add models please use the --no-dry-run flag.")
 
@@ -322,8 +220,9 @@ def run(unique_id: str = Argument(..., help="the unique id of the model to run."
             stdout_contents = fin.readlines()
         quants1 = read_merrill_model_stdout(stdout_contents)
 
-        # Calculate additional quants.
+        # Calculate additional quants (VTK is slow to import, so it's only imported when it's needed).
         logger.debug("Calculating quants")
+        from m4db.postprocessing.field_calculations import tec_to_unstructured_grid, net_quantities
         ug, tec_raw = tec_to_unstructured_grid(GLOBAL.MAGNETIZATION_TECPLOT_FILE_NAME)
         quants2 = net_quantities(ug)
 
@@ -451,26 +350,18 @@ def summary():
     config = read_config_from_environ()
 
     with get_session() as session:
-        n_not_run = session.query(func.count(Model.id)) \
-            .join(RunningStatus, Model.running_status_id == RunningStatus.id) \
-            .filter(RunningStatus.name == RunningStatusEnum.not_run.value) \
-            .scalar()
-        n_running = session.query(func.count(Model.id)) \
-            .join(RunningStatus, Model.running_status_id == RunningStatus.id) \
-            .filter(RunningStatus.name == RunningStatusEnum.running.value) \
-            .scalar()
-        n_re_run = session.query(func.count(Model.id)) \
-            .join(RunningStatus, Model.running_status_id == RunningStatus.id) \
-            .filter(RunningStatus.name == RunningStatusEnum.re_run.value) \
-            .scalar()
-        n_crashed = session.query(func.count(Model.id)) \
-            .join(RunningStatus, Model.running_status_id == RunningStatus.id) \
-            .filter(RunningStatus.name == RunningStatusEnum.crashed.value) \
-            .scalar()
-        n_finished = session.query(func.count(Model.id)) \
-            .join(RunningStatus, Model.running_status_id == RunningStatus.id) \
-            .filter(RunningStatus.name == RunningStatusEnum.finished.value) \
-            .scalar()
+        # Count models for every running status in one query.
+        counts = dict(
+            session.query(Model.running_status_id, func.count(Model.id))
+            .group_by(Model.running_status_id)
+            .all())
+        status_ids = {running_status.name: running_status.id for running_status in retrieve_running_statuses(session)}
+
+        n_not_run = counts.get(status_ids.get(RunningStatusEnum.not_run.value), 0)
+        n_running = counts.get(status_ids.get(RunningStatusEnum.running.value), 0)
+        n_re_run = counts.get(status_ids.get(RunningStatusEnum.re_run.value), 0)
+        n_crashed = counts.get(status_ids.get(RunningStatusEnum.crashed.value), 0)
+        n_finished = counts.get(status_ids.get(RunningStatusEnum.finished.value), 0)
 
         print(f"Models summary")
         print(f"Not run: {n_not_run}")
@@ -482,7 +373,7 @@ def summary():
 
 def entry_point():
     config = read_config_from_environ()
-    setup_logger(config.logging.file, config.logging.level, config.logging.log_to_stdout)
+    setup_logger_from_config(config.logging)
     app()
 
 
@@ -3,16 +3,21 @@ Perform various neb related actions.
 """
 from m4db.sessions import get_session
 
+from m4db.orm.schema import DBUser
+from m4db.orm.schema import Project
+
 from m4db.db.neb.create import create_fs_path
 from m4db.db.neb.create import create_neb_child_path
 from m4db.db.neb.create import create_fs_path_with_neb_child
 from m4db.db.neb.retrieve import get_nebs
+from m4db.db.neb.bulk_create import bulk_create_fs_paths
+from m4db.db.software.retrieve import retrieve_software
 
 
 def add_fs_path_action(args):
     kwargs = vars(args)
 
-    with get_session(nullpool=True) as session:
+    with get_session() as session:
         neb_unique_id, was_new = create_fs_path(session, **kwargs)
         if was_new:
             print(f"Created parent NEB with unique ID: {neb_unique_id}")
@@ -23,7 +28,7 @@ def add_fs_path_action(args):
 def add_neb_child_path_action(args):
     kwargs = vars(args)
 
-    with get_session(nullpool=True) as session:
+    with get_session() as session:
         neb_unique_id = create_neb_child_path(session, **kwargs)
         print(f"Created (child) NEB with unique ID: {neb_unique_id}")
 
@@ -31,15 +36,43 @@ def add_neb_child_path_action(args):
 def add_fs_path_with_neb_child_action(args):
     kwargs = vars(args)
 
-    with get_session(nullpool=True) as session:
+    with get_session() as session:
         parent_unique_id, child_unique_id = create_fs_path_with_neb_child(session, **kwargs)
         print(f"Created (parent) NEB with unique ID: {parent_unique_id}, along with")
         print(f"NEB (child) with unique ID: {child_unique_id}")
 
 
+def add_fs_paths_all_pairs_action(args):
+    # Only these arguments select models, the rest describe the new paths.
+    model_filters = {key: getattr(args, key) for key in
+                     ["running_status", "geometry", "size", "size_unit", "size_convention", "material", "temperature"]}
+
+    with get_session() as session:
+        project = session.query(Project).filter(Project.name == args.project).one()
+        db_user = session.query(DBUser).filter(DBUser.user_name == args.db_user).one()
+        software = retrieve_software(session, args.software, args.software_version)
+
+        neb_unique_ids, nnew, nexisting = bulk_create_fs_paths(
+            session, db_user, project, software,
+            no_of_points=args.no_of_points,
+            max_energy_evaluations=args.max_energy_evaluations,
+            max_path_evaluations=args.max_path_evaluations,
+            batch_size=args.batch_size,
+            dry_run=not args.real_run,
+            progress=lambda count: print(f"    {count} new path(s) ..."),
+            **model_filters
+        )
+
+        print(f"{nexisting} path(s) already exist.")
+        if args.real_run:
+            print(f"Created {len(neb_unique_ids)} parent NEB path(s).")
+        else:
+            print(f"{nnew} path(s) would be created, use --real-run to create them.")
+
+
 def uid_list_action(**kwargs):
 
-    with get_session(nullpool=True, echo=False) as session:
+    with get_session() as session:
         nebs = get_nebs(session, **kwargs)
         neb_unique_ids = []
         for neb in nebs:
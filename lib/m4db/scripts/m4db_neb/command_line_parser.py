@@ -135,7 +135,7 @@ def add_uid_list_subparser(subparsers):
                            choices=["not-run", "re-run", "running", "finished", "crashed", "any"],
                            help="schedule models with this running status")
     subparser.add_argument("--geometry",
-                           help="the name of the geometry to execute")
+                           help="the geometry unique id or type to execute")
     subparser.add_argument("--size",
                            type=float,
                            help="the size of the geometry")
@@ -157,6 +157,48 @@ def add_uid_list_subparser(subparsers):
     return subparser
 
 
+def add_fs_paths_all_pairs_subparser(subparsers):
+    r"""
+    Add a subparser to deal with adding Fabian/Shcherbakov paths between all pairs of a selection of models.
+    :param subparsers: the subparsers object.
+    :return: the 'add-fs-paths-all-pairs' sub parser
+    """
+    subparser = subparsers.add_parser(
+        "add-fs-paths-all-pairs",
+        help="Adds new fs NEB paths between all pairs of (compatible) models matching search criteria"
+    )
+
+    subparser.add_argument("--running-status",
+                           default="finished",
+                           choices=["not-run", "re-run", "running", "finished", "crashed", "any"],
+                           help="use models with this running status")
+    subparser.add_argument("--geometry",
+                           help="the geometry unique id or type of the models")
+    subparser.add_argument("--size",
+                           type=float,
+                           help="the size of the geometry")
+    subparser.add_argument("--size-unit",
+                           default="um",
+                           choices=["m", "cm", "mm", "um", "nm", "pm", "fm", "am"],
+                           help="the size unit for the geometry")
+    subparser.add_argument("--size-convention",
+                           default="ESVD",
+                           choices=["ESVD", "ECVL"],
+                           help="the size convention for the geometry")
+    subparser.add_argument("--material",
+                           help="a material belonging to the models")
+    subparser.add_argument("--temperature",
+                           help="a temperature belonging to the models")
+    subparser.add_argument("--no-of-points", type=int, default=100, help="no. of points")
+    subparser.add_argument("--max-energy-evaluations", type=int, default=10000, help="max no. of energy evaluations")
+    subparser.add_argument("--max-path-evaluations", type=int, default=5000, help="max no. of path evaluations")
+    subparser.add_argument("--batch-size", type=int, default=1000, help="no. of paths written per batch")
+    subparser.add_argument("--real-run", action="store_true", help="actually create the paths")
+
+    add_common_subparser_args(subparser)
+    return subparser
+
+
 def command_line_parser():
     r"""
     Create a command line parser to handle neb actions.
@@ -169,5 +211,6 @@ def command_line_parser():
     add_neb_child_path_subparser(subparsers)
     add_fs_path_with_neb_child_subparser(subparsers)
     add_uid_list_subparser(subparsers)
+    add_fs_paths_all_pairs_subparser(subparsers)
 
     return parser
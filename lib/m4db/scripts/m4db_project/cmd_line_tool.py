@@ -6,10 +6,6 @@ import typer
 from typer import Option
 from typer import Argument
 
-import pandas as pd
-
-from tabulate import tabulate
-
 from m4db.orm.schema import Project
 
 from m4db.sessions import get_session
@@ -27,7 +23,7 @@ def list(csv_file: str = Option(None, help="if specified, save the output to thi
     r"""
     Display all projects in m4db.
     """
-    session = get_session(nullpool=True)
+    session = get_session()
 
     try:
         projects = session.query(Project).all()
@@ -43,6 +39,8 @@ def list(csv_file: str = Option(None, help="if specified, save the output to thi
             for project in projects:
                 df_dict[NAME].append(project.name)
                 df_dict[DESCRIPTION].append(project.description)
+            import pandas as pd
+            from tabulate import tabulate
             df = pd.DataFrame(df_dict)
             if csv_file:
                 df.to_csv(csv_file, index=False)
@@ -58,7 +56,7 @@ def add(project_name: str = Argument(..., help="name of the new project."),
     r"""
     Adds a new m4db project.
     """
-    session = get_session(nullpool=True)
+    session = get_session()
 
     try:
         project = create_project(
@@ -5,7 +5,7 @@ Run a model.
 import typer
 
 from m4db.configuration import read_config_from_environ
-from m4db.utilities.logger import setup_logger
+from m4db.utilities.logger import setup_logger_from_config
 from m4db.utilities.logger import get_logger
 
 app = typer.Typer()
@@ -19,7 +19,7 @@ def run():
 
 def entry_point():
     config = read_config_from_environ()
-    setup_logger(config.logging.filename, config.logging.level, config.logging.log_to_stdout)
+    setup_logger_from_config(config.logging)
     app()
 
 
@@ -10,8 +10,8 @@ from tempfile import NamedTemporaryFile
 from m4db.sessions import get_session
 from m4db.configuration import read_config_from_environ
 
-from m4db.template import template_loader
-from m4db.db.model.retrieve import get_models
+from m4db.template import model_slurm_script
+from m4db.db.model.retrieve import iterate_models
 from m4db.rest_api.m4db_runner_web.set_model_running_status import set_model_running_status
 
 
@@ -22,28 +22,13 @@ def schedule_model(unique_id):
     :return: None
     """
     config = read_config_from_environ()
-    slurm_template = template_loader("slurm").get_template("slurm_model.jinja2")
 
-    sdata = {
-        "unique_id": unique_id,
-        "N": 1,
-        "n": 1,
-        "c": 1,
-        "time": "99:99:99",
-        "working_directory": config["m4db_serverside"]["working_dir"],
-        "module_dir": config["m4db_serverside"]["module_dir"],
-        "modules": config["m4db_serverside"]["modules"]
-    }
-
-    # Open a temporary file.
+    # Open a temporary file (the script is rendered through the shared template environment).
     with NamedTemporaryFile("w") as fout:
-        fout.write(slurm_template.render(sdata=sdata))
-
-        # print(slurm_template.render(sdata=sdata))
-
+        fout.write(model_slurm_script(unique_id))
         fout.flush()
 
-        cmd = "{} {}".format(config["m4db_serverside"]["slurm_exe"], fout.name)
+        cmd = "{} {}".format(config.scheduler.command, fout.name)
         proc = Popen(cmd, stdout=PIPE, stderr=PIPE, shell=True, universal_newlines=True, text=True)
 
         stdout, stderr = proc.communicate()
@@ -62,8 +47,8 @@ def schedule_jobs(**kwargs):
     :param kwargs: job arguments
     :return: None
     """
-    with get_session(nullpool=True) as session:
-        models = get_models(session, **kwargs)
+    with get_session() as session:
+        models = iterate_models(session, **kwargs)
         model_unique_ids = []
         for model in models:
             model_unique_ids.append(model.unique_id)
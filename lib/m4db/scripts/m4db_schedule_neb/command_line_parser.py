@@ -17,7 +17,7 @@ def command_line_parser():
                         choices=["not-run", "re-run", "running", "finished", "crashed", "any"],
                         help="schedule NEBs with this running status")
     parser.add_argument("--geometry",
-                        help="the name of the geometry to execute")
+                        help="the geometry unique id or type to execute")
     parser.add_argument("--size",
                         type=float,
                         help="the size of the geometry")
@@ -18,6 +18,7 @@ from m4db.install.data.anisotropy_forms import populate_anisotropy_forms
 from m4db.install.data.neb_calculation_type import populate_neb_calculation_types
 from m4db.install.data.running_statuses import populate_running_statuses
 from m4db.install.data.size_conventions import populate_size_conventions
+from m4db.install.indexes import create_partial_indexes
 
 app = Typer()
 
@@ -74,6 +75,9 @@ def setup_postgres_database(db_name, user=None, host=None, password=None, echo=F
     populate_running_statuses(session)
     populate_size_conventions(session)
 
+    # Partial indexes depend on the running statuses added above.
+    create_partial_indexes(session)
+
     return db_uri
 
 
@@ -7,15 +7,12 @@ import typer
 from typer import Option
 from typer import Argument
 
-import pandas as pd
-
-from tabulate import tabulate
-
 from m4db.orm.schema import Software
 
 from m4db.sessions import get_session
 
 from m4db.db.software.create import create_software
+from m4db.db.reference_data_cache import software_cache
 
 app = typer.Typer()
 
@@ -41,7 +38,7 @@ def list(csv_file: str = Option(None, help="if specified, save output to csv fil
     r"""
     List the software in the system.
     """
-    session = get_session(nullpool=True)
+    session = get_session()
     try:
         software_list = session.query(Software).all()
 
@@ -63,6 +60,8 @@ def list(csv_file: str = Option(None, help="if specified, save output to csv fil
                 df_dict[URL].append(software.url)
                 df_dict[CITATION].append(software.citation)
                 df_dict[EXECUTABLE].append(software.executable)
+            import pandas as pd
+            from tabulate import tabulate
             df = pd.DataFrame(df_dict)
             if csv_file:
                 df.to_csv(csv_file, index=False)
@@ -82,7 +81,7 @@ def add(name: str = Argument(..., help="the new software name."),
     r"""
     Adds a new m4db software item.
     """
-    session = get_session(nullpool=True)
+    session = get_session()
 
     try:
         software = create_software(
@@ -109,7 +108,7 @@ def update(name: str = Argument(..., help="the name of the software to update.")
     r"""
     Update or change some of a software's data items.
     """
-    session = get_session(nullpool=True)
+    session = get_session()
 
     try:
         software = session.query(Software) \
@@ -140,6 +139,9 @@ def update(name: str = Argument(..., help="the name of the software to update.")
             else:
                 print(f"Unknown field '{field}'")
 
+            # The software table may have changed, so evict cached software.
+            software_cache.invalidate()
+
     except ValueError as exception_obj:
         print(str(exception_obj))
     finally:
@@ -2,10 +2,6 @@ import typer
 from typer import Option
 from typer import Argument
 
-import pandas as pd
-
-from tabulate import tabulate
-
 from m4db.orm.schema import DBUser
 
 from m4db.sessions import get_session
@@ -27,7 +23,7 @@ def list(csv_file: str = Option(None, help="if specified, save the output to thi
     r"""
     List the users in the system.
     """
-    session = get_session(nullpool=True)
+    session = get_session()
     try:
         users = session.query(DBUser).all()
 
@@ -50,6 +46,8 @@ def list(csv_file: str = Option(None, help="if specified, save the output to thi
                 df_dict[SURNAME].append(user.surname)
                 df_dict[EMAIL].append(user.email)
                 df_dict[TELEPHONE].append(user.telephone)
+            import pandas as pd
+            from tabulate import tabulate
             df = pd.DataFrame(df_dict)
             if csv_file:
                 df.to_csv(csv_file, index=False)
@@ -69,7 +67,7 @@ def add(user_name: str = Argument(..., help="the username to identify the new us
     r"""
     Adds a new database user.
     """
-    session = get_session(nullpool=True)
+    session = get_session()
 
     try:
         create_db_user(session, user_name, first_name, surname, email, initials, telephone)
@@ -30,11 +30,67 @@ def get_session(scoped=False, echo=False, nullpool=False):
         return get_session(scoped=scoped, echo=echo, nullpool=nullpool)
     if config.database.type == GLOBAL.SQLITE_DATABASE_TYPE:
         from m4db.sessions_sqlite import get_session
-        return get_session(scoped=scoped, echo=echo)
+        return get_session(scoped=scoped, echo=echo, nullpool=nullpool)
 
     raise ValueError(f"Unsupported database in configuration.")
 
 
+def get_engine(echo=False, nullpool=False):
+    r"""
+    Retrieve the shared SQLAlchemy engine for the database in the M4DB_CONFIG file, the engine is created once per
+    process (with the pool settings of the configuration) and used by all sessions.
+    Parameters:
+        echo: if true we return an engine with echoing enabled.
+        nullpool: if true we return a non-pooled engine.
+    Returns:
+        An engine.
+    """
+    config = read_config_from_environ()
+
+    if config.database.type == GLOBAL.POSTGRES_DATABASE_TYPE:
+        from m4db.sessions_postgres import get_engine
+        return get_engine(echo=echo, nullpool=nullpool)
+    if config.database.type == GLOBAL.SQLITE_DATABASE_TYPE:
+        from m4db.sessions_sqlite import get_engine
+        return get_engine(echo=echo, nullpool=nullpool)
+
+    raise ValueError(f"Unsupported database in configuration.")
+
+
+def pool_metrics():
+    r"""
+    Retrieve connection pool metrics for the engines of the database in the M4DB_CONFIG file.
+    Returns:
+        A list of dictionaries, one per engine.
+    """
+    config = read_config_from_environ()
+
+    if config.database.type == GLOBAL.POSTGRES_DATABASE_TYPE:
+        from m4db.sessions_postgres import pool_metrics
+        return pool_metrics()
+    if config.database.type == GLOBAL.SQLITE_DATABASE_TYPE:
+        from m4db.sessions_sqlite import pool_metrics
+        return pool_metrics()
+
+    raise ValueError(f"Unsupported database in configuration.")
+
+
+def get_write_queue():
+    r"""
+    Retrieve the single-writer queue for the database in the M4DB_CONFIG file, only SQLite databases (which allow a
+    single writer at a time) use a write queue.
+    Returns:
+        A started WriteQueue for SQLite databases, otherwise None (writes should go directly to the database).
+    """
+    config = read_config_from_environ()
+
+    if config.database.type == GLOBAL.SQLITE_DATABASE_TYPE:
+        from m4db.sessions_sqlite import get_write_queue
+        return get_write_queue()
+
+    return None
+
+
 def get_session_from_args(db_type, **kwargs):
     r"""
     Retrieve an SQLAlchemy open database connection session from the user's input arguments.
@@ -9,17 +9,98 @@ database should be available. This may be created with the following instruction
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.pool import NullPool
 
-from m4db.configuration import read_config_from_environ
+from m4db.configuration import read_database_config
 from m4db.decorators import static
+from m4db.utilities.pool_metrics import PoolMetrics
 
 from m4db import GLOBAL
 
 
-@static(engine=None, Session=None)
+def engine_options(database, echo=False, nullpool=False):
+    r"""
+    Build the keyword arguments for `create_engine` from database configuration.
+
+    Args:
+        database: the database configuration (a `m4db.configuration.Database` object).
+        echo: boolean (default False) set to True if verbose SQLAlchemy output is required.
+        nullpool: boolean (default False) we should use the null pool instead of pooled connections.
+
+    Returns:
+        A dictionary of keyword arguments.
+
+    """
+    options = {"echo": echo, "insertmanyvalues_page_size": database.executemany_page_size}
+
+    if nullpool:
+        options["poolclass"] = NullPool
+    else:
+        options.update({
+            "pool_size": database.pool_size,
+            "max_overflow": database.max_overflow,
+            "pool_timeout": database.pool_timeout,
+            "pool_recycle": database.pool_recycle,
+            "pool_pre_ping": database.pool_pre_ping
+        })
+
+    # The executemany fast paths are specific to psycopg2 (psycopg 3 pipelines executemany by itself).
+    if make_url(database.uri).get_driver_name() == "psycopg2":
+        options["executemany_mode"] = database.executemany_mode
+        options["executemany_batch_page_size"] = database.executemany_page_size
+
+    if database.statement_timeout is not None:
+        options["connect_args"] = {"options": "-c statement_timeout={}".format(database.statement_timeout)}
+
+    return options
+
+
+@static(engines={}, metrics={})
+def get_engine(uri=None, echo=False, nullpool=False):
+    r"""
+    Retrieve the (shared) engine for a database, an engine is created once per process for each uri using the pool
+    and statement settings of the configuration stored in the M4DB_CONFIG environment variable (see
+    `read_database_config`).
+
+    Args:
+        uri: the database uri, if None then the uri of the configuration is used.
+        echo: boolean (default False) set to True if verbose SQLAlchemy output is required.
+        nullpool: boolean (default False) we should use the null pool instead of pooled connections.
+
+    Returns:
+        An SQLAlchemy engine.
+
+    """
+    database = read_database_config(uri)
+
+    key = (database.uri, echo, nullpool)
+    if key not in get_engine.engines:
+        engine = create_engine(database.uri, **engine_options(database, echo=echo, nullpool=nullpool))
+        get_engine.metrics[key] = PoolMetrics(engine)
+        get_engine.engines[key] = engine
+
+    return get_engine.engines[key]
+
+
+def pool_metrics():
+    r"""
+    Retrieve the pool metrics of all the engines created by `get_engine`.
+
+    Returns:
+        A list of dictionaries (see `PoolMetrics.as_dict`) along with the uri (without password) of each engine.
+
+    """
+    return [
+        dict(uri=make_url(uri).render_as_string(hide_password=True), echo=echo, nullpool=nullpool,
+             **metrics.as_dict())
+        for (uri, echo, nullpool), metrics in get_engine.metrics.items()
+    ]
+
+
+@static(Sessions={})
 def get_session(user=None, database=None, host=None, password=None, scoped=False, echo=False, nullpool=False):
     r"""
     Retrieve an open database connection session, if user, database and host are None then attempt to use data
@@ -38,36 +119,31 @@ def get_session(user=None, database=None, host=None, password=None, scoped=False
         A session connection to the database.
 
     """
-    if get_session.engine is None:
-        if user is None and database is None and host is None:
-            config = read_config_from_environ()
-            db_uri = config.database.uri
-        else:
-            if user is None and host is None and password is None:
-                db_uri = GLOBAL.POSTGRES_DATABASE_URI.format(
-                    db_name=database
-                )
-            elif password is None:
-                db_uri = GLOBAL.POSTGRES_DATABASE_USER_HOST_URI.format(
-                    user=user, host=host, db_name=database
-                )
-            else:
-                db_uri = GLOBAL.POSTGRES_DATABASE_USER_HOST_PASSWORD_URI.format(
-                    user=user, host=host, db_name=database, password=password
-                )
-        if nullpool:
-            get_session.engine = create_engine(db_uri, echo=echo, poolclass=NullPool)
-        else:
-            get_session.engine = create_engine(db_uri, echo=echo)
-
-    if get_session.Session is None:
-        get_session.Session = sessionmaker(
-            bind=get_session.engine,
+    if user is None and database is None and host is None:
+        db_uri = None
+    elif user is None and host is None and password is None:
+        db_uri = GLOBAL.POSTGRES_DATABASE_URI.format(
+            db_name=database
+        )
+    elif password is None:
+        db_uri = GLOBAL.POSTGRES_DATABASE_USER_HOST_URI.format(
+            user=user, host=host, db_name=database
+        )
+    else:
+        db_uri = GLOBAL.POSTGRES_DATABASE_USER_HOST_PASSWORD_URI.format(
+            user=user, host=host, db_name=database, password=password
+        )
+
+    engine = get_engine(db_uri, echo=echo, nullpool=nullpool)
+
+    if engine not in get_session.Sessions:
+        get_session.Sessions[engine] = sessionmaker(
+            bind=engine,
             autoflush=True,
             autocommit=False
         )
 
     if scoped:
-        return scoped_session(get_session.Session)
+        return scoped_session(get_session.Sessions[engine])
     else:
-        return get_session.Session()
+        return get_session.Sessions[engine]()
@@ -1,22 +1,152 @@
 r"""
 A set of utilities to create/open sqlite databases for SQLAlchemy.
 
+Connections are configured with the SQLite settings of the database configuration (see `m4db.configuration.SQLite`)
+when they are opened, and since SQLite only allows a single writer, writes from concurrent workers may be funnelled
+through a single-writer queue (see `get_write_queue`).
+
 @file util.sqlite.py
 @author L. Nagy, W. Williams
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.pool import NullPool
 
 from m4db.configuration import read_config_from_environ
+from m4db.configuration import read_database_config
 from m4db.decorators import static
+from m4db.db.write_queue import WriteQueue
+from m4db.utilities.pool_metrics import PoolMetrics
 
 from m4db import GLOBAL
 
 
-@static(engine=None, Session=None)
+def sqlite_pragmas(sqlite):
+    r"""
+    Retrieve the PRAGMA statements that are executed on each new connection.
+
+    Args:
+        sqlite: the SQLite configuration (a `m4db.configuration.SQLite` object).
+
+    Returns:
+        A list of PRAGMA statements.
+
+    """
+    pragmas = ["pragma busy_timeout={}".format(sqlite.busy_timeout)]
+
+    if sqlite.profile == "performance":
+        pragmas += [
+            "pragma journal_mode={}".format(sqlite.journal_mode),
+            "pragma synchronous={}".format(sqlite.synchronous),
+            "pragma mmap_size={}".format(sqlite.mmap_size),
+            # A negative cache size is in KiB rather than pages.
+            "pragma cache_size=-{}".format(sqlite.cache_size),
+            "pragma temp_store=memory"
+        ]
+
+    return pragmas
+
+
+def configure_sqlite_engine(engine, sqlite):
+    r"""
+    Register connection events on an engine that apply the SQLite settings to each new connection. The driver's own
+    transaction handling is also disabled in favour of explicit BEGIN statements, so that savepoints (used by the
+    single-writer queue) behave correctly.
+
+    Args:
+        engine: an SQLAlchemy engine for an SQLite database.
+        sqlite: the SQLite configuration (a `m4db.configuration.SQLite` object).
+
+    Returns:
+        None.
+
+    """
+    pragmas = sqlite_pragmas(sqlite)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql("begin")
+
+
+@static(engines={}, metrics={})
+def get_engine(uri=None, echo=False, nullpool=False):
+    r"""
+    Retrieve the (shared) engine for a database, an engine is created once per process for each uri using the SQLite
+    settings of the configuration stored in the M4DB_CONFIG environment variable (see `read_database_config`).
+
+    Args:
+        uri: the database uri, if None then the uri of the configuration is used.
+        echo: boolean (default False) set to True if verbose SQLAlchemy output is required.
+        nullpool: boolean (default False) we should use the null pool instead of pooled connections.
+
+    Returns:
+        An SQLAlchemy engine.
+
+    """
+    database = read_database_config(uri)
+
+    key = (database.uri, echo, nullpool)
+    if key not in get_engine.engines:
+        if nullpool:
+            engine = create_engine(database.uri, echo=echo, poolclass=NullPool)
+        else:
+            engine = create_engine(database.uri, echo=echo)
+        configure_sqlite_engine(engine, database.sqlite)
+        get_engine.metrics[key] = PoolMetrics(engine)
+        get_engine.engines[key] = engine
+
+    return get_engine.engines[key]
+
+
+def pool_metrics():
+    r"""
+    Retrieve the pool metrics of all the engines created by `get_engine`.
+
+    Returns:
+        A list of dictionaries (see `PoolMetrics.as_dict`) along with the uri of each engine.
+
+    """
+    return [
+        dict(uri=make_url(uri).render_as_string(hide_password=True), echo=echo, nullpool=nullpool,
+             **metrics.as_dict())
+        for (uri, echo, nullpool), metrics in get_engine.metrics.items()
+    ]
+
+
+@static(Sessions={})
+def get_sessionmaker(engine):
+    r"""
+    Retrieve the (shared) session factory for an engine.
+
+    Args:
+        engine: an engine created by `get_engine`.
+
+    Returns:
+        A session factory.
+
+    """
+    if engine not in get_sessionmaker.Sessions:
+        get_sessionmaker.Sessions[engine] = sessionmaker(
+            bind=engine,
+            autoflush=True,
+            autocommit=False
+        )
+
+    return get_sessionmaker.Sessions[engine]
+
+
 def get_session(file=None, scoped=False, echo=False, nullpool=False):
     r"""
     Retrieve an open database connection session, if file is None, then attempt to use config
@@ -31,25 +161,31 @@ def get_session(file=None, scoped=False, echo=False, nullpool=False):
     Returns:
         A session connection to the database.
     """
-    if get_session.engine is None:
-        if file is None:
-            config = read_config_from_environ()
-            db_uri = config["db_uri"]
-        else:
-            db_uri = GLOBAL.SQLITE_FILE_URI.format(file=file)
-        if nullpool:
-            get_session.engine = create_engine(db_uri, echo=echo, nullpool=NullPool)
-        else:
-            get_session.engine = create_engine(db_uri, echo=echo)
+    db_uri = None if file is None else GLOBAL.SQLITE_FILE_URI.format(file=file)
 
-    if get_session.Session is None:
-        get_session.Session = sessionmaker(
-            bind=get_session.engine,
-            autoflush=True,
-            autocommit=False
-        )
+    Session = get_sessionmaker(get_engine(db_uri, echo=echo, nullpool=nullpool))
 
     if scoped:
-        return scoped_session(get_session.Session)
+        return scoped_session(Session)
     else:
-        return get_session.Session()
+        return Session()
+
+
+@static(write_queue=None)
+def get_write_queue():
+    r"""
+    Retrieve the (started) single-writer queue for the database stored in M4DB_CONFIG environment variable, there is
+    one queue per process.
+
+    Returns:
+        A WriteQueue.
+
+    """
+    if get_write_queue.write_queue is None:
+        config = read_config_from_environ()
+        get_write_queue.write_queue = WriteQueue(
+            get_sessionmaker(get_engine()),
+            max_batch_size=config.database.sqlite.write_batch_size
+        ).start()
+
+    return get_write_queue.write_queue
@@ -1,30 +1,83 @@
 r"""
 Package level utilities for templates.
+
+All scripts are rendered through a single (per process) environment. Compiled template bytecode is cached on the file
+system, so that short-lived processes (command line tools, runners) don't have to compile the templates every time
+they start, and templates may also be precompiled in to Python modules (see `precompile_templates`) which are then
+preferred over the template sources.
 """
+import os
 
 import jinja2
 
 from m4db.decorators import static
 
+from m4db.configuration import Templates
 from m4db.configuration import read_config_from_environ
 
+from m4db import GLOBAL
+
+
+def template_environment(templates: Templates = None) -> jinja2.Environment:
+    r"""
+    Create a new environment that loads the package templates.
+
+    :param templates: template settings (see `m4db.configuration.Templates`), if None the default settings are used.
+
+    :return: the template loader environment.
+    """
+    if templates is None:
+        templates = Templates()
+
+    loader = jinja2.PackageLoader("m4db", "template")
+    if templates.precompiled_directory is not None and os.path.exists(templates.precompiled_directory):
+        loader = jinja2.ChoiceLoader([jinja2.ModuleLoader(templates.precompiled_directory), loader])
+
+    bytecode_cache = None
+    if templates.bytecode_cache:
+        if templates.bytecode_cache_directory is not None:
+            os.makedirs(templates.bytecode_cache_directory, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(templates.bytecode_cache_directory)
+
+    # Installed templates don't change while a process is running, so there's no need to check them for changes.
+    return jinja2.Environment(
+        loader=loader,
+        autoescape=jinja2.select_autoescape(["jinja2"]),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False)
+
 
 @static(env=None)
 def template_loader():
     r"""
-    Retrieve an object that can load JINJA2 templates.
+    Retrieve an object that can load JINJA2 templates, the same environment is shared by all callers.
 
     :return: the template loader environment.
     """
     self = template_loader
     if self.env is None:
-        self.env = jinja2.Environment(
-            loader=jinja2.PackageLoader("m4db", "template"),
-            autoescape=jinja2.select_autoescape(["jinja2"]))
+        templates = None
+        if os.environ.get(GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR) is not None:
+            templates = read_config_from_environ().templates
+        self.env = template_environment(templates)
 
     return template_loader.env
 
 
+def precompile_templates(target: str, zip: str = None):
+    r"""
+    Compile the package templates in to Python modules, the target can then be used as the 'precompiled-directory'
+    of the template settings (e.g. when distributing M4DB to compute nodes).
+
+    :param target: the directory (or zip file if `zip` is given) to which compiled templates are written.
+    :param zip: the zip compression, either 'deflated' or 'stored', if None templates are written to a directory.
+
+    :return: None.
+    """
+    environment = template_environment(Templates({"bytecode-cache": False}))
+    environment.compile_templates(target, extensions=["jinja2"], zip=zip, ignore_errors=False)
+
+
 def model_slurm_script(unique_id: str, nodes: int = 1, ntasks: int = 1, cpus_per_task: int = 1, time: str = "99:99:99"):
     r"""
     Build a slurm script that runs models and return it as a string.
@@ -35,10 +88,41 @@ def model_slurm_script(unique_id: str, nodes: int = 1, ntasks: int = 1, cpus_per
     :param cpus_per_task: request ncpus cores per task (-c switch).
     :param time: the maximum running time.
 
+    :return: a text file containing the slurm script populated using the input parameters.
+    """
+    return slurm_script("slurm_model.jinja2", unique_id, nodes, ntasks, cpus_per_task, time)
+
+
+def neb_slurm_script(unique_id: str, nodes: int = 1, ntasks: int = 1, cpus_per_task: int = 1, time: str = "99:99:99"):
+    r"""
+    Build a slurm script that runs NEBs and return it as a string.
+
+    :param unique_id: unique id of an NEB.
+    :param nodes: request that a minimum of minnodes nodes be allocated to this job (-N switch).
+    :param ntasks: number of tasks (MPI ranks) (-n switch).
+    :param cpus_per_task: request ncpus cores per task (-c switch).
+    :param time: the maximum running time.
+
+    :return: a text file containing the slurm script populated using the input parameters.
+    """
+    return slurm_script("slurm_neb.jinja2", unique_id, nodes, ntasks, cpus_per_task, time)
+
+
+def slurm_script(template_name: str, unique_id: str, nodes: int, ntasks: int, cpus_per_task: int, time: str):
+    r"""
+    Build a slurm script from one of the slurm templates.
+
+    :param template_name: the name of the slurm template.
+    :param unique_id: unique id of a model/NEB.
+    :param nodes: request that a minimum of minnodes nodes be allocated to this job (-N switch).
+    :param ntasks: number of tasks (MPI ranks) (-n switch).
+    :param cpus_per_task: request ncpus cores per task (-c switch).
+    :param time: the maximum running time.
+
     :return: a text file containing the slurm script populated using the input parameters.
     """
     config = read_config_from_environ()
-    template = template_loader().get_template("slurm_model.jinja2")
+    template = template_loader().get_template(template_name)
 
     return template.render(
         unique_id=unique_id,
@@ -51,3 +135,25 @@ def model_slurm_script(unique_id: str, nodes: int = 1, ntasks: int = 1, cpus_per
         module_dir=config.modules.path,
         modules=config.modules.to_load
     )
+
+
+def model_merrill_script(model) -> str:
+    r"""
+    Build the MERRILL script that runs a model.
+
+    :param model: the model (or an object with the same attributes).
+
+    :return: the MERRILL script.
+    """
+    template = template_loader().get_template("merrill_model.jinja2")
+
+    return template.render(
+        model=model,
+        mesh_file=GLOBAL.GEOMETRY_PATRAN_FILE_NAME,
+        minimizer=GLOBAL.DEFAULT_ENERGY_MINIMIZER,
+        exchange_calculator=GLOBAL.DEFAULT_EXCHANGE_CALCULATOR,
+        initial_model_tecplot=GLOBAL.INITIAL_MODEL_TECPLOT_FILE_NAME,
+        energy_log_file=GLOBAL.ENERGY_LOG_FILE_NAME,
+        field_unit=GLOBAL.FIELD_UNIT,
+        model_output=GLOBAL.MAGNETIZATION_OUTPUT_FILE_NAME
+    )
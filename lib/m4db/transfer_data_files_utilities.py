@@ -0,0 +1,388 @@
+r"""
+A collection of functions that transfer data files held in the 'file_store' directory structure in parallel.
+
+Each geometry/model/NEB directory is an independent unit of work, so directories are copied (or streamed in to a
+per-object zip archive) on a pool of threads; file copies and checksums release the GIL so that many transfers are
+in flight at once. Every transfer writes a manifest of the size and checksum of each file (or archive) it produced,
+which is verified before the data is imported in to a file root.
+"""
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+
+from concurrent.futures import ThreadPoolExecutor
+
+from m4db.configuration import read_config_from_environ
+
+from m4db.utilities.unique_id import uid_to_dir
+
+from m4db import GLOBAL
+
+# The name of the manifest that is written alongside transferred data.
+MANIFEST_FILE_NAME = "manifest.json"
+
+# The checksum algorithm used in manifests.
+CHECKSUM_ALGORITHM = "sha256"
+
+# The number of bytes read/written at a time.
+COPY_BLOCK_SIZE = 1 << 20
+
+# The default number of threads used for transfers.
+DEFAULT_MAX_WORKERS = 16
+
+# The file root directories that hold data files.
+DATA_FILE_DIRECTORY_NAMES = [GLOBAL.GEOMETRY_DIRECTORY_NAME, GLOBAL.MODEL_DIRECTORY_NAME, GLOBAL.NEB_DIRECTORY_NAME]
+
+
+def copy_file_with_checksum(src_file, dst_file, block_size=COPY_BLOCK_SIZE):
+    r"""
+    Copy a file, computing its checksum as it is copied (so the data is read only once).
+    Args:
+        src_file: the source file.
+        dst_file: the destination file.
+        block_size: the number of bytes read/written at a time.
+
+    Returns:
+        A pair with the size (in bytes) and the checksum of the file.
+
+    """
+    checksum = hashlib.new(CHECKSUM_ALGORITHM)
+    size = 0
+    with open(src_file, "rb") as fin, open(dst_file, "wb") as fout:
+        while True:
+            block = fin.read(block_size)
+            if not block:
+                break
+            checksum.update(block)
+            fout.write(block)
+            size += len(block)
+    shutil.copystat(src_file, dst_file)
+
+    return size, checksum.hexdigest()
+
+
+def file_checksum(file_name, block_size=COPY_BLOCK_SIZE):
+    r"""
+    Compute the checksum of a file.
+    Args:
+        file_name: the file.
+        block_size: the number of bytes read at a time.
+
+    Returns:
+        A pair with the size (in bytes) and the checksum of the file.
+
+    """
+    checksum = hashlib.new(CHECKSUM_ALGORITHM)
+    size = 0
+    with open(file_name, "rb") as fin:
+        while True:
+            block = fin.read(block_size)
+            if not block:
+                break
+            checksum.update(block)
+            size += len(block)
+
+    return size, checksum.hexdigest()
+
+
+def copy_data_dir(src_root, dst_root, relative_dir):
+    r"""
+    Copy the files of a single data directory.
+    Args:
+        src_root: the source root directory.
+        dst_root: the destination root directory.
+        relative_dir: the data directory (relative to both roots).
+
+    Returns:
+        A list of manifest entries, one per file.
+
+    """
+    src_dir = os.path.join(src_root, relative_dir)
+    dst_dir = os.path.join(dst_root, relative_dir)
+    os.makedirs(dst_dir, exist_ok=True)
+
+    entries = []
+    for file_name in sorted(os.listdir(src_dir)):
+        src_file = os.path.join(src_dir, file_name)
+        if not os.path.isfile(src_file):
+            continue
+        size, checksum = copy_file_with_checksum(src_file, os.path.join(dst_dir, file_name))
+        entries.append({"path": os.path.join(relative_dir, file_name), "size": size, "checksum": checksum})
+
+    return entries
+
+
+def archive_data_dir(src_root, dst_root, relative_dir):
+    r"""
+    Stream the files of a single data directory in to a zip archive called '<relative_dir>.zip' in the destination.
+    Args:
+        src_root: the source root directory.
+        dst_root: the destination root directory.
+        relative_dir: the data directory (relative to the source root).
+
+    Returns:
+        A list with a single manifest entry for the archive.
+
+    """
+    src_dir = os.path.join(src_root, relative_dir)
+    archive_path = relative_dir + ".zip"
+    archive_file = os.path.join(dst_root, archive_path)
+    os.makedirs(os.path.dirname(archive_file), exist_ok=True)
+
+    with zipfile.ZipFile(archive_file, "w", zipfile.ZIP_DEFLATED) as zout:
+        for file_name in sorted(os.listdir(src_dir)):
+            src_file = os.path.join(src_dir, file_name)
+            if os.path.isfile(src_file):
+                zout.write(src_file, file_name)
+
+    size, checksum = file_checksum(archive_file)
+
+    return [{"path": archive_path, "size": size, "checksum": checksum}]
+
+
+def write_manifest(dst_root, entries, archived):
+    r"""
+    Write a manifest file.
+    Args:
+        dst_root: the directory that the manifest describes.
+        entries: a list of manifest entries.
+        archived: flag set to True if the entries are per object archives.
+
+    Returns:
+        The manifest file name.
+
+    """
+    manifest_file = os.path.join(dst_root, MANIFEST_FILE_NAME)
+    with open(manifest_file, "w") as fout:
+        json.dump({
+            "algorithm": CHECKSUM_ALGORITHM,
+            "archived": archived,
+            "total_size": sum(entry["size"] for entry in entries),
+            "entries": sorted(entries, key=lambda entry: entry["path"])
+        }, fout, indent=4)
+        fout.write("\n")
+
+    return manifest_file
+
+
+def read_manifest(root):
+    r"""
+    Read the manifest file of a directory.
+    Args:
+        root: the directory that the manifest describes.
+
+    Returns:
+        The manifest as a python dictionary.
+
+    """
+    with open(os.path.join(root, MANIFEST_FILE_NAME), "r") as fin:
+        return json.load(fin)
+
+
+def verify_entry(root, entry):
+    r"""
+    Verify a single manifest entry.
+    Args:
+        root: the directory that the manifest describes.
+        entry: a manifest entry.
+
+    Returns:
+        An error message if the file is missing or differs from the entry, otherwise None.
+
+    """
+    file_name = os.path.join(root, entry["path"])
+    if not os.path.isfile(file_name):
+        return "missing file '{}'".format(entry["path"])
+
+    if os.path.getsize(file_name) != entry["size"]:
+        return "size mismatch for '{}' (expected {}, found {})".format(
+            entry["path"], entry["size"], os.path.getsize(file_name)
+        )
+
+    _, checksum = file_checksum(file_name)
+    if checksum != entry["checksum"]:
+        return "checksum mismatch for '{}'".format(entry["path"])
+
+    return None
+
+
+def verify_manifest(root, max_workers=DEFAULT_MAX_WORKERS, manifest=None):
+    r"""
+    Verify the files of a directory against its manifest, in parallel.
+    Args:
+        root: the directory that the manifest describes.
+        max_workers: the maximum number of threads used.
+        manifest: the manifest to verify against, if None the manifest file in 'root' is used.
+
+    Returns:
+        A list of error messages (an empty list means that every file was verified).
+
+    """
+    if manifest is None:
+        manifest = read_manifest(root)
+
+    if manifest["algorithm"] != CHECKSUM_ALGORITHM:
+        raise ValueError("Unsupported manifest checksum algorithm '{}'".format(manifest["algorithm"]))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        errors = executor.map(lambda entry: verify_entry(root, entry), manifest["entries"])
+        return [error for error in errors if error is not None]
+
+
+def parallel_transfer(src_root, dst_root, relative_dirs, archived=False, max_workers=DEFAULT_MAX_WORKERS,
+                      progress=None):
+    r"""
+    Transfer a collection of data directories from one root to another in parallel, and write a manifest.
+    Args:
+        src_root: the source root directory.
+        dst_root: the destination root directory.
+        relative_dirs: an iterable of data directories (relative to the source root).
+        archived: flag set to True if each data directory should be streamed in to its own zip archive.
+        max_workers: the maximum number of threads used.
+        progress: an optional function that is called with the number of directories transferred so far.
+
+    Returns:
+        The manifest file name.
+
+    """
+    os.makedirs(dst_root, exist_ok=True)
+    transfer = archive_data_dir if archived else copy_data_dir
+
+    entries = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda relative_dir: transfer(src_root, dst_root, relative_dir), relative_dirs)
+        for count, dir_entries in enumerate(results, start=1):
+            entries.extend(dir_entries)
+            if progress is not None:
+                progress(count)
+
+    return write_manifest(dst_root, entries, archived)
+
+
+def extract_archive_entry(src_root, dst_root, entry):
+    r"""
+    Extract a single per object archive to its data directory.
+    Args:
+        src_root: the directory holding the archives.
+        dst_root: the destination root directory.
+        entry: the manifest entry of the archive.
+
+    Returns:
+        None.
+
+    """
+    relative_dir = entry["path"][:-len(".zip")]
+    dst_dir = os.path.join(dst_root, relative_dir)
+    os.makedirs(dst_dir, exist_ok=True)
+
+    with zipfile.ZipFile(os.path.join(src_root, entry["path"]), "r") as zin:
+        zin.extractall(dst_dir)
+
+
+def copy_file_entry(src_root, dst_root, entry):
+    r"""
+    Copy a single file in a manifest.
+    Args:
+        src_root: the directory that the manifest describes.
+        dst_root: the destination root directory.
+        entry: the manifest entry of the file.
+
+    Returns:
+        None.
+
+    """
+    dst_file = os.path.join(dst_root, entry["path"])
+    os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+    shutil.copy2(os.path.join(src_root, entry["path"]), dst_file)
+
+
+def parallel_import(src_root, dst_root, max_workers=DEFAULT_MAX_WORKERS, verify=True, progress=None):
+    r"""
+    Import transferred data (as written by `parallel_transfer`) in to a root directory in parallel.
+    Args:
+        src_root: the transferred data directory (containing a manifest).
+        dst_root: the destination root directory.
+        max_workers: the maximum number of threads used.
+        verify: flag set to True if the transferred data should be verified against the manifest before import.
+        progress: an optional function that is called with the number of manifest entries imported so far.
+
+    Returns:
+        None.
+
+    Raises:
+        ValueError if verification fails, in which case nothing is imported.
+
+    """
+    manifest = read_manifest(src_root)
+
+    if verify:
+        errors = verify_manifest(src_root, max_workers, manifest)
+        if errors:
+            raise ValueError("Transferred data in '{}' failed verification:\n{}".format(src_root, "\n".join(errors)))
+
+    transfer = extract_archive_entry if manifest["archived"] else copy_file_entry
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda entry: transfer(src_root, dst_root, entry), manifest["entries"])
+        for count, _ in enumerate(results, start=1):
+            if progress is not None:
+                progress(count)
+
+
+def export_data_files(directory_name, dir_path, unique_ids, archived=False, max_workers=DEFAULT_MAX_WORKERS,
+                      progress=None):
+    r"""
+    Export the data files of geometries, models or NEBs from the file root to '<dir_path>/<directory_name>'.
+    Args:
+        directory_name: the file root directory of the objects, i.e. one of GLOBAL.GEOMETRY_DIRECTORY_NAME,
+                        GLOBAL.MODEL_DIRECTORY_NAME or GLOBAL.NEB_DIRECTORY_NAME.
+        dir_path: the destination path to export files to.
+        unique_ids: the unique ids of the objects to export.
+        archived: flag set to True if each object should be exported as its own zip archive.
+        max_workers: the maximum number of threads used.
+        progress: an optional function that is called with the number of objects exported so far.
+
+    Returns:
+        The manifest file name.
+
+    """
+    if directory_name not in DATA_FILE_DIRECTORY_NAMES:
+        raise ValueError("Unknown data file directory '{}'".format(directory_name))
+
+    config = read_config_from_environ()
+
+    return parallel_transfer(
+        os.path.join(config.database.file_root, directory_name),
+        os.path.join(dir_path, directory_name),
+        (uid_to_dir(unique_id) for unique_id in unique_ids),
+        archived, max_workers, progress
+    )
+
+
+def import_data_files(directory_name, dir_path, max_workers=DEFAULT_MAX_WORKERS, verify=True, progress=None):
+    r"""
+    Import exported data files of geometries, models or NEBs from '<dir_path>/<directory_name>' in to the file root.
+    Args:
+        directory_name: the file root directory of the objects, i.e. one of GLOBAL.GEOMETRY_DIRECTORY_NAME,
+                        GLOBAL.MODEL_DIRECTORY_NAME or GLOBAL.NEB_DIRECTORY_NAME.
+        dir_path: the path holding the exported files.
+        max_workers: the maximum number of threads used.
+        verify: flag set to True if the exported data should be verified against its manifest before import.
+        progress: an optional function that is called with the number of files/archives imported so far.
+
+    Returns:
+        None.
+
+    """
+    if directory_name not in DATA_FILE_DIRECTORY_NAMES:
+        raise ValueError("Unknown data file directory '{}'".format(directory_name))
+
+    config = read_config_from_environ()
+
+    parallel_import(
+        os.path.join(dir_path, directory_name),
+        os.path.join(config.database.file_root, directory_name),
+        max_workers, verify, progress
+    )
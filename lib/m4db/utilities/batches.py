@@ -0,0 +1,23 @@
+r"""
+A collection of utility routines to split work into fixed size batches.
+"""
+
+from itertools import islice
+
+
+def batches(iterable, batch_size: int):
+    r"""
+    Split an iterable in to lists of at most `batch_size` items.
+    :param iterable: the iterable to split.
+    :param batch_size: the maximum number of items in each batch.
+    :return: a generator of lists.
+    """
+    if batch_size < 1:
+        raise ValueError("The batch size must be at least 1.")
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if len(batch) == 0:
+            return
+        yield batch
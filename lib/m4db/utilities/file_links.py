@@ -0,0 +1,90 @@
+r"""
+Store a file more than once without storing its contents more than once: files are hard linked where possible,
+otherwise reflinked (a copy-on-write clone, on file systems that support them, e.g. btrfs and XFS) and otherwise
+copied.
+"""
+
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# The Linux ioctl request that clones a file (see ioctl_ficlone(2)).
+FICLONE = 0x40049409
+
+LINK_METHOD_HARDLINK = "hardlink"
+LINK_METHOD_REFLINK = "reflink"
+LINK_METHOD_COPY = "copy"
+
+
+def reflink(source, destination):
+    r"""
+    Create a copy-on-write clone of a file.
+
+    :param source: the source file.
+    :param destination: the destination file, this must not already exist.
+
+    :return: None, an OSError is raised if the file system does not support reflinks.
+    """
+    if fcntl is None:
+        raise OSError("Reflinks are not supported on this platform.")
+
+    with open(source, "rb") as fin, open(destination, "xb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            os.remove(destination)
+            raise
+
+
+def link_or_copy(source, destination):
+    r"""
+    Place a file at a destination by hard linking, reflinking or (failing both of those) copying it. The file is
+    created under a temporary name first and then moved in to place, so an existing destination is replaced
+    atomically.
+
+    :param source: the source file.
+    :param destination: the destination file.
+
+    :return: the method used, one of LINK_METHOD_HARDLINK, LINK_METHOD_REFLINK or LINK_METHOD_COPY.
+    """
+    if not os.path.isfile(source):
+        raise IOError(f"Could not find '{source}'.")
+
+    temporary_file = f"{destination}.tmp"
+    if os.path.lexists(temporary_file):
+        os.remove(temporary_file)
+
+    try:
+        os.link(source, temporary_file)
+        method = LINK_METHOD_HARDLINK
+    except OSError:
+        try:
+            reflink(source, temporary_file)
+            method = LINK_METHOD_REFLINK
+        except OSError:
+            shutil.copyfile(source, temporary_file)
+            method = LINK_METHOD_COPY
+
+    os.replace(temporary_file, destination)
+
+    return method
+
+
+def same_file(file_name1, file_name2):
+    r"""
+    Check whether two file names refer to the same file (e.g. because one is a hard link of the other).
+
+    :param file_name1: the first file name.
+    :param file_name2: the second file name.
+
+    :return: True if both files exist and are the same file, otherwise False.
+    """
+    try:
+        return os.path.samefile(file_name1, file_name2)
+    except OSError:
+        return False
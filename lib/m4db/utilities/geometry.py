@@ -6,6 +6,13 @@ import numpy as np
 
 from math import sqrt
 
+from m4db.utilities.mesh_statistics import edge_lengths
+from m4db.utilities.mesh_statistics import edge_statistics
+from m4db.utilities.mesh_statistics import element_volumes
+from m4db.utilities.mesh_statistics import unique_edges
+
+from m4db.utilities.logger import get_logger
+
 
 def tetra_volume(v0, v1, v2, v3):
     r"""
@@ -55,23 +62,13 @@ def geometry_volume(vertices, elements):
     :param elements: the element indices of the mesh.
     :return: the total volume of a geometry.
     """
-
-    # For each tetrahedron calculate a volume
-    tetra_volumes = []
-    for elem_idxs in elements:
-        v0 = vertices[elem_idxs[0]]
-        v1 = vertices[elem_idxs[1]]
-        v2 = vertices[elem_idxs[2]]
-        v3 = vertices[elem_idxs[3]]
-        tetra_volumes.append(tetra_volume(v0, v1, v2, v3))
-
-    # Return the sum total volume
-    return sum(tetra_volumes)
+    return float(element_volumes(vertices, elements).sum())
 
 
 def geometry_edge_stats(vertices, elements):
     r"""
-    Compute statistics related to tetrahedral edge lengths of a geometry
+    Compute statistics related to tetrahedral edge lengths of a geometry (over all six edges of every element, each
+    unique edge is counted once).
     :param vertices: the vertices of the mesh.
     :param elements: the element indices of the mesh.
     :return: a tuple containing:
@@ -80,25 +77,9 @@ def geometry_edge_stats(vertices, elements):
                 maximum edge length,
                 minimum edge length
     """
-    # For each unique edge, calculate a distance.
-    edge_lengths = {}
-    for elem_idxs in elements[:, 0:3]:
-        for vidx_i in range(len(elem_idxs)):
-            for vidx_j in range(vidx_i+1, len(elem_idxs)):
-                edge_key = order_pair((elem_idxs[vidx_i], elem_idxs[vidx_j]))
-
-                if (edge_key[0] == edge_key[1]):
-                    print("WARNING: defective edge key for element {}".format(elem_idxs))
-
-                if order_pair(edge_key) not in edge_lengths:
-                    v_i = vertices[edge_key[0]]
-                    v_j = vertices[edge_key[1]]
-                    edge_lengths[edge_key] = edge_length(v_i, v_j)
-
-                    if abs(edge_lengths[edge_key]) < 1E-15:
-                        print("WARNING: there is a zero edge length!")
-                        print("edge key: {}".format(edge_key))
-
-    # Take the average
-    lengths = list(edge_lengths.values())
-    return np.average(lengths), np.std(lengths), max(lengths), min(lengths)
+    lengths = edge_lengths(vertices, unique_edges(elements))
+
+    if np.any(lengths < 1E-15):
+        get_logger().warning("There is a zero edge length!")
+
+    return edge_statistics(lengths)
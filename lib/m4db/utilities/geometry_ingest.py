@@ -0,0 +1,192 @@
+r"""
+The geometry ingest stage: a patran file is read (and hashed) once when a geometry is added, everything that is stored
+on the geometry row is computed from the parsed mesh and a binary sidecar of the mesh is written next to the patran
+file, so that later consumers never have to parse the ASCII file again.
+
+Geometries with identical patran files (i.e. the same content hash) share a single copy of the patran file and the
+sidecar, the files in each geometry directory are links to the same data (see `m4db.utilities.file_links`).
+"""
+
+import hashlib
+import os
+
+from collections import namedtuple
+
+from m4db.file_io.mesh_sidecar import read_mesh
+from m4db.file_io.mesh_sidecar import write_mesh_sidecar
+from m4db.file_io.patran import parse_patran
+
+from m4db.utilities.directories import geometry_directory
+from m4db.utilities.file_links import link_or_copy
+from m4db.utilities.file_links import same_file
+from m4db.utilities.geometry import geometry_edge_stats
+from m4db.utilities.geometry import geometry_volume
+
+from m4db import GLOBAL
+
+# The hash algorithm used for geometry file contents.
+CONTENT_HASH_ALGORITHM = "sha256"
+
+# The number of bytes hashed at a time when hashing files.
+CONTENT_HASH_BLOCK_SIZE = 1024 * 1024
+
+MeshIngest = namedtuple("MeshIngest", ["vertices", "elements", "submesh_ids", "content_hash"])
+
+
+def content_hash(data):
+    r"""
+    Compute the content hash of some data.
+
+    :param data: the bytes to hash.
+
+    :return: the hex digest of the data.
+    """
+    return hashlib.new(CONTENT_HASH_ALGORITHM, data).hexdigest()
+
+
+def file_content_hash(file_name, block_size=CONTENT_HASH_BLOCK_SIZE):
+    r"""
+    Compute the content hash of a file, the file is read in blocks.
+
+    :param file_name: the file to hash.
+    :param block_size: the number of bytes read at a time.
+
+    :return: the hex digest of the file contents.
+    """
+    digest = hashlib.new(CONTENT_HASH_ALGORITHM)
+    with open(file_name, "rb") as fin:
+        for block in iter(lambda: fin.read(block_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def ingest_patran(patran_file):
+    r"""
+    Read and hash a patran file, the file is read from disk exactly once.
+
+    :param patran_file: the patran file name.
+
+    :return: a MeshIngest with the mesh vertices, elements, submesh indices and the content hash of the file.
+    """
+    with open(patran_file, "rb") as fin:
+        data = fin.read()
+
+    vertices, elements, submesh_ids = parse_patran(data.decode())
+
+    return MeshIngest(vertices, elements, submesh_ids, content_hash(data))
+
+
+def geometry_fields(ingest):
+    r"""
+    Compute the geometry row fields that are derived from a mesh.
+
+    :param ingest: a MeshIngest.
+
+    :return: a dictionary of Geometry column values.
+    """
+    volume = geometry_volume(ingest.vertices, ingest.elements)
+    avg_edge_length, std_dev_edge_length, max_edge_length, min_edge_length = geometry_edge_stats(
+        ingest.vertices, ingest.elements
+    )
+
+    return {
+        "nelements": len(ingest.elements),
+        "nvertices": len(ingest.vertices),
+        "nsubmeshes": len(ingest.submesh_ids),
+        "computed_volume": volume,
+        "computed_element_length_average": avg_edge_length,
+        "computed_element_length_standard_deviation": std_dev_edge_length,
+        "computed_element_length_minimum": min_edge_length,
+        "computed_element_length_maximum": max_edge_length,
+        "content_hash": ingest.content_hash,
+        "has_patran": True
+    }
+
+
+def write_geometry_sidecar(dest_dir, ingest):
+    r"""
+    Write the mesh sidecar of a geometry.
+
+    :param dest_dir: the geometry directory.
+    :param ingest: a MeshIngest.
+
+    :return: the sidecar file name.
+    """
+    sidecar_file = os.path.join(dest_dir, GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME)
+    write_mesh_sidecar(sidecar_file, ingest.vertices, ingest.elements, ingest.submesh_ids, ingest.content_hash)
+
+    return sidecar_file
+
+
+def shared_geometry_directory(geometries):
+    r"""
+    Find a geometry directory from which an identical patran file (and sidecar) can be shared.
+
+    :param geometries: geometries with the same content hash (see `get_geometries_by_content_hash`).
+
+    :return: the directory of the first geometry that has a patran file in the data store, or None.
+    """
+    for geometry in geometries:
+        dest_dir = geometry_directory(geometry.unique_id)
+        if os.path.isfile(os.path.join(dest_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME)):
+            return dest_dir
+
+    return None
+
+
+def link_geometry_files(source_dir, dest_dir):
+    r"""
+    Link the patran file and mesh sidecar of one geometry directory in to another (files that are already the same are
+    left alone, and a missing sidecar is skipped).
+
+    :param source_dir: the geometry directory that holds the files.
+    :param dest_dir: the geometry directory that should share them.
+
+    :return: a dictionary of the link method used, keyed on file name.
+    """
+    methods = {}
+    for file_name in [GLOBAL.GEOMETRY_PATRAN_FILE_NAME, GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME]:
+        source = os.path.join(source_dir, file_name)
+        destination = os.path.join(dest_dir, file_name)
+        if file_name == GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME and not os.path.isfile(source):
+            continue
+        if not same_file(source, destination):
+            methods[file_name] = link_or_copy(source, destination)
+
+    return methods
+
+
+def store_geometry_mesh(dest_dir, ingest, shared_dir=None):
+    r"""
+    Store the mesh sidecar of a geometry, shared with an identical geometry if possible.
+
+    :param dest_dir: the geometry directory.
+    :param ingest: a MeshIngest.
+    :param shared_dir: the directory of a geometry with the same content hash, or None.
+
+    :return: None.
+    """
+    if shared_dir is not None and os.path.isfile(os.path.join(shared_dir, GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME)):
+        link_geometry_files(shared_dir, dest_dir)
+    else:
+        write_geometry_sidecar(dest_dir, ingest)
+
+
+def read_geometry_mesh(unique_id, content_hash=None):
+    r"""
+    Read the mesh of a geometry in the data store, from its sidecar if there is one.
+
+    :param unique_id: the geometry unique id.
+    :param content_hash: if given, the sidecar is only used if it was written with this content hash (usually the
+                         `content_hash` of the geometry row).
+
+    :return: a 3-tuple containing the mesh vertices, elements, and submesh indices (as `read_patran`).
+    """
+    dest_dir = geometry_directory(unique_id)
+
+    return read_mesh(
+        os.path.join(dest_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME),
+        os.path.join(dest_dir, GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME),
+        content_hash
+    )
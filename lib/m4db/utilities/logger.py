@@ -2,11 +2,22 @@ r"""
 Return a logging object.
 """
 
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 
+from m4db.decorators import static
+
 from m4db import GLOBAL
 
+# The attributes that every log record has, anything else on a record was passed as an 'extra' field.
+LOG_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.NOTSET, "", 0, "", None, None)).keys()) | \
+                        {"message", "asctime"}
+
 
 def str_to_log_level(log_level: str):
     r"""
@@ -30,13 +41,94 @@ def str_to_log_level(log_level: str):
         raise ValueError(f"Unknown log level '{log_level}'.")
 
 
-def setup_logger(log_file: str = None, log_level: str = None, log_to_stdout=False):
+class JSONFormatter(logging.Formatter):
+    r"""
+    Format log records as single line JSON objects, any 'extra' fields passed with a record are included as keys of
+    the object.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "pathname": record.pathname,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in LOG_RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    r"""
+    Keep a fraction of debug records (every record at a higher level is kept), the records kept are evenly spaced so
+    that e.g. a rate of 0.1 keeps every tenth debug record.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.counter = itertools.count(1)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        n = next(self.counter)
+        return int(n * self.rate) != int((n - 1) * self.rate)
+
+
+def log_file_handler(log_file: str, rotation: str = None, max_bytes: int = 10485760, when: str = "midnight",
+                     backup_count: int = 5):
+    r"""
+    Create a handler that writes to a log file.
+    :param log_file: the name of the file to write logging data to.
+    :param rotation: None (or 'none') for no rotation, 'size' to rotate after 'max_bytes' or 'time' to rotate at the
+                     interval given by 'when'.
+    :param max_bytes: the size (in bytes) at which the file is rotated when rotating by size.
+    :param when: the interval (see `logging.handlers.TimedRotatingFileHandler`) when rotating by time.
+    :param backup_count: the number of rotated files to keep.
+    :return: a logging handler.
+    """
+    if rotation is None or rotation == "none":
+        return logging.FileHandler(log_file)
+    elif rotation == "size":
+        return logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+    elif rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count)
+    else:
+        raise ValueError(f"Unknown log rotation '{rotation}'.")
+
+
+@static(handlers=[], listeners=[], sampler=None)
+def setup_logger(log_file: str = None, log_level: str = None, log_to_stdout=False, use_queue=False, structured=False,
+                 debug_sample_rate=1.0, rotation=None, max_bytes=10485760, when="midnight", backup_count=5):
     r"""
+    Set up the global application logger, handlers are added to those of any previous call.
+
+    In queue mode the logger only puts records on an in-memory queue and a background listener thread formats them
+    and writes them to the file/stdout handlers, so that the caller (e.g. a web request) never waits on log I/O. The
+    listener is stopped (and the queue flushed) at exit or by `stop_logger`.
+
     :param log_file: the name of a file to write logging data to.
     :param log_level: the level at which to perform logging.
     :param log_to_stdout: boolean flag, if true logging information is displayed on standard output.
-    :return:
+    :param use_queue: boolean flag, if true logging is performed through a queue and a background thread.
+    :param structured: boolean flag, if true each record is written as a JSON object (see `JSONFormatter`).
+    :param debug_sample_rate: the fraction of debug records that are kept (see `DebugSampler`), the rate of the most
+                              recent call applies.
+    :param rotation: the log file rotation (see `log_file_handler`).
+    :param max_bytes: the size (in bytes) at which the log file is rotated when rotating by size.
+    :param when: the interval at which the log file is rotated when rotating by time.
+    :param backup_count: the number of rotated log files to keep.
+    :return: None
     """
+    self = setup_logger
 
     # Set up logging
     if log_level is None:
@@ -44,19 +136,73 @@ def setup_logger(log_file: str = None, log_level: str = None, log_to_stdout=Fals
     logger = logging.getLogger(GLOBAL.LOGGER_NAME)
     logger.setLevel(str_to_log_level(log_level))
 
+    handlers = []
     if log_file is not None:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(str_to_log_level(log_level))
-        file_formatter = logging.Formatter(GLOBAL.LOGGER_FORMAT)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-
+        handlers.append(log_file_handler(log_file, rotation, max_bytes, when, backup_count))
     if log_to_stdout:
-        stream_handler = logging.StreamHandler(sys.stdout)
-        stream_handler.setLevel(str_to_log_level(log_level))
-        stream_formatter = logging.Formatter(GLOBAL.LOGGER_FORMAT)
-        stream_handler.setFormatter(stream_formatter)
-        logger.addHandler(stream_handler)
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setLevel(str_to_log_level(log_level))
+        handler.setFormatter(JSONFormatter() if structured else logging.Formatter(GLOBAL.LOGGER_FORMAT))
+
+    if use_queue and handlers:
+        listener = logging.handlers.QueueListener(queue.SimpleQueue(), *handlers, respect_handler_level=True)
+        listener.start()
+        self.listeners.append(listener)
+        handlers = [logging.handlers.QueueHandler(listener.queue)]
+
+    for handler in handlers:
+        logger.addHandler(handler)
+        self.handlers.append(handler)
+
+    # Sampling is done on the logger, so that dropped records are never formatted or queued.
+    if self.sampler is not None:
+        logger.removeFilter(self.sampler)
+        self.sampler = None
+    if debug_sample_rate < 1.0:
+        self.sampler = DebugSampler(debug_sample_rate)
+        logger.addFilter(self.sampler)
+
+
+def setup_logger_from_config(logging_config):
+    r"""
+    Set up the global application logger from the logging section of the configuration.
+    :param logging_config: the logging configuration (see `m4db.configuration.Logging`).
+    :return: None
+    """
+    setup_logger(logging_config.file, logging_config.level, logging_config.log_to_stdout,
+                 use_queue=logging_config.queue,
+                 structured=logging_config.structured,
+                 debug_sample_rate=logging_config.debug_sample_rate,
+                 rotation=logging_config.rotation,
+                 max_bytes=logging_config.max_bytes,
+                 when=logging_config.when,
+                 backup_count=logging_config.backup_count)
+
+
+@atexit.register
+def stop_logger():
+    r"""
+    Remove the handlers (and sampler) added by `setup_logger`, if logging is performed through a queue the listener is
+    stopped once every queued record has been written.
+    :return: None
+    """
+    self = setup_logger
+    logger = logging.getLogger(GLOBAL.LOGGER_NAME)
+    for handler in self.handlers:
+        logger.removeHandler(handler)
+        handler.close()
+    if self.sampler is not None:
+        logger.removeFilter(self.sampler)
+
+    for listener in self.listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+    self.handlers = []
+    self.listeners = []
+    self.sampler = None
 
 
 def get_logger():
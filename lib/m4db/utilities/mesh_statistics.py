@@ -0,0 +1,314 @@
+r"""
+A collection of vectorised routines to compute statistics and quality metrics of tetrahedral meshes.
+
+All routines operate on a whole mesh at once, i.e. `vertices` is an (nvertices, 3) array of vertex positions and
+`elements` is an (nelements, >= 4) integer array whose first four columns are (zero based) vertex indices (further
+columns, such as the submesh index of a patran element, are ignored). Internally vectors are held as (3, n) arrays so
+that cross and dot products are plain element-wise arithmetic over contiguous rows.
+"""
+
+import numpy as np
+
+# The vertex index pairs of the six edges of a tetrahedron.
+TETRAHEDRON_EDGES = np.array([[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]])
+
+# The pairs of faces (each face is identified by its opposite vertex) that meet at each edge in TETRAHEDRON_EDGES,
+# i.e. edge (i, j) is shared by the faces opposite the two remaining vertices.
+TETRAHEDRON_EDGE_FACES = np.array([[2, 3], [1, 3], [1, 2], [0, 3], [0, 2], [0, 1]])
+
+
+def cross(u, v):
+    r"""
+    Compute the cross products of two sets of vectors.
+    :param u: a (3, n) array of vectors.
+    :param v: a (3, n) array of vectors.
+    :return: a (3, n) array of vectors.
+    """
+    return np.array([
+        u[1] * v[2] - u[2] * v[1],
+        u[2] * v[0] - u[0] * v[2],
+        u[0] * v[1] - u[1] * v[0]
+    ])
+
+
+def dot(u, v):
+    r"""
+    Compute the dot products of two sets of vectors.
+    :param u: a (3, n) array of vectors.
+    :param v: a (3, n) array of vectors.
+    :return: an array of n dot products.
+    """
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def norm(u):
+    r"""
+    Compute the lengths of a set of vectors.
+    :param u: a (3, n) array of vectors.
+    :return: an array of n lengths.
+    """
+    return np.sqrt(dot(u, u))
+
+
+def element_edge_vectors(vertices, elements):
+    r"""
+    Compute the vectors from the first vertex of each element to its other three vertices.
+    :param vertices: the vertices of the mesh.
+    :param elements: the element indices of the mesh.
+    :return: a three-tuple of (3, nelements) arrays, i.e. v1 - v0, v2 - v0 and v3 - v0.
+    """
+    positions = np.ascontiguousarray(np.asarray(vertices, dtype=np.float64).T)
+    elements = np.asarray(elements)
+
+    origins = positions[:, elements[:, 0]]
+
+    return tuple(positions[:, elements[:, index]] - origins for index in (1, 2, 3))
+
+
+def face_normals(a, b, c):
+    r"""
+    Compute the normals of the four faces of each element, the normals all point outwards for positively oriented
+    elements (and all inwards otherwise) and the length of each normal is twice the area of its face.
+    :param a: the (3, n) array of v1 - v0 vectors.
+    :param b: the (3, n) array of v2 - v0 vectors.
+    :param c: the (3, n) array of v3 - v0 vectors.
+    :return: a list of four (3, n) arrays, the i-th normal is the normal of the face opposite the i-th vertex.
+    """
+    normals = [None, -cross(b, c), cross(a, c), -cross(a, b)]
+
+    # The (area weighted) normals of a closed surface sum to zero, which saves a cross product.
+    normals[0] = -(normals[1] + normals[2] + normals[3])
+
+    return normals
+
+
+def normal_lengths(normals):
+    r"""
+    Compute the lengths of the face normals of each element.
+    :param normals: the face normals (see `face_normals`).
+    :return: a (4, n) array of lengths.
+    """
+    return np.sqrt(np.array([dot(normal, normal) for normal in normals]))
+
+
+def signed_element_volumes(vertices, elements):
+    r"""
+    Compute the signed volume of each element (the sign depends on the element's vertex ordering).
+    :param vertices: the vertices of the mesh.
+    :param elements: the element indices of the mesh.
+    :return: an array of nelements volumes.
+    """
+    a, b, c = element_edge_vectors(vertices, elements)
+    return dot(a, cross(b, c)) / 6.0
+
+
+def element_volumes(vertices, elements):
+    r"""
+    Compute the volume of each element.
+    :param vertices: the vertices of the mesh.
+    :param elements: the element indices of the mesh.
+    :return: an array of nelements volumes.
+    """
+    return np.abs(signed_element_volumes(vertices, elements))
+
+
+def unique_edge_keys(elements):
+    r"""
+    Find the unique edges of a mesh, encoded as single integers: an edge (i, j) with i < j has the key
+    i * stride + j.
+    :param elements: the element indices of the mesh.
+    :return: a pair containing the sorted array of unique keys and the stride.
+    """
+    # With the vertices of each element in ascending order, the first vertex of each edge in TETRAHEDRON_EDGES is
+    # always the smaller one.
+    tets = np.sort(np.asarray(elements)[:, 0:4], axis=1).T.astype(np.int64)
+    stride = np.int64(tets[3].max()) + 1 if tets.shape[1] > 0 else np.int64(1)
+
+    keys = np.empty((len(TETRAHEDRON_EDGES), tets.shape[1]), dtype=np.int64)
+    for key, (first, second) in zip(keys, TETRAHEDRON_EDGES):
+        np.multiply(tets[first], stride, out=key)
+        key += tets[second]
+
+    # Sort and drop repeats (i.e. a 1D unique, which is much faster than a unique over rows).
+    keys = keys.ravel()
+    keys.sort()
+    if len(keys) > 0:
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+    return keys, stride
+
+
+def unique_edges(elements):
+    r"""
+    Find the unique edges of a mesh, each edge is returned once (with its smallest vertex index first) no matter how
+    many elements share it.
+    :param elements: the element indices of the mesh.
+    :return: an (nedges, 2) array of vertex indices sorted by first and then second index.
+    """
+    keys, stride = unique_edge_keys(elements)
+
+    return np.column_stack((keys // stride, keys % stride))
+
+
+def edge_lengths(vertices, edges):
+    r"""
+    Compute the length of each edge.
+    :param vertices: the vertices of the mesh.
+    :param edges: an (nedges, 2) array of vertex indices.
+    :return: an array of nedges lengths.
+    """
+    positions = np.asarray(vertices, dtype=np.float64).T
+    return norm(positions[:, edges[:, 1]] - positions[:, edges[:, 0]])
+
+
+def edge_key_lengths(vertices, keys, stride):
+    r"""
+    Compute the length of each edge given by its key (see `unique_edge_keys`).
+    :param vertices: the vertices of the mesh.
+    :param keys: an array of edge keys.
+    :param stride: the stride of the keys.
+    :return: an array of lengths.
+    """
+    positions = np.asarray(vertices, dtype=np.float64).T
+    firsts = keys // stride
+
+    return norm(positions[:, keys - firsts * stride] - positions[:, firsts])
+
+
+def edge_statistics(lengths):
+    r"""
+    Compute statistics related to edge lengths.
+    :param lengths: an array of edge lengths.
+    :return: a tuple containing:
+                average edge length,
+                standard deviation of edge length,
+                maximum edge length,
+                minimum edge length
+    """
+    return float(np.average(lengths)), float(np.std(lengths)), float(np.max(lengths)), float(np.min(lengths))
+
+
+def aspect_ratios_from_edge_vectors(a, b, c, lengths, volumes):
+    r"""
+    Compute the aspect ratio of each element (see `aspect_ratios`).
+    :param a: the (3, n) array of v1 - v0 vectors.
+    :param b: the (3, n) array of v2 - v0 vectors.
+    :param c: the (3, n) array of v3 - v0 vectors.
+    :param lengths: the lengths of the face normals (see `normal_lengths`).
+    :param volumes: the volume of each element.
+    :return: an array of n aspect ratios.
+    """
+    longest_edges = dot(a, a)
+    for edge in [b, c, b - a, c - a, c - b]:
+        np.maximum(longest_edges, dot(edge, edge), out=longest_edges)
+    np.sqrt(longest_edges, out=longest_edges)
+    surface_areas = 0.5 * lengths.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inradii = 3.0 * volumes / surface_areas
+        return np.where(inradii > 0, longest_edges / (2.0 * np.sqrt(6.0) * inradii), np.inf)
+
+
+def aspect_ratios(vertices, elements):
+    r"""
+    Compute the aspect ratio of each element, i.e. the ratio of the longest edge to the inradius normalised so that a
+    regular tetrahedron has an aspect ratio of one; the ratio grows without bound as an element degenerates.
+    :param vertices: the vertices of the mesh.
+    :param elements: the element indices of the mesh.
+    :return: an array of nelements aspect ratios (infinite for elements with no volume).
+    """
+    a, b, c = element_edge_vectors(vertices, elements)
+    normals = face_normals(a, b, c)
+    return aspect_ratios_from_edge_vectors(a, b, c, normal_lengths(normals), np.abs(dot(a, normals[1])) / 6.0)
+
+
+def dihedral_cosines(normals, lengths=None):
+    r"""
+    Compute the cosines of the six dihedral angles of each element.
+    :param normals: the face normals (see `face_normals`).
+    :param lengths: the lengths of the face normals (see `normal_lengths`), computed if not given.
+    :return: an (n, 6) array of cosines, ordered as the edges in TETRAHEDRON_EDGES.
+    """
+    if lengths is None:
+        lengths = normal_lengths(normals)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosines = np.column_stack([-dot(normals[i], normals[j]) / (lengths[i] * lengths[j])
+                                   for i, j in TETRAHEDRON_EDGE_FACES])
+
+    return np.clip(cosines, -1.0, 1.0, out=cosines)
+
+
+def dihedral_angles(vertices, elements):
+    r"""
+    Compute the six (interior) dihedral angles of each element.
+    :param vertices: the vertices of the mesh.
+    :param elements: the element indices of the mesh.
+    :return: an (nelements, 6) array of angles in degrees, ordered as the edges in TETRAHEDRON_EDGES.
+    """
+    return np.degrees(np.arccos(dihedral_cosines(face_normals(*element_edge_vectors(vertices, elements)))))
+
+
+def exchange_length_check(lengths, exchange_length, length_scale=1e-6):
+    r"""
+    Compare edge lengths to the exchange length of a material, micromagnetic models are only reliable if edges are
+    not (much) longer than the exchange length.
+    :param lengths: an array of edge lengths (in units of `length_scale`).
+    :param exchange_length: the exchange length (in metres), for example `m4db.materials.lambda_ex`.
+    :param length_scale: the size of a mesh unit in metres (the default is micrometres).
+    :return: a tuple containing the ratio of the longest edge to the exchange length and the number of edges that
+             are longer than the exchange length.
+    """
+    ratios = np.asarray(lengths) * length_scale / exchange_length
+
+    return float(np.max(ratios)), int(np.count_nonzero(ratios > 1.0))
+
+
+def mesh_statistics(vertices, elements, exchange_length=None, length_scale=1e-6):
+    r"""
+    Compute summary statistics and quality metrics of a mesh.
+    :param vertices: the vertices of the mesh.
+    :param elements: the element indices of the mesh.
+    :param exchange_length: an optional exchange length (in metres) to check edge lengths against.
+    :param length_scale: the size of a mesh unit in metres (the default is micrometres).
+    :return: a dictionary of statistics.
+    """
+    a, b, c = element_edge_vectors(vertices, elements)
+    normals = face_normals(a, b, c)
+    # The face normal lengths are shared by the aspect ratios and the dihedral angles.
+    face_lengths = normal_lengths(normals)
+
+    volumes = np.abs(dot(a, normals[1])) / 6.0
+    lengths = edge_key_lengths(vertices, *unique_edge_keys(elements))
+    average_length, std_dev_length, max_length, min_length = edge_statistics(lengths)
+    ratios = aspect_ratios_from_edge_vectors(a, b, c, face_lengths, volumes)
+
+    # Only the extreme angles are needed, and the angle decreases as its cosine increases.
+    cosines = dihedral_cosines(normals, face_lengths)
+    min_angle, max_angle = np.degrees(np.arccos([np.max(cosines), np.min(cosines)]))
+
+    statistics = {
+        "nvertices": len(vertices),
+        "nelements": len(elements),
+        "nedges": len(lengths),
+        "volume": float(volumes.sum()),
+        "element_volume_minimum": float(volumes.min()),
+        "element_volume_maximum": float(volumes.max()),
+        "degenerate_elements": int(np.count_nonzero(volumes == 0.0)),
+        "edge_length_average": average_length,
+        "edge_length_standard_deviation": std_dev_length,
+        "edge_length_maximum": max_length,
+        "edge_length_minimum": min_length,
+        "degenerate_edges": int(np.count_nonzero(lengths == 0.0)),
+        "aspect_ratio_average": float(np.mean(ratios)),
+        "aspect_ratio_maximum": float(np.max(ratios)),
+        "dihedral_angle_minimum": float(min_angle),
+        "dihedral_angle_maximum": float(max_angle)
+    }
+
+    if exchange_length is not None:
+        max_ratio, nlong_edges = exchange_length_check(lengths, exchange_length, length_scale)
+        statistics["edge_length_exchange_length_ratio_maximum"] = max_ratio
+        statistics["edges_longer_than_exchange_length"] = nlong_edges
+
+    return statistics
@@ -2,6 +2,8 @@ r"""
 A selection of utility routines for dealing with passwords.
 """
 
+import random
+
 from hashlib import md5
 
 from m4db.configuration import read_config_from_environ
@@ -40,6 +42,6 @@ def random_password(length=15, with_specials=True):
     else:
         choose_chars = [ch for ch in chars]
 
-    random.shuffle(choose_chars)
+    random.SystemRandom().shuffle(choose_chars)
 
     return "".join(choose_chars[0:length])
@@ -0,0 +1,93 @@
+r"""
+A collection of utility routines to keep track of database connection pool usage.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+
+from m4db.utilities.request_metrics import record_statement
+
+
+class PoolMetrics:
+    r"""
+    Counts connection pool events for an engine and reports them along with the current state of the pool, the
+    number of SQL statements executed (and the time spent executing them) are also counted, and each statement is
+    attributed to the web request that executed it (see `m4db.utilities.request_metrics.record_statement`).
+    """
+
+    EVENTS = ["connect", "checkout", "checkin", "invalidate"]
+
+    def __init__(self, engine):
+        r"""
+        Start counting the connection pool events of an engine.
+        :param engine: the SQLAlchemy engine.
+        """
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.counts = {name: 0 for name in self.EVENTS}
+        self.statements = 0
+        self.statement_seconds = 0.0
+
+        for name in self.EVENTS:
+            event.listen(engine, name, self.counter(name))
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(engine, "handle_error", self.handle_error)
+
+    def counter(self, name):
+        r"""
+        Create an event listener that increments the count of an event.
+        :param name: the name of the event.
+        :return: the event listener.
+        """
+        def listener(*args):
+            with self.lock:
+                self.counts[name] += 1
+        return listener
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        r"""
+        Record the start time of a statement on the connection (statements may be nested, e.g. by event handlers).
+        """
+        conn.info.setdefault("statement_start_times", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        r"""
+        Count a statement and the time taken to execute it.
+        """
+        seconds = time.perf_counter() - conn.info["statement_start_times"].pop()
+        with self.lock:
+            self.statements += 1
+            self.statement_seconds += seconds
+        record_statement(seconds)
+
+    def handle_error(self, exception_context):
+        r"""
+        Discard the start time of a statement that failed (failed statements are not counted).
+        """
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("statement_start_times"):
+            connection.info["statement_start_times"].pop()
+
+    def as_dict(self):
+        r"""
+        Retrieve the pool metrics.
+        :return: a dictionary containing the pool class, the number of connections currently checked in/out, the
+                 overflow (for queue pools), the number of connects, checkouts, checkins and invalidations so far and
+                 the number of statements executed along with the time spent executing them.
+        """
+        pool = self.engine.pool
+
+        metrics = {"pool": type(pool).__name__}
+        for name in ["size", "checkedin", "checkedout", "overflow"]:
+            if hasattr(pool, name):
+                metrics[name] = getattr(pool, name)()
+
+        with self.lock:
+            metrics.update({"{}s".format(name): count for name, count in self.counts.items()})
+            metrics["statements"] = self.statements
+            metrics["statement_seconds"] = self.statement_seconds
+
+        return metrics
@@ -0,0 +1,311 @@
+r"""
+A collection of utility routines to keep track of web service requests: per route latency histograms, request counts,
+response sizes and the number (and duration) of the SQL statements executed on behalf of each route. Metrics are
+rendered in the Prometheus text exposition format.
+
+SQL statements are attributed to the request that is being handled by the current thread (see `record_statement`,
+which is called from the engine events registered by `m4db.utilities.pool_metrics.PoolMetrics`); statements executed
+elsewhere, e.g. by the single-writer queue, only count towards the per engine totals.
+"""
+
+import bisect
+import threading
+
+from contextvars import ContextVar
+
+from m4db.decorators import static
+
+# The upper bounds (in seconds) of the request latency histogram buckets.
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# The route label used for requests that did not match a route.
+UNMATCHED_ROUTE = "unmatched"
+
+# The content type of the Prometheus text exposition format.
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The statement tally of the request that is handled by the current thread (None outside of a request).
+current_statement_tally = ContextVar("current_statement_tally", default=None)
+
+
+class StatementTally:
+    r"""
+    The number of SQL statements executed (and the time spent executing them) while handling a request.
+    """
+
+    __slots__ = ["statements", "seconds"]
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+def record_statement(seconds):
+    r"""
+    Count a SQL statement against the request that is handled by the current thread, if any.
+    :param seconds: the time taken to execute the statement.
+    :return: None
+    """
+    tally = current_statement_tally.get()
+    if tally is not None:
+        tally.statements += 1
+        tally.seconds += seconds
+
+
+class Histogram:
+    r"""
+    A histogram with fixed bucket upper bounds, the count of each bucket is not cumulative (Prometheus buckets are
+    cumulative, see `cumulative_counts`).
+    """
+
+    __slots__ = ["bounds", "counts", "sum", "count"]
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        r"""
+        Retrieve the cumulative count of each bucket.
+        :return: a list of (upper bound, count) pairs, the last upper bound is '+Inf'.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + ["+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RequestMetrics:
+    r"""
+    Collects the latency, response size and SQL statements of requests, keyed on method and route.
+    """
+
+    def __init__(self, buckets=None):
+        r"""
+        :param buckets: the upper bounds (in seconds) of the latency histogram buckets.
+        """
+        self.buckets = LATENCY_BUCKETS if buckets is None else sorted(buckets)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.latencies = {}
+        self.response_bytes = {}
+        self.statements = {}
+        self.statement_seconds = {}
+
+    def observe(self, method, route, status, seconds, tally=None):
+        r"""
+        Record a request.
+        :param method: the HTTP method of the request.
+        :param route: the route (URI template) of the request.
+        :param status: the response status code.
+        :param seconds: the time taken to handle the request.
+        :param tally: the SQL statements executed while handling the request.
+        :return: None
+        """
+        key = (method, route)
+        with self.lock:
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            if key not in self.latencies:
+                self.latencies[key] = Histogram(self.buckets)
+            self.latencies[key].observe(seconds)
+            if tally is not None:
+                self.statements[key] = self.statements.get(key, 0) + tally.statements
+                self.statement_seconds[key] = self.statement_seconds.get(key, 0.0) + tally.seconds
+
+    def add_response_bytes(self, method, route, nbytes):
+        r"""
+        Record the number of bytes in a response body.
+        :param method: the HTTP method of the request.
+        :param route: the route (URI template) of the request.
+        :param nbytes: the number of bytes.
+        :return: None
+        """
+        with self.lock:
+            self.response_bytes[(method, route)] = self.response_bytes.get((method, route), 0) + nbytes
+
+    def prometheus_lines(self):
+        r"""
+        Retrieve the request metrics in the Prometheus text exposition format.
+        :return: a list of lines.
+        """
+        with self.lock:
+            requests = dict(self.requests)
+            latencies = {key: (histogram.cumulative_counts(), histogram.sum, histogram.count)
+                         for key, histogram in self.latencies.items()}
+            response_bytes = dict(self.response_bytes)
+            statements = dict(self.statements)
+            statement_seconds = dict(self.statement_seconds)
+
+        lines = metric_header("m4db_http_requests_total", "counter", "The number of requests handled.")
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(sample("m4db_http_requests_total", count, method=method, route=route, status=status))
+
+        lines += metric_header("m4db_http_request_duration_seconds", "histogram",
+                               "The time taken to handle requests (excluding the streaming of response bodies).")
+        for (method, route), (buckets, total, count) in sorted(latencies.items()):
+            for bound, bucket_count in buckets:
+                lines.append(sample("m4db_http_request_duration_seconds_bucket", bucket_count,
+                                    method=method, route=route, le=bound))
+            lines.append(sample("m4db_http_request_duration_seconds_sum", total, method=method, route=route))
+            lines.append(sample("m4db_http_request_duration_seconds_count", count, method=method, route=route))
+
+        lines += metric_header("m4db_http_response_bytes_total", "counter",
+                               "The number of bytes sent in response bodies.")
+        for (method, route), nbytes in sorted(response_bytes.items()):
+            lines.append(sample("m4db_http_response_bytes_total", nbytes, method=method, route=route))
+
+        lines += metric_header("m4db_http_db_statements_total", "counter",
+                               "The number of SQL statements executed while handling requests.")
+        for (method, route), count in sorted(statements.items()):
+            lines.append(sample("m4db_http_db_statements_total", count, method=method, route=route))
+
+        lines += metric_header("m4db_http_db_statement_seconds_total", "counter",
+                               "The time spent executing SQL statements while handling requests.")
+        for (method, route), seconds in sorted(statement_seconds.items()):
+            lines.append(sample("m4db_http_db_statement_seconds_total", seconds, method=method, route=route))
+
+        return lines
+
+
+@static(metrics=None)
+def request_metrics():
+    r"""
+    Retrieve the (process wide) request metrics.
+    :return: a RequestMetrics object.
+    """
+    self = request_metrics
+    if self.metrics is None:
+        self.metrics = RequestMetrics()
+    return self.metrics
+
+
+def metric_header(name, metric_type, description):
+    r"""
+    Retrieve the HELP and TYPE lines of a metric.
+    :param name: the metric name.
+    :param metric_type: the metric type (counter, gauge or histogram).
+    :param description: the metric description.
+    :return: a list of lines.
+    """
+    return [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}"]
+
+
+def escape_label_value(value):
+    r"""
+    Escape a label value for the Prometheus text exposition format.
+    :param value: the label value.
+    :return: the escaped value.
+    """
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def sample(name, value, **labels):
+    r"""
+    Retrieve a sample line.
+    :param name: the metric name.
+    :param value: the value of the sample.
+    :param labels: the labels of the sample.
+    :return: the sample line.
+    """
+    if labels:
+        label_text = ",".join(f'{key}="{escape_label_value(label)}"' for key, label in labels.items())
+        return f"{name}{{{label_text}}} {value}"
+    return f"{name} {value}"
+
+
+def pool_metrics_lines(pool_metrics):
+    r"""
+    Retrieve connection pool and engine metrics in the Prometheus text exposition format.
+    :param pool_metrics: a list of engine metrics (see `m4db.sessions.pool_metrics`).
+    :return: a list of lines.
+    """
+    lines = []
+    gauges = [("size", "The size of the connection pool."),
+              ("checkedin", "The number of connections checked in to the pool."),
+              ("checkedout", "The number of connections checked out of the pool."),
+              ("overflow", "The overflow of the connection pool.")]
+    for name, description in gauges:
+        lines += metric_header(f"m4db_db_pool_{name}", "gauge", description)
+        for metrics in pool_metrics:
+            if name in metrics:
+                lines.append(sample(f"m4db_db_pool_{name}", metrics[name], uri=metrics["uri"], pool=metrics["pool"]))
+
+    counters = [("connects", "The number of connections opened."),
+                ("checkouts", "The number of connection checkouts."),
+                ("checkins", "The number of connection checkins."),
+                ("invalidates", "The number of connections invalidated."),
+                ("statements", "The number of SQL statements executed."),
+                ("statement_seconds", "The time spent executing SQL statements.")]
+    for name, description in counters:
+        lines += metric_header(f"m4db_db_{name}_total", "counter", description)
+        for metrics in pool_metrics:
+            if name in metrics:
+                lines.append(sample(f"m4db_db_{name}_total", metrics[name], uri=metrics["uri"], pool=metrics["pool"]))
+
+    return lines
+
+
+def prometheus_text(metrics, pool_metrics=None):
+    r"""
+    Render request metrics (and connection pool metrics) in the Prometheus text exposition format.
+    :param metrics: a RequestMetrics object.
+    :param pool_metrics: a list of engine metrics (see `m4db.sessions.pool_metrics`), or None.
+    :return: the metrics text.
+    """
+    lines = metrics.prometheus_lines()
+    if pool_metrics:
+        lines += pool_metrics_lines(pool_metrics)
+    return "\n".join(lines) + "\n"
+
+
+class CountingIterable:
+    r"""
+    Wrap a response body iterable (of byte strings) so that the number of bytes sent is recorded once the iterable has
+    been consumed (or closed).
+    """
+
+    def __init__(self, iterable, on_close):
+        r"""
+        :param iterable: the response body iterable.
+        :param on_close: a callable that is passed the number of bytes sent when the iterable is closed.
+        """
+        self.iterable = iterable
+        self.on_close = on_close
+        self.nbytes = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.iterable:
+            self.nbytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if hasattr(self.iterable, "close"):
+            self.iterable.close()
+        self.on_close(self.nbytes)
+
+
+class CountingFile(CountingIterable):
+    r"""
+    Wrap a file-like response body so that the number of bytes sent is recorded once the file has been closed.
+    """
+
+    def read(self, size=-1):
+        data = self.iterable.read(size)
+        self.nbytes += len(data)
+        return data
+
+    def __iter__(self):
+        return iter(lambda: self.read(65536), b"")
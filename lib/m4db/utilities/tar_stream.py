@@ -0,0 +1,54 @@
+r"""
+Write tar archives as a stream of byte chunks (e.g. for streamed HTTP responses), so that an archive never has to be
+held in memory, or written to disk, as a whole.
+"""
+import io
+import tarfile
+import time
+
+
+class ChunkWriter:
+    r"""
+    A write-only file object that collects whatever is written to it until the chunks are taken.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        r"""
+        Take everything that has been written since the last call.
+        :return: the bytes written.
+        """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def tar_stream(members):
+    r"""
+    Write a tar archive member by member.
+    :param members: an iterable of (name, bytes) pairs.
+    :return: a generator of byte chunks, one per member (and a final chunk with the end of archive marker).
+    """
+    writer = ChunkWriter()
+    mtime = time.time()
+
+    with tarfile.open(fileobj=writer, mode="w|") as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = mtime
+            tar.addfile(info, io.BytesIO(data))
+
+            chunk = writer.take()
+            if len(chunk) > 0:
+                yield chunk
+
+    chunk = writer.take()
+    if len(chunk) > 0:
+        yield chunk
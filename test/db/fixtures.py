@@ -0,0 +1,127 @@
+r"""
+Shared fixtures for the database tests: an in-memory SQLite database populated with reference data, owners and
+ellipsoid geometries, and factories for model creation JSON.
+"""
+
+import unittest
+
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from m4db.orm.schema import Base
+from m4db.orm.schema import DBUser
+from m4db.orm.schema import Ellipsoid
+from m4db.orm.schema import Project
+from m4db.orm.schema import Software
+
+from m4db.orm.model_creation_schema import ModelListSchema
+
+from m4db.install.data.anisotropy_forms import populate_anisotropy_forms
+from m4db.install.data.neb_calculation_type import populate_neb_calculation_types
+from m4db.install.data.running_statuses import populate_running_statuses
+from m4db.install.data.size_conventions import populate_size_conventions
+
+from m4db.db.reference_data_cache import invalidate_reference_data_caches
+from m4db.db.size_convention.retrieve import retrieve_size_convention
+
+# A uniform applied field for model creation JSON.
+APPLIED_FIELD = {"magnitude": 10.0, "dir-x": 1.0, "dir-y": 0.0, "dir-z": 0.0}
+
+
+def new_engine():
+    r"""
+    Create an in-memory SQLite database with all the m4db tables.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def new_database(geometry_sizes=("0.1",), **geometry_kwargs):
+    r"""
+    Create an in-memory SQLite database populated with reference data, a user, project and software and an ESVD
+    ellipsoid for each size (with any extra ellipsoid columns given as keyword arguments).
+
+    :return: the engine, a session and the user, project and software.
+    """
+    engine = new_engine()
+    session = sessionmaker(bind=engine)()
+
+    populate_anisotropy_forms(session)
+    populate_neb_calculation_types(session)
+    populate_running_statuses(session)
+    populate_size_conventions(session)
+
+    db_user = DBUser(user_name="test", first_name="Test", surname="User", email="test@example.com")
+    project = Project(name="test", description="test project")
+    software = Software(name="merrill", version="1.8.6")
+    session.add_all([db_user, project, software])
+    for size in geometry_sizes:
+        session.add(Ellipsoid(size=Decimal(size), element_size=Decimal("0.01"),
+                              prolateness=Decimal("1.0"), oblateness=Decimal("1.0"),
+                              size_convention=retrieve_size_convention(session, "ESVD"), **geometry_kwargs))
+    session.commit()
+
+    return engine, session, db_user, project, software
+
+
+def material(name="magnetite", temperature=20.0, submesh_id=None):
+    r"""
+    Model creation JSON for a material.
+    """
+    result = {"name": name, "temperature": temperature, "k1": -1.35e4, "aex": 1.3e-11, "ms": 4.8e5,
+              "anisotropy-form": "cubic"}
+    if submesh_id is not None:
+        result["submesh-id"] = submesh_id
+    return result
+
+
+def model(size=0.1, materials=None, reps=1, initial_magnetization=None, applied_field=None):
+    r"""
+    Model creation JSON for (reps copies of) a model of an ESVD ellipsoid, by default a random magnetite model.
+    """
+    result = {
+        "geometry": {
+            "type": "ellipsoid",
+            "size": size,
+            "element-size": 0.01,
+            "size-convention": "ESVD",
+            "oblateness": 1.0,
+            "prolateness": 1.0
+        },
+        "materials": [material()] if materials is None else materials,
+        "initial-magnetization": {"type": "random"} if initial_magnetization is None else initial_magnetization,
+        "reps": reps
+    }
+    if applied_field is not None:
+        result["applied-field"] = applied_field
+    return result
+
+
+def model_list(initial_magnetization, reps, applied_field=None):
+    r"""
+    A model list of reps magnetite models of the 0.1um ellipsoid.
+    """
+    return ModelListSchema({"models": [
+        model(initial_magnetization=initial_magnetization, reps=reps, applied_field=applied_field)
+    ]})
+
+
+class DatabaseTestCase(unittest.TestCase):
+    r"""
+    A test case with a fresh database (see `new_database`) for every test, the reference data caches are invalidated
+    before and after each test.
+    """
+
+    GEOMETRY_SIZES = ("0.1",)
+    GEOMETRY_KWARGS = {}
+
+    def setUp(self):
+        invalidate_reference_data_caches()
+        self.engine, self.session, self.db_user, self.project, self.software = new_database(
+            self.GEOMETRY_SIZES, **self.GEOMETRY_KWARGS)
+
+    def tearDown(self):
+        invalidate_reference_data_caches()
@@ -0,0 +1,120 @@
+r"""
+Test bulk creation of models.
+"""
+
+import unittest
+import xmlrunner
+
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from m4db.orm.schema import Model
+from m4db.orm.schema import ModelInitialMagnetization
+from m4db.orm.schema import UniformInitialMagnetization
+
+from m4db.orm.model_creation_schema import ModelListSchema
+
+from m4db.db.model.bulk_create import bulk_create_models
+from m4db.db.model.validate import validate_new_models
+
+from fixtures import APPLIED_FIELD
+from fixtures import DatabaseTestCase
+from fixtures import model_list
+
+START_MODEL_UNIQUE_ID = "1d73da1c-ea5f-4690-a170-4f6eb442d8e2"
+
+
+class TestBulkCreateModels(DatabaseTestCase):
+
+    def test_bulk_create_with_reps(self):
+        models = model_list({"type": "uniform", "magnitude": 1.0, "dir-x": 0.0, "dir-y": 0.0, "dir-z": 1.0}, 5, APPLIED_FIELD)
+        models.validate()
+
+        unique_ids = bulk_create_models(self.session, models.models, self.db_user, self.project, self.software,
+                                        batch_size=2)
+        self.session.commit()
+
+        self.assertEqual(len(unique_ids), 5)
+        self.assertEqual(len(set(unique_ids)), 5)
+
+        for unique_id in unique_ids:
+            model = self.session.query(Model).filter(Model.unique_id == unique_id).one()
+            self.assertEqual(model.running_status.name, "not-run")
+            self.assertEqual(model.geometry.size, Decimal("0.1"))
+            self.assertEqual(model.materials[0].name, "magnetite")
+            self.assertEqual(model.materials[0].anisotropy_form.name, "cubic")
+            self.assertIsInstance(model.initial_magnetization, UniformInitialMagnetization)
+            self.assertEqual(model.initial_magnetization.dir_z, 1.0)
+            self.assertEqual(model.applied_field.magnitude, 10.0)
+            self.assertEqual(model.mdata.db_user.user_name, "test")
+
+        # Now create models that start from one of the models just created.
+        models = model_list({"type": "model", "unique-id": unique_ids[0]}, 2, APPLIED_FIELD)
+        models.validate()
+        new_unique_ids = bulk_create_models(self.session, models.models, self.db_user, self.project, self.software)
+        self.session.commit()
+
+        for unique_id in new_unique_ids:
+            model = self.session.query(Model).filter(Model.unique_id == unique_id).one()
+            self.assertIsInstance(model.initial_magnetization, ModelInitialMagnetization)
+            self.assertEqual(model.initial_magnetization.model.unique_id, unique_ids[0])
+
+    def test_missing_start_model(self):
+        models = model_list({"type": "model", "unique-id": START_MODEL_UNIQUE_ID}, 1, APPLIED_FIELD)
+        models.validate()
+
+        with self.assertRaises(ValueError):
+            bulk_create_models(self.session, models.models, self.db_user, self.project, self.software)
+
+
+class TestValidateNewModels(DatabaseTestCase):
+
+    def test_valid_models(self):
+        models = model_list({"type": "random"}, 3, APPLIED_FIELD)
+        models.validate()
+
+        self.assertEqual(validate_new_models(self.session, models.models), [])
+
+    def test_all_errors_reported(self):
+        models = ModelListSchema({"models": [
+            model.to_primitive() for model in
+            model_list({"type": "model", "unique-id": START_MODEL_UNIQUE_ID}, 1, APPLIED_FIELD).models * 3
+        ]})
+        models.models[1].geometry.size = Decimal("0.2")
+        models.validate()
+
+        errors = validate_new_models(self.session, models.models)
+
+        # Three missing start models and one missing geometry.
+        self.assertEqual(len(errors), 4)
+
+    def test_constant_query_count(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        # Warm the reference data caches.
+        validate_new_models(self.session, model_list({"type": "random"}, 1, APPLIED_FIELD).models)
+
+        counts = []
+        for size in [1, 50]:
+            models = ModelListSchema({"models": [
+                model.to_primitive() for model in
+                model_list({"type": "model", "unique-id": START_MODEL_UNIQUE_ID}, 1, APPLIED_FIELD).models * size
+            ]})
+            models.validate()
+
+            statements.clear()
+            validate_new_models(self.session, models.models)
+            counts.append(len(statements))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+if __name__ == "__main__":
+    with open("test-bulk-create-models.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,73 @@
+r"""
+Test bulk creation of NEB paths between all pairs of models.
+"""
+
+import unittest
+import xmlrunner
+
+from m4db.orm.schema import NEB
+
+from m4db.orm.model_creation_schema import ModelListSchema
+
+from m4db.db.model.bulk_create import bulk_create_models
+from m4db.db.neb.bulk_create import bulk_create_fs_paths
+from m4db.db.neb.bulk_create import get_model_groups
+
+from fixtures import DatabaseTestCase
+from fixtures import material
+from fixtures import model
+
+
+class TestBulkCreateNEBs(DatabaseTestCase):
+
+    GEOMETRY_SIZES = ("0.1", "0.2")
+
+    def setUp(self):
+        super().setUp()
+
+        # Paths may only join models in the same group: 4 + 3 models at 0.1um (two temperatures) and 2 at 0.2um.
+        models = ModelListSchema({"models": [
+            model(0.1, [material(temperature=20.0)], 4),
+            model(0.1, [material(temperature=100.0)], 3),
+            model(0.2, [material(temperature=20.0)], 2)
+        ]})
+        models.validate()
+        bulk_create_models(self.session, models.models, self.db_user, self.project, self.software)
+        self.session.commit()
+
+    def test_model_groups(self):
+        groups = get_model_groups(self.session, running_status="not-run")
+        self.assertEqual(sorted(len(group) for group in groups), [2, 3, 4])
+
+        groups = get_model_groups(self.session, running_status="not-run", size=0.1, temperature=20.0)
+        self.assertEqual([len(group) for group in groups], [4])
+
+    def test_bulk_create_all_pairs(self):
+        unique_ids, nnew, nexisting = bulk_create_fs_paths(
+            self.session, self.db_user, self.project, self.software, dry_run=True, running_status="not-run")
+        self.assertEqual((unique_ids, nnew, nexisting), ([], 6 + 3 + 1, 0))
+        self.assertEqual(self.session.query(NEB).count(), 0)
+
+        unique_ids, nnew, nexisting = bulk_create_fs_paths(
+            self.session, self.db_user, self.project, self.software, batch_size=4, running_status="not-run")
+        self.assertEqual((len(unique_ids), nnew, nexisting), (10, 10, 0))
+        self.assertEqual(self.session.query(NEB).count(), 10)
+
+        neb = self.session.query(NEB).filter(NEB.unique_id == unique_ids[0]).one()
+        self.assertEqual(neb.start_model.geometry.id, neb.end_model.geometry.id)
+        self.assertEqual(neb.neb_calculation_type.name, "fs_heuristic")
+        self.assertEqual(neb.running_status.name, "not-run")
+        self.assertEqual(neb.mdata.project.name, "test")
+
+        # Running again creates nothing new.
+        unique_ids, nnew, nexisting = bulk_create_fs_paths(
+            self.session, self.db_user, self.project, self.software, running_status="not-run")
+        self.assertEqual((len(unique_ids), nnew, nexisting), (0, 0, 10))
+
+
+if __name__ == "__main__":
+    with open("test-bulk-create-nebs.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
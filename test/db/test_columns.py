@@ -0,0 +1,47 @@
+r"""
+Test adding the columns introduced after v2 to an existing database.
+"""
+
+import unittest
+import xmlrunner
+
+from sqlalchemy import inspect
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from m4db.install.columns import add_geometry_content_hash
+from m4db.install.columns import has_geometry_content_hash
+
+from fixtures import new_engine
+
+
+class TestColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = new_engine()
+        self.session = sessionmaker(bind=self.engine)()
+
+    def test_new_database_has_content_hash(self):
+        self.assertTrue(has_geometry_content_hash(self.session))
+        self.assertFalse(add_geometry_content_hash(self.session))
+
+    def test_add_content_hash(self):
+        # An existing database, i.e. one without the column (or its index).
+        self.session.execute(text("drop index idx_geometry_01"))
+        self.session.execute(text("alter table geometry drop column content_hash"))
+        self.session.commit()
+        self.assertFalse(has_geometry_content_hash(self.session))
+
+        self.assertTrue(add_geometry_content_hash(self.session))
+        self.assertTrue(has_geometry_content_hash(self.session))
+        self.assertIn("idx_geometry_01", [index["name"] for index in inspect(self.engine).get_indexes("geometry")])
+        # Adding the column a second time is harmless.
+        self.assertFalse(add_geometry_content_hash(self.session))
+
+
+if __name__ == "__main__":
+    with open("test-columns.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,147 @@
+r"""
+Test the (recursive) export dependency resolvers.
+"""
+
+import unittest
+import xmlrunner
+
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+
+from m4db.orm.schema import Base
+from m4db.orm.schema import DBUser
+from m4db.orm.schema import Ellipsoid
+from m4db.orm.schema import Metadata
+from m4db.orm.schema import Model
+from m4db.orm.schema import ModelInitialMagnetization
+from m4db.orm.schema import NEB
+from m4db.orm.schema import NEBCalculationType
+from m4db.orm.schema import NEBReportData
+from m4db.orm.schema import NEBRunData
+from m4db.orm.schema import Project
+from m4db.orm.schema import RandomInitialMagnetization
+from m4db.orm.schema import Software
+
+from m4db.install.data.neb_calculation_type import populate_neb_calculation_types
+from m4db.install.data.running_statuses import populate_running_statuses
+
+from m4db.db.reference_data_cache import invalidate_reference_data_caches
+from m4db.db.running_status.retrieve import retrieve_not_run_status
+
+from m4db.dependency_exporter import model_dependencies
+from m4db.dependency_exporter import neb_dependencies
+
+
+class TestDependencyExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        invalidate_reference_data_caches()
+        populate_running_statuses(self.session)
+        populate_neb_calculation_types(self.session)
+
+        self.mdata = Metadata(db_user=DBUser(user_name="test", first_name="Test", surname="User",
+                                             email="test@example.com"),
+                              project=Project(name="test", description="test project"),
+                              software=Software(name="merrill", version="1.8.6"))
+        self.geometries = [Ellipsoid(unique_id=f"10000000-0000-0000-0000-{index:012d}", size=0.1 * (index + 1),
+                                     element_size=0.01, prolateness=1.0, oblateness=1.0)
+                           for index in range(2)]
+        self.session.add(self.mdata)
+        self.session.add_all(self.geometries)
+        self.session.commit()
+
+        # Models 0 - 3 form a chain (each one starts from the previous one's magnetization), model 4 is on its own
+        # and model 5 has a different geometry.
+        self.models = []
+        for index in range(6):
+            if 0 < index < 4:
+                initial_magnetization = ModelInitialMagnetization(model=self.models[index - 1])
+            else:
+                initial_magnetization = RandomInitialMagnetization()
+            self.models.append(self.new_model(index, self.geometries[1 if index == 5 else 0], initial_magnetization))
+        self.session.commit()
+
+        # A root path and a child path.
+        self.parent = self.new_neb(self.models[3], self.models[4])
+        self.child = self.new_neb(self.models[3], self.models[4], parent_neb=self.parent)
+        self.session.commit()
+
+    def tearDown(self):
+        invalidate_reference_data_caches()
+
+    def new_model(self, index, geometry, initial_magnetization):
+        model = Model(unique_id=f"00000000-0000-0000-0000-{index:012d}", geometry=geometry,
+                      initial_magnetization=initial_magnetization,
+                      running_status=retrieve_not_run_status(self.session),
+                      model_run_data_id=1, model_report_data_id=1, mdata=self.mdata)
+        self.session.add(model)
+        self.session.flush()
+        return model
+
+    def new_neb(self, start_model, end_model, parent_neb=None):
+        neb = NEB(start_model=start_model, end_model=end_model, parent_neb=parent_neb,
+                  neb_calculation_type=self.session.query(NEBCalculationType).first(),
+                  neb_run_data=NEBRunData(), neb_report_data=NEBReportData(),
+                  running_status=retrieve_not_run_status(self.session), mdata=self.mdata)
+        self.session.add(neb)
+        return neb
+
+    def count_statements(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        return statements
+
+    def test_model_dependencies(self):
+        unique_ids = [model.unique_id for model in self.models]
+        geometry_unique_ids = [geometry.unique_id for geometry in self.geometries]
+
+        statements = self.count_statements()
+        geometries, models = model_dependencies([unique_ids[2], unique_ids[5]], self.session)
+
+        self.assertEqual(sorted(geometries), geometry_unique_ids)
+        self.assertEqual(sorted(models), [unique_ids[0], unique_ids[1], unique_ids[2], unique_ids[5]])
+        self.assertEqual(len(statements), 1)
+
+    def test_model_dependencies_batched(self):
+        unique_ids = [model.unique_id for model in self.models]
+
+        geometries, models = model_dependencies(unique_ids, self.session, batch_size=2)
+
+        self.assertEqual(sorted(models), unique_ids)
+
+    def test_missing_model(self):
+        with self.assertRaises(NoResultFound):
+            model_dependencies(["ffffffff-ffff-ffff-ffff-ffffffffffff"], self.session)
+
+    def test_neb_dependencies(self):
+        unique_ids = [model.unique_id for model in self.models]
+        parent_unique_id = self.parent.unique_id
+        child_unique_id = self.child.unique_id
+        geometry_unique_id = self.geometries[0].unique_id
+
+        statements = self.count_statements()
+        geometries, models, nebs = neb_dependencies([child_unique_id], self.session)
+
+        self.assertEqual(geometries, [geometry_unique_id])
+        self.assertEqual(sorted(models), unique_ids[:5])
+        self.assertEqual(sorted(nebs), sorted([parent_unique_id, child_unique_id]))
+        self.assertEqual(len(statements), 2)
+
+    def test_missing_neb(self):
+        with self.assertRaises(NoResultFound):
+            neb_dependencies([self.child.unique_id, "ffffffff-ffff-ffff-ffff-ffffffffffff"], self.session)
+
+
+if __name__ == "__main__":
+    with open("test-dependency-exporter.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
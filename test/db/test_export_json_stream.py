@@ -0,0 +1,139 @@
+r"""
+Test the streaming JSON exporters.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import xmlrunner
+
+from sqlalchemy import event
+
+from m4db.orm.schema import NEB
+from m4db.orm.schema import UniformAppliedField
+
+from m4db.db.model.bulk_create import bulk_create_models
+from m4db.db.neb.bulk_create import bulk_create_fs_paths
+
+from m4db.export_json_stream_utilities import stream_export_geometry_by_unique_id
+from m4db.export_json_stream_utilities import stream_export_model_by_unique_id
+from m4db.export_json_stream_utilities import stream_export_neb_by_unique_id
+from m4db.export_json_stream_utilities import stream_export_reference_data
+
+from fixtures import APPLIED_FIELD
+from fixtures import DatabaseTestCase
+from fixtures import model_list
+
+
+class TestExportJSONStream(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dir_path = tempfile.mkdtemp()
+
+        models = model_list({"type": "random"}, 4, APPLIED_FIELD)
+        models.validate()
+        self.model_unique_ids = bulk_create_models(self.session, models.models, self.db_user, self.project,
+                                                   self.software)
+        models = model_list({"type": "model", "unique-id": self.model_unique_ids[0]}, 2)
+        models.validate()
+        self.model_unique_ids += bulk_create_models(self.session, models.models, self.db_user, self.project,
+                                                    self.software)
+        self.session.commit()
+
+        self.neb_unique_ids, _, _ = bulk_create_fs_paths(self.session, self.db_user, self.project, self.software)
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.dir_path)
+
+    def count_statements(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        return statements
+
+    def read_json(self, name):
+        with open(os.path.join(self.dir_path, name)) as fin:
+            return json.load(fin)
+
+    def read_json_lines(self, name):
+        with open(os.path.join(self.dir_path, name)) as fin:
+            return [json.loads(line) for line in fin]
+
+    def test_export_models(self):
+        count = stream_export_model_by_unique_id(self.dir_path, self.session, format_json=True, yield_per=2)
+
+        models = self.read_json("model.json")
+        self.assertEqual(count, 6)
+        self.assertEqual(sorted(model["unique_id"] for model in models), sorted(self.model_unique_ids))
+        for model in models:
+            self.assertEqual(model["geometry"]["size"], "0.10000")
+            self.assertEqual(model["geometry"]["size_convention"], "ESVD")
+            self.assertEqual(model["materials"][0]["anisotropy_form"]["name"], "cubic")
+            self.assertEqual(model["mdata"]["db_user_user_name"], "test")
+        self.assertEqual(sorted(model["start_magnetization"].get("model_unique_id", "") for model in models),
+                         [""] * 4 + [self.model_unique_ids[0]] * 2)
+
+        applied_fields = {model["unique_id"]: model["applied_field"] for model in models}
+        for unique_id in self.model_unique_ids[:4]:
+            self.assertEqual(applied_fields[unique_id]["magnitude"], 10.0)
+            self.assertEqual([applied_fields[unique_id][key] for key in ["dir_x", "dir_y", "dir_z"]],
+                             [1.0, 0.0, 0.0])
+        for unique_id in self.model_unique_ids[4:]:
+            self.assertIsNone(applied_fields[unique_id])
+
+    def test_queries_per_chunk(self):
+        # One query for the models and at most one for each eagerly loaded relationship per chunk.
+        max_chunk_statements = 15
+
+        self.session.expunge_all()
+        statements = self.count_statements()
+        stream_export_model_by_unique_id(self.dir_path, self.session, yield_per=6)
+        self.assertLessEqual(len(statements), max_chunk_statements)
+
+        self.session.expunge_all()
+        del statements[:]
+        stream_export_model_by_unique_id(self.dir_path, self.session, yield_per=2)
+        self.assertLessEqual(len(statements), 3 * max_chunk_statements)
+
+        self.session.expunge_all()
+        del statements[:]
+        stream_export_model_by_unique_id(self.dir_path, self.session, self.model_unique_ids, json_lines=True,
+                                         yield_per=6)
+        self.assertLessEqual(len(statements), max_chunk_statements)
+        self.assertEqual(len(self.read_json_lines("model.jsonl")), 6)
+
+    def test_export_nebs_as_json_lines(self):
+        neb = self.session.query(NEB).filter(NEB.unique_id == self.neb_unique_ids[0]).one()
+        neb.applied_field = UniformAppliedField(dir_x=0.0, dir_y=0.0, dir_z=1.0, magnitude=5.0)
+        self.session.commit()
+
+        count = stream_export_neb_by_unique_id(self.dir_path, self.session, json_lines=True)
+
+        nebs = self.read_json_lines("neb.jsonl")
+        self.assertEqual(count, len(self.neb_unique_ids))
+        self.assertEqual(sorted(neb["unique_id"] for neb in nebs), sorted(self.neb_unique_ids))
+        self.assertEqual(nebs[0]["neb_calculation_type"]["name"], "fs_heuristic")
+
+        applied_fields = {neb["unique_id"]: neb["applied_field"] for neb in nebs}
+        self.assertEqual(applied_fields.pop(self.neb_unique_ids[0])["magnitude"], 5.0)
+        self.assertEqual(list(applied_fields.values()), [None] * len(applied_fields))
+
+    def test_export_geometries_and_reference_data(self):
+        stream_export_geometry_by_unique_id(self.dir_path, self.session)
+        counts = stream_export_reference_data(self.dir_path, self.session)
+
+        self.assertEqual(self.read_json("geometry.json")[0]["type"], "ellipsoid")
+        self.assertEqual(counts["db_user"], 1)
+        self.assertEqual(self.read_json("running_status.json")[0]["name"], "not-run")
+
+
+if __name__ == "__main__":
+    with open("test-export-json-stream.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
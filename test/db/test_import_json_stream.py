@@ -0,0 +1,161 @@
+r"""
+Test the streaming JSON importers.
+"""
+
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import xmlrunner
+
+from decimal import Decimal
+
+from sqlalchemy import delete
+from sqlalchemy import event
+
+from m4db.orm.schema import Ellipsoid
+from m4db.orm.schema import Geometry
+from m4db.orm.schema import Model
+from m4db.orm.schema import ModelInitialMagnetization
+from m4db.orm.schema import NEB
+from m4db.orm.schema import UniformAppliedField
+
+from m4db.db.reference_data_cache import invalidate_reference_data_caches
+from m4db.db.model.bulk_create import bulk_create_models
+from m4db.db.neb.bulk_create import bulk_create_fs_paths
+
+from m4db.export_json_stream_utilities import stream_export_model_by_unique_id
+from m4db.export_json_stream_utilities import stream_export_neb_by_unique_id
+
+from m4db.import_json_stream_utilities import iterate_json_array
+from m4db.import_json_stream_utilities import stream_import_model
+from m4db.import_json_stream_utilities import stream_import_neb
+
+from fixtures import APPLIED_FIELD
+from fixtures import model_list
+from fixtures import new_database
+
+GEOMETRY_UNIQUE_ID = "5b0f2a3c-7d62-4d4e-9a8b-1c2d3e4f5a6b"
+
+
+class TestIterateJSONArray(unittest.TestCase):
+
+    def test_small_chunks(self):
+        values = [{"a": 1, "b": [1.5, "x, ]"]}, 12345, "string", None, [], {"c": {"d": -0.25e-3}}]
+        text = json.dumps(values, indent=2)
+
+        for read_chunk_size in [1, 2, 3, 7, 1000]:
+            self.assertEqual(list(iterate_json_array(io.StringIO(text), read_chunk_size)), values)
+
+    def test_empty_and_invalid(self):
+        self.assertEqual(list(iterate_json_array(io.StringIO(" [ ] "))), [])
+        with self.assertRaises(ValueError):
+            list(iterate_json_array(io.StringIO("{}")))
+        with self.assertRaises(ValueError):
+            list(iterate_json_array(io.StringIO("[1, 2")))
+
+
+class TestImportJSONStream(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_reference_data_caches()
+        self.dir_path = tempfile.mkdtemp()
+
+        # The source database.
+        _, session, db_user, project, software = new_database(unique_id=GEOMETRY_UNIQUE_ID)
+        models = model_list({"type": "random"}, 3, APPLIED_FIELD)
+        models.validate()
+        self.model_unique_ids = bulk_create_models(session, models.models, db_user, project, software)
+        models = model_list({"type": "model", "unique-id": self.model_unique_ids[0]}, 2)
+        models.validate()
+        self.model_unique_ids += bulk_create_models(session, models.models, db_user, project, software)
+        session.commit()
+        self.neb_unique_ids, _, _ = bulk_create_fs_paths(session, db_user, project, software)
+
+        # Add a child path.
+        parent = session.query(NEB).filter(NEB.unique_id == self.neb_unique_ids[0]).one()
+        child = NEB(start_model_id=parent.start_model_id, end_model_id=parent.end_model_id, parent_neb=parent,
+                    neb_calculation_type=parent.neb_calculation_type, neb_run_data=parent.neb_run_data,
+                    neb_report_data=parent.neb_report_data, running_status=parent.running_status,
+                    mdata=parent.mdata,
+                    applied_field=UniformAppliedField(dir_x=0.0, dir_y=0.0, dir_z=1.0, magnitude=5.0))
+        session.add(child)
+        session.commit()
+        self.neb_unique_ids.append(child.unique_id)
+
+        stream_export_model_by_unique_id(self.dir_path, session)
+        stream_export_neb_by_unique_id(self.dir_path, session, json_lines=True)
+        session.close()
+
+        # The destination database.
+        invalidate_reference_data_caches()
+        self.engine, self.session, _, _, _ = new_database(unique_id=GEOMETRY_UNIQUE_ID)
+
+    def tearDown(self):
+        invalidate_reference_data_caches()
+        shutil.rmtree(self.dir_path)
+
+    def test_round_trip(self):
+        reports = []
+        report = stream_import_model(f"{self.dir_path}/model.json", self.session, batch_size=2,
+                                     progress=lambda count, rate: reports.append(count))
+        self.assertEqual(report["count"], 5)
+        self.assertEqual(reports, [2, 4, 5])
+
+        report = stream_import_neb(f"{self.dir_path}/neb.jsonl", self.session, batch_size=100)
+        self.assertEqual(report["count"], len(self.neb_unique_ids))
+
+        self.assertEqual(sorted(unique_id for unique_id, in self.session.query(Model.unique_id)),
+                         sorted(self.model_unique_ids))
+        self.assertEqual(sorted(unique_id for unique_id, in self.session.query(NEB.unique_id)),
+                         sorted(self.neb_unique_ids))
+
+        for model in self.session.query(Model):
+            self.assertEqual(model.geometry.unique_id, GEOMETRY_UNIQUE_ID)
+            self.assertEqual(model.materials[0].name, "magnetite")
+            self.assertEqual(model.materials[0].temperature, Decimal("20.0"))
+            self.assertEqual(model.materials[0].anisotropy_form.name, "cubic")
+            self.assertEqual(model.running_status.name, "not-run")
+            self.assertEqual(model.mdata.db_user.user_name, "test")
+            if isinstance(model.initial_magnetization, ModelInitialMagnetization):
+                self.assertEqual(model.initial_magnetization.model.unique_id, self.model_unique_ids[0])
+                self.assertIsNone(model.applied_field)
+            else:
+                self.assertEqual(model.applied_field.magnitude, 10.0)
+                self.assertEqual((model.applied_field.dir_x, model.applied_field.dir_y, model.applied_field.dir_z),
+                                 (1.0, 0.0, 0.0))
+
+        child = self.session.query(NEB).filter(NEB.unique_id == self.neb_unique_ids[-1]).one()
+        self.assertEqual(child.parent_neb.unique_id, self.neb_unique_ids[0])
+        self.assertEqual(child.applied_field.magnitude, 5.0)
+        self.assertEqual(child.applied_field.dir_z, 1.0)
+        self.assertIsNone(child.parent_neb.applied_field)
+
+    def test_reference_lookups_memoised(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        stream_import_model(f"{self.dir_path}/model.json", self.session, batch_size=1)
+
+        # Each reference row is looked up exactly once, however many models refer to it.
+        for table in ["running_status", "db_user", "project", "software", "anisotropy_form"]:
+            self.assertEqual(len([statement for statement in statements
+                                  if statement.startswith(f"SELECT {table}.id")]), 1)
+
+    def test_missing_geometry(self):
+        self.session.execute(delete(Ellipsoid.__table__))
+        self.session.execute(delete(Geometry.__table__))
+        self.session.commit()
+
+        with self.assertRaises(ValueError):
+            stream_import_model(f"{self.dir_path}/model.json", self.session)
+
+
+if __name__ == "__main__":
+    with open("test-import-json-stream.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
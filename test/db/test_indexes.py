@@ -0,0 +1,97 @@
+r"""
+Test the creation of secondary indexes.
+"""
+
+import unittest
+import xmlrunner
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from m4db.orm.schema import Base
+
+from m4db.install.columns import add_geometry_content_hash
+
+from m4db.install.indexes import secondary_indexes
+from m4db.install.indexes import create_secondary_indexes
+from m4db.install.indexes import create_unique_indexes
+from m4db.install.indexes import drop_secondary_indexes
+from m4db.install.indexes import create_partial_indexes
+
+
+class TestIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def index_names(self, table_name):
+        # The inspector does not report expression indexes, so use the SQLite catalogue directly.
+        with self.engine.connect() as connection:
+            return set(connection.execute(text(
+                "select name from sqlite_master "
+                "where type = 'index' and tbl_name = :table_name and name not like 'sqlite_autoindex%'"
+            ), {"table_name": table_name}).scalars())
+
+    def test_indexes_created_with_tables(self):
+        self.assertEqual(self.index_names("model"), {"idx_model_01", "idx_model_02", "idx_model_03"})
+        self.assertEqual(self.index_names("neb"),
+                         {"idx_neb_01", "idx_neb_02", "idx_neb_03", "idx_neb_04", "idx_neb_05", "uniq_neb_02"})
+        self.assertEqual(self.index_names("material"), {"idx_material_01"})
+        self.assertEqual(self.index_names("geometry"), {"idx_geometry_01"})
+
+    def test_drop_and_create(self):
+        drop_secondary_indexes(self.session)
+        self.assertEqual(self.index_names("model"), set())
+
+        create_secondary_indexes(self.session)
+        # Creating the indexes a second time is harmless.
+        create_secondary_indexes(self.session)
+        self.assertEqual(self.index_names("model") | self.index_names("neb") | self.index_names("material"),
+                         {index.name for index in secondary_indexes()} | {"uniq_neb_02"})
+
+    def test_drop_keeps_other_indexes(self):
+        # The unique end point index and the content_hash index are not secondary indexes.
+        self.assertNotIn("uniq_neb_02", [index.name for index in secondary_indexes()])
+        self.assertNotIn("idx_geometry_01", [index.name for index in secondary_indexes()])
+
+        drop_secondary_indexes(self.session)
+        self.assertEqual(self.index_names("neb"), {"uniq_neb_02"})
+        self.assertEqual(self.index_names("material"), set())
+        self.assertEqual(self.index_names("geometry"), {"idx_geometry_01"})
+
+    def test_create_unique_indexes(self):
+        self.session.execute(text("drop index uniq_neb_02"))
+        self.session.commit()
+
+        create_unique_indexes(self.session)
+        # Creating the indexes a second time is harmless.
+        create_unique_indexes(self.session)
+        self.assertIn("uniq_neb_02", self.index_names("neb"))
+
+    def test_create_on_database_without_content_hash(self):
+        # A database from before geometry.content_hash, its index is added along with the column.
+        drop_secondary_indexes(self.session)
+        self.session.execute(text("drop index idx_geometry_01"))
+        self.session.execute(text("alter table geometry drop column content_hash"))
+        self.session.commit()
+
+        create_secondary_indexes(self.session)
+        self.assertEqual(self.index_names("geometry"), set())
+
+        add_geometry_content_hash(self.session)
+        self.assertEqual(self.index_names("geometry"), {"idx_geometry_01"})
+
+    def test_partial_indexes_ignored_for_sqlite(self):
+        create_partial_indexes(self.session)
+        self.assertNotIn("idx_model_pending_01", self.index_names("model"))
+
+
+if __name__ == "__main__":
+    with open("test-indexes.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
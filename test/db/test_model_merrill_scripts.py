@@ -0,0 +1,155 @@
+r"""
+Test the batch MERRILL script generation (eager loading and the runner web service).
+"""
+
+import io
+import json
+import logging
+import tarfile
+import unittest
+import xmlrunner
+
+import falcon
+import falcon.testing
+
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from m4db.orm.schema import Base
+from m4db.orm.schema import Ellipsoid
+from m4db.orm.schema import Material
+from m4db.orm.schema import Model
+from m4db.orm.schema import RandomInitialMagnetization
+from m4db.orm.schema import UniformAppliedField
+from m4db.orm.schema import UniformInitialMagnetization
+
+from m4db.db.model.retrieve import get_models_by_unique_ids
+from m4db.db.model.retrieve import merrill_script_loader_options
+
+from m4db.rest.m4db_runner_web.get_model_merrill_scripts import GetModelMerrillScripts
+from m4db.rest.m4db_runner_web.get_model_merrill_scripts import MISSING_FILE_NAME
+
+from m4db.template import model_merrill_script
+
+from m4db import GLOBAL
+
+MISSING_UNIQUE_ID = "ffffffff-ffff-ffff-ffff-ffffffffffff"
+
+
+def unique_id(index):
+    return f"00000000-0000-0000-0000-{index:012d}"
+
+
+class TestModelMerrillScripts(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        # Models are referenced by id (or unique id), so rows with dangling foreign keys are fine here.
+        geometry = Ellipsoid(size=0.1, element_size=0.01, prolateness=1.0, oblateness=1.0)
+        for index in range(6):
+            if index % 2 == 0:
+                initial_magnetization = UniformInitialMagnetization(dir_x=1.0, dir_y=0.0, dir_z=0.0, magnitude=1.0)
+            else:
+                initial_magnetization = RandomInitialMagnetization()
+            model = Model(unique_id=unique_id(index), geometry=geometry, max_energy_evaluations=1000 + index,
+                          initial_magnetization=initial_magnetization, running_status_id=1, model_run_data_id=1,
+                          model_report_data_id=1, mdata_id=1,
+                          applied_field=UniformAppliedField(dir_x=0.0, dir_y=0.0, dir_z=1.0, magnitude=10.0))
+            model.materials = [Material(name="magnetite", temperature=20 + submesh_id, submesh_id=submesh_id,
+                                        anisotropy_form_id=1, alpha=None, theta=None, phi=None)
+                               for submesh_id in range(1, 1 + index % 3)]
+            self.session.add(model)
+        self.session.commit()
+        self.session.expunge_all()
+
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.count_statement)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self.count_statement)
+
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def render(self, unique_ids):
+        self.statements = []
+        models = get_models_by_unique_ids(self.session, unique_ids, merrill_script_loader_options())
+        scripts = {unique_id: model_merrill_script(model) for unique_id, model in models.items()}
+        nstatements = len(self.statements)
+        self.session.expunge_all()
+        return scripts, nstatements
+
+    def test_constant_number_of_queries(self):
+        scripts, nstatements_few = self.render([unique_id(index) for index in range(2)])
+        self.assertEqual(len(scripts), 2)
+
+        scripts, nstatements_all = self.render([unique_id(index) for index in range(6)] + [MISSING_UNIQUE_ID])
+        self.assertEqual(len(scripts), 6)
+        self.assertEqual(nstatements_few, nstatements_all)
+        self.assertLessEqual(nstatements_all, 4)
+
+        self.assertIn("Uniform Magnetization 1.0 0.0 0.0", scripts[unique_id(0)])
+        self.assertIn("Randomize All Moments", scripts[unique_id(1)])
+        self.assertIn("Set MaxEnergyEvaluations 1005", scripts[unique_id(5)])
+        self.assertIn("set subdomain 2 magnetite 22", scripts[unique_id(5)])
+
+    def test_batches(self):
+        models = get_models_by_unique_ids(self.session, [unique_id(index) for index in range(6)], batch_size=4)
+        self.assertEqual(set(models.keys()), {unique_id(index) for index in range(6)})
+
+    def client(self):
+        resource = GetModelMerrillScripts()
+        resource.session = self.session
+        resource.logger = logging.getLogger("test")
+
+        app = falcon.App()
+        app.add_route("/get-model-merrill-scripts", resource)
+        return falcon.testing.TestClient(app)
+
+    def test_service_json(self):
+        unique_ids = [unique_id(0), unique_id(3), MISSING_UNIQUE_ID]
+
+        # Runner clients send their parameters as a JSON encoded string.
+        response = self.client().simulate_post(
+            "/get-model-merrill-scripts", json=json.dumps({"unique-ids": unique_ids})
+        )
+        self.assertEqual(response.status, falcon.HTTP_200)
+
+        output = json.loads(response.text)
+        self.assertEqual(set(output["return"].keys()), {unique_id(0), unique_id(3)})
+        self.assertEqual(output["missing"], [MISSING_UNIQUE_ID])
+        self.assertIn("Set MaxEnergyEvaluations 1003", output["return"][unique_id(3)])
+
+    def test_service_tar(self):
+        unique_ids = [unique_id(index) for index in range(6)] + [MISSING_UNIQUE_ID]
+        response = self.client().simulate_post(
+            "/get-model-merrill-scripts", json={"unique-ids": unique_ids, "format": "tar"}
+        )
+        self.assertEqual(response.status, falcon.HTTP_200)
+        self.assertEqual(response.headers["content-type"], "application/x-tar")
+
+        with tarfile.open(fileobj=io.BytesIO(response.content), mode="r") as tar:
+            names = tar.getnames()
+            self.assertEqual(len(names), 7)
+            self.assertIn(f"{unique_id(4)}/{GLOBAL.MODEL_MERRILL_SCRIPT_FILE_NAME}", names)
+            self.assertEqual(json.load(tar.extractfile(MISSING_FILE_NAME)), [MISSING_UNIQUE_ID])
+            script = tar.extractfile(f"{unique_id(4)}/{GLOBAL.MODEL_MERRILL_SCRIPT_FILE_NAME}").read().decode()
+            self.assertIn("Set MaxEnergyEvaluations 1004", script)
+
+    def test_service_bad_request(self):
+        response = self.client().simulate_post("/get-model-merrill-scripts", json={"unique-ids": ["not-a-uid"]})
+        self.assertEqual(response.status, falcon.HTTP_400)
+        response = self.client().simulate_post("/get-model-merrill-scripts", json={"unique-ids": []})
+        self.assertEqual(response.status, falcon.HTTP_400)
+
+
+if __name__ == "__main__":
+    with open("test-model-merrill-scripts.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,120 @@
+r"""
+Test model retrieval.
+"""
+
+import unittest
+import xmlrunner
+
+import numpy as np
+
+from sqlalchemy import event
+
+from m4db.orm.model_creation_schema import ModelListSchema
+
+from m4db.db.model.bulk_create import bulk_create_models
+from m4db.db.model.retrieve import get_models
+from m4db.db.model.retrieve import iterate_models
+from m4db.db.model.retrieve import iterate_model_quant_chunks
+from m4db.db.model.retrieve import get_model_quants
+from m4db.db.model.retrieve import get_model_quants_array
+from m4db.db.model.retrieve import get_model_quants_data_frame
+
+from fixtures import DatabaseTestCase
+from fixtures import material
+from fixtures import model
+
+
+class TestModelRetrieve(DatabaseTestCase):
+
+    GEOMETRY_SIZES = ("0.1", "0.2")
+    GEOMETRY_KWARGS = {"nsubmeshes": 2}
+
+    def setUp(self):
+        super().setUp()
+
+        models = ModelListSchema({"models": [
+            model(0.1, [material("magnetite", 20.0, 1), material("iron", 20.0, 2)], 3),
+            model(0.1, [material("magnetite", 100.0, 1), material("iron", 100.0, 2)], 4),
+            model(0.2, [material("magnetite", 20.0, 1), material("magnetite", 20.0, 2)], 5)
+        ]})
+        models.validate()
+        bulk_create_models(self.session, models.models, self.db_user, self.project, self.software)
+        self.session.commit()
+
+    def test_no_filters(self):
+        self.assertEqual(len(get_models(self.session)), 12)
+        self.assertEqual(len(get_models(self.session, running_status="not-run", geometry=None)), 12)
+        self.assertEqual(len(get_models(self.session, running_status="finished")), 0)
+
+    def test_metadata_and_geometry_filters(self):
+        self.assertEqual(len(get_models(self.session, db_user="test", software="merrill")), 12)
+        self.assertEqual(len(get_models(self.session, db_user="nobody")), 0)
+        self.assertEqual(len(get_models(self.session, geometry="ellipsoid")), 12)
+        self.assertEqual(len(get_models(self.session, size=0.1, size_convention="ESVD")), 7)
+        self.assertEqual(len(get_models(self.session, size=200, size_unit="nm")), 5)
+
+    def test_material_filters(self):
+        self.assertEqual(len(get_models(self.session, material="iron")), 7)
+        self.assertEqual(len(get_models(self.session, materials=["magnetite", "iron"])), 7)
+        self.assertEqual(len(get_models(self.session, temperature=100.0)), 4)
+        self.assertEqual(len(get_models(self.session, materials=["magnetite", "iron"], temperature=20.0)), 3)
+        self.assertEqual(len(get_models(self.session, materials=["magnetite", "iron"],
+                                        temperatures=[100.0, 100.0])), 4)
+        self.assertEqual(len(get_models(self.session, material="magnetite", temperature=20.0)), 8)
+        self.assertEqual(len(get_models(self.session, materials=["magnetite", "iron"],
+                                        temperatures=[100.0, 20.0])), 0)
+
+        with self.assertRaises(ValueError):
+            get_models(self.session, materials=["magnetite", "iron"], temperatures=[20.0])
+
+    def test_only_required_tables_are_joined(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        get_models(self.session, running_status="not-run")
+
+        self.assertNotIn("JOIN metadata", statements[-1])
+        self.assertNotIn("JOIN geometry", statements[-1])
+
+    def test_iterate_models_pages(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        unique_ids = [model.unique_id for model in iterate_models(self.session, page_size=5, material="iron")]
+
+        self.assertEqual(len(unique_ids), 7)
+        self.assertEqual(len(set(unique_ids)), 7)
+        # A full page of models followed by a short (last) page.
+        self.assertEqual(len(statements), 2)
+
+    def test_model_quants(self):
+        for index, model in enumerate(get_models(self.session)):
+            model.e_tot = float(index)
+            model.geometry.computed_volume = 1.0e-21
+        self.session.commit()
+
+        quants = get_model_quants_array(self.session, material="iron")
+        self.assertEqual(quants.shape, (7,))
+        self.assertEqual(list(quants["e_tot"]), [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        self.assertTrue(np.all(quants["volume"] == 1.0e-21))
+        self.assertTrue(np.all(np.isnan(quants["mx_tot"])))
+
+        chunks = list(iterate_model_quant_chunks(self.session, chunk_size=5))
+        self.assertEqual([len(chunk) for chunk in chunks], [5, 5, 2])
+
+        data_frame = get_model_quants_data_frame(self.session, geometry="ellipsoid", size=0.2)
+        self.assertEqual(len(data_frame), 5)
+        self.assertEqual(list(data_frame["e_tot"]), [7.0, 8.0, 9.0, 10.0, 11.0])
+
+        self.assertEqual([quant["e_tot"] for quant in get_model_quants(self.session, temperature=100.0)],
+                         [3.0, 4.0, 5.0, 6.0])
+
+
+if __name__ == "__main__":
+    with open("test-model-retrieve.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
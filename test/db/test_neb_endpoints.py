@@ -0,0 +1,121 @@
+r"""
+Test the direction independent NEB end point lookups.
+"""
+
+import unittest
+import xmlrunner
+
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from m4db.orm.schema import Base
+from m4db.orm.schema import DBUser
+from m4db.orm.schema import Ellipsoid
+from m4db.orm.schema import Metadata
+from m4db.orm.schema import Model
+from m4db.orm.schema import NEB
+from m4db.orm.schema import NEBCalculationType
+from m4db.orm.schema import NEBReportData
+from m4db.orm.schema import NEBRunData
+from m4db.orm.schema import Project
+from m4db.orm.schema import Software
+
+from m4db.install.data.neb_calculation_type import populate_neb_calculation_types
+from m4db.install.data.running_statuses import populate_running_statuses
+
+from m4db.db.reference_data_cache import invalidate_reference_data_caches
+from m4db.db.running_status.retrieve import retrieve_not_run_status
+from m4db.db.neb.check_endpoint_exists import endpoint_key
+from m4db.db.neb.check_endpoint_exists import parent_path_with_models_exists
+from m4db.db.neb.check_endpoint_exists import parent_paths_with_model_ids_exist
+
+
+class TestNEBEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        invalidate_reference_data_caches()
+        populate_running_statuses(self.session)
+        populate_neb_calculation_types(self.session)
+
+        self.mdata = Metadata(db_user=DBUser(user_name="test", first_name="Test", surname="User",
+                                             email="test@example.com"),
+                              project=Project(name="test", description="test project"),
+                              software=Software(name="merrill", version="1.8.6"))
+        self.session.add(self.mdata)
+        self.session.commit()
+
+        # Models are mostly referenced by id, so rows with dangling foreign keys are fine here (the NEB validator
+        # does however require a geometry).
+        geometry = Ellipsoid(size=0.1, element_size=0.01, prolateness=1.0, oblateness=1.0)
+        self.models = [Model(unique_id=f"00000000-0000-0000-0000-{index:012d}", geometry=geometry,
+                             initial_magnetization_id=1, running_status=retrieve_not_run_status(self.session),
+                             model_run_data_id=1, model_report_data_id=1, mdata=self.mdata)
+                       for index in range(4)]
+        self.session.add_all(self.models)
+        self.session.commit()
+
+        self.parent = self.new_neb(self.models[2], self.models[0])
+        self.session.commit()
+
+    def tearDown(self):
+        invalidate_reference_data_caches()
+
+    def new_neb(self, start_model, end_model, parent_neb=None):
+        neb = NEB(start_model=start_model, end_model=end_model, parent_neb=parent_neb,
+                  neb_calculation_type=self.session.query(NEBCalculationType).first(),
+                  neb_run_data=NEBRunData(), neb_report_data=NEBReportData(),
+                  running_status=retrieve_not_run_status(self.session), mdata=self.mdata)
+        self.session.add(neb)
+        return neb
+
+    def test_endpoint_key(self):
+        self.assertEqual(endpoint_key(5, 3), (3, 5))
+        self.assertEqual((self.parent.endpoint_low_model_id, self.parent.endpoint_high_model_id),
+                         endpoint_key(self.models[0].id, self.models[2].id))
+
+    def test_parent_path_exists_in_either_direction(self):
+        unique_ids = [model.unique_id for model in self.models]
+        parent_unique_id = self.parent.unique_id
+
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        self.assertEqual(parent_path_with_models_exists(self.session, unique_ids[0], unique_ids[2]), parent_unique_id)
+        self.assertEqual(parent_path_with_models_exists(self.session, unique_ids[2], unique_ids[0]), parent_unique_id)
+        self.assertIsNone(parent_path_with_models_exists(self.session, unique_ids[0], unique_ids[1]))
+
+        # One query per lookup.
+        self.assertEqual(len(statements), 3)
+
+    def test_bulk_check(self):
+        ids = [model.id for model in self.models]
+        pairs = [(ids[i], ids[j]) for i in range(4) for j in range(4) if i != j]
+
+        existing = parent_paths_with_model_ids_exist(self.session, pairs, batch_size=5)
+
+        self.assertEqual(existing, {endpoint_key(ids[0], ids[2]): self.parent.unique_id})
+
+    def test_unique_parent_path(self):
+        # A child path between the same models is fine ...
+        self.new_neb(self.models[0], self.models[2], parent_neb=self.parent)
+        self.session.commit()
+
+        # ... but a second parent path (in the reverse direction) is not.
+        self.new_neb(self.models[0], self.models[2])
+        with self.assertRaises(IntegrityError):
+            self.session.commit()
+
+
+if __name__ == "__main__":
+    with open("test-neb-endpoints.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,126 @@
+r"""
+Test the process-wide reference data cache.
+"""
+
+import unittest
+import xmlrunner
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from m4db.install.data.running_statuses import populate_running_statuses
+
+from m4db.db.reference_data_cache import running_status_cache
+from m4db.db.reference_data_cache import software_cache
+from m4db.db.reference_data_cache import invalidate_reference_data_caches
+
+from m4db.db.running_status.retrieve import retrieve_running_status
+from m4db.db.software.create import create_software
+from m4db.db.software.retrieve import retrieve_software
+
+from fixtures import new_engine
+
+
+class TestReferenceDataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = new_engine()
+        self.Session = sessionmaker(bind=self.engine)
+
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+        invalidate_reference_data_caches()
+        populate_running_statuses(self.Session())
+
+    def tearDown(self):
+        invalidate_reference_data_caches()
+
+    def test_warm_cache_issues_no_queries(self):
+        r"""
+        Once the cache is warm, running status lookups from new sessions must not touch the database.
+        """
+        session = self.Session()
+        not_run = retrieve_running_status(session, "not-run")
+        self.assertEqual(not_run.name, "not-run")
+
+        self.statements.clear()
+        for _ in range(10):
+            other_session = self.Session()
+            finished = retrieve_running_status(other_session, "finished")
+            self.assertEqual(finished.name, "finished")
+            self.assertIn(finished, other_session)
+        self.assertEqual(len(self.statements), 0)
+
+    def test_unknown_key_raises(self):
+        session = self.Session()
+        with self.assertRaises(ValueError):
+            retrieve_running_status(session, "no-such-status")
+
+    def test_create_evicts(self):
+        r"""
+        Creating software through the create module must make the new row visible to the cache.
+        """
+        session = self.Session()
+        self.assertIsNone(retrieve_software(session, "merrill", "1.8.6", allow_none=True))
+
+        software = create_software(session, "merrill", "1.8.6", "/usr/bin/merrill", None, None, None)
+        session.add(software)
+        session.commit()
+
+        self.assertIsNone(software_cache._rows)
+        cached = retrieve_software(self.Session(), "merrill", "1.8.6")
+        self.assertEqual(cached.executable, "/usr/bin/merrill")
+
+    def test_create_evicts_after_commit(self):
+        r"""
+        The cache must not be evicted before the new software is committed, or it could be reloaded without it.
+        """
+        session = self.Session()
+        self.assertIsNone(retrieve_software(session, "merrill", "1.8.6", allow_none=True))
+
+        software = create_software(session, "merrill", "1.8.6", "/usr/bin/merrill", None, None, None)
+        session.add(software)
+        self.assertIsNotNone(software_cache._rows)
+
+        session.commit()
+        self.assertIsNone(software_cache._rows)
+
+    def test_unknown_key_reloads_once(self):
+        r"""
+        Repeated lookups of a missing row must not reload the table each time.
+        """
+        session = self.Session()
+        self.assertIsNone(retrieve_software(session, "merrill", "1.8.6", allow_none=True))
+
+        self.statements.clear()
+        for _ in range(10):
+            self.assertIsNone(retrieve_software(self.Session(), "merrill", "1.8.6", allow_none=True))
+        self.assertEqual(len(self.statements), 0)
+
+        # The missing row is looked for again once the cache is invalidated.
+        software = create_software(session, "merrill", "1.8.6", "/usr/bin/merrill", None, None, None)
+        session.add(software)
+        session.commit()
+        self.assertIsNotNone(retrieve_software(self.Session(), "merrill", "1.8.6", allow_none=True))
+
+    def test_cached_object_is_clean(self):
+        r"""
+        Cached rows must be attached to the caller's session as clean, persistent rows.
+        """
+        running_status_cache.get(self.Session(), "not-run")
+
+        session = self.Session()
+        status = running_status_cache.get(session, "re-run")
+        self.assertIn(status, session)
+        self.assertNotIn(status, session.dirty)
+        self.assertEqual(session.get(type(status), status.id).name, "re-run")
+
+
+if __name__ == "__main__":
+    with open("test-reference-data-cache.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,130 @@
+r"""
+Test the row transforms of the v1 to v2 upgrade script.
+"""
+
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import xmlrunner
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+
+from m4db.configuration import Configuration
+from m4db.configuration import read_config_from_environ
+from m4db.configuration import write_config_to_file
+
+from m4db import GLOBAL
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "upgrade_scripts"))
+
+from m4db_upgrade_from_v1_to_v2 import TABLE_COPIES
+
+# Columns of the new tables that are not copied from a source column of the same name.
+NEW_COLUMNS = {
+    "db_user": ["password", "ticket_hash", "ticket_length", "ticket_timeout", "access_level"],
+    "model": ["rh_tot", "volume", "model_materials_text_id"],
+    "neb": ["energy_barrier"],
+    "neb_model_split": ["id"],
+    "project": ["last_modified", "created"]
+}
+
+
+class TestUpgradeTransforms(unittest.TestCase):
+
+    def setUp(self):
+        # The password helpers read the password salt from the configuration.
+        self.directory = tempfile.mkdtemp()
+        file_name = os.path.join(self.directory, "config.yaml")
+        write_config_to_file(file_name, Configuration({
+            "password-salt": "salt",
+            "database": {"type": "SQLITE", "uri": "sqlite://", "file-root": "/data", "working-root": "/work"},
+            "runner-web": {"host": "http://localhost", "port": 8080, "no-of-retries": 1, "backoff-factor": 1},
+            "scheduler": {"command": "sbatch"},
+            "modules": {"path": "/opt/modules", "to-load": ["merrill"]}
+        }))
+        self.environ = os.environ.get(GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR)
+        os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR] = file_name
+
+        # The v1 (old) tables that the model_materials_text transform reads.
+        self.old_engine = create_engine("sqlite://")
+        with self.old_engine.begin() as connection:
+            connection.execute(text("create table material (id integer, name varchar, temperature float)"))
+            connection.execute(text(
+                "create table model_material_association (model_id integer, material_id integer, submesh_id integer)"
+            ))
+            connection.execute(text("insert into material values (1, 'magnetite', 20.0), (2, 'iron', 20.0)"))
+            connection.execute(text("insert into model_material_association values (7, 2, 2), (7, 1, 1)"))
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR]
+        else:
+            os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR] = self.environ
+        read_config_from_environ.config = None
+        shutil.rmtree(self.directory)
+        self.old_engine.dispose()
+
+    def transform(self, table, record):
+        with self.old_engine.connect() as connection:
+            rows = table.transform(connection, [record], 10)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(rows[0]), len(table.columns))
+        return dict(zip(table.columns, rows[0]))
+
+    def test_named_records(self):
+        # Each source value is its own column name, so every copied value must land in the column of that name.
+        for table in TABLE_COPIES:
+            if table.name == "model_materials_text":
+                continue
+            with self.subTest(table=table.name):
+                row = self.transform(table, tuple(table.select))
+                for column, value in row.items():
+                    if column not in NEW_COLUMNS.get(table.name, []):
+                        self.assertEqual(value, column)
+
+    def test_new_columns(self):
+        tables = {table.name: table for table in TABLE_COPIES}
+
+        row = self.transform(tables["model"], tuple(tables["model"].select))
+        self.assertEqual(row["model_materials_text_id"], "id")
+        self.assertIsNone(row["rh_tot"])
+        self.assertIsNone(row["volume"])
+
+        row = self.transform(tables["db_user"], tuple(tables["db_user"].select))
+        self.assertEqual(len(row["password"]), 32)
+        self.assertEqual(row["access_level"], GLOBAL.ACCESS_ALL)
+
+        self.assertEqual(self.transform(tables["neb"], tuple(tables["neb"].select))["energy_barrier"], 0.0)
+        self.assertEqual(
+            self.transform(tables["neb_model_split"], tuple(tables["neb_model_split"].select))["id"], 10)
+
+    def test_model_materials_text(self):
+        table = [table for table in TABLE_COPIES if table.name == "model_materials_text"][0]
+        row = self.transform(table, (7,))
+
+        self.assertEqual(row["id"], 7)
+        self.assertEqual(row["materials"], "iron,magnetite")
+        self.assertEqual(row["submeshidxs_materials"], "1:magnetite,2:iron")
+        self.assertEqual(row["submeshidxs_materials_temperatures"], "1:magnetite:20.0,2:iron:20.0")
+        self.assertIsInstance(row["created"], datetime.datetime)
+
+    def test_timestamps_are_naive(self):
+        tables = {table.name: table for table in TABLE_COPIES}
+
+        rows = [self.transform(tables["model_materials_text"], (7,)),
+                self.transform(tables["project"], tuple(tables["project"].select))]
+        for row in rows:
+            self.assertIsNone(row["last_modified"].tzinfo)
+            self.assertIsNone(row["created"].tzinfo)
+
+
+if __name__ == "__main__":
+    with open("test-upgrade-from-v1-to-v2.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,113 @@
+r"""
+Test the SQLite connection settings and the single-writer queue.
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+import xmlrunner
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from m4db.configuration import SQLite
+
+from m4db.orm.schema import Base
+from m4db.orm.schema import Project
+
+from m4db.sessions_sqlite import configure_sqlite_engine
+
+from m4db.db.write_queue import WriteQueue
+
+
+def add_project(session, name):
+    session.add(Project(name=name, description="A test project."))
+    session.flush()
+    return name
+
+
+def add_project_and_fail(session, name):
+    add_project(session, name)
+    raise ValueError("Failed after adding project '{}'.".format(name))
+
+
+class TestWriteQueue(unittest.TestCase):
+
+    def setUp(self):
+        file_descriptor, self.file_name = tempfile.mkstemp(suffix=".db")
+        os.close(file_descriptor)
+
+        self.engine = create_engine("sqlite:///{}".format(self.file_name))
+        configure_sqlite_engine(self.engine, SQLite())
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        for suffix in ["", "-wal", "-shm"]:
+            if os.path.isfile(self.file_name + suffix):
+                os.remove(self.file_name + suffix)
+
+    def project_names(self):
+        with self.Session() as session:
+            return sorted(name for name, in session.query(Project.name))
+
+    def test_pragmas(self):
+        with self.engine.connect() as connection:
+            self.assertEqual("wal", connection.execute(text("pragma journal_mode")).scalar())
+            self.assertEqual(1, connection.execute(text("pragma synchronous")).scalar())
+            self.assertEqual(30000, connection.execute(text("pragma busy_timeout")).scalar())
+            self.assertEqual(-65536, connection.execute(text("pragma cache_size")).scalar())
+
+    def test_default_profile_only_sets_busy_timeout(self):
+        engine = create_engine("sqlite:///{}".format(self.file_name))
+        configure_sqlite_engine(engine, SQLite({"profile": "default", "busy-timeout": 1000}))
+        with engine.connect() as connection:
+            self.assertEqual(1000, connection.execute(text("pragma busy_timeout")).scalar())
+            self.assertEqual(2, connection.execute(text("pragma synchronous")).scalar())
+        engine.dispose()
+
+    def test_concurrent_writers(self):
+        names = ["project-{:03d}".format(index) for index in range(200)]
+
+        with WriteQueue(self.Session, max_batch_size=16) as write_queue:
+            def worker(worker_names):
+                for name in worker_names:
+                    self.assertEqual(name, write_queue.submit(add_project, name).result())
+
+            threads = [threading.Thread(target=worker, args=(names[index::8],)) for index in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(names, self.project_names())
+
+    def test_failed_write_is_isolated(self):
+        with WriteQueue(self.Session) as write_queue:
+            # Queue all writes before they are executed so that they are committed in the same batch.
+            futures = [
+                write_queue.submit(add_project, "project-1"),
+                write_queue.submit(add_project_and_fail, "project-2"),
+                write_queue.submit(add_project, "project-3")
+            ]
+            self.assertEqual("project-1", futures[0].result())
+            with self.assertRaises(ValueError):
+                futures[1].result()
+            self.assertEqual("project-3", futures[2].result())
+
+        self.assertEqual(["project-1", "project-3"], self.project_names())
+
+    def test_submit_before_start(self):
+        with self.assertRaises(RuntimeError):
+            WriteQueue(self.Session).submit(add_project, "project-1")
+
+
+if __name__ == "__main__":
+    with open("test-write-queue.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,152 @@
+r"""
+Test configuration loading by way of the validated configuration snapshot.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import xmlrunner
+
+from m4db.configuration import Configuration
+from m4db.configuration import config_snapshot_file_name
+from m4db.configuration import read_config_from_environ
+from m4db.configuration import read_config_with_snapshot
+from m4db.configuration import read_database_config
+from m4db.configuration import write_config_to_environ
+from m4db.configuration import write_config_to_file
+
+from m4db import GLOBAL
+
+
+def scheduler_config(scheduler_command="sbatch"):
+    return Configuration({
+        "password-salt": "salt",
+        "database": {"type": "SQLITE", "uri": "sqlite://", "file-root": "/data", "working-root": "/work",
+                     "pool-size": 7, "sqlite": {"profile": "default"}},
+        "runner-web": {"host": "http://localhost", "port": 8080, "no-of-retries": 1, "backoff-factor": 1},
+        "scheduler": {"command": scheduler_command},
+        "modules": {"path": "/opt/modules", "to-load": ["merrill"]}
+    })
+
+
+class TestConfigurationSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, "config.yaml")
+        self.snapshot_file = config_snapshot_file_name(self.file_name)
+        write_config_to_file(self.file_name, scheduler_config())
+
+        self.environ = os.environ.get(GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR)
+        os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR] = self.file_name
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR]
+        else:
+            os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR] = self.environ
+        read_config_from_environ.config = None
+        shutil.rmtree(self.directory)
+
+    def read_snapshot(self):
+        with open(self.snapshot_file, "r") as fin:
+            return json.load(fin)
+
+    def write_snapshot(self, snapshot):
+        with open(self.snapshot_file, "w") as fout:
+            json.dump(snapshot, fout)
+
+    def test_snapshot_is_written(self):
+        config = read_config_with_snapshot(self.file_name)
+
+        self.assertEqual(config.scheduler.command, "sbatch")
+        snapshot = self.read_snapshot()
+        self.assertEqual(snapshot["config"], config.to_primitive())
+        self.assertEqual(snapshot["mtime-ns"], os.stat(self.file_name).st_mtime_ns)
+        self.assertEqual(os.stat(self.snapshot_file).st_mode & 0o777, 0o600)
+        self.assertEqual([f for f in os.listdir(self.directory) if f.endswith(".tmp")], [])
+
+    def test_unchanged_file_uses_snapshot(self):
+        read_config_with_snapshot(self.file_name)
+
+        # Alter the snapshot only, if the snapshot is used the altered value is read.
+        snapshot = self.read_snapshot()
+        snapshot["config"]["scheduler"]["command"] = "qsub"
+        self.write_snapshot(snapshot)
+
+        self.assertEqual(read_config_with_snapshot(self.file_name).scheduler.command, "qsub")
+
+    def test_touched_file_with_same_contents_uses_snapshot(self):
+        read_config_with_snapshot(self.file_name)
+        snapshot = self.read_snapshot()
+        snapshot["config"]["scheduler"]["command"] = "qsub"
+        self.write_snapshot(snapshot)
+
+        stat = os.stat(self.file_name)
+        os.utime(self.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        self.assertEqual(read_config_with_snapshot(self.file_name).scheduler.command, "qsub")
+        self.assertEqual(self.read_snapshot()["mtime-ns"], stat.st_mtime_ns + 1000000000)
+
+    def test_changed_file_is_reloaded(self):
+        read_config_with_snapshot(self.file_name)
+
+        write_config_to_file(self.file_name, scheduler_config("qsub"))
+        stat = os.stat(self.file_name)
+        os.utime(self.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        self.assertEqual(read_config_with_snapshot(self.file_name).scheduler.command, "qsub")
+        self.assertEqual(self.read_snapshot()["config"]["scheduler"]["command"], "qsub")
+
+    def test_unusable_snapshots_are_ignored(self):
+        read_config_with_snapshot(self.file_name)
+        snapshot = self.read_snapshot()
+        snapshot["config"]["scheduler"]["command"] = "qsub"
+
+        # Snapshots of a different format or schema, or with an unreadable configuration, are never used.
+        for altered in [dict(snapshot, format=0), dict(snapshot, schema="other"), dict(snapshot, config=[]),
+                        dict(snapshot, config={"database": 5})]:
+            self.write_snapshot(altered)
+            self.assertEqual(read_config_with_snapshot(self.file_name).scheduler.command, "sbatch")
+
+        with open(self.snapshot_file, "w") as fout:
+            fout.write("{not json")
+        self.assertEqual(read_config_with_snapshot(self.file_name).scheduler.command, "sbatch")
+
+    def test_force_reload(self):
+        config = read_config_from_environ()
+        self.assertIs(read_config_from_environ(), config)
+        self.assertIs(read_config_from_environ(force_reload=True), config)
+
+        write_config_to_environ(scheduler_config("qsub"))
+        stat = os.stat(self.file_name)
+        os.utime(self.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        self.assertIs(read_config_from_environ(), config)
+        self.assertEqual(read_config_from_environ(force_reload=True).scheduler.command, "qsub")
+
+    def test_database_config_with_uri(self):
+        self.assertEqual(read_database_config().uri, "sqlite://")
+
+        # Only the uri is overridden, the cached configuration is left alone.
+        database = read_database_config("sqlite:///other.db")
+        self.assertEqual(database.uri, "sqlite:///other.db")
+        self.assertEqual(database.pool_size, 7)
+        self.assertEqual(database.sqlite.profile, "default")
+        self.assertEqual(read_config_from_environ().database.uri, "sqlite://")
+
+        # Without a configuration the defaults are used.
+        del os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR]
+        database = read_database_config("sqlite:///other.db")
+        os.environ[GLOBAL.M4DB_DATABASE_CONFIG_ENV_VAR] = self.file_name
+        self.assertEqual(database.pool_size, 5)
+        self.assertEqual(database.sqlite.profile, "performance")
+
+
+if __name__ == "__main__":
+    with open("test-configuration.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False)
@@ -0,0 +1,93 @@
+r"""
+Test the engine options built from database configuration and connection pool metrics.
+"""
+
+import os
+import tempfile
+import unittest
+import xmlrunner
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+
+from m4db.configuration import Database
+
+from m4db.sessions_postgres import engine_options
+
+from m4db.utilities.pool_metrics import PoolMetrics
+
+
+class TestEngineOptions(unittest.TestCase):
+
+    def test_defaults(self):
+        database = Database({"uri": "postgresql+psycopg2://m4db@localhost/m4db"})
+        options = engine_options(database)
+
+        self.assertEqual(5, options["pool_size"])
+        self.assertEqual(10, options["max_overflow"])
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual("values_plus_batch", options["executemany_mode"])
+        self.assertEqual(1000, options["executemany_batch_page_size"])
+        self.assertNotIn("connect_args", options)
+
+    def test_statement_timeout(self):
+        database = Database({"uri": "postgresql+psycopg2://m4db@localhost/m4db", "statement-timeout": 5000})
+        options = engine_options(database)
+
+        self.assertEqual({"options": "-c statement_timeout=5000"}, options["connect_args"])
+
+    def test_nullpool(self):
+        database = Database({"uri": "postgresql+psycopg2://m4db@localhost/m4db"})
+        options = engine_options(database, nullpool=True)
+
+        self.assertIs(NullPool, options["poolclass"])
+        self.assertNotIn("pool_size", options)
+
+    def test_psycopg_has_no_executemany_mode(self):
+        database = Database({"uri": "postgresql+psycopg://m4db@localhost/m4db"})
+        options = engine_options(database)
+
+        self.assertNotIn("executemany_mode", options)
+        self.assertEqual(1000, options["insertmanyvalues_page_size"])
+
+
+class TestPoolMetrics(unittest.TestCase):
+
+    def setUp(self):
+        file_descriptor, self.file_name = tempfile.mkstemp(suffix=".db")
+        os.close(file_descriptor)
+        self.engine = create_engine("sqlite:///{}".format(self.file_name))
+        self.metrics = PoolMetrics(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.file_name)
+
+    def test_counts(self):
+        for _ in range(3):
+            with self.engine.connect() as connection:
+                connection.execute(text("select 1"))
+
+        metrics = self.metrics.as_dict()
+
+        self.assertEqual("QueuePool", metrics["pool"])
+        self.assertEqual(1, metrics["connects"])
+        self.assertEqual(3, metrics["checkouts"])
+        self.assertEqual(3, metrics["checkins"])
+        self.assertEqual(0, metrics["checkedout"])
+        self.assertEqual(1, metrics["checkedin"])
+
+    def test_checked_out(self):
+        with self.engine.connect():
+            metrics = self.metrics.as_dict()
+
+        self.assertEqual(1, metrics["checkedout"])
+
+
+if __name__ == "__main__":
+    with open("test-engines.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,213 @@
+r"""
+Test the geometry ingest stage (fast patran reader, content hashes and mesh sidecars).
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import xmlrunner
+
+import numpy as np
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from m4db.db.geometry.retrieve import get_geometries_by_content_hash
+
+from m4db.file_io.mesh_sidecar import read_mesh
+from m4db.file_io.mesh_sidecar import read_mesh_sidecar
+from m4db.file_io.mesh_sidecar import write_mesh_sidecar
+from m4db.file_io.patran import parse_patran
+from m4db.file_io.patran import read_patran
+from m4db.file_io.patran import read_patran_fast
+
+from m4db.orm.schema import Base
+from m4db.orm.schema import Geometry
+
+from m4db.utilities.file_links import LINK_METHOD_HARDLINK
+from m4db.utilities.file_links import link_or_copy
+from m4db.utilities.file_links import same_file
+from m4db.utilities.geometry import geometry_volume
+from m4db.utilities.geometry_ingest import file_content_hash
+from m4db.utilities.geometry_ingest import geometry_fields
+from m4db.utilities.geometry_ingest import ingest_patran
+from m4db.utilities.geometry_ingest import link_geometry_files
+from m4db.utilities.geometry_ingest import store_geometry_mesh
+from m4db.utilities.geometry_ingest import write_geometry_sidecar
+
+from m4db import GLOBAL
+
+# A unit cube split in to six tetrahedra (corner index = x + 2y + 4z), the last two are in a second submesh.
+CUBE_VERTICES = np.array([[x, y, z] for z in (0.0, 1.0) for y in (0.0, 1.0) for x in (0.0, 1.0)])
+CUBE_ELEMENTS = np.array([
+    [0, 1, 3, 7, 1], [0, 1, 5, 7, 1], [0, 2, 3, 7, 1], [0, 2, 6, 7, 1], [0, 4, 5, 7, 2], [0, 4, 6, 7, 2]
+])
+
+
+def patran_text(vertices, elements, reverse=False):
+    r"""
+    Write a mesh as a (MERRILL style) patran neutral file, optionally with the packets in reverse order.
+    """
+    vertex_packets = [
+        "01{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}\n".format(index + 1, 1, 2, 0, 0, 0, 0, 0) +
+        "{:16.9E}{:16.9E}{:16.9E}\n".format(*vertex) +
+        "1G       6       0       0  000000\n"
+        for index, vertex in enumerate(vertices)
+    ]
+    element_packets = [
+        "02{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}\n".format(index + 1, 5, 2, 0, 0, 0, 0, 0) +
+        "{:8d}{:8d}{:8d}{:8d} 0.000000000E+00 0.000000000E+00 0.000000000E+00\n".format(4, 0, element[4], 0) +
+        "{:8d}{:8d}{:8d}{:8d}\n".format(*(element[0:4] + 1))
+        for index, element in enumerate(elements)
+    ]
+    if reverse:
+        vertex_packets.reverse()
+        element_packets.reverse()
+
+    return (
+        "25       0       0       1       0       0       0       0       0\n"
+        "PATRAN neutral file\n"
+        "26{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}\n".format(0, 0, 1, len(vertices), len(elements), 0, 0, 0) +
+        "unit cube\n" +
+        "".join(vertex_packets) +
+        "".join(element_packets) +
+        "99       0       0       1       0       0       0       0       0\n"
+    )
+
+
+class TestGeometryIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.patran_file = os.path.join(self.directory, "cube.pat")
+        with open(self.patran_file, "w") as fout:
+            fout.write(patran_text(CUBE_VERTICES, CUBE_ELEMENTS))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertMeshEqual(self, mesh, expected):
+        np.testing.assert_allclose(mesh[0], expected[0])
+        np.testing.assert_array_equal(mesh[1], expected[1])
+        self.assertEqual(mesh[2], expected[2])
+
+    def test_fast_reader_matches_read_patran(self):
+        expected = read_patran(self.patran_file)
+        self.assertMeshEqual(read_patran_fast(self.patran_file), expected)
+        self.assertMeshEqual(read_patran_fast(self.patran_file), (CUBE_VERTICES, CUBE_ELEMENTS, [1, 2]))
+
+    def test_fast_reader_orders_packets(self):
+        mesh = parse_patran(patran_text(CUBE_VERTICES, CUBE_ELEMENTS, reverse=True))
+        self.assertMeshEqual(mesh, (CUBE_VERTICES, CUBE_ELEMENTS, [1, 2]))
+
+    def test_fast_reader_checks(self):
+        text = patran_text(CUBE_VERTICES, CUBE_ELEMENTS)
+        with self.assertRaises(ValueError):
+            parse_patran(text.replace("02       6", "02       9", 1))
+        with self.assertRaises(ValueError):
+            parse_patran(patran_text(CUBE_VERTICES, CUBE_ELEMENTS[0:5]).replace(
+                "26       0       0       1       8       5", "26       0       0       1       8       6", 1
+            ))
+
+    def test_ingest(self):
+        ingest = ingest_patran(self.patran_file)
+        with open(self.patran_file, "rb") as fin:
+            expected_hash = hashlib.sha256(fin.read()).hexdigest()
+        self.assertEqual(ingest.content_hash, expected_hash)
+        self.assertEqual(file_content_hash(self.patran_file, block_size=7), expected_hash)
+
+        fields = geometry_fields(ingest)
+        self.assertEqual(fields["nvertices"], 8)
+        self.assertEqual(fields["nelements"], 6)
+        self.assertEqual(fields["nsubmeshes"], 2)
+        self.assertAlmostEqual(fields["computed_volume"], 1.0)
+        self.assertAlmostEqual(fields["computed_volume"], geometry_volume(CUBE_VERTICES, CUBE_ELEMENTS))
+        self.assertAlmostEqual(fields["computed_element_length_minimum"], 1.0)
+        self.assertAlmostEqual(fields["computed_element_length_maximum"], np.sqrt(3.0))
+        self.assertEqual(fields["content_hash"], expected_hash)
+
+    def test_sidecar(self):
+        ingest = ingest_patran(self.patran_file)
+        sidecar_file = write_geometry_sidecar(self.directory, ingest)
+        self.assertEqual(os.path.basename(sidecar_file), GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME)
+
+        self.assertMeshEqual(read_mesh_sidecar(sidecar_file, ingest.content_hash), ingest[0:3])
+        with self.assertRaises(ValueError):
+            read_mesh_sidecar(sidecar_file, "stale")
+
+        # A stale sidecar falls back to the patran file.
+        write_mesh_sidecar(sidecar_file, CUBE_VERTICES[0:4], CUBE_ELEMENTS[0:1], [1], "stale")
+        self.assertMeshEqual(read_mesh(self.patran_file, sidecar_file, ingest.content_hash), ingest[0:3])
+        self.assertEqual(len(read_mesh(self.patran_file, sidecar_file)[0]), 4)
+
+
+class TestGeometryDeduplication(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.directory, "source")
+        self.dest_dir = os.path.join(self.directory, "dest")
+        os.makedirs(self.source_dir)
+        os.makedirs(self.dest_dir)
+
+        patran_file = os.path.join(self.source_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME)
+        with open(patran_file, "w") as fout:
+            fout.write(patran_text(CUBE_VERTICES, CUBE_ELEMENTS))
+        self.ingest = ingest_patran(patran_file)
+        store_geometry_mesh(self.source_dir, self.ingest)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_link_or_copy(self):
+        source = os.path.join(self.source_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME)
+        destination = os.path.join(self.dest_dir, GLOBAL.GEOMETRY_PATRAN_FILE_NAME)
+        with open(destination, "w") as fout:
+            fout.write("replaced")
+
+        self.assertEqual(link_or_copy(source, destination), LINK_METHOD_HARDLINK)
+        self.assertTrue(same_file(source, destination))
+        self.assertEqual(os.listdir(self.dest_dir), [GLOBAL.GEOMETRY_PATRAN_FILE_NAME])
+
+        with self.assertRaises(IOError):
+            link_or_copy(os.path.join(self.source_dir, "missing"), destination)
+
+    def test_link_geometry_files(self):
+        methods = link_geometry_files(self.source_dir, self.dest_dir)
+        self.assertEqual(set(methods.keys()),
+                         {GLOBAL.GEOMETRY_PATRAN_FILE_NAME, GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME})
+        for file_name in methods:
+            self.assertTrue(same_file(os.path.join(self.source_dir, file_name), os.path.join(self.dest_dir, file_name)))
+
+        # Files that are already shared are left alone.
+        self.assertEqual(link_geometry_files(self.source_dir, self.dest_dir), {})
+
+        # The shared sidecar is used by an identical geometry rather than writing a new one.
+        shared_dir = os.path.join(self.directory, "shared")
+        os.makedirs(shared_dir)
+        store_geometry_mesh(shared_dir, self.ingest, self.source_dir)
+        self.assertTrue(same_file(os.path.join(self.source_dir, GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME),
+                                  os.path.join(shared_dir, GLOBAL.GEOMETRY_MESH_SIDECAR_FILE_NAME)))
+
+    def test_geometries_by_content_hash(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+
+        for unique_id, content_hash in [("a", self.ingest.content_hash), ("b", "other"), ("c", self.ingest.content_hash)]:
+            session.add(Geometry(unique_id=unique_id, type="geometry", content_hash=content_hash))
+        session.commit()
+
+        geometries = get_geometries_by_content_hash(session, self.ingest.content_hash)
+        self.assertEqual([geometry.unique_id for geometry in geometries], ["a", "c"])
+        self.assertEqual(get_geometries_by_content_hash(session, "missing"), [])
+
+
+if __name__ == "__main__":
+    with open("test-geometry-ingest.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,49 @@
+r"""
+Test that the command line entry points do not import the slow optional modules (VTK, pandas, tabulate) at start up.
+"""
+
+import subprocess
+import sys
+import unittest
+import xmlrunner
+
+ENTRY_POINTS = [
+    "m4db.scripts.m4db_setup_database.cmd_line_tool",
+    "m4db.scripts.m4db_user.cmd_line_tool",
+    "m4db.scripts.m4db_software.cmd_line_tool",
+    "m4db.scripts.m4db_project.cmd_line_tool",
+    "m4db.scripts.m4db_geometry.cmd_line_tool",
+    "m4db.scripts.m4db_model.cmd_line_tool",
+    "m4db.scripts.m4db_run_model.cmd_line_tool",
+    "m4db.scripts.m4db_assay.actions"
+]
+
+SLOW_MODULES = ["vtk", "pandas", "tabulate"]
+
+IMPORT_SCRIPT = r"""
+import importlib
+import sys
+
+for module in {entry_points!r}:
+    importlib.import_module(module)
+print(",".join(name for name in {slow_modules!r} if name in sys.modules))
+"""
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_entry_points_do_not_import_slow_modules(self):
+        # A fresh interpreter is used, since the test suite itself may already have imported any of these.
+        script = IMPORT_SCRIPT.format(entry_points=ENTRY_POINTS, slow_modules=SLOW_MODULES)
+        result = subprocess.run([sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    with open("test-lazy-imports.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False)
@@ -0,0 +1,103 @@
+r"""
+Test queue based, structured, sampled and rotated logging.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import shutil
+import tempfile
+import unittest
+import xmlrunner
+
+from m4db.utilities.logger import DebugSampler
+from m4db.utilities.logger import JSONFormatter
+from m4db.utilities.logger import get_logger
+from m4db.utilities.logger import log_file_handler
+from m4db.utilities.logger import setup_logger
+from m4db.utilities.logger import stop_logger
+
+
+def log_record(level=logging.DEBUG, msg="message", **extra):
+    record = logging.LogRecord("m4db", level, "file.py", 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.directory, "m4db.log")
+
+    def tearDown(self):
+        stop_logger()
+        shutil.rmtree(self.directory)
+
+    def read_log_lines(self):
+        with open(self.log_file, "r") as fin:
+            return fin.read().splitlines()
+
+    def test_json_formatter(self):
+        entry = json.loads(JSONFormatter().format(log_record(msg="quants", unique_id="abc", quants={"e_tot": 1.5})))
+
+        self.assertEqual(entry["level"], "DEBUG")
+        self.assertEqual(entry["message"], "quants")
+        self.assertEqual(entry["unique_id"], "abc")
+        self.assertEqual(entry["quants"], {"e_tot": 1.5})
+        self.assertNotIn("args", entry)
+
+    def test_debug_sampler(self):
+        sampler = DebugSampler(0.25)
+
+        self.assertEqual(sum(sampler.filter(log_record()) for _ in range(100)), 25)
+        self.assertTrue(all(sampler.filter(log_record(logging.INFO)) for _ in range(10)))
+        self.assertFalse(any(DebugSampler(0.0).filter(log_record()) for _ in range(10)))
+
+    def test_queue_logging(self):
+        setup_logger(self.log_file, "debug", use_queue=True, structured=True)
+        logger = get_logger()
+        for index in range(100):
+            logger.debug("record", extra={"index": index})
+        stop_logger()
+
+        entries = [json.loads(line) for line in self.read_log_lines()]
+        self.assertEqual([entry["index"] for entry in entries], list(range(100)))
+        self.assertEqual(logger.handlers, [])
+
+    def test_sampled_logging(self):
+        setup_logger(self.log_file, "debug", debug_sample_rate=0.1)
+        logger = get_logger()
+        for _ in range(100):
+            logger.debug("debug record")
+        logger.error("error record")
+        stop_logger()
+
+        lines = self.read_log_lines()
+        self.assertEqual(len([line for line in lines if "debug record" in line]), 10)
+        self.assertEqual(len([line for line in lines if "error record" in line]), 1)
+        self.assertEqual(logger.filters, [])
+
+    def test_log_file_handler(self):
+        self.assertIs(type(log_file_handler(self.log_file)), logging.FileHandler)
+        self.assertIsInstance(log_file_handler(self.log_file, "size"), logging.handlers.RotatingFileHandler)
+        self.assertIsInstance(log_file_handler(self.log_file, "time"), logging.handlers.TimedRotatingFileHandler)
+        with self.assertRaises(ValueError):
+            log_file_handler(self.log_file, "weekly")
+
+    def test_size_rotation(self):
+        setup_logger(self.log_file, "info", rotation="size", max_bytes=1024, backup_count=2)
+        logger = get_logger()
+        for _ in range(100):
+            logger.info("x" * 100)
+        stop_logger()
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ["m4db.log", "m4db.log.1", "m4db.log.2"])
+
+
+if __name__ == "__main__":
+    with open("test-logger.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False)
@@ -0,0 +1,114 @@
+r"""
+Test the (vectorised) material parameter evaluation.
+"""
+
+import unittest
+import xmlrunner
+
+import numpy as np
+
+from m4db.materials import MATERIAL_PARAMETER_DTYPE
+from m4db.materials import MaterialParameterTable
+from m4db.materials import horner
+from m4db.materials import material_parameter_array
+from m4db.materials import material_parameter_sweep
+from m4db.materials import material_parameters
+from m4db.materials import saturation_energy
+from m4db.materials import saturation_magnetization
+
+# Material parameters (Aex, Ms, K1) computed with the original, power based, polynomials.
+REFERENCE_PARAMETERS = {
+    "iron": {
+        20.0: (1.930677371822247e-11, 1712813.0220904301, 47926.456890270216),
+        300.0: (1.5196893474227653e-11, 1608453.4034955986, 22328.30528105626),
+        700.0: (4.341726592800727e-12, 923980.4598600864, 672.585924423459)
+    },
+    "magnetite": {
+        20.0: (1.3348664845127952e-11, 480767.8328969511, -13265.76028692282),
+        300.0: (8.651564783820679e-12, 364353.88448360574, -1443.5643862915015),
+        575.0: (3.2533708479460215e-13, 72819.5839386583, -0.003674806473577337)
+    }
+}
+
+
+class TestMaterials(unittest.TestCase):
+
+    def test_horner(self):
+        x = np.array([-1.0, 0.0, 2.0])
+        np.testing.assert_allclose(horner((2.0, -3.0, 1.0), x), 2.0 * x ** 2 - 3.0 * x + 1.0)
+        self.assertEqual(horner((1.0, 1.0), 2.0), 3.0)
+
+    def test_reference_values(self):
+        for material, references in REFERENCE_PARAMETERS.items():
+            temperatures = np.array(sorted(references.keys()))
+            parameters = material_parameter_array(temperatures, material)
+            for row, temperature in zip(parameters, temperatures):
+                a, ms, k1 = references[temperature]
+                self.assertAlmostEqual(row["Aex"] / a, 1.0, places=10)
+                self.assertAlmostEqual(row["Ms"] / ms, 1.0, places=10)
+                self.assertAlmostEqual(row["K1"] / k1, 1.0, places=10)
+
+                scalar = material_parameters(temperature, material)
+                for name in ["Aex", "Ms", "K1", "Kd", "lambda_ex", "q_hardness"]:
+                    self.assertAlmostEqual(row[name] / scalar[name], 1.0, places=10)
+                self.assertIsInstance(scalar["Ms"], float)
+                self.assertEqual(scalar["Kd"], saturation_energy(temperature, material))
+                self.assertEqual(saturation_magnetization(temperature, material), scalar["Ms"])
+
+    def test_array_shape_and_undefined_values(self):
+        parameters = material_parameter_array(np.array([[20.0, 600.0]]), "magnetite")
+        self.assertEqual(parameters.dtype, MATERIAL_PARAMETER_DTYPE)
+        self.assertEqual(parameters.shape, (1, 2))
+        self.assertTrue(np.isnan(parameters["Ms"][0, 1]))
+        self.assertTrue(np.isnan(parameters["lambda_ex"][0, 1]))
+        self.assertFalse(np.isnan(parameters["Ms"][0, 0]))
+
+    def test_unknown_material(self):
+        with self.assertRaises(ValueError):
+            material_parameter_array([20.0], "nickel")
+        with self.assertRaises(ValueError):
+            MaterialParameterTable("nickel")
+
+    def test_memoised_table(self):
+        table = MaterialParameterTable("iron")
+        temperatures = np.array([300.0, 20.0, 300.0, 100.0])
+
+        parameters = table.parameters(temperatures)
+        self.assertEqual(len(table), 3)
+        np.testing.assert_array_equal(parameters, material_parameter_array(temperatures))
+
+        parameters = table.parameters([700.0, 20.0])
+        self.assertEqual(len(table), 4)
+        np.testing.assert_array_equal(parameters["temperature"], [700.0, 20.0])
+        np.testing.assert_array_equal(parameters, material_parameter_array([700.0, 20.0]))
+
+        self.assertEqual(table.parameters(100.0)["temperature"], 100.0)
+        self.assertEqual(len(table), 4)
+
+    def test_non_finite_temperatures_not_memoised(self):
+        table = MaterialParameterTable("iron")
+        table.parameters([20.0, 100.0])
+
+        for _ in range(2):
+            parameters = table.parameters([20.0, np.nan, np.inf])
+            self.assertEqual(len(table), 2)
+            self.assertEqual(parameters.shape, (3,))
+            self.assertEqual(parameters["temperature"][0], 20.0)
+            self.assertTrue(np.isnan(parameters["temperature"][1]))
+            self.assertTrue(np.isnan(parameters["Ms"][1]))
+            self.assertEqual(parameters["temperature"][2], np.inf)
+
+        self.assertTrue(np.isnan(MaterialParameterTable("magnetite").parameters(np.nan)["Ms"]))
+
+    def test_sweep(self):
+        temperatures = np.linspace(0.0, 570.0, 1000)
+        np.testing.assert_array_equal(material_parameter_sweep(temperatures, "magnetite"),
+                                      material_parameter_array(temperatures, "magnetite"))
+
+
+if __name__ == "__main__":
+    with open("test-materials.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
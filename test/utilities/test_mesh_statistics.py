@@ -0,0 +1,114 @@
+r"""
+Test the vectorised mesh statistics.
+"""
+
+import unittest
+import xmlrunner
+
+import numpy as np
+
+from m4db.utilities.geometry import geometry_edge_stats
+from m4db.utilities.geometry import geometry_volume
+from m4db.utilities.geometry import tetra_volume
+
+from m4db.utilities.mesh_statistics import aspect_ratios
+from m4db.utilities.mesh_statistics import dihedral_angles
+from m4db.utilities.mesh_statistics import element_volumes
+from m4db.utilities.mesh_statistics import exchange_length_check
+from m4db.utilities.mesh_statistics import mesh_statistics
+from m4db.utilities.mesh_statistics import signed_element_volumes
+from m4db.utilities.mesh_statistics import unique_edges
+
+# A regular tetrahedron with unit edges.
+REGULAR_VERTICES = np.array([
+    [0.0, 0.0, 0.0],
+    [1.0, 0.0, 0.0],
+    [0.5, np.sqrt(3.0) / 2.0, 0.0],
+    [0.5, np.sqrt(3.0) / 6.0, np.sqrt(2.0 / 3.0)]
+])
+REGULAR_ELEMENTS = np.array([[0, 1, 2, 3, 1]])
+
+# A unit cube split in to six tetrahedra (corner index = x + 2y + 4z), with a submesh column.
+CUBE_VERTICES = np.array([[x, y, z] for z in (0.0, 1.0) for y in (0.0, 1.0) for x in (0.0, 1.0)])
+CUBE_ELEMENTS = np.array([
+    [0, 1, 3, 7, 1], [0, 1, 5, 7, 1], [0, 2, 3, 7, 1], [0, 2, 6, 7, 1], [0, 4, 5, 7, 1], [0, 4, 6, 7, 1]
+])
+
+
+class TestMeshStatistics(unittest.TestCase):
+
+    def test_regular_tetrahedron(self):
+        self.assertAlmostEqual(1.0 / (6.0 * np.sqrt(2.0)), element_volumes(REGULAR_VERTICES, REGULAR_ELEMENTS)[0])
+        self.assertAlmostEqual(1.0, aspect_ratios(REGULAR_VERTICES, REGULAR_ELEMENTS)[0])
+        np.testing.assert_allclose(
+            dihedral_angles(REGULAR_VERTICES, REGULAR_ELEMENTS)[0], np.degrees(np.arccos(1.0 / 3.0)) * np.ones(6)
+        )
+
+    def test_orientation(self):
+        flipped = REGULAR_ELEMENTS[:, [1, 0, 2, 3]]
+        self.assertAlmostEqual(
+            -signed_element_volumes(REGULAR_VERTICES, REGULAR_ELEMENTS)[0],
+            signed_element_volumes(REGULAR_VERTICES, flipped)[0]
+        )
+        np.testing.assert_allclose(
+            dihedral_angles(REGULAR_VERTICES, REGULAR_ELEMENTS)[0], dihedral_angles(REGULAR_VERTICES, flipped)[0]
+        )
+
+    def test_cube(self):
+        self.assertAlmostEqual(1.0, geometry_volume(CUBE_VERTICES, CUBE_ELEMENTS))
+
+        # 12 cube edges, 6 face diagonals and the body diagonal.
+        edges = unique_edges(CUBE_ELEMENTS)
+        self.assertEqual(19, len(edges))
+        self.assertTrue(np.all(edges[:, 0] < edges[:, 1]))
+
+        average, std_dev, maximum, minimum = geometry_edge_stats(CUBE_VERTICES, CUBE_ELEMENTS)
+        self.assertAlmostEqual((12.0 + 6.0 * np.sqrt(2.0) + np.sqrt(3.0)) / 19.0, average)
+        self.assertAlmostEqual(np.sqrt(3.0), maximum)
+        self.assertAlmostEqual(1.0, minimum)
+
+        angles = dihedral_angles(CUBE_VERTICES, CUBE_ELEMENTS)
+        self.assertAlmostEqual(45.0, angles.min())
+        self.assertAlmostEqual(90.0, angles.max())
+
+    def test_matches_per_element_volume(self):
+        rng = np.random.default_rng(1)
+        vertices = rng.random((50, 3))
+        elements = np.array([rng.choice(50, 4, replace=False) for _ in range(100)])
+
+        expected = [tetra_volume(*vertices[element]) for element in elements]
+        np.testing.assert_allclose(expected, element_volumes(vertices, elements))
+
+    def test_degenerate_element(self):
+        vertices = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 0.0]])
+        elements = np.array([[0, 1, 2, 3]])
+
+        self.assertEqual(0.0, element_volumes(vertices, elements)[0])
+        self.assertTrue(np.isinf(aspect_ratios(vertices, elements)[0]))
+
+    def test_exchange_length_check(self):
+        # Edges of 5nm and 20nm against an exchange length of 10nm.
+        max_ratio, nlong_edges = exchange_length_check(np.array([0.005, 0.02]), 10e-9)
+        self.assertAlmostEqual(2.0, max_ratio)
+        self.assertEqual(1, nlong_edges)
+
+    def test_mesh_statistics(self):
+        statistics = mesh_statistics(CUBE_VERTICES, CUBE_ELEMENTS, exchange_length=1.5e-6)
+
+        self.assertEqual(8, statistics["nvertices"])
+        self.assertEqual(6, statistics["nelements"])
+        self.assertEqual(19, statistics["nedges"])
+        self.assertAlmostEqual(1.0, statistics["volume"])
+        self.assertEqual(0, statistics["degenerate_elements"])
+        self.assertAlmostEqual(45.0, statistics["dihedral_angle_minimum"])
+        self.assertAlmostEqual(90.0, statistics["dihedral_angle_maximum"])
+        self.assertAlmostEqual(np.sqrt(3.0) / 1.5, statistics["edge_length_exchange_length_ratio_maximum"])
+        self.assertEqual(1, statistics["edges_longer_than_exchange_length"])
+
+
+if __name__ == "__main__":
+    with open("test-mesh-statistics.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,118 @@
+r"""
+Test the request metrics middleware, SQL statement attribution and the Prometheus text output.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+import xmlrunner
+
+import falcon
+import falcon.testing
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+
+from m4db.rest.middleware import MetricsManager
+
+from m4db.utilities.pool_metrics import PoolMetrics
+from m4db.utilities.request_metrics import Histogram
+from m4db.utilities.request_metrics import RequestMetrics
+from m4db.utilities.request_metrics import prometheus_text
+from m4db.utilities.request_metrics import sample
+
+
+class Query:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def on_get(self, req, resp, count):
+        with self.engine.connect() as connection:
+            for _ in range(count):
+                connection.execute(text("select 1"))
+        resp.text = "x" * 10
+
+
+class Stream:
+    def on_get(self, req, resp):
+        resp.stream = (b"y" * 100 for _ in range(5))
+
+
+class File:
+    def on_get(self, req, resp):
+        resp.stream = io.BytesIO(b"z" * 300)
+
+
+class TestRequestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        file_descriptor, self.file_name = tempfile.mkstemp(suffix=".db")
+        os.close(file_descriptor)
+        self.engine = create_engine("sqlite:///{}".format(self.file_name))
+        self.pool_metrics = PoolMetrics(self.engine)
+
+        self.metrics = RequestMetrics()
+        app = falcon.App(middleware=[MetricsManager(self.metrics)])
+        app.add_route("/query/{count:int}", Query(self.engine))
+        app.add_route("/stream", Stream())
+        app.add_route("/file", File())
+        self.client = falcon.testing.TestClient(app)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.file_name)
+
+    def test_requests_and_statements(self):
+        self.client.simulate_get("/query/3")
+        self.client.simulate_get("/query/2")
+        self.client.simulate_get("/missing")
+
+        # Statements outside of a request only count towards the engine totals.
+        with self.engine.connect() as connection:
+            connection.execute(text("select 1"))
+
+        key = ("GET", "/query/{count:int}")
+        self.assertEqual(self.metrics.requests[key + (200,)], 2)
+        self.assertEqual(self.metrics.requests[("GET", "unmatched", 404)], 1)
+        self.assertEqual(self.metrics.latencies[key].count, 2)
+        self.assertEqual(self.metrics.statements[key], 5)
+        self.assertEqual(self.metrics.response_bytes[key], 20)
+        self.assertEqual(self.pool_metrics.as_dict()["statements"], 6)
+
+    def test_streamed_bytes(self):
+        self.assertEqual(len(self.client.simulate_get("/stream").content), 500)
+        self.assertEqual(len(self.client.simulate_get("/file").content), 300)
+
+        self.assertEqual(self.metrics.response_bytes[("GET", "/stream")], 500)
+        self.assertEqual(self.metrics.response_bytes[("GET", "/file")], 300)
+
+    def test_prometheus_text(self):
+        self.client.simulate_get("/query/1")
+        output = prometheus_text(self.metrics, [dict(uri="sqlite://", **self.pool_metrics.as_dict())])
+        lines = output.splitlines()
+
+        self.assertIn('m4db_http_requests_total{method="GET",route="/query/{count:int}",status="200"} 1', lines)
+        self.assertIn('m4db_http_request_duration_seconds_bucket{method="GET",route="/query/{count:int}",le="+Inf"} 1',
+                      lines)
+        self.assertIn('m4db_http_db_statements_total{method="GET",route="/query/{count:int}"} 1', lines)
+        self.assertIn('m4db_db_statements_total{uri="sqlite://",pool="QueuePool"} 1', lines)
+        self.assertIn("# TYPE m4db_http_request_duration_seconds histogram", lines)
+
+    def test_histogram(self):
+        histogram = Histogram([0.1, 1.0])
+        for value in [0.05, 0.1, 0.5, 5.0]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.cumulative_counts(), [(0.1, 2), (1.0, 3), ("+Inf", 4)])
+        self.assertEqual(histogram.count, 4)
+
+    def test_label_escaping(self):
+        self.assertEqual(sample("m", 1, route='a"b\\c\n'), 'm{route="a\\"b\\\\c\\n"} 1')
+
+
+if __name__ == "__main__":
+    with open("test-request-metrics.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False)
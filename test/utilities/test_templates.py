@@ -0,0 +1,100 @@
+r"""
+Test the shared template environment, its bytecode cache and precompiled templates.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import xmlrunner
+
+from types import SimpleNamespace
+
+from m4db.configuration import Templates
+
+from m4db.template import model_merrill_script
+from m4db.template import precompile_templates
+from m4db.template import template_environment
+from m4db.template import template_loader
+
+SLURM_VARIABLES = {
+    "unique_id": "abc",
+    "nodes": 1,
+    "ntasks": 2,
+    "cpus_per_task": 3,
+    "time": "01:00:00",
+    "working_directory": "/work",
+    "module_source": None,
+    "module_dir": "/opt/modules",
+    "modules": ["merrill"]
+}
+
+
+class TestTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_environment(self):
+        self.assertIs(template_loader(), template_loader())
+
+    def test_bytecode_cache(self):
+        cache_directory = os.path.join(self.directory, "cache")
+        templates = Templates({"bytecode-cache-directory": cache_directory})
+
+        expected = template_environment(templates).get_template("slurm_model.jinja2").render(**SLURM_VARIABLES)
+        self.assertGreater(len(os.listdir(cache_directory)), 0)
+
+        # A new environment (i.e. a new process) loads the cached bytecode.
+        self.assertEqual(
+            template_environment(templates).get_template("slurm_model.jinja2").render(**SLURM_VARIABLES), expected
+        )
+
+    def test_no_bytecode_cache(self):
+        environment = template_environment(Templates({"bytecode-cache": False}))
+        self.assertIsNone(environment.bytecode_cache)
+
+    def test_precompiled_templates(self):
+        precompiled_directory = os.path.join(self.directory, "precompiled")
+        precompile_templates(precompiled_directory)
+        self.assertGreater(len(os.listdir(precompiled_directory)), 0)
+
+        environment = template_environment(
+            Templates({"bytecode-cache": False, "precompiled-directory": precompiled_directory})
+        )
+        for name in ["slurm_model.jinja2", "slurm_neb.jinja2"]:
+            template = environment.get_template(name)
+            self.assertTrue(template.filename.startswith(precompiled_directory))
+            self.assertEqual(
+                template.render(**SLURM_VARIABLES),
+                template_environment(Templates({"bytecode-cache": False})).get_template(name).render(**SLURM_VARIABLES)
+            )
+
+    def test_slurm_neb_script(self):
+        script = template_loader().get_template("slurm_neb.jinja2").render(**SLURM_VARIABLES)
+        self.assertIn("#SBATCH --job-name=abc", script)
+        self.assertIn("module load merrill", script)
+        self.assertIn("m4db_run_neb abc", script)
+
+    def test_model_merrill_script(self):
+        model = SimpleNamespace(
+            max_energy_evaluations=100,
+            initial_magnetization=SimpleNamespace(type="uniform_initial_magnetization", dir_x=1, dir_y=0, dir_z=0),
+            materials=[SimpleNamespace(name="magnetite", temperature=20, alpha=None, theta=None, phi=None)],
+            applied_field=None
+        )
+        script = model_merrill_script(model)
+        self.assertIn("Set MaxEnergyEvaluations 100", script)
+        self.assertIn("Uniform Magnetization 1 0 0", script)
+        self.assertIn("magnetite 20 C", script)
+
+
+if __name__ == "__main__":
+    with open("test-templates.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
@@ -0,0 +1,104 @@
+r"""
+Test the parallel data file transfers.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import xmlrunner
+
+from m4db.utilities.unique_id import uid_to_dir
+
+from m4db.transfer_data_files_utilities import MANIFEST_FILE_NAME
+from m4db.transfer_data_files_utilities import parallel_import
+from m4db.transfer_data_files_utilities import parallel_transfer
+from m4db.transfer_data_files_utilities import read_manifest
+from m4db.transfer_data_files_utilities import verify_manifest
+
+UNIQUE_IDS = ["0f86b938-15a3-4f1e-99b1-8f2b65b37a{:02d}".format(index) for index in range(20)]
+
+
+class TestTransferDataFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src_root = os.path.join(self.root, "src")
+        self.transfer_root = os.path.join(self.root, "transfer")
+        self.dst_root = os.path.join(self.root, "dst")
+
+        for index, unique_id in enumerate(UNIQUE_IDS):
+            data_dir = os.path.join(self.src_root, uid_to_dir(unique_id))
+            os.makedirs(data_dir)
+            with open(os.path.join(data_dir, "model.dat"), "wb") as fout:
+                fout.write(os.urandom(1000 + index))
+            with open(os.path.join(data_dir, "model.stdout"), "w") as fout:
+                fout.write("model {}\n".format(unique_id))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def relative_dirs(self):
+        return [uid_to_dir(unique_id) for unique_id in UNIQUE_IDS]
+
+    def assertSameFiles(self, unique_id):
+        for file_name in ["model.dat", "model.stdout"]:
+            with open(os.path.join(self.src_root, uid_to_dir(unique_id), file_name), "rb") as fin:
+                expected = fin.read()
+            with open(os.path.join(self.dst_root, uid_to_dir(unique_id), file_name), "rb") as fin:
+                self.assertEqual(fin.read(), expected)
+
+    def test_copy_and_import(self):
+        counts = []
+        parallel_transfer(self.src_root, self.transfer_root, self.relative_dirs(), max_workers=4,
+                          progress=counts.append)
+
+        manifest = read_manifest(self.transfer_root)
+        self.assertEqual(counts[-1], len(UNIQUE_IDS))
+        self.assertFalse(manifest["archived"])
+        self.assertEqual(len(manifest["entries"]), 2 * len(UNIQUE_IDS))
+        self.assertEqual(verify_manifest(self.transfer_root), [])
+
+        parallel_import(self.transfer_root, self.dst_root, max_workers=4)
+        for unique_id in UNIQUE_IDS:
+            self.assertSameFiles(unique_id)
+
+    def test_archive_and_import(self):
+        parallel_transfer(self.src_root, self.transfer_root, self.relative_dirs(), archived=True, max_workers=4)
+
+        manifest = read_manifest(self.transfer_root)
+        self.assertTrue(manifest["archived"])
+        self.assertEqual(len(manifest["entries"]), len(UNIQUE_IDS))
+
+        parallel_import(self.transfer_root, self.dst_root, max_workers=4)
+        for unique_id in UNIQUE_IDS:
+            self.assertSameFiles(unique_id)
+
+    def test_verification_failure(self):
+        parallel_transfer(self.src_root, self.transfer_root, self.relative_dirs())
+
+        # Corrupt one file (same size) and remove another.
+        corrupt_file = os.path.join(self.transfer_root, uid_to_dir(UNIQUE_IDS[0]), "model.stdout")
+        with open(corrupt_file, "r+b") as fout:
+            fout.write(b"X")
+        os.remove(os.path.join(self.transfer_root, uid_to_dir(UNIQUE_IDS[1]), "model.dat"))
+
+        errors = verify_manifest(self.transfer_root)
+        self.assertEqual(len(errors), 2)
+
+        with self.assertRaises(ValueError):
+            parallel_import(self.transfer_root, self.dst_root)
+        self.assertFalse(os.path.exists(self.dst_root))
+
+    def test_manifest_location(self):
+        manifest_file = parallel_transfer(self.src_root, self.transfer_root, self.relative_dirs()[:1])
+
+        self.assertEqual(manifest_file, os.path.join(self.transfer_root, MANIFEST_FILE_NAME))
+
+
+if __name__ == "__main__":
+    with open("test-transfer-data-files.xml", "wb") as fout:
+        unittest.main(
+            testRunner=xmlrunner.XMLTestRunner(output=fout),
+            failfast=False, buffer=False, catchbreak=False
+        )
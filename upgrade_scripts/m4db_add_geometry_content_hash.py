@@ -0,0 +1,24 @@
+r"""
+Add the geometry.content_hash column (the sha256 hash of a geometry's patran file) and its index to an existing v2
+database. The database is taken from the M4DB_CONFIG file. Once the column exists, run 'm4db-geometry dedup' to
+compute the hashes of the existing geometries.
+"""
+
+from m4db.sessions import get_session
+
+from m4db.install.columns import add_geometry_content_hash
+
+
+def main():
+    session = get_session(nullpool=True)
+
+    if add_geometry_content_hash(session):
+        print("Added column 'content_hash' to table 'geometry'")
+    else:
+        print("Table 'geometry' already has column 'content_hash'")
+
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
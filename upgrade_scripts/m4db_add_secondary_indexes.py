@@ -0,0 +1,70 @@
+r"""
+Add the secondary indexes on the model/NEB foreign keys (and, on PostgreSQL, the partial indexes over pending
+models/NEBs) to an existing v2 database, along with the unique NEB end point index. The database is taken from the
+M4DB_CONFIG file. The geometry.content_hash column and its index (see m4db_add_geometry_content_hash.py) are added
+first if they are missing. With --drop, only the secondary and partial indexes are dropped, the unique index and the
+content_hash index are left in place.
+"""
+import sys
+
+from argparse import ArgumentParser
+
+from m4db.sessions import get_session
+
+from m4db.db.neb.check_endpoint_exists import duplicate_parent_paths
+
+from m4db.install.columns import add_geometry_content_hash
+
+from m4db.install.indexes import secondary_indexes
+from m4db.install.indexes import unique_indexes
+from m4db.install.indexes import create_secondary_indexes
+from m4db.install.indexes import create_unique_indexes
+from m4db.install.indexes import drop_secondary_indexes
+from m4db.install.indexes import create_partial_indexes
+from m4db.install.indexes import drop_partial_indexes
+
+
+def command_line_parser():
+    parser = ArgumentParser()
+
+    parser.add_argument("--drop", action="store_true", help="drop the indexes instead (i.e. undo this upgrade)")
+
+    return parser
+
+
+def main():
+    parser = command_line_parser()
+    args = parser.parse_args()
+
+    session = get_session(nullpool=True)
+
+    if args.drop:
+        print("Dropping partial indexes")
+        drop_partial_indexes(session)
+        print("Dropping secondary indexes")
+        drop_secondary_indexes(session)
+    else:
+        duplicates = duplicate_parent_paths(session)
+        if duplicates:
+            print("The following pairs of models are joined by more than one parent NEB, please resolve these "
+                  "before adding the unique end point index")
+            for low_model_id, high_model_id, count in duplicates:
+                print(f"    model ids {low_model_id} and {high_model_id}: {count} parent NEBs")
+            sys.exit(1)
+
+        if add_geometry_content_hash(session):
+            print("Added column 'content_hash' to table 'geometry'")
+        for index in secondary_indexes():
+            print(f"Creating index '{index.name}' on table '{index.table.name}'")
+        create_secondary_indexes(session)
+        for index in unique_indexes():
+            print(f"Creating unique index '{index.name}' on table '{index.table.name}'")
+        create_unique_indexes(session)
+        print("Creating partial indexes")
+        create_partial_indexes(session)
+
+    session.close()
+
+
+if __name__ == "__main__":
+    main()